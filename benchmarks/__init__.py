@@ -0,0 +1,19 @@
+"""Offline benchmarks for retrieval, chunking and load.
+
+Run with ``python -m benchmarks.<name>``; see ``benchmarks/README.md``.
+"""
+
+import subprocess
+
+
+def git_commit() -> str | None:
+    """Current commit, recorded with benchmark results."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
@@ -0,0 +1,463 @@
+"""Chunking benchmark: throughput, memory and chunk sizes per strategy.
+
+Runs ``SimpleSemanticChunking``, ``ContextualSemanticChunking`` (LLM and
+extractive contexts) and ``LangChainContextualChunker`` (sync and async)
+over a fixed local corpus, with the embeddings and Gemini replaced by local
+fakes that wait a configurable latency per call::
+
+    python -m benchmarks.chunking --chunk-sizes 512,1000 --thresholds 0.5,0.7 \\
+        --output chunking.json --compare baseline.json
+
+Each setup runs in a fresh process, so peak RSS belongs to that setup
+alone. A timed pass measures MB/s and chunks/s; a second pass under
+``tracemalloc`` (with the fakes' latency off) measures the traced peak and
+the lines allocating the most. The report also has the chunk size
+distribution in characters and (estimated) tokens.
+
+With ``--compare`` the run exits with status 1 when throughput drops,
+memory grows past the tolerances, or the chunks produced change.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import re
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import git_commit
+from benchmarks.dataset import QADataset
+from benchmarks.fakes import FakeGeminiClient, HashingChunkEmbeddings, Latency, estimate_tokens
+from benchmarks.scoring import percentile
+
+DEFAULT_DATASET = Path(__file__).parent / "data" / "economics_qa.json"
+
+STRATEGIES = (
+    "agno_semantic",
+    "agno_contextual",
+    "agno_extractive",
+    "langchain_contextual",
+    "langchain_contextual_async",
+)
+
+CONTEXT_PREFIX = re.compile(r"^\[CONTEXT: .*?\]\n\n", re.DOTALL)
+
+# Allocation sites kept in the report, outside the benchmark's own code
+TOP_ALLOCATIONS = 8
+ALLOCATION_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "*/benchmarks/*"),
+)
+
+
+@dataclass
+class ChunkingConfig:
+    """One benchmarked setup.
+
+    Attributes:
+        strategy: One of ``STRATEGIES``.
+        chunk_size: Chunker ``chunk_size``.
+        similarity_threshold: Chunker ``similarity_threshold``.
+        embedding_latency: Delay per embeddings call.
+        context_latency: Delay per context generation call.
+        seed: Seed of the latency draws.
+    """
+
+    strategy: str
+    chunk_size: int
+    similarity_threshold: float
+    embedding_latency: Latency
+    context_latency: Latency
+    seed: int = 0
+
+
+def load_corpus(
+    corpus: Path | None, dataset: Path, scale: int, seed: int = 0
+) -> list[tuple[str, str]]:
+    """Return the benchmark documents as ``(name, text)`` pairs.
+
+    Args:
+        corpus: Directory of ``.txt``, ``.md`` and ``.pdf`` files; None
+            builds the corpus from the QA dataset.
+        dataset: QA dataset whose documents make the default corpus.
+        scale: Rounds of each dataset document's passages, each round in a
+            different (seeded) order, joined into one long document.
+        seed: Shuffle seed.
+    """
+    if corpus is not None:
+        documents = []
+        for path in sorted(corpus.rglob("*")):
+            if path.suffix in (".txt", ".md"):
+                documents.append((path.name, path.read_text(encoding="utf-8")))
+            elif path.suffix == ".pdf":
+                from pypdf import PdfReader
+
+                pages = PdfReader(path).pages
+                documents.append((path.name, "\n\n".join(p.extract_text() for p in pages)))
+        return documents
+
+    rng = random.Random(seed)
+    passages: dict[str, list[str]] = {}
+    for chunk in QADataset.load(dataset).chunks:
+        passages.setdefault(chunk.document_id, []).append(chunk.text)
+    documents = []
+    for document_id, texts in passages.items():
+        rounds = []
+        for _ in range(scale):
+            rounds.extend(rng.sample(texts, len(texts)))
+        documents.append((document_id, "\n\n".join(rounds)))
+    return documents
+
+
+class StrategyRunner:
+    """Builds a strategy with fake providers and chunks documents with it."""
+
+    def __init__(self, config: ChunkingConfig) -> None:
+        """Build the chunker of a setup.
+
+        Args:
+            config: Setup to build.
+        """
+        self.config = config
+        self.embeddings = HashingChunkEmbeddings(
+            latency=config.embedding_latency, seed=config.seed
+        )
+        self.client = FakeGeminiClient(latency=config.context_latency, seed=config.seed)
+
+        if config.strategy == "agno_semantic":
+            from src.rag.agno.simple_chunking import SimpleSemanticChunking
+
+            self.chunker = SimpleSemanticChunking(
+                chunk_size=config.chunk_size,
+                similarity_threshold=config.similarity_threshold,
+                embedding_model=self.embeddings,
+            )
+        elif config.strategy in ("agno_contextual", "agno_extractive"):
+            from src.rag.agno.chunking import ContextualSemanticChunking
+
+            self.chunker = ContextualSemanticChunking(
+                chunk_size=config.chunk_size,
+                similarity_threshold=config.similarity_threshold,
+                embedding_model=self.embeddings,
+                context_client=self.client,
+                context_strategy="extractive" if config.strategy == "agno_extractive" else "llm",
+            )
+        else:
+            from src.rag.langchain.chunking import LangChainContextualChunker
+
+            self.chunker = LangChainContextualChunker(
+                embedder=self.embeddings,
+                chunk_size=config.chunk_size,
+                similarity_threshold=config.similarity_threshold,
+                client=self.client,
+            )
+
+    def chunk(self, documents: list[tuple[str, str]]) -> list[str]:
+        """Chunk documents and return the chunk texts as stored."""
+        strategy = self.config.strategy
+        if strategy.startswith("agno"):
+            from agno.knowledge.document import Document
+
+            return [
+                chunk.content
+                for name, text in documents
+                for chunk in self.chunker.chunk(Document(name=name, content=text))
+            ]
+
+        from langchain_core.documents import Document
+
+        docs = [Document(page_content=text, metadata={"source": name}) for name, text in documents]
+        if strategy == "langchain_contextual_async":
+            chunks = asyncio.run(self.chunker.achunk_documents(docs))
+        else:
+            chunks = self.chunker.chunk_documents(docs)
+        return [chunk.page_content for chunk in chunks]
+
+    def disable_latency(self) -> None:
+        """Make the fakes answer immediately."""
+        self.embeddings.latency = Latency(0)
+        self.client.latency = Latency(0)
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _short_path(filename: str) -> str:
+    """Path of a source file relative to site-packages or the repository."""
+    if "site-packages/" in filename:
+        return filename.rpartition("site-packages/")[2]
+    root = str(Path(__file__).parent.parent) + "/"
+    return filename.removeprefix(root)
+
+
+def _distribution(values: list[int]) -> dict[str, float]:
+    """Min, mean, percentiles and max of chunk sizes."""
+    return {
+        "min": min(values, default=0),
+        "mean": round(sum(values) / len(values), 1) if values else 0.0,
+        "p5": percentile(values, 5),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "max": max(values, default=0),
+    }
+
+
+def measure(config: ChunkingConfig, documents: list[tuple[str, str]]) -> dict:
+    """Benchmark one setup (meant to run in a fresh process).
+
+    Returns:
+        Result row of the setup.
+    """
+    runner = StrategyRunner(config)
+    input_bytes = sum(len(text.encode()) for _, text in documents)
+
+    # Warm up imports and the tokenizer outside the measurements
+    runner.chunk(documents[:1])
+    embedding_calls, context_calls = runner.embeddings.calls, runner.client.calls
+    baseline_rss = _peak_rss_mb()
+
+    start = time.perf_counter()
+    chunks = runner.chunk(documents)
+    seconds = time.perf_counter() - start
+    peak_rss = _peak_rss_mb()
+    embedding_calls = runner.embeddings.calls - embedding_calls
+    context_calls = runner.client.calls - context_calls
+
+    runner.disable_latency()
+    tracemalloc.start(1)
+    before = tracemalloc.take_snapshot()
+    # Keep the output alive, so the snapshot includes what the chunks hold
+    traced_chunks = runner.chunk(documents)
+    after = tracemalloc.take_snapshot()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced_chunks
+    stats = after.filter_traces(ALLOCATION_FILTERS).compare_to(
+        before.filter_traces(ALLOCATION_FILTERS), "lineno"
+    )
+    top = [
+        {
+            "site": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+            "kb": round(stat.size_diff / 1024, 1),
+            "blocks": stat.count_diff,
+        }
+        for stat in stats[:TOP_ALLOCATIONS]
+    ]
+
+    texts = [CONTEXT_PREFIX.sub("", chunk, count=1) for chunk in chunks]
+    tokens = [estimate_tokens(text) for text in texts]
+    oversized = sum(1 for count in tokens if count > config.chunk_size)
+    return {
+        **asdict(config),
+        "documents": len(documents),
+        "input_mb": round(input_bytes / 1e6, 4),
+        "seconds": round(seconds, 3),
+        "mb_per_s": round(input_bytes / 1e6 / seconds, 4),
+        "chunks": len(chunks),
+        "chunks_per_s": round(len(chunks) / seconds, 2),
+        "embedding_calls": embedding_calls,
+        "context_calls": context_calls,
+        "peak_rss_mb": round(peak_rss, 1),
+        "rss_growth_mb": round(peak_rss - baseline_rss, 1),
+        "traced_peak_mb": round(traced_peak / 1e6, 2),
+        "top_allocations": top,
+        "chunk_chars": _distribution([len(text) for text in texts]),
+        "chunk_tokens": _distribution(tokens),
+        "over_chunk_size": round(oversized / len(tokens), 4) if tokens else 0.0,
+    }
+
+
+def run_isolated(config: ChunkingConfig, documents: list[tuple[str, str]]) -> dict:
+    """Run ``measure`` in a fresh process, so peak RSS is the setup's own."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure, config, documents).result()
+
+
+def _row_key(row: dict) -> tuple:
+    """Identity of a result row across runs."""
+    return (row["strategy"], row["chunk_size"], row["similarity_threshold"])
+
+
+def compare(
+    results: list[dict],
+    baseline: list[dict],
+    max_throughput_drop: float,
+    max_memory_increase: float,
+) -> list[str]:
+    """List regressions of ``results`` against a baseline run.
+
+    Args:
+        results: Result rows of this run.
+        baseline: Result rows of the baseline run.
+        max_throughput_drop: Allowed relative drop of MB/s.
+        max_memory_increase: Allowed relative growth of RSS growth and of
+            the traced peak.
+
+    Returns:
+        Human-readable regressions (empty when there are none).
+    """
+    previous = {_row_key(row): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get(_row_key(row))
+        if before is None:
+            continue
+        label = "/".join(str(part) for part in _row_key(row))
+        if row["mb_per_s"] < before["mb_per_s"] * (1 - max_throughput_drop):
+            regressions.append(
+                f"{label}: {before['mb_per_s']:.3f} -> {row['mb_per_s']:.3f} MB/s"
+            )
+        for metric in ("rss_growth_mb", "traced_peak_mb"):
+            # Ignore noise below 1 MB
+            if row[metric] > max(before[metric] * (1 + max_memory_increase), before[metric] + 1):
+                regressions.append(f"{label}: {metric} {before[metric]} -> {row[metric]}")
+        if row["documents"] == before["documents"] and (
+            row["chunks"] != before["chunks"]
+            or row["chunk_tokens"]["p50"] != before["chunk_tokens"]["p50"]
+        ):
+            regressions.append(
+                f"{label}: chunks changed ({before['chunks']} -> {row['chunks']}, "
+                f"p50 {before['chunk_tokens']['p50']} -> {row['chunk_tokens']['p50']} tokens)"
+            )
+    return regressions
+
+
+def _print_row(row: dict) -> None:
+    """Print a result row."""
+    tokens = row["chunk_tokens"]
+    print(
+        f"  {row['strategy']:<27} size={row['chunk_size']:<5} "
+        f"threshold={row['similarity_threshold']:<4} "
+        f"{row['mb_per_s']:8.4f} MB/s {row['chunks_per_s']:8.2f} chunks/s "
+        f"rss+{row['rss_growth_mb']:.1f}MB traced={row['traced_peak_mb']:.1f}MB "
+        f"chunks={row['chunks']} tokens p50={tokens['p50']} p95={tokens['p95']} "
+        f"max={tokens['max']}"
+    )
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _float_list(value: str) -> list[float]:
+    return [float(v) for v in value.split(",") if v]
+
+
+def _str_list(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main() -> None:
+    """Run the chunking benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Measure throughput, memory and chunk sizes of the chunking strategies"
+    )
+    parser.add_argument(
+        "--strategies",
+        type=_str_list,
+        default=list(STRATEGIES),
+        help=f"Strategies to run ({', '.join(STRATEGIES)})",
+    )
+    parser.add_argument("--chunk-sizes", type=_int_list, default=[1000])
+    parser.add_argument("--thresholds", type=_float_list, default=[0.5])
+    parser.add_argument("--corpus", type=Path, help="Directory of .txt/.md/.pdf files")
+    parser.add_argument(
+        "--dataset", type=Path, default=DEFAULT_DATASET, help="Default corpus source"
+    )
+    parser.add_argument(
+        "--scale", type=int, default=50, help="Rounds of passages per dataset document"
+    )
+    parser.add_argument(
+        "--embedding-latency",
+        type=Latency.parse,
+        default=Latency(150, 30),
+        help="Per embeddings call, milliseconds mean[:jitter]",
+    )
+    parser.add_argument(
+        "--context-latency",
+        type=Latency.parse,
+        default=Latency(200, 50),
+        help="Per context generation call, milliseconds mean[:jitter]",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Corpus and latency seed")
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON")
+    parser.add_argument(
+        "--max-throughput-drop", type=float, default=0.2, help="Allowed relative MB/s drop"
+    )
+    parser.add_argument(
+        "--max-memory-increase",
+        type=float,
+        default=0.25,
+        help="Allowed relative growth of RSS growth and traced peak",
+    )
+    args = parser.parse_args()
+
+    unknown = set(args.strategies) - set(STRATEGIES)
+    if unknown:
+        parser.error(f"Unknown strategies: {', '.join(sorted(unknown))}")
+
+    documents = load_corpus(args.corpus, args.dataset, args.scale, args.seed)
+    input_mb = sum(len(text.encode()) for _, text in documents) / 1e6
+    configs = [
+        ChunkingConfig(
+            strategy,
+            size,
+            threshold,
+            args.embedding_latency,
+            args.context_latency,
+            args.seed,
+        )
+        for strategy in args.strategies
+        for size in args.chunk_sizes
+        for threshold in args.thresholds
+    ]
+    print(
+        f"✂️  Benchmarking {len(configs)} setups on {len(documents)} documents "
+        f"({input_mb:.2f} MB)\n"
+    )
+
+    results = []
+    for config in configs:
+        row = run_isolated(config, documents)
+        _print_row(row)
+        results.append(row)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "corpus": str(args.corpus) if args.corpus else f"{args.dataset.name} x{args.scale}",
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(
+            results, baseline, args.max_throughput_drop, args.max_memory_increase
+        )
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressions against {args.compare}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
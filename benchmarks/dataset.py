@@ -0,0 +1,148 @@
+"""QA dataset format for retrieval benchmarks.
+
+A dataset is a JSON file::
+
+    {
+      "name": "economics-sample",
+      "documents": [
+        {
+          "id": "inflation",
+          "title": "Inflation in Brazil",
+          "chunks": [
+            {"id": "inflation-0", "text": "...", "context": "optional situating context"}
+          ]
+        }
+      ],
+      "questions": [
+        {"id": "q1", "question": "...", "relevant": ["inflation-0"]}
+      ]
+    }
+
+``relevant`` lists the chunk ids that answer a question. ``context`` is
+what the contextual chunkers would prepend to the chunk; store the real
+LLM output there to benchmark actual ingestion quality. Chunks without it
+get a deterministic stand-in (document title plus its first sentence).
+"""
+
+import json
+import random
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+@dataclass
+class Chunk:
+    """A retrievable passage.
+
+    Attributes:
+        id: Unique chunk id, referenced by questions.
+        document_id: Id of the source document.
+        text: Chunk text as produced by semantic chunking.
+        context: Situating context added by contextual chunking.
+    """
+
+    id: str
+    document_id: str
+    text: str
+    context: str
+
+    def contextual_text(self) -> str:
+        """Chunk content as stored by the contextual chunkers."""
+        return f"[CONTEXT: {self.context.strip()}]\n\n{self.text}"
+
+
+@dataclass
+class Question:
+    """A question and the chunks that answer it."""
+
+    id: str
+    question: str
+    relevant: set[str]
+
+
+@dataclass
+class QADataset:
+    """Chunks plus questions with known relevant chunks.
+
+    Attributes:
+        name: Dataset name, recorded in results.
+        chunks: Retrievable passages.
+        questions: Benchmark questions.
+        titles: Document titles by document id.
+    """
+
+    name: str
+    chunks: list[Chunk]
+    questions: list[Question] = field(default_factory=list)
+    titles: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "QADataset":
+        """Load and validate a dataset file.
+
+        Raises:
+            ValueError: A question references an unknown chunk id.
+        """
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        chunks = []
+        for document in data["documents"]:
+            texts = [chunk["text"] for chunk in document["chunks"]]
+            first_sentence = SENTENCE_END.split(" ".join(texts).strip(), maxsplit=1)[0]
+            fallback = f"From '{document.get('title', document['id'])}'. {first_sentence}"
+            chunks.extend(
+                Chunk(
+                    id=chunk["id"],
+                    document_id=document["id"],
+                    text=chunk["text"],
+                    context=chunk.get("context") or fallback,
+                )
+                for chunk in document["chunks"]
+            )
+
+        ids = {chunk.id for chunk in chunks}
+        questions = [
+            Question(q["id"], q["question"], set(q["relevant"])) for q in data["questions"]
+        ]
+        for question in questions:
+            unknown = question.relevant - ids
+            if unknown:
+                raise ValueError(f"Question {question.id} references unknown chunks {unknown}")
+        titles = {
+            document["id"]: document.get("title", document["id"])
+            for document in data["documents"]
+        }
+        return cls(data.get("name", Path(path).stem), chunks, questions, titles)
+
+    def with_corpus_size(self, size: int, seed: int = 0) -> list[Chunk]:
+        """Return the chunks padded with synthetic distractors up to ``size``.
+
+        Distractors are shuffled word salads of the dataset's own vocabulary,
+        so they compete on the same terms without answering any question.
+        The same seed always yields the same corpus.
+
+        Args:
+            size: Target number of chunks (no padding when not larger than
+                the dataset).
+            seed: Random seed for the distractors.
+        """
+        if size <= len(self.chunks):
+            return list(self.chunks)
+
+        rng = random.Random(seed)
+        vocabulary = sorted({w for c in self.chunks for w in c.text.split()})
+        lengths = [len(c.text.split()) for c in self.chunks]
+        distractors = []
+        for i in range(size - len(self.chunks)):
+            words = rng.choices(vocabulary, k=rng.choice(lengths))
+            distractors.append(
+                Chunk(
+                    id=f"distractor-{i}",
+                    document_id=f"distractor-{i // 8}",
+                    text=" ".join(words),
+                    context=" ".join(rng.choices(vocabulary, k=12)),
+                )
+            )
+        return self.chunks + distractors
@@ -0,0 +1,208 @@
+"""Deterministic local providers, so benchmarks run without API keys or network.
+
+Texts are embedded as signed feature-hashed bags of words and word bigrams,
+L2-normalized. Similarity is purely lexical, which is enough to compare
+chunking strategies against each other (contextual prefixes add the terms
+questions use) but says nothing about absolute quality with real embeddings.
+
+The chunking fakes (``HashingChunkEmbeddings``, ``FakeGeminiClient``) can
+also wait a sampled ``Latency`` per call, to stand in for the network time
+of the real providers.
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.knowledge.embedder.base import Embedder
+from chonkie.embeddings import BaseEmbeddings
+from langchain_core.embeddings import Embeddings
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Too frequent to tell passages apart
+STOPWORDS = frozenset(
+    "a an and are as at be by de do da das dos e em for from how in is it its "
+    "no na nas o os of on or para por que the this to um uma was what which with".split()
+)
+
+
+def _tokens(text: str) -> list[str]:
+    """Lowercase, accent-free words without stopwords."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [w for w in WORD_PATTERN.findall(text) if w not in STOPWORDS]
+
+
+def hashed_embedding(text: str, dimensions: int = 768) -> list[float]:
+    """Embed text as a normalized signed hash of its words and word bigrams.
+
+    Args:
+        text: Text to embed.
+        dimensions: Vector size.
+
+    Returns:
+        Unit vector (all zeros for text without words).
+    """
+    words = _tokens(text)
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    vector = [0.0] * dimensions
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
+
+
+@dataclass
+class HashingEmbedder(Embedder):
+    """Agno embedder backed by ``hashed_embedding``."""
+
+    id: str = "hashing"
+    dimensions: Optional[int] = 768
+
+    def get_embedding(self, text: str) -> List[float]:
+        return hashed_embedding(text, self.dimensions or 768)
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding(text)
+
+    async def async_get_embedding_and_usage(
+        self, text: str
+    ) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+
+class HashingEmbeddings(Embeddings):
+    """LangChain embeddings backed by ``hashed_embedding``."""
+
+    def __init__(self, dimensions: int = 768) -> None:
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [hashed_embedding(text, self.dimensions) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return hashed_embedding(text, self.dimensions)
+
+
+@dataclass
+class Latency:
+    """Normally distributed delay, truncated at zero.
+
+    Attributes:
+        mean_ms: Mean delay in milliseconds.
+        jitter_ms: Standard deviation in milliseconds.
+    """
+
+    mean_ms: float
+    jitter_ms: float = 0.0
+
+    @classmethod
+    def parse(cls, value: str) -> "Latency":
+        """Parse ``"mean"`` or ``"mean:jitter"`` (milliseconds)."""
+        mean, _, jitter = value.partition(":")
+        return cls(float(mean), float(jitter or 0))
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a delay in seconds."""
+        return max(0.0, rng.gauss(self.mean_ms, self.jitter_ms)) / 1000
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class HashingChunkEmbeddings(BaseEmbeddings):
+    """Chonkie embeddings backed by ``hashed_embedding``.
+
+    Each ``embed_batch`` call (one per document in the semantic chunker)
+    waits ``latency``, like one request to the embeddings API.
+
+    Attributes:
+        latency: Delay per call.
+        calls: Number of embedding calls made.
+    """
+
+    def __init__(
+        self, dimensions: int = 768, latency: Latency | None = None, seed: int = 0
+    ) -> None:
+        super().__init__()
+        self.dimensions = dimensions
+        self.latency = latency or Latency(0)
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        self.calls += 1
+        time.sleep(self.latency.sample(self._rng))
+        return [np.array(hashed_embedding(text, self.dimensions)) for text in texts]
+
+    def count_tokens(self, text: str) -> int:
+        return estimate_tokens(text)
+
+    def similarity(self, u: np.ndarray, v: np.ndarray) -> float:
+        norm = np.linalg.norm(u) * np.linalg.norm(v)
+        return float(np.dot(u, v) / norm) if norm else 0.0
+
+    @property
+    def dimension(self) -> int:
+        return self.dimensions
+
+
+class FakeGeminiClient:
+    """Stand-in for ``genai.Client`` in context generation.
+
+    ``models.generate_content`` (and ``aio.models.generate_content``) answer
+    after ``latency`` with a one-sentence context naming the chunk's first
+    words, plus usage metadata.
+
+    Attributes:
+        latency: Delay per call.
+        calls: Number of generation calls made.
+    """
+
+    def __init__(self, latency: Latency | None = None, seed: int = 0) -> None:
+        self.latency = latency or Latency(0)
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self.models = SimpleNamespace(generate_content=self._generate)
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._agenerate))
+
+    def _response(self, contents: str) -> SimpleNamespace:
+        self.calls += 1
+        chunk = contents.rpartition("CHUNK:")[2]
+        words = " ".join(chunk.split()[:12])
+        text = f"This chunk discusses {words}."
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=estimate_tokens(contents),
+                candidates_token_count=estimate_tokens(text),
+            ),
+        )
+
+    def _generate(self, model: str, contents: str) -> SimpleNamespace:
+        time.sleep(self.latency.sample(self._rng))
+        return self._response(contents)
+
+    async def _agenerate(self, model: str, contents: str) -> SimpleNamespace:
+        await asyncio.sleep(self.latency.sample(self._rng))
+        return self._response(contents)
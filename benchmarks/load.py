@@ -0,0 +1,680 @@
+"""Load test of ``/query`` and the Telegram webhook with stubbed providers.
+
+Runs the API in this process under uvicorn, with Gemini, Groq, Tavily,
+YFinance and the Telegram Bot API replaced by the latency-injecting stubs
+of ``benchmarks.stubs``, then replays recorded or synthetic traffic::
+
+    python -m benchmarks.load --requests 500 --rate 20 --telegram-share 0.5 \\
+        --output load.json
+
+Arrivals are open-loop (Poisson at ``--rate``, or the recorded offsets of a
+replay) or closed-loop (``--concurrency`` clients sending back to back).
+Open-loop latency counts from the scheduled arrival, so a saturated server
+shows up as latency instead of silently slowing the clients down.
+
+Telegram updates are answered by the webhook right away and handled by the
+update queue; their latency runs until the bot finished handling the update
+(reply sent), their outcome comes from the messages the bot sent.
+
+The report has throughput, latency percentiles and error rates per
+endpoint, Postgres connections sampled from ``pg_stat_activity`` and the
+calls made to each stub. The app still needs a real Postgres (sessions,
+memories, the knowledge base); point ``DB_URL`` at a scratch database.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import git_commit
+from benchmarks.dataset import QADataset
+from benchmarks.scoring import latency_summary
+from benchmarks.fakes import Latency
+from benchmarks.stubs import ProviderStubs, StubConfig, stub_toolkits
+
+DEFAULT_DATASET = Path(__file__).parent / "data" / "economics_qa.json"
+
+BOT_TOKEN = "123456:load-test"
+
+CHAT_MESSAGES = ["Oi!", "Bom dia", "Obrigado!", "Valeu, até mais", "Tudo bem?"]
+TOOL_MESSAGES = [
+    "Qual o preço atual da PETR4?",
+    "Quanto está a ação da Vale hoje?",
+    "Quais as últimas notícias sobre a taxa Selic?",
+    "O que saiu hoje sobre o dólar?",
+]
+
+
+@dataclass
+class TrafficItem:
+    """One request of a load test.
+
+    Attributes:
+        endpoint: ``query`` or ``telegram``.
+        text: Question or message text.
+        user: Synthetic user number (also the Telegram chat).
+        at: Offset in seconds from the start of the run, for replays.
+        voice: Send a Telegram voice note instead of text.
+    """
+
+    endpoint: str
+    text: str
+    user: int
+    at: float | None = None
+    voice: bool = False
+
+
+@dataclass
+class Result:
+    """Outcome of one request.
+
+    Attributes:
+        endpoint: ``query`` or ``telegram``.
+        status: HTTP status for ``/query``; for Telegram the bot's outcome
+            (``ok``, ``error``, ``busy``, ``rate_limited``, ``no_reply``) or the
+            webhook's HTTP status when it refused the update.
+        seconds: Latency.
+        ack_seconds: Time until the webhook answered (Telegram only).
+    """
+
+    endpoint: str
+    status: str
+    seconds: float
+    ack_seconds: float | None = None
+
+
+def synthetic_traffic(
+    count: int,
+    users: int,
+    telegram_share: float,
+    voice_share: float,
+    mix: dict[str, float],
+    dataset: QADataset,
+    seed: int = 0,
+) -> list[TrafficItem]:
+    """Generate a reproducible request mix.
+
+    Args:
+        count: Number of requests.
+        users: Distinct users the requests are spread over.
+        telegram_share: Fraction of requests sent to the Telegram webhook.
+        voice_share: Fraction of Telegram requests sent as voice notes.
+        mix: Weights of ``chat`` (small talk), ``kb`` (dataset questions) and
+            ``tools`` (prices and news) messages.
+        dataset: Source of the knowledge base questions.
+        seed: Random seed.
+    """
+    rng = random.Random(seed)
+    pools = {
+        "chat": CHAT_MESSAGES,
+        "kb": [q.question for q in dataset.questions],
+        "tools": TOOL_MESSAGES,
+    }
+    kinds = [kind for kind in pools if mix.get(kind, 0) > 0]
+    weights = [mix[kind] for kind in kinds]
+
+    items = []
+    for _ in range(count):
+        endpoint = "telegram" if rng.random() < telegram_share else "query"
+        kind = rng.choices(kinds, weights)[0]
+        items.append(
+            TrafficItem(
+                endpoint=endpoint,
+                text=rng.choice(pools[kind]),
+                user=rng.randrange(users),
+                voice=endpoint == "telegram" and rng.random() < voice_share,
+            )
+        )
+    return items
+
+
+def load_traffic(path: Path) -> list[TrafficItem]:
+    """Read traffic from JSON lines (one ``TrafficItem`` object per line)."""
+    with path.open(encoding="utf-8") as f:
+        return [TrafficItem(**json.loads(line)) for line in f if line.strip()]
+
+
+def save_traffic(path: Path, items: list[TrafficItem]) -> None:
+    """Write traffic as JSON lines, for replaying the same run later."""
+    with path.open("w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(asdict(item), ensure_ascii=False) + "\n")
+
+
+class ConnectionSampler:
+    """Samples the database's connections from ``pg_stat_activity``.
+
+    Connections of the sampler itself are excluded.
+    """
+
+    QUERY = (
+        "SELECT coalesce(state, 'unknown'), count(*) FROM pg_stat_activity "
+        "WHERE datname = current_database() AND pid <> pg_backend_pid() "
+        "AND backend_type = 'client backend' GROUP BY 1"
+    )
+
+    def __init__(self, db_url: str, interval: float = 0.5) -> None:
+        """Initialize the sampler.
+
+        Args:
+            db_url: Database to watch.
+            interval: Seconds between samples.
+        """
+        from sqlalchemy import create_engine
+
+        self.engine = create_engine(db_url, pool_size=1, max_overflow=0)
+        self.interval = interval
+        self.samples: list[dict[str, int]] = []
+        self.max_connections: int | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pg-sampler", daemon=True)
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and close the connection."""
+        self._stop.set()
+        self._thread.join()
+        self.engine.dispose()
+
+    def _run(self) -> None:
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            self.max_connections = int(conn.execute(text("SHOW max_connections")).scalar())
+            while not self._stop.is_set():
+                rows = conn.execute(text(self.QUERY)).all()
+                conn.rollback()
+                self.samples.append({state: count for state, count in rows})
+                self._stop.wait(self.interval)
+
+    def summary(self) -> dict:
+        """Peak and mean connections, overall and per state."""
+        totals = [sum(sample.values()) for sample in self.samples] or [0]
+        states = sorted({state for sample in self.samples for state in sample})
+        return {
+            "max_connections": self.max_connections,
+            "samples": len(self.samples),
+            "peak": max(totals),
+            "mean": round(sum(totals) / len(totals), 2),
+            "peak_by_state": {
+                state: max(sample.get(state, 0) for sample in self.samples)
+                for state in states
+            },
+        }
+
+
+class TelegramTracker:
+    """Reports when the bot finished handling each load-test update.
+
+    Wraps the update queue's handler, which runs on the app's event loop,
+    and resolves a future on the load generator's loop.
+    """
+
+    def __init__(self, queue, stubs: ProviderStubs, busy_texts: dict[str, str]) -> None:
+        """Install the tracker.
+
+        Args:
+            queue: The app's ``UpdateQueue``.
+            stubs: Stubs recording the messages the bot sent.
+            busy_texts: Outcome name -> start of the bot message signalling it.
+        """
+        self.stubs = stubs
+        self.busy_texts = busy_texts
+        self._waiting: dict[int, tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._handler = queue.handler
+        queue.handler = self._handle
+
+    def expect(self, update_id: int) -> asyncio.Future:
+        """Future resolved with ``(finished_at, outcome)`` for an update."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting[update_id] = (loop, future)
+        return future
+
+    async def _handle(self, payload: dict) -> None:
+        start = time.perf_counter()
+        try:
+            await self._handler(payload)
+        finally:
+            end = time.perf_counter()
+            waiting = self._waiting.pop(payload["update_id"], None)
+            if waiting is not None:
+                chat_id = payload["message"]["chat"]["id"]
+                outcome = self._outcome(self.stubs.messages(chat_id, start, end))
+                loop, future = waiting
+                loop.call_soon_threadsafe(_resolve, future, (end, outcome))
+
+    def _outcome(self, messages) -> str:
+        if not messages:
+            return "no_reply"
+        for outcome, prefix in self.busy_texts.items():
+            if any(m.text.startswith(prefix) for m in messages):
+                return outcome
+        return "ok"
+
+
+def _resolve(future: asyncio.Future, value) -> None:
+    if not future.done():
+        future.set_result(value)
+
+
+def telegram_update(item: TrafficItem, update_id: int, message_id: int) -> dict:
+    """Webhook payload of a private-chat message from the item's user."""
+    chat_id = 100_000 + item.user
+    message = {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private", "first_name": f"Load {item.user}"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": f"Load {item.user}"},
+    }
+    if item.voice:
+        file_id = f"voice-{update_id}"
+        message["voice"] = {
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "duration": 5,
+            "mime_type": "audio/ogg",
+            "file_size": 16_000,
+        }
+    else:
+        message["text"] = item.text
+    return {"update_id": update_id, "message": message}
+
+
+class LoadGenerator:
+    """Sends traffic to the app and collects results.
+
+    Attributes:
+        app_url: Base URL of the app.
+        tracker: Completion tracker of Telegram updates.
+        timeout: Seconds before a request (or an update's handling) counts as
+            ``timeout``.
+    """
+
+    def __init__(self, app_url: str, tracker: TelegramTracker, timeout: float) -> None:
+        """Initialize the generator.
+
+        Args:
+            app_url: Base URL of the app.
+            tracker: Completion tracker of Telegram updates.
+            timeout: Per-request timeout in seconds.
+        """
+        self.app_url = app_url
+        self.tracker = tracker
+        self.timeout = timeout
+        self.results: list[Result] = []
+        # Unique across runs: the update store deduplicates ids
+        self._update_ids = iter(range(time.time_ns() // 1000, 2**63))
+        self._message_ids = iter(range(1, 2**31))
+
+    async def send(self, client, item: TrafficItem, scheduled: float) -> None:
+        """Send one request; latency counts from ``scheduled``."""
+        import httpx
+
+        try:
+            if item.endpoint == "query":
+                result = await self._query(client, item, scheduled)
+            else:
+                result = await self._telegram(client, item, scheduled)
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            result = Result(item.endpoint, "timeout", time.perf_counter() - scheduled)
+        except httpx.HTTPError:
+            result = Result(item.endpoint, "connection_error", time.perf_counter() - scheduled)
+        self.results.append(result)
+
+    async def _query(self, client, item: TrafficItem, scheduled: float) -> Result:
+        user_id = f"load-{item.user}"
+        response = await client.post(
+            f"{self.app_url}/query",
+            json={"question": item.text, "user_id": user_id, "session_id": user_id},
+        )
+        return Result("query", str(response.status_code), time.perf_counter() - scheduled)
+
+    async def _telegram(self, client, item: TrafficItem, scheduled: float) -> Result:
+        update_id = next(self._update_ids)
+        done = self.tracker.expect(update_id)
+        payload = telegram_update(item, update_id, next(self._message_ids))
+        response = await client.post(f"{self.app_url}/telegram", json=payload)
+        ack = time.perf_counter() - scheduled
+        if response.status_code != 200 or not response.json().get("queued"):
+            done.cancel()
+            return Result("telegram", str(response.status_code), ack, ack)
+        remaining = max(0.0, self.timeout - ack)
+        finished, outcome = await asyncio.wait_for(done, remaining)
+        return Result("telegram", outcome, finished - scheduled, ack)
+
+    async def run(
+        self,
+        items: list[TrafficItem],
+        rate: float | None,
+        concurrency: int,
+        speed: float = 1.0,
+        seed: int = 0,
+    ) -> float:
+        """Send all items and wait for them to finish.
+
+        Args:
+            items: Traffic to send.
+            rate: Poisson arrival rate in requests per second; None replays
+                the items' ``at`` offsets when they all have one, else runs
+                closed-loop.
+            concurrency: Closed-loop clients, or the cap on requests in flight
+                for open-loop runs (0 = uncapped).
+            speed: Replay speed-up of recorded offsets.
+            seed: Seed of the arrival times.
+
+        Returns:
+            Wall-clock seconds of the run.
+        """
+        import httpx
+
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            start = time.perf_counter()
+            if rate is None and not all(item.at is not None for item in items):
+                await self._closed_loop(client, items, concurrency)
+            else:
+                if rate is not None:
+                    rng = random.Random(seed)
+                    offsets, at = [], 0.0
+                    for _ in items:
+                        at += rng.expovariate(rate)
+                        offsets.append(at)
+                else:
+                    offsets = [item.at / speed for item in items]
+                await self._open_loop(client, items, offsets, concurrency, start)
+            return time.perf_counter() - start
+
+    async def _closed_loop(self, client, items: list[TrafficItem], concurrency: int) -> None:
+        pending = iter(items)
+
+        async def worker():
+            for item in pending:
+                await self.send(client, item, time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+    async def _open_loop(
+        self, client, items: list[TrafficItem], offsets: list[float], concurrency: int, start: float
+    ) -> None:
+        slots = asyncio.Semaphore(concurrency) if concurrency > 0 else None
+
+        async def fire(item: TrafficItem, scheduled: float):
+            if slots is None:
+                await self.send(client, item, scheduled)
+                return
+            async with slots:
+                await self.send(client, item, scheduled)
+
+        tasks = []
+        for item, offset in sorted(zip(items, offsets), key=lambda pair: pair[1]):
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(fire(item, start + offset)))
+        await asyncio.gather(*tasks)
+
+
+def summarize(results: list[Result], wall_seconds: float) -> dict[str, dict]:
+    """Throughput, latency percentiles and error rates per endpoint."""
+    report = {}
+    for endpoint in sorted({r.endpoint for r in results}):
+        rows = [r for r in results if r.endpoint == endpoint]
+        ok = [r for r in rows if r.status in ("200", "ok")]
+        summary = {
+            "requests": len(rows),
+            "ok": len(ok),
+            "throughput_rps": round(len(ok) / wall_seconds, 3) if wall_seconds else 0.0,
+            "error_rate": round(1 - len(ok) / len(rows), 4),
+            "statuses": dict(Counter(r.status for r in rows)),
+            "latency_ms": {
+                **latency_summary([r.seconds for r in ok]),
+                "max": round(max((r.seconds for r in ok), default=0) * 1000, 3),
+            },
+        }
+        acks = [r.ack_seconds for r in rows if r.ack_seconds is not None]
+        if acks:
+            summary["ack_latency_ms"] = latency_summary(acks)
+        report[endpoint] = summary
+    return report
+
+
+def _print_report(report: dict) -> None:
+    """Print the report's main figures."""
+    print(f"\n⏱️  {report['wall_seconds']:.1f}s wall clock")
+    for endpoint, row in report["endpoints"].items():
+        latency = row["latency_ms"]
+        statuses = ", ".join(f"{k}={v}" for k, v in sorted(row["statuses"].items()))
+        print(
+            f"  {endpoint:<9} n={row['requests']:<6} {row['throughput_rps']:7.2f} req/s "
+            f"errors={row['error_rate']:.1%} p50={latency['p50']:.0f}ms "
+            f"p95={latency['p95']:.0f}ms p99={latency['p99']:.0f}ms [{statuses}]"
+        )
+    db = report["db_connections"]
+    print(
+        f"  postgres  peak={db['peak']} mean={db['mean']} of max {db['max_connections']} "
+        f"{db['peak_by_state']}"
+    )
+    for name, stats in report["providers"].items():
+        print(f"  {name:<26} calls={stats['calls']:<6} peak_in_flight={stats['peak_in_flight']}")
+
+
+def _configure_environment(stubs_url: str, app_url: str) -> None:
+    """Point every provider at the stubs before the app reads its settings.
+
+    The keys are overridden too, so a provider the stubs don't cover fails
+    instead of spending real quota.
+    """
+    os.environ.update(
+        GOOGLE_API_KEY="load-test",
+        GOOGLE_API_KEY_FREE_LIMITED="load-test",
+        OPENAI_API_KEY="load-test",
+        TAVILY_API_KEY="load-test",
+        GROQ_API_KEY="load-test",
+        GOOGLE_GEMINI_BASE_URL=stubs_url,
+        GROQ_BASE_URL=stubs_url,
+        TELEGRAM_API_BASE_URL=stubs_url,
+        TELEGRAM_BOT_TOKEN=BOT_TOKEN,
+        RENDER_EXTERNAL_URL=app_url,
+    )
+
+
+def _start_app(host: str, port: int):
+    """Serve the API from a background thread once its warm-up finished.
+
+    Returns:
+        The ``src.api.main`` module and the uvicorn server.
+    """
+    import httpx
+    import uvicorn
+
+    from src.api import main as api
+
+    server = uvicorn.Server(uvicorn.Config(api.app, host=host, port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="api", daemon=True).start()
+    while True:
+        try:
+            health = httpx.get(f"http://{host}:{port}/health", timeout=5).json()
+            if health["ready"]:
+                break
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    if health["startup"]["warm_up_error"]:
+        raise RuntimeError(f"App warm-up failed: {health['startup']['warm_up_error']}")
+    return api, server
+
+
+def _mix(value: str) -> dict[str, float]:
+    mix = {}
+    for pair in value.split(","):
+        kind, _, weight = pair.partition("=")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def main() -> None:
+    """Run a load test."""
+    parser = argparse.ArgumentParser(
+        description="Load test /query and the Telegram webhook with stubbed providers"
+    )
+    traffic = parser.add_argument_group("traffic")
+    traffic.add_argument("--replay", type=Path, help="Traffic JSON lines to replay")
+    traffic.add_argument("--record", type=Path, help="Write the traffic sent as JSON lines")
+    traffic.add_argument("--requests", type=int, default=200, help="Synthetic requests")
+    traffic.add_argument("--users", type=int, default=50, help="Synthetic users")
+    traffic.add_argument(
+        "--telegram-share", type=float, default=0.5, help="Fraction sent to /telegram"
+    )
+    traffic.add_argument(
+        "--voice-share", type=float, default=0.1, help="Fraction of Telegram voice notes"
+    )
+    traffic.add_argument(
+        "--mix",
+        type=_mix,
+        default={"chat": 0.2, "kb": 0.5, "tools": 0.3},
+        help="Message weights, e.g. chat=0.2,kb=0.5,tools=0.3",
+    )
+    traffic.add_argument(
+        "--dataset", type=Path, default=DEFAULT_DATASET, help="Source of KB questions"
+    )
+    traffic.add_argument("--rate", type=float, help="Open-loop arrivals per second (Poisson)")
+    traffic.add_argument(
+        "--concurrency",
+        type=int,
+        default=10,
+        help="Closed-loop clients, or in-flight cap with --rate/replay (0 = none)",
+    )
+    traffic.add_argument("--speed", type=float, default=1.0, help="Replay speed-up")
+    traffic.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout")
+    traffic.add_argument("--seed", type=int, default=0, help="Traffic and stub seed")
+
+    stubs = parser.add_argument_group("stub latencies (milliseconds, mean[:jitter])")
+    defaults = StubConfig()
+    for name in ("gemini", "embedding", "groq", "telegram", "tool"):
+        stubs.add_argument(
+            f"--{name}-latency",
+            type=Latency.parse,
+            default=getattr(defaults, f"{name}_latency"),
+        )
+    stubs.add_argument(
+        "--gemini-tokens-per-second", type=float, default=defaults.gemini_tokens_per_second
+    )
+    stubs.add_argument("--output-tokens", type=int, default=defaults.output_tokens)
+    stubs.add_argument(
+        "--tool-rate",
+        type=float,
+        default=defaults.tool_rate,
+        help="Fraction of model calls with tools that call one",
+    )
+
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766, help="App port")
+    parser.add_argument("--stubs-port", type=int, default=8765)
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="Postgres sampling")
+    parser.add_argument("--output", type=Path, help="Write the report JSON here")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        gemini_latency=args.gemini_latency,
+        gemini_tokens_per_second=args.gemini_tokens_per_second,
+        output_tokens=args.output_tokens,
+        embedding_latency=args.embedding_latency,
+        groq_latency=args.groq_latency,
+        telegram_latency=args.telegram_latency,
+        tool_latency=args.tool_latency,
+        tool_rate=args.tool_rate,
+        seed=args.seed,
+    )
+    provider_stubs = ProviderStubs(config)
+    stubs_url = provider_stubs.start(args.host, args.stubs_port)
+    app_url = f"http://{args.host}:{args.port}"
+    _configure_environment(stubs_url, app_url)
+
+    # Imported only now: settings are read on import
+    from src.agents.pool import AgentResourcePool
+    from src.config import settings
+    from src.integrations.telegram import bot
+
+    AgentResourcePool._build_tools = staticmethod(lambda: stub_toolkits(config))
+
+    if args.replay:
+        items = load_traffic(args.replay)
+    else:
+        items = synthetic_traffic(
+            args.requests,
+            args.users,
+            args.telegram_share,
+            args.voice_share,
+            args.mix,
+            QADataset.load(args.dataset),
+            args.seed,
+        )
+    if args.record:
+        save_traffic(args.record, items)
+
+    api, server = _start_app(args.host, args.port)
+    if api.telegram_queue is None:
+        raise RuntimeError("Telegram webhook failed to start, see the app logs")
+    tracker = TelegramTracker(
+        api.telegram_queue,
+        provider_stubs,
+        {
+            "error": bot.ERROR_MESSAGE,
+            "busy": bot.BUSY_MESSAGE,
+            "rate_limited": bot.RATE_LIMITED_MESSAGE.split("{")[0],
+        },
+    )
+
+    mode = f"{args.rate}/s open-loop" if args.rate else f"{args.concurrency} clients"
+    print(f"🚦 Sending {len(items)} requests ({mode}) to {app_url}, providers at {stubs_url}")
+    sampler = ConnectionSampler(settings.db_url, args.sample_interval)
+    sampler.start()
+    generator = LoadGenerator(app_url, tracker, args.timeout)
+    try:
+        wall = asyncio.run(
+            generator.run(items, args.rate, args.concurrency, args.speed, args.seed)
+        )
+    finally:
+        sampler.stop()
+        server.should_exit = True
+        provider_stubs.stop()
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "options": {
+            "requests": len(items),
+            "replay": str(args.replay) if args.replay else None,
+            "rate": args.rate,
+            "concurrency": args.concurrency,
+            "stubs": asdict(config),
+            "agent_max_in_flight": settings.agent_max_in_flight,
+            "agent_max_queue": settings.agent_max_queue,
+            "telegram_workers": settings.telegram_workers,
+            "telegram_streaming": settings.telegram_streaming,
+        },
+        "wall_seconds": round(wall, 3),
+        "endpoints": summarize(generator.results, wall),
+        "db_connections": sampler.summary(),
+        "providers": provider_stubs.stats(),
+    }
+    _print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"\n💾 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
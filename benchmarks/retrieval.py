@@ -0,0 +1,440 @@
+"""Retrieval benchmark: semantic vs contextual knowledge bases.
+
+Loads a QA dataset into fresh Postgres tables through each knowledge base
+class, with deterministic hashing embedders instead of Gemini, then
+measures recall@k, MRR and search latency for every combination of
+knowledge base, search type, vector index, corpus size and ``max_results``.
+``agno_extractive`` stores the chunks with extractive contexts (title,
+section and keyphrases) instead of the dataset's LLM contexts::
+
+    python -m benchmarks.retrieval --corpus-sizes 0,2000 --k 1,3,5,10 \\
+        --output results.json --compare baseline.json
+
+Results are written as JSON for regression tracking; with ``--compare``
+the run exits with status 1 when quality drops or p95 latency grows past
+the configured tolerances.
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from itertools import batched
+from pathlib import Path
+from typing import Protocol
+
+from benchmarks import git_commit
+from benchmarks.dataset import Chunk, QADataset, Question
+from benchmarks.fakes import HashingEmbedder, HashingEmbeddings
+from benchmarks.scoring import latency_summary, reciprocal_rank, recall_at_k
+from src.config import settings
+from src.rag.extractive_context import ExtractiveContextGenerator
+
+DEFAULT_DATASET = Path(__file__).parent / "data" / "economics_qa.json"
+
+# Knowledge base name -> whether it stores contextual chunk text
+KNOWLEDGE_BASES = {
+    "agno_semantic": False,
+    "agno_contextual": True,
+    "agno_extractive": True,
+    "langchain_contextual": True,
+}
+
+# LangChain's PGVector has no search type or index settings
+LANGCHAIN_SETTINGS = ("vector", "none")
+
+INSERT_BATCH_SIZE = 100
+
+
+class BenchmarkIndex(Protocol):
+    """A knowledge base loaded with benchmark chunks."""
+
+    def load(self, chunks: list[Chunk], contextual: bool) -> None: ...
+
+    def search(self, query: str, limit: int) -> list[str]: ...
+
+    def drop(self) -> None: ...
+
+
+class AgnoIndex:
+    """Agno knowledge base (semantic or contextual) on a PgVector table."""
+
+    def __init__(
+        self,
+        name: str,
+        table: str,
+        db_url: str,
+        search_type: str,
+        index: str,
+        shard_urls: list[str] | None = None,
+    ) -> None:
+        from agno.vectordb.pgvector import HNSW, Ivfflat, SearchType
+
+        from src.rag.agno import AgnoKnowledgeBase, ContextualAgnoKnowledgeBase
+
+        kb_cls = AgnoKnowledgeBase if name == "agno_semantic" else ContextualAgnoKnowledgeBase
+        self.index = index
+        self.kb = kb_cls(
+            table_name=table,
+            embedder=HashingEmbedder(),
+            db_url=db_url,
+            search_type=SearchType(search_type),
+            vector_index={"hnsw": HNSW(), "ivfflat": Ivfflat()}.get(index),
+            shard_urls=shard_urls,
+        )
+        self.vector_db = self.kb.knowledge.vector_db
+
+    def load(self, chunks: list[Chunk], contextual: bool) -> None:
+        from agno.knowledge.document import Document
+
+        self.vector_db.drop()
+        self.vector_db.create()
+        for batch in batched(chunks, INSERT_BATCH_SIZE):
+            self.vector_db.upsert(
+                content_hash=f"benchmark-{batch[0].id}",
+                documents=[
+                    Document(
+                        id=chunk.id,
+                        name=chunk.document_id,
+                        content=chunk.contextual_text() if contextual else chunk.text,
+                        meta_data={"chunk_id": chunk.id},
+                    )
+                    for chunk in batch
+                ],
+            )
+        if self.index != "none":
+            self.vector_db.optimize(force_recreate=True)
+
+    def search(self, query: str, limit: int) -> list[str]:
+        return [doc.meta_data.get("chunk_id") for doc in self.kb.search(query, limit=limit)]
+
+    def drop(self) -> None:
+        self.vector_db.drop()
+
+
+class LangChainIndex:
+    """LangChain contextual knowledge base on a PGVector collection."""
+
+    def __init__(self, collection: str, db_url: str) -> None:
+        from src.rag.langchain import ContextualLangChainKnowledgeBase
+
+        self.kb = ContextualLangChainKnowledgeBase(
+            collection_name=collection,
+            embeddings=HashingEmbeddings(),
+            connection_string=db_url,
+        )
+
+    def load(self, chunks: list[Chunk], contextual: bool) -> None:
+        self.kb.vectorstore.delete_collection()
+        self.kb.vectorstore.create_collection()
+        for batch in batched(chunks, INSERT_BATCH_SIZE):
+            self.kb.vectorstore.add_texts(
+                [chunk.contextual_text() if contextual else chunk.text for chunk in batch],
+                metadatas=[{"chunk_id": chunk.id} for chunk in batch],
+                ids=[chunk.id for chunk in batch],
+            )
+
+    def search(self, query: str, limit: int) -> list[str]:
+        return [doc.metadata.get("chunk_id") for doc in self.kb.search(query, limit=limit)]
+
+    def drop(self) -> None:
+        self.kb.vectorstore.delete_collection()
+
+
+def with_extractive_contexts(chunks: list[Chunk], titles: dict[str, str]) -> list[Chunk]:
+    """Replace the chunks' contexts with the extractive strategy's.
+
+    Each document is rebuilt from its chunks in order, so keyphrases are
+    scored against the document's other chunks.
+
+    Args:
+        chunks: Benchmark chunks.
+        titles: Document titles by document id.
+    """
+    generator = ExtractiveContextGenerator()
+    documents: dict[str, list[Chunk]] = {}
+    for chunk in chunks:
+        documents.setdefault(chunk.document_id, []).append(chunk)
+
+    contexts = {}
+    for document_id, document_chunks in documents.items():
+        texts = [chunk.text for chunk in document_chunks]
+        generated = generator.contexts(
+            "\n\n".join(texts), texts, title=titles.get(document_id, document_id)
+        )
+        contexts.update(zip((chunk.id for chunk in document_chunks), generated))
+    return [replace(chunk, context=contexts[chunk.id]) for chunk in chunks]
+
+
+@dataclass
+class BenchmarkConfig:
+    """One benchmarked setup."""
+
+    kb: str
+    search_type: str
+    index: str
+    corpus_size: int
+
+    @property
+    def table(self) -> str:
+        """Scratch table (or collection) name for the setup."""
+        return f"bench_{self.kb}_{self.search_type}_{self.index}_{self.corpus_size}"
+
+
+def build_configs(
+    kbs: list[str], search_types: list[str], indexes: list[str], corpus_sizes: list[int]
+) -> list[BenchmarkConfig]:
+    """Expand the CLI options into setups (LangChain has a single setting)."""
+    configs = []
+    for size in corpus_sizes:
+        for kb in kbs:
+            if kb == "langchain_contextual":
+                configs.append(BenchmarkConfig(kb, *LANGCHAIN_SETTINGS, size))
+                continue
+            for search_type in search_types:
+                configs.extend(
+                    BenchmarkConfig(kb, search_type, index, size) for index in indexes
+                )
+    return configs
+
+
+def open_index(
+    config: BenchmarkConfig, db_url: str, shard_urls: list[str] | None = None
+) -> BenchmarkIndex:
+    """Create the knowledge base for a setup (Agno tables sharded over ``shard_urls``)."""
+    if config.kb == "langchain_contextual":
+        return LangChainIndex(config.table, db_url)
+    return AgnoIndex(
+        config.kb, config.table, db_url, config.search_type, config.index, shard_urls
+    )
+
+
+def run_config(
+    index: BenchmarkIndex,
+    config: BenchmarkConfig,
+    chunks: list[Chunk],
+    questions: list[Question],
+    ks: list[int],
+    repeats: int,
+) -> list[dict]:
+    """Load a setup and measure every ``max_results`` value.
+
+    Returns:
+        One result row per ``max_results``.
+    """
+    start = time.perf_counter()
+    index.load(chunks, KNOWLEDGE_BASES[config.kb])
+    load_seconds = time.perf_counter() - start
+
+    # Warm up connections, caches and the query planner
+    for question in questions[:5]:
+        index.search(question.question, max(ks))
+
+    rows = []
+    for k in ks:
+        latencies, recalls, reciprocal_ranks = [], [], []
+        for question in questions:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                retrieved = index.search(question.question, k)
+                latencies.append(time.perf_counter() - start)
+            recalls.append(recall_at_k(retrieved, question.relevant, k))
+            reciprocal_ranks.append(reciprocal_rank(retrieved, question.relevant, k))
+
+        rows.append(
+            {
+                **asdict(config),
+                "corpus_chunks": len(chunks),
+                "max_results": k,
+                "queries": len(latencies),
+                "recall": round(sum(recalls) / len(recalls), 4),
+                "mrr": round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4),
+                "latency_ms": latency_summary(latencies),
+                "load_seconds": round(load_seconds, 3),
+            }
+        )
+    return rows
+
+
+def _row_key(row: dict) -> tuple:
+    """Identity of a result row across runs."""
+    return (row["kb"], row["search_type"], row["index"], row["corpus_size"], row["max_results"])
+
+
+def compare(
+    results: list[dict],
+    baseline: list[dict],
+    max_quality_drop: float,
+    max_latency_increase: float,
+) -> list[str]:
+    """List regressions of ``results`` against a baseline run.
+
+    Args:
+        results: Result rows of this run.
+        baseline: Result rows of the baseline run.
+        max_quality_drop: Allowed absolute drop of recall and MRR.
+        max_latency_increase: Allowed relative growth of p95 latency.
+
+    Returns:
+        Human-readable regressions (empty when there are none).
+    """
+    previous = {_row_key(row): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get(_row_key(row))
+        if before is None:
+            continue
+        label = "/".join(str(part) for part in _row_key(row))
+        for metric in ("recall", "mrr"):
+            if before[metric] - row[metric] > max_quality_drop:
+                regressions.append(
+                    f"{label}: {metric} {before[metric]:.3f} -> {row[metric]:.3f}"
+                )
+        p95, old_p95 = row["latency_ms"]["p95"], before["latency_ms"]["p95"]
+        if old_p95 > 0 and p95 > old_p95 * (1 + max_latency_increase):
+            regressions.append(f"{label}: p95 {old_p95:.1f}ms -> {p95:.1f}ms")
+    return regressions
+
+
+def _print_rows(rows: list[dict]) -> None:
+    """Print result rows as a table."""
+    for row in rows:
+        latency = row["latency_ms"]
+        print(
+            f"  {row['kb']:<21} {row['search_type']:<7} {row['index']:<8} "
+            f"n={row['corpus_chunks']:<6} k={row['max_results']:<3} "
+            f"recall={row['recall']:.3f} mrr={row['mrr']:.3f} "
+            f"p50={latency['p50']:7.2f}ms p95={latency['p95']:7.2f}ms "
+            f"p99={latency['p99']:7.2f}ms"
+        )
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _str_list(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main() -> None:
+    """Run the retrieval benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Compare retrieval quality and latency of the knowledge bases"
+    )
+    parser.add_argument("--dataset", type=Path, default=DEFAULT_DATASET, help="QA dataset JSON")
+    parser.add_argument(
+        "--kb",
+        type=_str_list,
+        default=list(KNOWLEDGE_BASES),
+        help=f"Knowledge bases to compare ({', '.join(KNOWLEDGE_BASES)})",
+    )
+    parser.add_argument(
+        "--k", type=_int_list, default=[1, 3, 5, 10], help="max_results values"
+    )
+    parser.add_argument(
+        "--corpus-sizes",
+        type=_int_list,
+        default=[0],
+        help="Corpus sizes in chunks, padded with distractors (0 = dataset only)",
+    )
+    parser.add_argument(
+        "--search-types",
+        type=_str_list,
+        default=["hybrid", "vector"],
+        help="Agno search types (vector, keyword, hybrid)",
+    )
+    parser.add_argument(
+        "--indexes",
+        type=_str_list,
+        default=["hnsw"],
+        help="Agno vector indexes (hnsw, ivfflat, none)",
+    )
+    parser.add_argument("--repeats", type=int, default=3, help="Timed searches per question")
+    parser.add_argument("--seed", type=int, default=0, help="Distractor seed")
+    parser.add_argument(
+        "--db-url", default=settings.db_url, help="PostgreSQL with pgvector (scratch tables)"
+    )
+    parser.add_argument(
+        "--shard-urls",
+        type=_str_list,
+        default=[],
+        help="Comma-separated PostgreSQL URLs to shard the Agno tables over "
+        "(partitioned by SHARD_PARTITION)",
+    )
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON")
+    parser.add_argument(
+        "--max-quality-drop", type=float, default=0.02, help="Allowed recall/MRR drop"
+    )
+    parser.add_argument(
+        "--max-latency-increase",
+        type=float,
+        default=0.5,
+        help="Allowed relative p95 latency growth",
+    )
+    parser.add_argument(
+        "--keep-tables", action="store_true", help="Don't drop the scratch tables"
+    )
+    args = parser.parse_args()
+
+    unknown = set(args.kb) - set(KNOWLEDGE_BASES)
+    if unknown:
+        parser.error(f"Unknown knowledge bases: {', '.join(sorted(unknown))}")
+
+    dataset = QADataset.load(args.dataset)
+    configs = build_configs(args.kb, args.search_types, args.indexes, args.corpus_sizes)
+    print(
+        f"📏 Benchmarking {len(configs)} setups on '{dataset.name}' "
+        f"({len(dataset.chunks)} chunks, {len(dataset.questions)} questions)\n"
+    )
+
+    results = []
+    for config in configs:
+        chunks = dataset.with_corpus_size(config.corpus_size, seed=args.seed)
+        if config.kb == "agno_extractive":
+            chunks = with_extractive_contexts(chunks, dataset.titles)
+        index = open_index(config, args.db_url, args.shard_urls)
+        try:
+            rows = run_config(index, config, chunks, dataset.questions, args.k, args.repeats)
+        finally:
+            if not args.keep_tables:
+                index.drop()
+        _print_rows(rows)
+        results.extend(rows)
+
+    report = {
+        "dataset": dataset.name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "embedder": "hashing",
+        "options": {
+            "k": args.k,
+            "corpus_sizes": args.corpus_sizes,
+            "repeats": args.repeats,
+            "seed": args.seed,
+            "shards": len(args.shard_urls),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(
+            results, baseline, args.max_quality_drop, args.max_latency_increase
+        )
+        if regressions:
+            print("\n❌ Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
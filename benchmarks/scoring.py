@@ -0,0 +1,44 @@
+"""Retrieval quality and latency statistics."""
+
+import math
+from typing import Sequence
+
+
+def recall_at_k(retrieved: Sequence[str], relevant: set[str], k: int) -> float:
+    """Fraction of the relevant ids found in the top ``k`` results."""
+    if not relevant:
+        return 0.0
+    return len(relevant.intersection(retrieved[:k])) / len(relevant)
+
+
+def reciprocal_rank(retrieved: Sequence[str], relevant: set[str], k: int) -> float:
+    """1 / rank of the first relevant id in the top ``k`` results (0 if none)."""
+    for rank, chunk_id in enumerate(retrieved[:k], start=1):
+        if chunk_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile.
+
+    Args:
+        values: Samples.
+        q: Percentile in [0, 100].
+    """
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(seconds: Sequence[float]) -> dict[str, float]:
+    """Return mean and p50/p95/p99 of latencies in milliseconds."""
+    millis = [s * 1000 for s in seconds]
+    return {
+        "mean": round(sum(millis) / len(millis), 3) if millis else math.nan,
+        "p50": round(percentile(millis, 50), 3),
+        "p95": round(percentile(millis, 95), 3),
+        "p99": round(percentile(millis, 99), 3),
+    }
@@ -0,0 +1,357 @@
+"""Latency-injecting local stand-ins for the external providers.
+
+``ProviderStubs`` is one HTTP server speaking just enough of each provider's
+wire protocol for the app's SDKs to work unchanged:
+
+- Gemini (``generateContent``, ``streamGenerateContent``, embeddings),
+  reached through ``GOOGLE_GEMINI_BASE_URL``.
+- Groq Whisper transcriptions, reached through ``GROQ_BASE_URL``.
+- The Telegram Bot API and file downloads, reached through
+  ``TELEGRAM_API_BASE_URL``.
+
+YFinance and Tavily have no base-URL setting, so ``stub_toolkits`` returns
+toolkits with the same function names to put in place of the real ones.
+Every stub waits a sampled latency before answering and counts its calls
+and peak concurrency, so a load test shows what the app sends upstream.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+from benchmarks.fakes import Latency, hashed_embedding
+
+ANSWER_WORDS = (
+    "a inflação a taxa Selic o câmbio o crescimento do PIB os juros futuros a "
+    "poupança o consumo das famílias a política monetária o mercado de trabalho"
+).split()
+
+TRANSCRIPT = "Qual é a taxa Selic hoje e como ela afeta a inflação?"
+
+# Arguments the stub model passes when it decides to call a tool
+TOOL_ARGUMENTS = {
+    "get_current_stock_price": lambda prompt: {"symbol": "PETR4.SA"},
+    "web_search_using_tavily": lambda prompt: {"query": prompt[-200:], "max_results": 5},
+}
+
+# Tokens per streamed chunk, roughly what Gemini sends
+STREAM_CHUNK_TOKENS = 20
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the provider stubs.
+
+    Attributes:
+        gemini_latency: Time to the first generated token.
+        gemini_tokens_per_second: Generation speed after the first token.
+        output_tokens: Tokens in each generated answer.
+        embedding_latency: Delay of an embedding request.
+        groq_latency: Delay of a transcription.
+        telegram_latency: Delay of a Bot API call or file download.
+        tool_latency: Delay of a YFinance or Tavily tool call.
+        tool_rate: Fraction of model calls with tools that request one.
+        seed: Seed of the latency and tool-choice random draws.
+    """
+
+    gemini_latency: Latency = field(default_factory=lambda: Latency(600, 150))
+    gemini_tokens_per_second: float = 150.0
+    output_tokens: int = 200
+    embedding_latency: Latency = field(default_factory=lambda: Latency(80, 20))
+    groq_latency: Latency = field(default_factory=lambda: Latency(700, 200))
+    telegram_latency: Latency = field(default_factory=lambda: Latency(60, 20))
+    tool_latency: Latency = field(default_factory=lambda: Latency(400, 150))
+    tool_rate: float = 0.3
+    seed: int = 0
+
+
+@dataclass
+class SentMessage:
+    """A message the bot sent or edited through the stub Bot API."""
+
+    at: float
+    chat_id: int
+    method: str
+    text: str
+
+
+class ProviderStubs:
+    """HTTP server emulating Gemini, Groq and the Telegram Bot API.
+
+    Attributes:
+        config: Latencies and behaviour.
+        app: The stub ASGI app.
+        url: Base URL once started.
+    """
+
+    def __init__(self, config: StubConfig | None = None) -> None:
+        """Initialize the stubs.
+
+        Args:
+            config: Latencies and behaviour; defaults to ``StubConfig()``.
+        """
+        self.config = config or StubConfig()
+        self.url: str | None = None
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._calls: defaultdict[str, int] = defaultdict(int)
+        self._in_flight: defaultdict[str, int] = defaultdict(int)
+        self._peak: defaultdict[str, int] = defaultdict(int)
+        self._messages: list[SentMessage] = []
+        self._message_ids = 0
+        self._server: uvicorn.Server | None = None
+        self.app = self._build_app()
+
+    def start(self, host: str = "127.0.0.1", port: int = 8765) -> str:
+        """Serve the stubs from a background thread.
+
+        Returns:
+            Base URL of the stubs.
+        """
+        config = uvicorn.Config(self.app, host=host, port=port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        threading.Thread(target=self._server.run, name="provider-stubs", daemon=True).start()
+        while not self._server.started:
+            time.sleep(0.05)
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    def stop(self) -> None:
+        """Ask the server to exit."""
+        if self._server is not None:
+            self._server.should_exit = True
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Calls and peak concurrent calls per provider operation."""
+        with self._lock:
+            return {
+                name: {"calls": self._calls[name], "peak_in_flight": self._peak[name]}
+                for name in sorted(self._calls)
+            }
+
+    def messages(self, chat_id: int, start: float, end: float) -> list[SentMessage]:
+        """Messages sent or edited in a chat between two ``perf_counter`` times."""
+        with self._lock:
+            return [
+                m for m in self._messages if m.chat_id == chat_id and start <= m.at <= end
+            ]
+
+    @asynccontextmanager
+    async def _call(self, name: str, latency: Latency):
+        """Count a provider call and wait its latency."""
+        with self._lock:
+            self._calls[name] += 1
+            self._in_flight[name] += 1
+            self._peak[name] = max(self._peak[name], self._in_flight[name])
+        try:
+            await asyncio.sleep(latency.sample(self._rng))
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[name] -= 1
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Provider stubs")
+
+        @app.post("/{version}/models/{target:path}")
+        async def gemini(version: str, target: str, request: Request):
+            model, _, action = target.rpartition(":")
+            body = await request.json()
+            if action == "generateContent":
+                return await self._generate(model, body)
+            if action == "streamGenerateContent":
+                return self._stream(model, body)
+            if action in ("embedContent", "batchEmbedContents"):
+                return await self._embed(action, body)
+            return JSONResponse({"error": {"message": f"Unsupported {action}"}}, 404)
+
+        @app.post("/openai/v1/audio/transcriptions")
+        async def groq_transcription(request: Request):
+            await request.body()
+            async with self._call("groq.transcription", self.config.groq_latency):
+                return PlainTextResponse(TRANSCRIPT)
+
+        @app.post("/bot{token}/{method}")
+        async def telegram(token: str, method: str, request: Request):
+            params = await _telegram_params(request)
+            async with self._call(f"telegram.{method}", self.config.telegram_latency):
+                return {"ok": True, "result": self._telegram_result(method, params)}
+
+        @app.get("/file/bot{token}/{path:path}")
+        async def telegram_file(token: str, path: str):
+            async with self._call("telegram.download", self.config.telegram_latency):
+                return Response(self._rng.randbytes(16_000), media_type="audio/ogg")
+
+        return app
+
+    def _reply(self, body: dict) -> tuple[dict, int, int]:
+        """Decide the model's answer to a request.
+
+        Returns:
+            The candidate content, prompt tokens and output tokens.
+        """
+        declared = {
+            function["name"]
+            for tool in body.get("tools", [])
+            for function in tool.get("functionDeclarations", [])
+        }
+        contents = body.get("contents", [])
+        prompt = " ".join(
+            part.get("text", "") for content in contents for part in content.get("parts", [])
+        )
+        prompt_tokens = max(1, len(json.dumps(body)) // 4)
+        last_parts = contents[-1].get("parts", []) if contents else []
+        answered = any("functionResponse" in part for part in last_parts)
+
+        tools = sorted(declared.intersection(TOOL_ARGUMENTS))
+        if tools and not answered and self._rng.random() < self.config.tool_rate:
+            name = self._rng.choice(tools)
+            call = {"name": name, "args": TOOL_ARGUMENTS[name](prompt)}
+            return {"role": "model", "parts": [{"functionCall": call}]}, prompt_tokens, 10
+
+        words = self._rng.choices(ANSWER_WORDS, k=max(1, self.config.output_tokens * 3 // 4))
+        text = " ".join(words).capitalize() + "."
+        return {"role": "model", "parts": [{"text": text}]}, prompt_tokens, self.config.output_tokens
+
+    @staticmethod
+    def _response(model: str, content: dict, prompt_tokens: int, output_tokens: int) -> dict:
+        return {
+            "candidates": [{"content": content, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": model.removeprefix("models/"),
+        }
+
+    async def _generate(self, model: str, body: dict) -> dict:
+        content, prompt_tokens, output_tokens = self._reply(body)
+        async with self._call("gemini.generate", self.config.gemini_latency):
+            await asyncio.sleep(output_tokens / self.config.gemini_tokens_per_second)
+            return self._response(model, content, prompt_tokens, output_tokens)
+
+    def _stream(self, model: str, body: dict) -> StreamingResponse:
+        content, prompt_tokens, output_tokens = self._reply(body)
+
+        async def events():
+            async with self._call("gemini.stream", self.config.gemini_latency):
+                parts = content["parts"]
+                if "text" not in parts[0]:
+                    chunks = [content]
+                else:
+                    words = parts[0]["text"].split(" ")
+                    step = max(1, STREAM_CHUNK_TOKENS * 3 // 4)
+                    chunks = [
+                        {"role": "model", "parts": [{"text": " ".join(words[i : i + step]) + " "}]}
+                        for i in range(0, len(words), step)
+                    ]
+                for i, chunk in enumerate(chunks):
+                    if i:
+                        await asyncio.sleep(
+                            STREAM_CHUNK_TOKENS / self.config.gemini_tokens_per_second
+                        )
+                    event = self._response(model, chunk, prompt_tokens, output_tokens)
+                    yield f"data: {json.dumps(event)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def _embed(self, action: str, body: dict) -> dict:
+        requests = body["requests"] if action == "batchEmbedContents" else [body]
+        embeddings = []
+        for request in requests:
+            text = " ".join(part.get("text", "") for part in request["content"]["parts"])
+            dimensions = request.get("outputDimensionality") or 768
+            embeddings.append({"values": hashed_embedding(text, dimensions)})
+        async with self._call("gemini.embed", self.config.embedding_latency):
+            if action == "batchEmbedContents":
+                return {"embeddings": embeddings}
+            return {"embedding": embeddings[0]}
+
+    def _telegram_result(self, method: str, params: dict):
+        """Bot API result for a method; unknown methods just succeed."""
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}
+        if method == "getFile":
+            file_id = params.get("file_id", "file")
+            return {
+                "file_id": file_id,
+                "file_unique_id": file_id,
+                "file_size": 16_000,
+                "file_path": f"voice/{file_id}.oga",
+            }
+        if method in ("sendMessage", "editMessageText"):
+            chat_id = int(params.get("chat_id", 0))
+            with self._lock:
+                if method == "sendMessage":
+                    self._message_ids += 1
+                    message_id = self._message_ids
+                else:
+                    message_id = int(params.get("message_id", 0))
+                self._messages.append(
+                    SentMessage(time.perf_counter(), chat_id, method, params.get("text", ""))
+                )
+            return {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+
+async def _telegram_params(request: Request) -> dict:
+    """Bot API parameters, sent as JSON or as a urlencoded form."""
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/json"):
+        return json.loads(body or b"{}")
+    return dict(parse_qsl(body.decode()))
+
+
+def stub_toolkits(config: StubConfig) -> list:
+    """Toolkits standing in for YFinance and Tavily.
+
+    They expose the same function names, so the stub model's tool calls and
+    the app's tool cache and hooks behave as with the real toolkits.
+    """
+    from agno.tools import Toolkit
+
+    rng = random.Random(config.seed + 1)
+
+    def get_current_stock_price(symbol: str) -> str:
+        """Get the current stock price for a given symbol.
+
+        Args:
+            symbol: The stock symbol.
+        """
+        time.sleep(config.tool_latency.sample(rng))
+        return f"{rng.uniform(10, 100):.2f}"
+
+    def web_search_using_tavily(query: str, max_results: int = 5) -> str:
+        """Search the web for a query.
+
+        Args:
+            query: Query to search for.
+            max_results: Maximum number of results.
+        """
+        time.sleep(config.tool_latency.sample(rng))
+        results = [
+            {"title": f"Resultado {i + 1}", "url": f"https://example.com/{i}", "content": query}
+            for i in range(max_results)
+        ]
+        return json.dumps({"query": query, "results": results})
+
+    return [
+        Toolkit(name="yfinance_tools", tools=[get_current_stock_price]),
+        Toolkit(name="tavily_tools", tools=[web_search_using_tavily]),
+    ]
@@ -0,0 +1,613 @@
+"""Chunking parameter tuner: sweep ``chunk_size`` and ``similarity_threshold``.
+
+Chunks a corpus sample with ``SimpleSemanticChunking`` for every pair of
+parameters, scores each setup on retrieval quality and ingestion cost, and
+stores the chosen pair for a table in ``settings.chunking_params_file``,
+where the knowledge bases read it at start::
+
+    python -m benchmarks.tune_chunking --chunk-sizes 256,512,1000 \\
+        --thresholds 0.4,0.5,0.6 --table economics_enhanced_gemini
+
+Sentence embeddings only depend on the text, not on the parameters, so
+they are computed once and cached (on disk with ``--cache-dir``); every
+setup after the first re-chunks from the cache. Chunk and question
+embeddings for retrieval are cached the same way, and chunks shared by
+several setups are embedded once.
+
+Quality is the evidence coverage of the top ``k`` chunks: the share of the
+sentences answering each question that appear in a retrieved chunk. Cost
+is what ingesting the corpus would take per MB: context generation calls
+and tokens (for contextual tables), embedded tokens, vectors stored and
+an estimate of the ingestion time. The cheapest setup whose quality is
+within ``--quality-tolerance`` of the best wins.
+
+With ``--offline`` both embedders are replaced by the local hashing fakes,
+which is enough to try the tool but not to choose real parameters.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, List, Sequence
+
+import numpy as np
+from chonkie.embeddings import BaseEmbeddings
+
+from benchmarks import git_commit
+from benchmarks.chunking import load_corpus
+from benchmarks.dataset import SENTENCE_END, QADataset
+from benchmarks.fakes import HashingChunkEmbeddings, estimate_tokens, hashed_embedding
+from src.agents.pool import DEFAULT_TABLE_NAME
+from src.config import settings
+from src.rag.chunking_params import ChunkingParams, save_chunking_params
+from src.usage import UsageLedger
+
+DEFAULT_DATASET = Path(__file__).parent / "data" / "economics_qa.json"
+
+# Tokens of a generated context (1-2 sentences), for the cost estimate
+CONTEXT_OUTPUT_TOKENS = 60
+
+# Bytes of a stored 768-dimension float32 vector
+VECTOR_BYTES = 768 * 4
+
+
+@dataclass
+class Evidence:
+    """A question and the passages that answer it.
+
+    Attributes:
+        question: Question text.
+        passages: Texts holding the answer.
+    """
+
+    question: str
+    passages: list[str]
+
+
+def _normalize(text: str) -> str:
+    """Casefolded text with collapsed whitespace, for containment checks."""
+    return " ".join(text.casefold().split())
+
+
+def _sentences(passages: Sequence[str]) -> list[str]:
+    """Normalized sentences of the evidence passages."""
+    return [
+        _normalize(sentence)
+        for passage in passages
+        for sentence in SENTENCE_END.split(passage.strip())
+        if sentence.strip()
+    ]
+
+
+class EmbeddingCache:
+    """Vectors by text for one model, optionally stored in a ``.npz`` file.
+
+    Attributes:
+        model: Model the vectors come from (part of the file name).
+        path: Cache file, or None to keep the vectors in memory only.
+        hits: Texts served from the cache.
+        misses: Texts embedded.
+    """
+
+    def __init__(self, model: str, directory: Path | None = None) -> None:
+        """Load the cache of a model.
+
+        Args:
+            model: Embedding model identifier.
+            directory: Directory of the cache files (None for memory only).
+        """
+        self.model = model
+        file_name = re.sub(r"[^\w.-]+", "_", model) + ".npz"
+        self.path = directory / file_name if directory else None
+        self.hits = 0
+        self.misses = 0
+        self._vectors: dict[str, np.ndarray] = {}
+        if self.path is not None and self.path.exists():
+            with np.load(self.path) as data:
+                self._vectors = dict(zip(data["keys"].tolist(), data["vectors"]))
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def get_many(
+        self, texts: Sequence[str], embed: Callable[[list[str]], Sequence[Sequence[float]]]
+    ) -> list[np.ndarray]:
+        """Return the vectors of texts, embedding only the uncached ones.
+
+        Args:
+            texts: Texts to embed.
+            embed: Batch embedding function for the cache misses.
+        """
+        keys = [self._key(text) for text in texts]
+        missing = {key: text for key, text in zip(keys, texts) if key not in self._vectors}
+        if missing:
+            vectors = embed(list(missing.values()))
+            for key, vector in zip(missing, vectors):
+                self._vectors[key] = np.asarray(vector, dtype=np.float32)
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+        return [self._vectors[key] for key in keys]
+
+    def save(self) -> None:
+        """Write the cache file (no-op for memory-only caches)."""
+        if self.path is None or not self._vectors:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            self.path,
+            keys=np.array(list(self._vectors)),
+            vectors=np.stack(list(self._vectors.values())),
+        )
+
+
+class CachedChunkEmbeddings(BaseEmbeddings):
+    """Chonkie embeddings that serve repeated texts from an ``EmbeddingCache``."""
+
+    def __init__(self, inner: BaseEmbeddings, cache: EmbeddingCache) -> None:
+        """Wrap chonkie embeddings.
+
+        Args:
+            inner: Embeddings used for cache misses (and token counting).
+            cache: Cache of the inner model's vectors.
+        """
+        super().__init__()
+        self.inner = inner
+        self.cache = cache
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        return self.cache.get_many(texts, self.inner.embed_batch)
+
+    def count_tokens(self, text: str) -> int:
+        return self.inner.count_tokens(text)
+
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        return self.inner.count_tokens_batch(texts)
+
+    def similarity(self, u: np.ndarray, v: np.ndarray) -> float:
+        return self.inner.similarity(u, v)
+
+    def get_tokenizer_or_token_counter(self) -> Any:
+        return self.inner.get_tokenizer_or_token_counter()
+
+    @property
+    def dimension(self) -> int:
+        return self.inner.dimension
+
+
+class Retriever:
+    """In-memory cosine search over chunk embeddings, standing in for pgvector."""
+
+    def __init__(self, cache: EmbeddingCache, embed: Callable[[list[str]], Sequence]) -> None:
+        """Set up the retrieval embeddings.
+
+        Args:
+            cache: Cache of the retrieval model's vectors.
+            embed: Batch embedding function of the retrieval model.
+        """
+        self.cache = cache
+        self.embed = embed
+
+    def matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """Row-normalized embeddings of texts."""
+        vectors = np.stack(self.cache.get_many(texts, self.embed))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def search(self, queries: np.ndarray, chunks: np.ndarray, k: int) -> np.ndarray:
+        """Indexes of the ``k`` most similar chunks for each query row."""
+        scores = queries @ chunks.T
+        k = min(k, chunks.shape[0])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        return np.take_along_axis(top, order, axis=1)
+
+
+def load_tuning_set(
+    dataset: Path,
+    corpus: Path | None,
+    questions: Path | None,
+    corpus_size: int = 0,
+    seed: int = 0,
+) -> tuple[list[tuple[str, str]], list[Evidence]]:
+    """Return the corpus documents and the evidence of each question.
+
+    Args:
+        dataset: QA dataset used when no corpus is given. Its documents are
+            rebuilt from their chunks in order, and the evidence of a
+            question is the text of its relevant chunks.
+        corpus: Directory of ``.txt``, ``.md`` and ``.pdf`` files.
+        questions: JSON list of ``{"question": ..., "evidence": [...]}``
+            for the corpus; evidence passages are quoted from the corpus.
+        corpus_size: Chunks of the dataset corpus, padded with distractor
+            documents (see ``QADataset.with_corpus_size``).
+        seed: Distractor seed.
+    """
+    if corpus is not None:
+        documents = load_corpus(corpus, dataset, scale=1)
+        entries = json.loads(questions.read_text(encoding="utf-8"))
+        evidence = [
+            Evidence(
+                entry["question"],
+                [entry["evidence"]] if isinstance(entry["evidence"], str) else entry["evidence"],
+            )
+            for entry in entries
+        ]
+        return documents, evidence
+
+    qa = QADataset.load(dataset)
+    texts: dict[str, list[str]] = {}
+    by_id = {}
+    for chunk in qa.with_corpus_size(corpus_size, seed):
+        texts.setdefault(chunk.document_id, []).append(chunk.text)
+        by_id[chunk.id] = chunk.text
+    documents = [(document_id, "\n\n".join(parts)) for document_id, parts in texts.items()]
+    evidence = [
+        Evidence(question.question, [by_id[chunk_id] for chunk_id in sorted(question.relevant)])
+        for question in qa.questions
+    ]
+    return documents, evidence
+
+
+def sample_tuning_set(
+    documents: list[tuple[str, str]], evidence: list[Evidence], size: int, seed: int = 0
+) -> tuple[list[tuple[str, str]], list[Evidence]]:
+    """Keep ``size`` random documents and the questions they fully answer.
+
+    Args:
+        documents: Corpus documents.
+        evidence: Questions and their evidence.
+        size: Documents to keep (0 keeps all).
+        seed: Sampling seed.
+    """
+    if size and size < len(documents):
+        documents = random.Random(seed).sample(documents, size)
+    corpus = [_normalize(text) for _, text in documents]
+    kept = [
+        item
+        for item in evidence
+        if all(any(s in text for text in corpus) for s in _sentences(item.passages))
+    ]
+    return documents, kept
+
+
+def chunk_documents(
+    params: ChunkingParams, documents: list[tuple[str, str]], embeddings: BaseEmbeddings
+) -> list[tuple[int, str]]:
+    """Chunk documents the way ``AgnoKnowledgeBase`` would.
+
+    Returns:
+        ``(document index, chunk text)`` pairs.
+    """
+    from agno.knowledge.document import Document
+
+    from src.rag.agno.simple_chunking import SimpleSemanticChunking
+
+    chunker = SimpleSemanticChunking(
+        chunk_size=params.chunk_size,
+        similarity_threshold=params.similarity_threshold,
+        embedding_model=embeddings,
+    )
+    return [
+        (index, chunk.content)
+        for index, (name, text) in enumerate(documents)
+        for chunk in chunker.chunk(Document(name=name, content=text))
+    ]
+
+
+class Tuner:
+    """Scores chunking parameters on one corpus sample."""
+
+    def __init__(
+        self,
+        documents: list[tuple[str, str]],
+        evidence: list[Evidence],
+        chunk_embeddings: BaseEmbeddings,
+        retriever: Retriever,
+        k: int,
+        contextual: bool,
+        context_call_ms: float,
+    ) -> None:
+        """Prepare the sample and embed the questions.
+
+        Args:
+            documents: Corpus sample.
+            evidence: Questions answered by the sample.
+            chunk_embeddings: Sentence embeddings of the semantic chunker.
+            retriever: Search over the retrieval embeddings.
+            k: Chunks retrieved per question.
+            contextual: Count context generation in the cost, as the
+                contextual knowledge bases generate one per chunk.
+            context_call_ms: Mean latency of a context generation call.
+        """
+        self.documents = documents
+        self.evidence = evidence
+        self.chunk_embeddings = chunk_embeddings
+        self.retriever = retriever
+        self.k = k
+        self.contextual = contextual
+        self.context_call_ms = context_call_ms
+        self.input_mb = sum(len(text.encode()) for _, text in documents) / 1e6
+        self.queries = retriever.matrix([item.question for item in evidence])
+        self.sentences = [_sentences(item.passages) for item in evidence]
+
+        ledger = UsageLedger(prices=settings.usage_prices)
+        self.context_price = ledger.price(settings.context_generation_model)
+        self.embedding_price = ledger.price(settings.embedding_model)[0]
+
+    def quality(self, chunks: list[str]) -> dict[str, float]:
+        """Evidence coverage and hit rate of the top ``k`` chunks.
+
+        Returns:
+            Mean coverage@k, hit@k and search time per question.
+        """
+        normalized = [_normalize(chunk) for chunk in chunks]
+        start = time.perf_counter()
+        top = self.retriever.search(self.queries, self.retriever.matrix(chunks), self.k)
+        search_ms = (time.perf_counter() - start) * 1000 / max(1, len(self.evidence))
+
+        coverages, hits = [], []
+        for sentences, indexes in zip(self.sentences, top):
+            retrieved = [normalized[i] for i in indexes]
+            covered = sum(1 for s in sentences if any(s in chunk for chunk in retrieved))
+            coverages.append(covered / len(sentences) if sentences else 0.0)
+            hits.append(1.0 if covered else 0.0)
+        count = max(1, len(coverages))
+        return {
+            "coverage": round(sum(coverages) / count, 4),
+            "hit_rate": round(sum(hits) / count, 4),
+            "search_ms": round(search_ms, 3),
+        }
+
+    def cost(self, chunks: list[tuple[int, str]], chunking_s: float) -> dict[str, float]:
+        """Ingestion cost of a chunking per MB of corpus.
+
+        Context prompts use the chunkers' own prompt and truncation; the
+        generated context is assumed to be ``CONTEXT_OUTPUT_TOKENS`` long.
+        """
+        from src.rag.agno.chunking import ContextualSemanticChunking
+
+        context_calls = len(chunks) if self.contextual else 0
+        context_input = context_output = 0
+        embedded = 0
+        for index, chunk in chunks:
+            embedded += estimate_tokens(chunk)
+            if self.contextual:
+                prompt = ContextualSemanticChunking.CONTEXT_PROMPT.format(
+                    whole_doc=self.documents[index][1][:5000], chunk_content=chunk[:500]
+                )
+                context_input += estimate_tokens(prompt)
+                context_output += CONTEXT_OUTPUT_TOKENS
+                embedded += CONTEXT_OUTPUT_TOKENS
+
+        usd = (
+            context_input * self.context_price[0]
+            + context_output * self.context_price[1]
+            + embedded * self.embedding_price
+        ) / 1e6
+        ingest_s = (
+            chunking_s
+            + context_calls * self.context_call_ms / 1000 / settings.ingest_max_concurrency
+        )
+        mb = self.input_mb or 1.0
+        return {
+            "chunks_per_mb": round(len(chunks) / mb, 1),
+            "context_calls_per_mb": round(context_calls / mb, 1),
+            "context_tokens_per_mb": round((context_input + context_output) / mb),
+            "embedded_tokens_per_mb": round(embedded / mb),
+            "vector_mb_per_mb": round(len(chunks) * VECTOR_BYTES / 1e6 / mb, 3),
+            "usd_per_mb": round(usd / mb, 6),
+            "ingest_s_per_mb": round(ingest_s / mb, 2),
+        }
+
+    def score(self, params: ChunkingParams) -> dict:
+        """Chunk the sample with one setup and score it."""
+        start = time.perf_counter()
+        chunks = chunk_documents(params, self.documents, self.chunk_embeddings)
+        chunking_s = time.perf_counter() - start
+        return {
+            **asdict(params),
+            "chunks": len(chunks),
+            "chunking_s": round(chunking_s, 3),
+            "quality": self.quality([text for _, text in chunks]),
+            "cost": self.cost(chunks, chunking_s),
+        }
+
+
+def select(rows: list[dict], tolerance: float) -> dict:
+    """Pick the cheapest setup whose coverage is within ``tolerance`` of the best.
+
+    Ties on cost go to fewer chunks, then to the faster ingestion.
+    """
+    best = max(row["quality"]["coverage"] for row in rows)
+    eligible = [row for row in rows if row["quality"]["coverage"] >= best - tolerance]
+    return min(
+        eligible,
+        key=lambda row: (
+            row["cost"]["usd_per_mb"],
+            row["cost"]["chunks_per_mb"],
+            row["cost"]["ingest_s_per_mb"],
+            -row["quality"]["coverage"],
+        ),
+    )
+
+
+def _build_embedders(
+    offline: bool, cache_dir: Path | None
+) -> tuple[CachedChunkEmbeddings, Retriever]:
+    """Chunking embeddings and retriever, real or offline fakes, with caches."""
+    if offline:
+        chunk_cache = EmbeddingCache("hashing-chunking", cache_dir)
+        retrieval_cache = EmbeddingCache("hashing-retrieval", cache_dir)
+        return CachedChunkEmbeddings(HashingChunkEmbeddings(), chunk_cache), Retriever(
+            retrieval_cache, lambda texts: [hashed_embedding(text) for text in texts]
+        )
+
+    from agno.knowledge.embedder.google import GeminiEmbedder
+    from chonkie.embeddings import AutoEmbeddings
+
+    inner = AutoEmbeddings.get_embeddings(
+        settings.semantic_chunking_model, api_key=settings.openai_api_key
+    )
+    embedder = GeminiEmbedder(
+        id=settings.embedding_model, api_key=settings.google_api_key, dimensions=768
+    )
+    return CachedChunkEmbeddings(
+        inner, EmbeddingCache(settings.semantic_chunking_model, cache_dir)
+    ), Retriever(
+        EmbeddingCache(settings.embedding_model, cache_dir),
+        lambda texts: [embedder.get_embedding(text) for text in texts],
+    )
+
+
+def _print_row(row: dict, chosen: bool = False) -> None:
+    """One line of results."""
+    quality, cost = row["quality"], row["cost"]
+    print(
+        f"{'→' if chosen else ' '} size={row['chunk_size']:<5} "
+        f"threshold={row['similarity_threshold']:<4} "
+        f"chunks={row['chunks']:<5} coverage={quality['coverage']:.3f} "
+        f"hit={quality['hit_rate']:.3f} usd/MB={cost['usd_per_mb']:.4f} "
+        f"calls/MB={cost['context_calls_per_mb']:<7} ingest_s/MB={cost['ingest_s_per_mb']}"
+    )
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _float_list(value: str) -> list[float]:
+    return [float(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    """Run the chunking parameter tuner."""
+    parser = argparse.ArgumentParser(
+        description="Choose chunk_size and similarity_threshold for a table"
+    )
+    parser.add_argument("--chunk-sizes", type=_int_list, default=[256, 512, 1000, 1500])
+    parser.add_argument("--thresholds", type=_float_list, default=[0.3, 0.4, 0.5, 0.6, 0.7])
+    parser.add_argument("--corpus", type=Path, help="Directory of .txt/.md/.pdf files")
+    parser.add_argument("--questions", type=Path, help="Questions JSON for --corpus")
+    parser.add_argument(
+        "--dataset", type=Path, default=DEFAULT_DATASET, help="QA dataset without --corpus"
+    )
+    parser.add_argument(
+        "--corpus-size",
+        type=int,
+        default=400,
+        help="Dataset chunks, padded with distractor documents",
+    )
+    parser.add_argument(
+        "--sample-docs", type=int, default=0, help="Random documents to tune on (0 = all)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Distractor and sampling seed")
+    parser.add_argument("--k", type=int, default=5, help="Chunks retrieved per question")
+    parser.add_argument(
+        "--quality-tolerance",
+        type=float,
+        default=0.02,
+        help="Coverage below the best accepted for a cheaper setup",
+    )
+    parser.add_argument(
+        "--contextual",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Count one context generation call per chunk (contextual tables)",
+    )
+    parser.add_argument(
+        "--context-call-ms",
+        type=float,
+        default=400,
+        help="Mean context generation latency, for the ingestion time estimate",
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, default=Path(".tune_cache"), help="Embedding cache directory"
+    )
+    parser.add_argument("--offline", action="store_true", help="Use the hashing fakes")
+    parser.add_argument("--table", default=DEFAULT_TABLE_NAME, help="Table to tune")
+    parser.add_argument("--output", type=Path, help="Write all results JSON here")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report without storing the parameters"
+    )
+    args = parser.parse_args()
+    if args.corpus and not args.questions:
+        parser.error("--corpus needs --questions")
+
+    documents, evidence = load_tuning_set(
+        args.dataset, args.corpus, args.questions, args.corpus_size, args.seed
+    )
+    documents, evidence = sample_tuning_set(documents, evidence, args.sample_docs, args.seed)
+    if not evidence:
+        parser.error("No question has all its evidence in the sampled documents")
+
+    chunk_embeddings, retriever = _build_embedders(args.offline, args.cache_dir)
+    tuner = Tuner(
+        documents,
+        evidence,
+        chunk_embeddings,
+        retriever,
+        args.k,
+        args.contextual,
+        args.context_call_ms,
+    )
+    grid = [
+        ChunkingParams(size, threshold)
+        for size in args.chunk_sizes
+        for threshold in args.thresholds
+    ]
+    print(
+        f"🎛️  Tuning {len(grid)} setups on {len(documents)} documents "
+        f"({tuner.input_mb:.3f} MB) and {len(evidence)} questions\n"
+    )
+
+    try:
+        # Sentence embeddings are the same for every setup: fill the cache
+        # first, so the timings compare the chunking itself
+        chunk_documents(grid[0], documents, chunk_embeddings)
+        rows = [tuner.score(params) for params in grid]
+    finally:
+        chunk_embeddings.cache.save()
+        retriever.cache.save()
+    chosen = select(rows, args.quality_tolerance)
+    for row in rows:
+        _print_row(row, chosen=row is chosen)
+
+    caches = {
+        cache.model: {"hits": cache.hits, "misses": cache.misses}
+        for cache in (chunk_embeddings.cache, retriever.cache)
+    }
+    print(f"\n🗄️  Embedding cache: {caches}")
+
+    params = ChunkingParams(chosen["chunk_size"], chosen["similarity_threshold"])
+    details = {
+        "tuned_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "corpus": str(args.corpus) if args.corpus else args.dataset.name,
+        "offline": args.offline,
+        "quality": chosen["quality"],
+        "cost": chosen["cost"],
+    }
+    if args.output:
+        report = {**details, "table": args.table, "chosen": asdict(params), "results": rows}
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"💾 Results written to {args.output}")
+
+    if args.dry_run:
+        print(f"\n🧪 Dry run: {args.table} would use {asdict(params)}")
+        return
+    path = save_chunking_params(args.table, params, details)
+    print(f"\n✅ {args.table} now uses {asdict(params)} ({path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ import argparse
 from pathlib import Path
 
 from src.rag.agno import ContextualAgnoKnowledgeBase
+from src.tracing import configure_tracing
+from src.usage import get_usage_ledger
 
 
 def main():
@@ -23,19 +25,40 @@ def main():
         default="economics_enhanced_gemini",
         help="Table name for the vectorstore",
     )
+    parser.add_argument(
+        "--context-strategy",
+        choices=["llm", "extractive"],
+        default=None,
+        help="Chunk contexts from Gemini (llm) or from titles, headings and "
+        "keyphrases without LLM calls (extractive); defaults to CONTEXT_STRATEGY",
+    )
     args = parser.parse_args()
 
-    kb = ContextualAgnoKnowledgeBase(table_name=args.table)
+    configure_tracing("rag-ingest")
+
+    kb = ContextualAgnoKnowledgeBase(
+        table_name=args.table, context_strategy=args.context_strategy
+    )
 
     pdf_dir = Path(args.directory)
     if not pdf_dir.exists():
         print(f"❌ Directory not found: {args.directory}")
         return
 
-    print(f"🚀 Starting Agno contextual ingestion from: {args.directory}")
+    print(
+        f"🚀 Starting Agno contextual ingestion ({kb.context_strategy} contexts) "
+        f"from: {args.directory}"
+    )
     kb.ingest_directory(args.directory)
     print("✅ Ingestion complete!")
 
+    ledger = get_usage_ledger()
+    ledger.shutdown()
+    print("\n💰 Model usage by document (costs are estimates):")
+    print(ledger.report("document"))
+    print("\n💰 Model usage by model:")
+    print(ledger.report())
+
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,7 @@ import argparse
 from pathlib import Path
 
 from src.rag.agno import AgnoKnowledgeBase
+from src.tracing import configure_tracing
 
 
 def main():
@@ -25,6 +26,8 @@ def main():
     )
     args = parser.parse_args()
 
+    configure_tracing("rag-ingest")
+
     kb = AgnoKnowledgeBase(table_name=args.table)
 
     pdf_dir = Path(args.directory)
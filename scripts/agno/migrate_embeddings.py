@@ -0,0 +1,111 @@
+"""Re-embed an Agno knowledge base table with another embedding model, online."""
+
+import argparse
+import json
+import signal
+
+from src.config import settings
+from src.rag.agno.embedding_migration import EmbeddingMigration, EmbeddingMigrationError
+from src.tracing import configure_tracing
+from src.usage import get_usage_ledger
+
+
+def main():
+    """Run one step of an embedding model migration."""
+    parser = argparse.ArgumentParser(
+        description="Re-embed an Agno knowledge base table with another embedding "
+        "model while it keeps serving queries"
+    )
+    parser.add_argument(
+        "step",
+        choices=["start", "backfill", "switch", "rollback", "abort", "finalize", "status"],
+        help="start: create the shadow table; backfill: re-embed the stored chunks "
+        "into it; switch: serve the table from it; rollback: serve the previous "
+        "table again; abort: drop the shadow table; finalize: drop the previous "
+        "table; status: show the migration state",
+    )
+    parser.add_argument(
+        "--table",
+        type=str,
+        default="economics_enhanced_gemini",
+        help="Knowledge base table name",
+    )
+    parser.add_argument(
+        "--model",
+        type=str,
+        default=None,
+        help="New Gemini embedding model (start only)",
+    )
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        default=settings.embedding_dimensions,
+        help="Vector size of the new model (start only)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Rows embedded and written per transaction",
+    )
+    parser.add_argument(
+        "--rows-per-second",
+        type=float,
+        default=20.0,
+        help="Maximum rows embedded per second (0 = unthrottled)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Embedding requests in flight at once",
+    )
+    parser.add_argument(
+        "--switch",
+        action="store_true",
+        help="Switch as soon as the backfill completes (backfill only)",
+    )
+    args = parser.parse_args()
+
+    if args.step == "start" and not args.model:
+        parser.error("start requires --model")
+
+    configure_tracing("rag-embedding-migration")
+
+    migration = EmbeddingMigration(
+        args.table,
+        batch_size=args.batch_size,
+        rows_per_second=args.rows_per_second,
+        concurrency=args.concurrency,
+    )
+    # Finish the current batch on Ctrl+C / SIGTERM; the next run resumes
+    signal.signal(signal.SIGINT, lambda *_: migration.stop())
+    signal.signal(signal.SIGTERM, lambda *_: migration.stop())
+
+    try:
+        if args.step == "start":
+            migration.start(args.model, args.dimensions)
+        elif args.step == "backfill":
+            copied = migration.backfill()
+            print(f"🔁 Re-embedded {copied} rows")
+            if args.switch:
+                migration.switch()
+        elif args.step == "switch":
+            migration.switch()
+        elif args.step == "rollback":
+            migration.rollback()
+        elif args.step == "abort":
+            migration.abort()
+        elif args.step == "finalize":
+            migration.finalize()
+    except EmbeddingMigrationError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    finally:
+        get_usage_ledger().shutdown()
+
+    print(json.dumps(migration.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
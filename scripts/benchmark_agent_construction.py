@@ -0,0 +1,76 @@
+"""Benchmark create_rag_agent with and without the shared resource pool."""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.agents import AgentResourcePool, create_rag_agent
+
+
+def _measure(build, iterations: int) -> list[float]:
+    """Time ``build`` over several iterations.
+
+    Args:
+        build: Zero-argument callable that creates an agent.
+        iterations: Number of timed iterations.
+
+    Returns:
+        Durations in milliseconds.
+    """
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        build()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def _report(label: str, durations: list[float]) -> None:
+    """Print summary statistics for a set of durations."""
+    print(
+        f"  {label:<28} median={statistics.median(durations):8.2f}ms "
+        f"min={min(durations):8.2f}ms max={max(durations):8.2f}ms"
+    )
+
+
+def main() -> None:
+    """Compare per-request agent construction before and after pooling."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark agent construction with and without pooling"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=10, help="Timed iterations per mode"
+    )
+    args = parser.parse_args()
+
+    print(f"⏱️  Benchmarking create_rag_agent ({args.iterations} iterations)\n")
+
+    # Before: every request builds its own resources (old behaviour)
+    cold = _measure(
+        lambda: create_rag_agent(
+            user_id="bench", session_id="bench", pool=AgentResourcePool()
+        ),
+        args.iterations,
+    )
+
+    # After: resources are built once and shared
+    pool = AgentResourcePool()
+    pool.warm_up()
+    pooled = _measure(
+        lambda: create_rag_agent(user_id="bench", session_id="bench", pool=pool),
+        args.iterations,
+    )
+
+    _report("fresh resources (before)", cold)
+    _report("pooled resources (after)", pooled)
+    speedup = statistics.median(cold) / max(statistics.median(pooled), 1e-6)
+    print(f"\n✅ Pooled construction is {speedup:.0f}x faster (median)")
+
+
+if __name__ == "__main__":
+    main()
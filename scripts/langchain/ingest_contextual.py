@@ -1,9 +1,12 @@
 """Ingest PDFs using LangChain with contextual semantic chunking."""
 
 import argparse
+import asyncio
 from pathlib import Path
 
 from src.rag.langchain import ContextualLangChainKnowledgeBase
+from src.tracing import configure_tracing
+from src.usage import get_usage_ledger
 
 
 def main():
@@ -23,9 +26,25 @@ def main():
         default="economics_enhanced_langchain",
         help="Collection name for the vectorstore",
     )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Use the async ingestion API (concurrent context generation)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Max concurrent LLM calls/files in async mode (default from settings)",
+    )
     args = parser.parse_args()
 
-    kb = ContextualLangChainKnowledgeBase(collection_name=args.collection)
+    configure_tracing("rag-ingest")
+
+    kb = ContextualLangChainKnowledgeBase(
+        collection_name=args.collection, max_concurrency=args.concurrency
+    )
 
     pdf_dir = Path(args.directory)
     if not pdf_dir.exists():
@@ -33,9 +52,19 @@ def main():
         return
 
     print(f"🚀 Starting LangChain ingestion from: {args.directory}")
-    kb.ingest_directory(args.directory)
+    if args.use_async:
+        asyncio.run(kb.aingest_directory(args.directory))
+    else:
+        kb.ingest_directory(args.directory)
     print("✅ Ingestion complete!")
 
+    ledger = get_usage_ledger()
+    ledger.shutdown()
+    print("\n💰 Model usage by document (costs are estimates):")
+    print(ledger.report("document"))
+    print("\n💰 Model usage by model:")
+    print(ledger.report())
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,112 @@
+"""Profile API cold start: import-time breakdown and warm-up duration.
+
+Runs a fresh interpreter with ``-X importtime`` so the numbers match a real
+cold start, then aggregates the per-module timings by top-level package.
+
+Usage:
+    poetry run python scripts/profile_startup.py
+    poetry run python scripts/profile_startup.py --module src.agents --top 30
+    poetry run python scripts/profile_startup.py --warm-up
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WARM_UP_SNIPPET = """
+import time
+start = time.perf_counter()
+from src.agents import get_resource_pool
+pool = get_resource_pool()
+pool.warm_up()
+print(f"WARM_UP {time.perf_counter() - start:.3f}")
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Parse ``-X importtime`` output.
+
+    Args:
+        stderr: Interpreter stderr.
+
+    Returns:
+        List of (module, self_us, cumulative_us) tuples.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def profile_imports(module: str) -> tuple[list[tuple[str, int, int]], float]:
+    """Import a module in a fresh interpreter and collect import timings.
+
+    Args:
+        module: Module to import.
+
+    Returns:
+        Tuple of (import rows, wall-clock seconds of the interpreter run).
+    """
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit(f"❌ Importing {module} failed")
+    return parse_importtime(result.stderr), float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Print the import-time breakdown of the API module."""
+    parser = argparse.ArgumentParser(description="Profile API cold start")
+    parser.add_argument(
+        "--module", default="src.api.main", help="Module whose import is profiled"
+    )
+    parser.add_argument("--top", type=int, default=20, help="Rows to show per table")
+    parser.add_argument(
+        "--warm-up",
+        action="store_true",
+        help="Also time the resource pool warm-up (needs API keys and a database)",
+    )
+    args = parser.parse_args()
+
+    rows, total = profile_imports(args.module)
+
+    by_package: dict[str, int] = defaultdict(int)
+    for module, self_us, _ in rows:
+        by_package[module.split(".")[0]] += self_us
+
+    print(f"⏱️  import {args.module}: {total:.2f}s ({len(rows)} modules)\n")
+
+    print(f"{'package':<40} {'self (s)':>10}")
+    for package, self_us in sorted(by_package.items(), key=lambda x: -x[1])[: args.top]:
+        print(f"{package:<40} {self_us / 1e6:>10.3f}")
+
+    print(f"\n{'module':<60} {'cumulative (s)':>15}")
+    for module, _, cumulative_us in sorted(rows, key=lambda x: -x[2])[: args.top]:
+        print(f"{module:<60} {cumulative_us / 1e6:>15.3f}")
+
+    if args.warm_up:
+        result = subprocess.run(
+            [sys.executable, "-c", WARM_UP_SNIPPET], cwd=ROOT, capture_output=True, text=True
+        )
+        lines = [line for line in result.stdout.splitlines() if line.startswith("WARM_UP")]
+        if result.returncode != 0 or not lines:
+            print(result.stderr[-2000:])
+            raise SystemExit("❌ Warm-up failed")
+        print(f"\n🔥 Resource pool warm-up (imports + construction): {lines[0].split()[1]}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,25 @@
 """Agents module."""
 
+from src.agents.admission import AgentRateLimitedError, RunPriority
+from src.agents.pool import AgentResourcePool, get_resource_pool
 from src.agents.rag_agent import create_rag_agent
+from src.agents.router import Route
+from src.agents.runner import (
+    AgentQueueFullError,
+    AgentQueueTimeoutError,
+    AgentRunner,
+    get_agent_runner,
+)
 
-__all__ = ["create_rag_agent"]
+__all__ = [
+    "AgentQueueFullError",
+    "AgentQueueTimeoutError",
+    "AgentRateLimitedError",
+    "AgentResourcePool",
+    "AgentRunner",
+    "Route",
+    "RunPriority",
+    "create_rag_agent",
+    "get_agent_runner",
+    "get_resource_pool",
+]
@@ -0,0 +1,228 @@
+"""Per-user admission control for agent runs."""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from enum import IntEnum
+
+from src.metrics import AGENT_REJECTIONS
+
+
+class RunPriority(IntEnum):
+    """Scheduling class of an agent run; lower values are served first."""
+
+    INTERACTIVE = 0
+    AUDIO = 1
+    BATCH = 2
+
+
+# Token cost per run. Audio also spends a transcription call, so it costs more.
+PRIORITY_COST = {
+    RunPriority.INTERACTIVE: 1.0,
+    RunPriority.AUDIO: 2.0,
+    RunPriority.BATCH: 1.0,
+}
+
+
+class AgentRateLimitedError(Exception):
+    """Raised when a user exceeded their run budget.
+
+    Attributes:
+        retry_after: Seconds until the user may try again.
+    """
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second.
+
+    The bucket may go into debt by up to ``rate * max_delay`` tokens; callers
+    that cause debt wait until it is paid back instead of being rejected.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum stored tokens (burst size).
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last update."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, cost: float, max_delay: float) -> float:
+        """Take ``cost`` tokens, possibly on credit.
+
+        Args:
+            cost: Tokens to take.
+            max_delay: Maximum seconds the caller is willing to wait.
+
+        Returns:
+            Seconds the caller must wait before using the tokens.
+
+        Raises:
+            AgentRateLimitedError: If the wait would exceed ``max_delay``;
+                no tokens are taken in that case.
+        """
+        self._refill(time.monotonic())
+        delay = max(0.0, (cost - self.tokens) / self.rate)
+        if delay > max_delay:
+            raise AgentRateLimitedError(
+                "Run budget exhausted", retry_after=delay - max_delay
+            )
+        self.tokens -= cost
+        return delay
+
+
+class AdmissionTicket:
+    """Admission granted to one run; must be released when the run ends.
+
+    Attributes:
+        user_id: User the run belongs to (None when not rate limited).
+        priority: Scheduling class of the run.
+        delay: Seconds the run must wait before starting.
+    """
+
+    def __init__(
+        self,
+        controller: "AdmissionController | None",
+        user_id: str | None,
+        priority: RunPriority,
+        delay: float = 0.0,
+    ) -> None:
+        self.user_id = user_id
+        self.priority = priority
+        self.delay = delay
+        self._controller = controller
+        self._released = False
+
+    async def wait(self) -> None:
+        """Sleep for the admission delay, if any."""
+        if self.delay > 0:
+            await asyncio.sleep(self.delay)
+
+    def release(self) -> None:
+        """Return the user's pending slot (idempotent)."""
+        if self._released:
+            return
+        self._released = True
+        if self._controller is not None and self.user_id is not None:
+            self._controller._release(self.user_id)
+
+
+class _UserState:
+    """Token bucket and pending-run count of one user."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.bucket = TokenBucket(rate, capacity)
+        self.pending = 0
+
+
+class AdmissionController:
+    """Per-user token buckets and pending-run caps in front of the scheduler.
+
+    Each user earns ``rate_per_minute`` run tokens per minute up to ``burst``.
+    A run that arrives with an empty bucket is delayed until its tokens are
+    earned, or rejected if that would take longer than ``max_delay``. Users
+    can also have at most ``max_pending`` runs admitted but not finished, so
+    a flood of messages can't fill the shared queue.
+
+    Attributes:
+        rate_per_minute: Run tokens earned per user per minute.
+        burst: Maximum tokens a user can save up.
+        max_delay: Maximum seconds a run is delayed before being rejected.
+        max_pending: Maximum unfinished runs per user.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float = 10.0,
+        burst: float = 5.0,
+        max_delay: float = 10.0,
+        max_pending: int = 2,
+        max_users: int = 10_000,
+    ) -> None:
+        """Initialize the controller.
+
+        Args:
+            rate_per_minute: Run tokens earned per user per minute.
+            burst: Maximum tokens a user can save up.
+            max_delay: Maximum seconds a run is delayed before being rejected.
+            max_pending: Maximum unfinished runs per user.
+            max_users: Idle users tracked before the oldest are forgotten.
+        """
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.max_users = max_users
+
+        self._lock = threading.Lock()
+        self._users: OrderedDict[str, _UserState] = OrderedDict()
+
+    def _user(self, user_id: str) -> _UserState:
+        """Return the user's state, evicting idle users beyond ``max_users``."""
+        state = self._users.get(user_id)
+        if state is None:
+            state = _UserState(self.rate_per_minute / 60, self.burst)
+            self._users[user_id] = state
+            for idle_id in list(self._users):
+                if len(self._users) <= self.max_users:
+                    break
+                if self._users[idle_id].pending == 0:
+                    del self._users[idle_id]
+        else:
+            self._users.move_to_end(user_id)
+        return state
+
+    def admit(self, user_id: str | None, priority: RunPriority) -> AdmissionTicket:
+        """Admit a run for a user.
+
+        Args:
+            user_id: User the run belongs to; None skips per-user limits.
+            priority: Scheduling class of the run.
+
+        Returns:
+            Ticket carrying the delay to wait before running.
+
+        Raises:
+            AgentRateLimitedError: If the user has too many pending runs or
+                exhausted their budget.
+        """
+        if user_id is None:
+            return AdmissionTicket(None, None, priority)
+
+        with self._lock:
+            state = self._user(user_id)
+            if state.pending >= self.max_pending:
+                AGENT_REJECTIONS.inc(reason="user_pending")
+                raise AgentRateLimitedError(
+                    f"{state.pending} runs already pending for user",
+                    retry_after=self.max_delay,
+                )
+            try:
+                delay = state.bucket.reserve(PRIORITY_COST[priority], self.max_delay)
+            except AgentRateLimitedError:
+                AGENT_REJECTIONS.inc(reason="rate_limited")
+                raise
+            state.pending += 1
+
+        return AdmissionTicket(self, user_id, priority, delay)
+
+    def _release(self, user_id: str) -> None:
+        """Mark one of the user's runs as finished."""
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is not None and state.pending > 0:
+                state.pending -= 1
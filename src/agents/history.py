@@ -0,0 +1,475 @@
+"""Compacted chat history: rolling summary plus the last raw turns."""
+
+import contextvars
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    PrimaryKeyConstraint,
+    String,
+    Table,
+    Text,
+    create_engine,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+
+from src.config import settings
+from src.logger import logger
+from src.metrics import HISTORY_CACHE_REQUESTS, HISTORY_CONTEXT_TOKENS
+from src.tracing import tracer
+from src.usage import timed_usage
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an assistant.
+
+Update the summary below with the new turns. Keep facts about the user (name, preferences, goals), open questions, decisions and figures that were given. Drop small talk and anything already answered in full. Write in the language of the conversation, at most {max_words} words.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW TURNS:
+{turns}
+
+UPDATED SUMMARY:"""
+
+# Saves of a session history retried after concurrent writes from other processes
+SAVE_ATTEMPTS = 3
+
+metadata = MetaData()
+
+session_history = Table(
+    "agent_session_history",
+    metadata,
+    Column("user_id", String(255), nullable=False),
+    Column("session_id", String(255), nullable=False),
+    Column("summary", Text, nullable=False, server_default=""),
+    Column("turns", JSONB, nullable=False, server_default="[]"),
+    Column("summarized_turns", Integer, nullable=False, server_default="0"),
+    Column("version", Integer, nullable=False, server_default="0"),
+    Column("updated_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    PrimaryKeyConstraint("user_id", "session_id"),
+)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """Return the tiktoken encoding used for budgets, or None if unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens (cl100k approximation of the model's tokenizer)."""
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most ``max_tokens`` tokens."""
+    encoding = _encoding()
+    if encoding is None:
+        return text[: max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]) + " [...]"
+
+
+@dataclass
+class SessionHistory:
+    """Compacted history of one user session.
+
+    Attributes:
+        user_id: Session owner ("" for anonymous sessions).
+        session_id: Session identifier.
+        summary: Rolling summary of the turns no longer kept raw.
+        turns: Most recent raw turns, oldest first, as ``{"user", "assistant"}``.
+        summarized_turns: Number of turns folded into the summary so far.
+        version: Stored row version this copy was loaded or saved at (0 if
+            never stored).
+    """
+
+    user_id: str
+    session_id: str
+    summary: str = ""
+    turns: list[dict[str, str]] = field(default_factory=list)
+    summarized_turns: int = 0
+    version: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    compacting: bool = field(default=False, repr=False)
+
+
+class HistoryConflict(Exception):
+    """Raised when a session's stored history changed since it was loaded."""
+
+
+class HistoryStore:
+    """Persists compacted session histories in Postgres.
+
+    Rows carry a version, so a process saving a history it loaded before
+    another process wrote the session fails instead of overwriting it.
+    """
+
+    def __init__(self, db_url: str | None = None) -> None:
+        """Initialize the store and create its table if needed.
+
+        Args:
+            db_url: PostgreSQL connection string (defaults to ``settings.db_url``).
+        """
+        self.engine = create_engine(db_url or settings.db_url, pool_pre_ping=True)
+        metadata.create_all(self.engine, tables=[session_history], checkfirst=True)
+
+    def load(self, user_id: str, session_id: str) -> SessionHistory:
+        """Load a session's history, or an empty one if none was stored."""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(session_history).where(
+                    session_history.c.user_id == user_id,
+                    session_history.c.session_id == session_id,
+                )
+            ).one_or_none()
+        if row is None:
+            return SessionHistory(user_id=user_id, session_id=session_id)
+        return SessionHistory(
+            user_id=user_id,
+            session_id=session_id,
+            summary=row.summary,
+            turns=list(row.turns),
+            summarized_turns=row.summarized_turns,
+            version=row.version,
+        )
+
+    def save(self, history: SessionHistory) -> None:
+        """Store a session's history unless it changed since ``history`` was loaded.
+
+        Args:
+            history: History to store; its version is advanced on success.
+
+        Raises:
+            HistoryConflict: The stored version differs from ``history.version``.
+        """
+        values = {
+            "summary": history.summary,
+            "turns": history.turns,
+            "summarized_turns": history.summarized_turns,
+            "version": history.version + 1,
+            "updated_at": func.now(),
+        }
+        statement = insert(session_history).values(
+            user_id=history.user_id, session_id=history.session_id, **values
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[session_history.c.user_id, session_history.c.session_id],
+            set_=values,
+            where=session_history.c.version == history.version,
+        ).returning(session_history.c.version)
+        with self.engine.begin() as conn:
+            version = conn.execute(statement).scalar_one_or_none()
+        if version is None:
+            raise HistoryConflict(f"{history.user_id}/{history.session_id}")
+        history.version = version
+
+
+class HistoryManager:
+    """Keeps each session's prompt history under a token budget.
+
+    The context given to the agent is a rolling summary followed by the last
+    ``keep_turns`` raw turns, each capped at ``max_turn_tokens`` (so large
+    tool outputs never re-enter the prompt). When raw turns overflow the turn
+    count or the budget, the oldest ones are folded into the summary in the
+    background: only the previous summary and the evicted turns are sent to
+    the summarizer, so compaction cost doesn't grow with the session.
+
+    Histories are cached in-process (LRU) between turns, so consecutive
+    turns of a session read Postgres at most once. Writes are checked
+    against the stored version: when another process wrote the session in
+    between, the cached copy is reloaded and the change applied again, so
+    neither process's turns or summary are lost.
+
+    Attributes:
+        store: Persistent history store.
+        keep_turns: Raw turns kept verbatim.
+        token_budget: Maximum tokens of the rendered history context.
+        max_turn_tokens: Maximum tokens stored per user or assistant message.
+        cache_size: Sessions kept in the in-process cache.
+    """
+
+    def __init__(
+        self,
+        store: HistoryStore,
+        keep_turns: int = 4,
+        token_budget: int = 2000,
+        max_turn_tokens: int = 400,
+        cache_size: int = 1000,
+    ) -> None:
+        """Initialize the manager.
+
+        Args:
+            store: Persistent history store.
+            keep_turns: Raw turns kept verbatim.
+            token_budget: Maximum tokens of the rendered history context.
+            max_turn_tokens: Maximum tokens stored per user or assistant message.
+            cache_size: Sessions kept in the in-process cache.
+        """
+        self.store = store
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.max_turn_tokens = max_turn_tokens
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, str], SessionHistory] = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self._client = None
+
+    def get(self, user_id: str | None, session_id: str) -> SessionHistory:
+        """Return a session's history from the cache or the store."""
+        key = (user_id or "", session_id)
+        with self._lock:
+            history = self._cache.get(key)
+            if history is not None:
+                self._cache.move_to_end(key)
+        if history is not None:
+            HISTORY_CACHE_REQUESTS.inc(result="hit")
+            return history
+
+        HISTORY_CACHE_REQUESTS.inc(result="miss")
+        loaded = self.store.load(*key)
+        with self._lock:
+            # Another thread may have loaded it meanwhile; keep the first one
+            history = self._cache.setdefault(key, loaded)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return history
+
+    def _save(
+        self, history: SessionHistory, change: Callable[[SessionHistory], bool]
+    ) -> bool:
+        """Apply a change to a history and store it, reapplying it on conflicts.
+
+        Called with ``history.lock`` held. On a conflict, the history is
+        reloaded in place (the cached copy was stale) and ``change`` runs
+        again on the stored state.
+
+        Args:
+            history: Cached history to change.
+            change: Mutates the history; returns False when the change no
+                longer applies to it (nothing is saved then).
+
+        Returns:
+            Whether the change was stored.
+
+        Raises:
+            HistoryConflict: The session kept changing over every attempt.
+        """
+        for _ in range(SAVE_ATTEMPTS):
+            if not change(history):
+                return False
+            try:
+                self.store.save(history)
+                return True
+            except HistoryConflict:
+                HISTORY_CACHE_REQUESTS.inc(result="stale")
+                stored = self.store.load(history.user_id, history.session_id)
+                history.summary = stored.summary
+                history.turns = stored.turns
+                history.summarized_turns = stored.summarized_turns
+                history.version = stored.version
+        raise HistoryConflict(f"{history.user_id}/{history.session_id}")
+
+    def _render(self, history: SessionHistory) -> str:
+        """Render summary and raw turns, dropping the oldest turns over budget."""
+        summary = (
+            f"Summary of the earlier conversation:\n{history.summary}"
+            if history.summary
+            else ""
+        )
+        budget = self.token_budget - count_tokens(summary)
+
+        rendered_turns: list[str] = []
+        for turn in reversed(history.turns):
+            text = f"User: {turn['user']}\nAssistant: {turn['assistant']}"
+            cost = count_tokens(text)
+            if cost > budget:
+                break
+            rendered_turns.insert(0, text)
+            budget -= cost
+
+        parts = [summary] if summary else []
+        if rendered_turns:
+            parts.append("Most recent messages:\n" + "\n\n".join(rendered_turns))
+        return "\n\n".join(parts)
+
+    def build_context(self, user_id: str | None, session_id: str) -> str:
+        """Return the compacted history to add to the agent's context.
+
+        Args:
+            user_id: Session owner.
+            session_id: Session identifier.
+
+        Returns:
+            History context within ``token_budget`` tokens (may be empty).
+        """
+        with tracer.start_as_current_span("history.load") as span:
+            history = self.get(user_id, session_id)
+            with history.lock:
+                context = self._render(history)
+            tokens = count_tokens(context) if context else 0
+            span.set_attribute("tokens", tokens)
+        HISTORY_CONTEXT_TOKENS.observe(tokens)
+        return context
+
+    def record_turn(
+        self, user_id: str | None, session_id: str, user_message: str, assistant_message: str
+    ) -> None:
+        """Append a finished turn and schedule compaction if needed.
+
+        Args:
+            user_id: Session owner.
+            session_id: Session identifier.
+            user_message: User message of the turn.
+            assistant_message: Final assistant response of the turn.
+        """
+        turn = {
+            "user": truncate_tokens(user_message, self.max_turn_tokens),
+            "assistant": truncate_tokens(assistant_message, self.max_turn_tokens),
+        }
+        history = self.get(user_id, session_id)
+        with history.lock:
+            try:
+                self._save(history, lambda h: h.turns.append(turn) or True)
+            except Exception as e:
+                logger.error(
+                    f"Failed to save session history | session={session_id}: {e}"
+                )
+
+            needs_compaction = not history.compacting and self._over_limit(history)
+            if needs_compaction:
+                history.compacting = True
+
+        if needs_compaction:
+            # Keep the caller's log correlation and usage scope
+            context = contextvars.copy_context()
+            self._executor.submit(context.run, self._compact, history)
+
+    def _over_limit(self, history: SessionHistory) -> bool:
+        """Whether raw turns exceed the turn count or the token budget."""
+        if len(history.turns) > self.keep_turns:
+            return True
+        return count_tokens(self._render_all(history)) > self.token_budget
+
+    @staticmethod
+    def _render_all(history: SessionHistory) -> str:
+        """Render the summary and every raw turn."""
+        turns = "\n\n".join(
+            f"User: {t['user']}\nAssistant: {t['assistant']}" for t in history.turns
+        )
+        return f"{history.summary}\n\n{turns}"
+
+    def _compact(self, history: SessionHistory) -> None:
+        """Fold the oldest raw turns into the summary."""
+        try:
+            with history.lock:
+                evict = max(1, len(history.turns) - self.keep_turns)
+                evicted = history.turns[:evict]
+                summary = history.summary
+                summarized_turns = history.summarized_turns
+
+            with tracer.start_as_current_span(
+                "history.compact", attributes={"turns": len(evicted)}
+            ):
+                new_summary = self._summarize(summary, evicted)
+
+            def fold(history: SessionHistory) -> bool:
+                # Another process compacted the session meanwhile: drop ours
+                if history.summarized_turns != summarized_turns:
+                    return False
+                # Turns are only appended meanwhile, so the evicted ones are
+                # still at the front
+                del history.turns[: len(evicted)]
+                history.summary = new_summary
+                history.summarized_turns += len(evicted)
+                return True
+
+            with history.lock:
+                if not self._save(history, fold):
+                    logger.info(
+                        f"Session history compacted elsewhere, summary dropped | "
+                        f"session={history.session_id}"
+                    )
+                    return
+            logger.info(
+                f"Compacted session history | session={history.session_id} "
+                f"turns={len(evicted)} summary_tokens={count_tokens(new_summary)}"
+            )
+        except Exception as e:
+            logger.error(
+                f"History compaction failed | session={history.session_id}: {e}"
+            )
+        finally:
+            with history.lock:
+                history.compacting = False
+
+    def _summarize(self, summary: str, turns: list[dict[str, str]]) -> str:
+        """Summarize the previous summary plus evicted turns with Gemini."""
+        from google import genai
+
+        if self._client is None:
+            self._client = genai.Client(api_key=settings.google_api_key)
+
+        max_summary_tokens = self.token_budget // 2
+        prompt = SUMMARY_PROMPT.format(
+            max_words=int(max_summary_tokens * 0.7),
+            summary=summary or "(empty)",
+            turns="\n\n".join(
+                f"User: {t['user']}\nAssistant: {t['assistant']}" for t in turns
+            ),
+        )
+        model = settings.context_generation_model
+        with timed_usage("llm", "summary", model) as recorded:
+            response = self._client.models.generate_content(model=model, contents=prompt)
+            usage = response.usage_metadata
+            if usage:
+                recorded["input_tokens"] = usage.prompt_token_count
+                recorded["output_tokens"] = usage.candidates_token_count
+        if not response.text:
+            raise ValueError("Summarizer returned no text")
+        return truncate_tokens(response.text.strip(), max_summary_tokens)
+
+
+_manager: HistoryManager | None = None
+_manager_lock = threading.Lock()
+
+
+def get_history_manager() -> HistoryManager:
+    """Return the process-wide history manager, creating it from settings."""
+    global _manager
+
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = HistoryManager(
+                    HistoryStore(),
+                    keep_turns=settings.history_keep_turns,
+                    token_budget=settings.history_token_budget,
+                    max_turn_tokens=settings.history_max_turn_tokens,
+                    cache_size=settings.history_cache_size,
+                )
+    return _manager
@@ -0,0 +1,213 @@
+"""Process-wide pool of heavy resources shared by agent instances."""
+
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.agents.tool_cache import cache_tool_calls, get_tool_cache
+from src.agents.tool_hooks import coalesce_tool_calls, observe_tool_calls, tool_call_key
+from src.config import settings
+from src.logger import logger
+
+if TYPE_CHECKING:
+    from src.rag.agno import ContextualAgnoKnowledgeBase
+
+DEFAULT_TABLE_NAME = "economics_enhanced_gemini"
+
+
+def load_instructions() -> str:
+    """Load agent instructions from file."""
+    instructions_file = Path(__file__).parent / "RAG_AGENT_INSTRUCTIONS.md"
+    logger.info(f"Looking for instructions file at: {instructions_file.absolute()}")
+    if instructions_file.exists():
+        logger.info(f"Loading instructions from found file.")
+        return instructions_file.read_text()
+    else:
+        logger.info(f"Instructions not found. Using default.")
+        return "You are a helpful AI assistant."
+
+
+class AgentResourcePool:
+    """Thread-safe holder for the objects every agent run can share.
+
+    Knowledge bases (embedder, PgVector engine, chunkers), the session
+    database engine, the Gemini model, the toolkits and the instructions are
+    built once and reused, so creating an agent per request only binds the
+    per-user ``user_id``/``session_id``. A knowledge base is rebuilt when the
+    embedding registry switches its table to another model (checked every
+    ``settings.embedding_registry_refresh`` seconds); runs that already got
+    the old one finish with it.
+
+    Provider SDKs, toolkits and the chunking stack are imported when the
+    pool is built rather than when this module is imported, so the API can
+    start serving (and report readiness) while ``warm_up`` runs.
+
+    Attributes:
+        instructions: Default agent instructions (system prompt).
+        model: Gemini model shared by all agents.
+        db: Postgres database for sessions and memories.
+        tools: Toolkits attached to every agent.
+        tool_hooks: Hooks wrapping every tool call of pooled agents (metrics,
+            result cache, coalescing).
+    """
+
+    def __init__(self) -> None:
+        """Build the shared resources."""
+        from agno.db.postgres import PostgresDb
+        from agno.models.google import Gemini
+
+        self._lock = threading.Lock()
+        self._knowledge_bases: dict[str, "ContextualAgnoKnowledgeBase"] = {}
+        self._registry_checked_at: dict[str, float] = {}
+
+        self.instructions = load_instructions()
+        self.model = Gemini(id=settings.llm_model, api_key=settings.google_api_key)
+        self.db = PostgresDb(db_url=settings.db_url)
+        self.tools = self._build_tools()
+
+        # Finance/web tools don't depend on the user, so identical calls can
+        # share one result (cached or concurrent). Built-in tools (memory,
+        # history) can't.
+        shared_tool_names = {
+            name for toolkit in self.tools for name in toolkit.functions
+        }
+        # Hooks run outermost first: observe the latency callers actually see,
+        # serve repeats from the cache, then coalesce concurrent misses
+        self.tool_hooks = [
+            observe_tool_calls,
+            cache_tool_calls(get_tool_cache(), shared_tool_names, tool_call_key),
+            coalesce_tool_calls(shared_tool_names),
+        ]
+
+    @staticmethod
+    def _build_tools() -> list:
+        """Create the toolkits (yfinance pulls in pandas, so import lazily)."""
+        from agno.tools.yfinance import YFinanceTools
+
+        tools = [YFinanceTools()]
+        if settings.tavily_api_key:
+            from agno.tools.tavily import TavilyTools
+
+            tools.append(TavilyTools(api_key=settings.tavily_api_key))
+        return tools
+
+    def get_knowledge_base(self, table_name: str) -> "ContextualAgnoKnowledgeBase":
+        """Return the shared knowledge base for a table, creating it once.
+
+        Args:
+            table_name: Knowledge base table name.
+
+        Returns:
+            Knowledge base bound to the table.
+        """
+        kb = self._knowledge_bases.get(table_name)
+        if kb is not None and not self._registry_check_due(table_name):
+            return kb
+
+        with self._lock:
+            kb = self._knowledge_bases.get(table_name)
+            if kb is not None and not self._registry_check_due(table_name):
+                return kb
+            if kb is None or self._embedding_target_changed(kb, table_name):
+                from src.rag.agno import ContextualAgnoKnowledgeBase
+
+                kb = ContextualAgnoKnowledgeBase(table_name=table_name, coalesce=True)
+                self._knowledge_bases[table_name] = kb
+                logger.info(
+                    f"Created pooled knowledge base | table={table_name} "
+                    f"target={kb.embedding_target}"
+                )
+            self._registry_checked_at[table_name] = time.monotonic()
+            return kb
+
+    def _registry_check_due(self, table_name: str) -> bool:
+        """Whether a table's embedding target should be looked up again."""
+        checked_at = self._registry_checked_at.get(table_name, 0.0)
+        return time.monotonic() - checked_at >= settings.embedding_registry_refresh
+
+    @staticmethod
+    def _embedding_target_changed(
+        kb: "ContextualAgnoKnowledgeBase", table_name: str
+    ) -> bool:
+        """Whether the registry switched a table away from a knowledge base's target.
+
+        Lookup errors keep the current knowledge base (the registry lives in
+        the same database as the vectors, so searches would fail anyway).
+        """
+        if kb.embedding_registry is None:
+            return False
+        try:
+            target = kb.embedding_registry.resolve(table_name)
+        except Exception as e:
+            logger.warning(f"Embedding registry lookup failed | table={table_name} error={e}")
+            return False
+        return target != kb.embedding_target
+
+    def warm_up(
+        self, table_names: tuple[str, ...] = (DEFAULT_TABLE_NAME,)
+    ) -> dict[str, float]:
+        """Prepare everything the first request would otherwise pay for.
+
+        Builds the knowledge bases, creates the Gemini client and opens
+        database connections so they sit ready in the connection pools.
+
+        Args:
+            table_names: Tables whose knowledge bases should be created.
+
+        Returns:
+            Seconds spent per warm-up step.
+        """
+        timings = {}
+
+        start = time.perf_counter()
+        for table_name in table_names:
+            self.get_knowledge_base(table_name)
+        timings["knowledge_bases"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.model.get_client()
+        timings["model_client"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self._open_connections()
+        timings["db_connections"] = time.perf_counter() - start
+
+        return timings
+
+    def _open_connections(self) -> None:
+        """Open (and return to the pool) one connection per concurrent run."""
+        from sqlalchemy import text
+
+        engines = [self.db.db_engine]
+        for kb in self._knowledge_bases.values():
+            # Sharded tables hold one PgVector (and engine) per shard
+            vector_db = kb.knowledge.vector_db
+            for shard in getattr(vector_db, "shards", [vector_db]):
+                if shard.db_engine not in engines:
+                    engines.append(shard.db_engine)
+        for engine in engines:
+            connections = [
+                engine.connect() for _ in range(max(1, settings.agent_max_in_flight))
+            ]
+            try:
+                for connection in connections:
+                    connection.execute(text("SELECT 1"))
+            finally:
+                for connection in connections:
+                    connection.close()
+
+
+_pool: AgentResourcePool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_resource_pool() -> AgentResourcePool:
+    """Return the process-wide resource pool, creating it on first use."""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = AgentResourcePool()
+    return _pool
@@ -1,80 +1,107 @@
 """Agent factory for creating configured agents."""
 
-from pathlib import Path
 from agno.agent import Agent
-from agno.models.google import Gemini
-from agno.tools.yfinance import YFinanceTools
-from agno.tools.tavily import TavilyTools
-from agno.db.postgres import PostgresDb
 
-from src.logger import logger
-from src.config import settings
-from src.rag.agno import ContextualAgnoKnowledgeBase
-
-
-def _load_instructions() -> str:
-    """Load agent instructions from file."""
-    instructions_file = Path(__file__).parent / "RAG_AGENT_INSTRUCTIONS.md"
-    logger.info(f"Looking for instructions file at: {instructions_file.absolute()}")
-    if instructions_file.exists():
-        logger.info(f"Loading instructions from found file.")
-        return instructions_file.read_text()
-    else:
-        logger.info(f"Instructions not found. Using default.")
-        return "You are a helpful AI assistant."
+from src.agents.pool import DEFAULT_TABLE_NAME, AgentResourcePool, get_resource_pool
+from src.agents.router import Route
+from src.metrics import AGENT_CONSTRUCTION_SECONDS
+from src.tracing import tracer
 
 
 def create_rag_agent(
-    table_name: str = "economics_enhanced_gemini",
+    table_name: str = DEFAULT_TABLE_NAME,
     num_history_runs: int = 5,
     instructions: str = "",
     user_id: str = None,
     session_id: str = None,
+    pool: AgentResourcePool | None = None,
+    history_context: str | None = None,
+    route: Route = Route.FULL,
 ) -> Agent:
     """Create a RAG agent with knowledge base and tools.
 
+    Heavy resources (knowledge base, database, model, tools) come from the
+    shared resource pool; only the user/session binding is per call.
+
     Args:
         table_name: Knowledge base table name.
         num_history_runs: Number of history runs to include in context.
         instructions: Agent personality and rules (system prompt).
         user_id: Unique user identifier for memory isolation.
         session_id: Unique session identifier for chat history.
+        pool: Resource pool to draw from. Defaults to the process-wide pool.
+        history_context: Compacted session history (see ``src.agents.history``).
+            When given, it replaces the raw runs agno would load from the
+            database; None keeps agno's own history.
+        route: Agent path. ``DIRECT`` answers without retrieval or tools,
+            ``KB_ONLY`` searches the knowledge base without tools.
 
     Returns:
         Configured Agent instance.
     """
+    with (
+        tracer.start_as_current_span(
+            "agent.create", attributes={"table": table_name, "route": route.value}
+        ),
+        AGENT_CONSTRUCTION_SECONDS.time(),
+    ):
+        return _build_agent(
+            pool or get_resource_pool(),
+            table_name,
+            num_history_runs,
+            instructions,
+            user_id,
+            session_id,
+            history_context,
+            route,
+        )
+
+
+def _build_agent(
+    pool: AgentResourcePool,
+    table_name: str,
+    num_history_runs: int,
+    instructions: str,
+    user_id: str | None,
+    session_id: str | None,
+    history_context: str | None,
+    route: Route,
+) -> Agent:
+    """Bind pooled resources to a new agent for one user/session."""
     # Default instructions
     if not instructions:
-        instructions = _load_instructions()
-
-    # Knowledge base
-    kb = ContextualAgnoKnowledgeBase(table_name=table_name)
+        instructions = pool.instructions
 
-    # Tools
-    tools = [YFinanceTools()]
-    if settings.tavily_api_key:
-        tools.append(TavilyTools(api_key=settings.tavily_api_key))
+    # Knowledge base and tools, depending on what the route needs
+    knowledge = None
+    if route != Route.DIRECT:
+        knowledge = pool.get_knowledge_base(table_name).knowledge
+    tools = list(pool.tools) if route == Route.FULL else []
 
-    # Database for sessions
-    db = PostgresDb(db_url=settings.db_url)
+    # History: compacted context, or the last raw runs loaded by agno. With
+    # compaction the history tools stay off too, or the model could pull the
+    # full raw history back into the prompt.
+    compacted = history_context is not None
 
     # Agent
     agent = Agent(
-        model=Gemini(id=settings.llm_model, api_key=settings.google_api_key),
+        model=pool.model,
         user_id=user_id,
         session_id=session_id,
         instructions=instructions,
-        knowledge=kb.knowledge,
-        search_knowledge=True,
+        knowledge=knowledge,
+        search_knowledge=knowledge is not None,
         markdown=True,
-        add_history_to_context=True,
+        add_history_to_context=not compacted,
         num_history_runs=num_history_runs,
+        additional_context=history_context or None,
         update_memory_on_run=True,
-        read_chat_history=True,
-        read_tool_call_history=True,
+        read_chat_history=not compacted,
+        read_tool_call_history=not compacted,
         compress_tool_results=True,
-        db=db,
+        db=pool.db,
         tools=tools,
+        tool_hooks=list(pool.tool_hooks),
     )
 
     return agent
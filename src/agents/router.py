@@ -0,0 +1,243 @@
+"""Cheap local routing of messages to the agent path they need."""
+
+import hashlib
+import math
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from enum import StrEnum
+
+from src.config import settings
+from src.metrics import AGENT_ROUTES
+
+
+class Route(StrEnum):
+    """Agent path for a message, from cheapest to most capable."""
+
+    DIRECT = "direct"  # No retrieval, no tools
+    KB_ONLY = "kb_only"  # Knowledge base search, no tools
+    FULL = "full"  # Knowledge base and finance/web tools
+
+
+# Context lines callers prepend to the user message, e.g. "[User_name: ...]"
+CONTEXT_PREFIX_PATTERN = re.compile(r"^(\s*\[[^\]\n]*\]\s*\n?)+")
+
+# Whole-message chatter answered without retrieval or tools: greetings,
+# thanks, goodbyes and laughter, which never continue a task
+CHATTER_PATTERN = re.compile(
+    r"^(oi+|ol[aá]|e a[ií]|eai|opa|hey|hi|hello|yo|"
+    r"bom dia|boa tarde|boa noite|good (morning|afternoon|evening|night)|"
+    r"tudo (bem|bom|certo)|como vai|how are you|"
+    r"obrigad[oa]|muito obrigad[oa]|valeu|vlw|brigad[oa]|thanks?( you)?|thx|ty|"
+    r"tchau|at[eé] (mais|logo)|bye|see you|falou|flw|haha+|kkk+|rs+)"
+    r"( (sir spets|bot|amigo|cara|mano))?[\s!.?,]*$"
+)
+
+# Whole-message replies (yes, no, ok...). The router doesn't see the previous
+# turn, and they usually answer the agent's own offer ("quer que eu busque a
+# cotação?"), so they go to the full agent
+REPLY_PATTERN = re.compile(
+    r"^(sim|n[aã]o|yes|no|yep|nope|ok(ay)?|blz|beleza|certo|claro|pode( ser)?|"
+    r"perfeito|legal|show|top|massa|entendi|cool|nice|great|got it|sure|please)"
+    r"(,? (sim|por favor|please|obrigad[oa]|thanks))?[\s!.?,]*$"
+)
+
+# Anything that needs live data or the web goes to the full agent
+TOOL_PATTERN = re.compile(
+    r"https?://|www\.|\$|\b[A-Z]{4}\d{1,2}\b|\b[A-Z]{2,5}\b(?= (stock|share|price))|"
+    r"\b(cota[cç][aã]o|cotado|pre[cç]o|a[cç][aã]o|a[cç][oõ]es|bolsa|ibovespa|ibov|"
+    r"d[oó]lar|euro|bitcoin|btc|cripto\w*|dividend\w*|balan[cç]o|"
+    r"not[ií]cias?|hoje|agora|atual|[uú]ltim[oa]s?|recentes?|"
+    r"pesquis\w*|busque|procure|google|internet|site|"
+    r"selic|ipca|igp-?m|cdi|taxa de (juros|c[aâ]mbio)|quanto (est[aá]|vale|custa|foi)|"
+    r"stocks?|shares?|prices?|ticker|market|news|today|now|latest|current|"
+    r"recent|search|look up|web|rates?|(19|20)\d\d)\b",
+    re.IGNORECASE,
+)
+
+# Labelled examples for the similarity router, in both languages the bot sees
+EXEMPLARS: dict[Route, tuple[str, ...]] = {
+    Route.DIRECT: (
+        "oi tudo bem",
+        "bom dia, como você está?",
+        "quem é você?",
+        "o que você sabe fazer?",
+        "qual é o seu nome?",
+        "me conta uma piada",
+        "muito obrigado pela ajuda",
+        "valeu, até mais",
+        "hello, who are you?",
+        "what can you do?",
+        "tell me a joke",
+        "thank you so much",
+    ),
+    # Concept and book questions only: questions about economic indicators
+    # ("o que é PIB?") sit too close to ones asking for current figures
+    Route.KB_ONLY: (
+        "explique o conceito de custo de oportunidade",
+        "qual a diferença entre política monetária e fiscal?",
+        "como funcionam os juros compostos?",
+        "o que o livro diz sobre hábitos?",
+        "como criar um hábito novo?",
+        "resuma o capítulo sobre oferta e demanda",
+        "explain opportunity cost",
+        "how do habits form according to the book?",
+        "what is the difference between fiscal and monetary policy?",
+    ),
+}
+
+
+@dataclass
+class RouteDecision:
+    """Outcome of routing one message.
+
+    Attributes:
+        route: Chosen agent path.
+        reason: Why it was chosen (rule name or similarity score).
+        seconds: Time spent classifying.
+    """
+
+    route: Route
+    reason: str
+    seconds: float = 0.0
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.split())
+
+
+def _vectorize(text: str, dimensions: int = 1024) -> dict[int, float]:
+    """Embed text as an L2-normalized hashed bag of words and char trigrams."""
+    normalized = _normalize(text)
+    features = normalized.split()
+    padded = f" {normalized} "
+    features += [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+    vector: dict[int, float] = {}
+    for feature in features:
+        index = int.from_bytes(hashlib.md5(feature.encode()).digest()[:4], "little")
+        vector[index % dimensions] = vector.get(index % dimensions, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {i: v / norm for i, v in vector.items()}
+
+
+def _cosine(a: dict[int, float], b: dict[int, float]) -> float:
+    """Cosine similarity of two normalized sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(i, 0.0) for i, v in a.items())
+
+
+class MessageRouter:
+    """Rules plus nearest-exemplar similarity, all local and sub-millisecond.
+
+    Messages that match chatter rules take the direct path; short replies
+    (yes, no, ok) and messages that mention live data (tickers, prices,
+    rates, news, URLs, years) take the full agent. Everything else is
+    compared with labelled exemplars using hashed n-gram vectors, and
+    anything not clearly similar to an exemplar goes to the full agent. A
+    message misrouted to a cheaper path gets an answer without live data,
+    so the rules and exemplars lean towards the full agent.
+
+    The router also keeps a moving average of run time per route, which is
+    used to log how much a cheaper route saved compared with the full agent.
+
+    Attributes:
+        threshold: Minimum similarity to route by exemplar.
+        max_words: Messages longer than this always take the full agent.
+    """
+
+    def __init__(self, threshold: float = 0.5, max_words: int = 40) -> None:
+        """Initialize the router.
+
+        Args:
+            threshold: Minimum similarity to route by exemplar.
+            max_words: Messages longer than this always take the full agent.
+        """
+        self.threshold = threshold
+        self.max_words = max_words
+        self._exemplars = [
+            (route, _vectorize(text)) for route, texts in EXEMPLARS.items() for text in texts
+        ]
+        self._lock = threading.Lock()
+        self._run_seconds: dict[Route, float] = {}
+
+    def _classify(self, message: str) -> tuple[Route, str]:
+        """Pick a route and the reason for it."""
+        text = CONTEXT_PREFIX_PATTERN.sub("", message).strip()
+        if not text or not any(c.isalnum() for c in text):
+            return Route.DIRECT, "rule:empty"
+        if re.fullmatch(r"/\w+(@\w+)?", text):
+            return Route.DIRECT, "rule:command"
+        if CHATTER_PATTERN.match(_normalize(text)):
+            return Route.DIRECT, "rule:chatter"
+        if REPLY_PATTERN.match(_normalize(text)):
+            return Route.FULL, "rule:reply"
+        if TOOL_PATTERN.search(text):
+            return Route.FULL, "rule:tools"
+        if len(text.split()) > self.max_words:
+            return Route.FULL, "rule:long"
+
+        vector = _vectorize(text)
+        route, score = max(
+            ((route, _cosine(vector, exemplar)) for route, exemplar in self._exemplars),
+            key=lambda item: item[1],
+        )
+        if score < self.threshold:
+            return Route.FULL, f"similarity:{score:.2f}"
+        return route, f"similarity:{score:.2f}"
+
+    def route(self, message: str) -> RouteDecision:
+        """Route a message.
+
+        Args:
+            message: User message.
+
+        Returns:
+            The routing decision.
+        """
+        start = time.perf_counter()
+        route, reason = self._classify(message)
+        AGENT_ROUTES.inc(route=route.value, reason=reason.split(":")[0])
+        return RouteDecision(route, reason, time.perf_counter() - start)
+
+    def observe(self, route: Route, seconds: float) -> float | None:
+        """Record a run's duration and estimate the time saved by its route.
+
+        Args:
+            route: Route the run took.
+            seconds: Run duration.
+
+        Returns:
+            Estimated seconds saved compared with the full agent, or None
+            while no full runs were observed yet.
+        """
+        with self._lock:
+            average = self._run_seconds.get(route)
+            self._run_seconds[route] = (
+                seconds if average is None else 0.9 * average + 0.1 * seconds
+            )
+            full = self._run_seconds.get(Route.FULL)
+        if route == Route.FULL or full is None:
+            return None
+        return full - seconds
+
+
+_router: MessageRouter | None = None
+_router_lock = threading.Lock()
+
+
+def get_message_router() -> MessageRouter:
+    """Return the process-wide message router, creating it from settings."""
+    global _router
+
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = MessageRouter(threshold=settings.agent_routing_threshold)
+    return _router
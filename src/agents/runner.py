@@ -0,0 +1,599 @@
+"""Bounded, non-blocking execution of agent runs."""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, asynccontextmanager, closing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable
+
+from agno.agent import Agent
+from agno.run.agent import RunOutput
+
+from src.agents.admission import AdmissionController, AdmissionTicket, RunPriority
+from src.agents.rag_agent import create_rag_agent
+from src.agents.router import Route, RouteDecision, get_message_router
+from src.agents.streaming import AgentStreamEvent, iter_agent_run
+from src.config import settings
+from src.logger import logger
+from src.metrics import (
+    AGENT_QUEUE_WAIT_SECONDS,
+    AGENT_REJECTIONS,
+    AGENT_RUN_SECONDS,
+    LLM_SECONDS,
+    LLM_TOKENS,
+    ROUTED_RUN_SECONDS,
+    CallbackMetric,
+)
+from src.tracing import set_usage_attributes, tracer
+from src.usage import get_usage_ledger, usage_scope
+
+
+class AgentQueueFullError(Exception):
+    """Raised when all run slots are busy and the wait queue is full."""
+
+
+class AgentQueueTimeoutError(Exception):
+    """Raised when a queued run does not get a slot within the queue timeout."""
+
+
+@dataclass
+class RunTiming:
+    """Timing breakdown of a bounded agent run.
+
+    Attributes:
+        queue_wait: Seconds spent waiting for a free run slot.
+        execution: Seconds spent executing once a slot was granted.
+        throttle: Seconds the run was delayed by per-user rate limiting.
+    """
+
+    queue_wait: float
+    execution: float
+    throttle: float = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the timing in milliseconds for API responses."""
+        return {
+            "queue_wait_ms": round(self.queue_wait * 1000, 1),
+            "execution_ms": round(self.execution * 1000, 1),
+            "throttle_ms": round(self.throttle * 1000, 1),
+        }
+
+
+class AgentRunner:
+    """Runs agents off the event loop with bounded concurrency and backpressure.
+
+    At most ``max_in_flight`` runs execute at once, each on a dedicated worker
+    thread. Up to ``max_queue`` further callers wait for a slot for at most
+    ``queue_timeout`` seconds; beyond that, callers are rejected immediately.
+    Freed slots go to the waiting caller with the best ``RunPriority``
+    (interactive text, then audio, then API batch), first come first served
+    within a class. Before queueing, runs of identified users pass the
+    per-user ``AdmissionController``.
+
+    Attributes:
+        max_in_flight: Maximum concurrently executing runs.
+        max_queue: Maximum callers waiting for a slot.
+        queue_timeout: Maximum seconds a caller waits for a slot.
+        admission: Per-user rate limits applied by ``admit``.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        max_queue: int = 16,
+        queue_timeout: float = 30.0,
+        admission: AdmissionController | None = None,
+    ) -> None:
+        """Initialize the runner.
+
+        Args:
+            max_in_flight: Maximum concurrently executing runs.
+            max_queue: Maximum callers waiting for a slot.
+            queue_timeout: Maximum seconds a caller waits for a slot.
+            admission: Per-user admission controller. Defaults to one with
+                default limits.
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.admission = admission or AdmissionController()
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="agent-run"
+        )
+        self._free_slots = max_in_flight
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._waiting = 0
+        self._in_flight = 0
+
+    @property
+    def waiting(self) -> int:
+        """Number of callers currently waiting for a slot."""
+        return self._waiting
+
+    @property
+    def in_flight(self) -> int:
+        """Number of runs currently holding a slot."""
+        return self._in_flight
+
+    def check_capacity(self) -> None:
+        """Reject early if a new caller would not even fit in the wait queue.
+
+        Raises:
+            AgentQueueFullError: If the wait queue is full.
+        """
+        if self._free_slots == 0 and self._waiting >= self.max_queue:
+            AGENT_REJECTIONS.inc(reason="queue_full")
+            raise AgentQueueFullError(
+                f"{self._in_flight} runs in flight and {self._waiting} queued"
+            )
+
+    def admit(self, user_id: str | None, priority: RunPriority) -> AdmissionTicket:
+        """Apply per-user limits before a run is queued.
+
+        Callers that do work before the run (e.g. audio transcription) admit
+        first and pass the ticket to ``run``/``stream``, so excess work is
+        rejected before it costs anything.
+
+        Args:
+            user_id: User the run belongs to; None skips per-user limits.
+            priority: Scheduling class of the run.
+
+        Returns:
+            Ticket to pass to ``run``/``stream`` (which release it).
+
+        Raises:
+            AgentRateLimitedError: If the user is over their limits.
+        """
+        return self.admission.admit(user_id, priority)
+
+    async def _acquire(self, priority: RunPriority) -> float:
+        """Wait for a run slot, served in priority order.
+
+        Args:
+            priority: Scheduling class of the run.
+
+        Returns:
+            Seconds spent waiting.
+
+        Raises:
+            AgentQueueFullError: If the wait queue is full.
+            AgentQueueTimeoutError: If no slot frees up within the timeout.
+        """
+        self.check_capacity()
+
+        start = time.perf_counter()
+        if self._free_slots > 0:
+            self._free_slots -= 1
+        else:
+            granted = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._sequence), granted))
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(granted, self.queue_timeout)
+            except BaseException as e:
+                if granted.done() and not granted.cancelled():
+                    # The slot was handed over just as we gave up: pass it on
+                    self._hand_over_slot()
+                if isinstance(e, TimeoutError):
+                    AGENT_REJECTIONS.inc(reason="queue_timeout")
+                    raise AgentQueueTimeoutError(
+                        f"No run slot available after {self.queue_timeout:.0f}s"
+                    ) from None
+                raise
+            finally:
+                self._waiting -= 1
+
+        self._in_flight += 1
+        queue_wait = time.perf_counter() - start
+        AGENT_QUEUE_WAIT_SECONDS.observe(queue_wait, priority=priority.name.lower())
+        return queue_wait
+
+    def _hand_over_slot(self) -> None:
+        """Give a free slot to the best waiting caller, or return it to the pool."""
+        while self._waiters:
+            _, _, granted = heapq.heappop(self._waiters)
+            if not granted.done():
+                granted.set_result(None)
+                return
+        self._free_slots += 1
+
+    def _release(self) -> None:
+        """Free a run slot."""
+        self._in_flight -= 1
+        self._hand_over_slot()
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: RunPriority = RunPriority.BATCH
+    ) -> AsyncIterator[float]:
+        """Hold a run slot for async work executed on the event loop.
+
+        Args:
+            priority: Scheduling class of the work.
+
+        Yields:
+            Seconds spent waiting for the slot.
+        """
+        queue_wait = await self._acquire(priority)
+        try:
+            yield queue_wait
+        finally:
+            self._release()
+
+    async def run_in_thread(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        priority: RunPriority = RunPriority.BATCH,
+    ) -> tuple[Any, RunTiming]:
+        """Run a blocking callable on the runner's executor once a slot is free.
+
+        The slot is held until the worker thread finishes, even if the caller
+        is cancelled, so in-flight work never exceeds ``max_in_flight``.
+
+        Args:
+            func: Blocking callable to execute.
+            *args: Positional arguments for ``func``.
+            priority: Scheduling class of the work.
+
+        Returns:
+            Tuple of (result, timing).
+        """
+        queue_wait = await self._acquire(priority)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        try:
+            # Carry the caller's context (trace span, log correlation) into the thread
+            context = contextvars.copy_context()
+            future = self._executor.submit(context.run, func, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+
+        with AGENT_RUN_SECONDS.time_with_status(mode="thread"):
+            result = await asyncio.wrap_future(future)
+        return result, RunTiming(queue_wait, time.perf_counter() - start)
+
+    async def run(
+        self,
+        message: str,
+        user_id: str | None,
+        session_id: str | None,
+        priority: RunPriority = RunPriority.BATCH,
+        ticket: AdmissionTicket | None = None,
+    ) -> tuple[RunOutput, RunTiming]:
+        """Run a RAG agent turn for a user/session.
+
+        Args:
+            message: User message (with any context prefix).
+            user_id: Unique user identifier for memory isolation.
+            session_id: Unique session identifier for chat history.
+            priority: Scheduling class of the run.
+            ticket: Admission obtained earlier through ``admit``; admitted
+                here when omitted.
+
+        Returns:
+            Tuple of (agent response, timing).
+
+        Raises:
+            AgentRateLimitedError: If the user is over their limits.
+            AgentQueueFullError: If the wait queue is full.
+            AgentQueueTimeoutError: If no slot frees up within the timeout.
+        """
+        ticket = ticket or self.admit(user_id, priority)
+        try:
+            await ticket.wait()
+            response, timing = await self.run_in_thread(
+                _run_agent, message, user_id, session_id, priority=ticket.priority
+            )
+        finally:
+            ticket.release()
+        timing.throttle = ticket.delay
+        return response, timing
+
+    async def stream(
+        self,
+        message: str,
+        user_id: str | None,
+        session_id: str | None,
+        priority: RunPriority = RunPriority.BATCH,
+        ticket: AdmissionTicket | None = None,
+    ) -> AsyncIterator[AgentStreamEvent]:
+        """Stream a RAG agent turn for a user/session once a slot is free.
+
+        Like ``run``, the agent runs on a worker thread (session storage,
+        retrieval, tools and usage writes are blocking) and its events are
+        handed to the event loop as they come. Closing the generator early
+        stops the run at its next event; the slot is held until the worker
+        thread is done.
+
+        Args:
+            message: User message (with any context prefix).
+            user_id: Unique user identifier for memory isolation.
+            session_id: Unique session identifier for chat history.
+            priority: Scheduling class of the run.
+            ticket: Admission obtained earlier through ``admit``; admitted
+                here when omitted.
+
+        Yields:
+            Stream events; the final ``done`` event carries the timing.
+        """
+        ticket = ticket or self.admit(user_id, priority)
+        try:
+            await ticket.wait()
+            async with aclosing(
+                self._stream(message, user_id, session_id, ticket)
+            ) as events:
+                async for event in events:
+                    yield event
+        finally:
+            ticket.release()
+
+    async def _stream(
+        self,
+        message: str,
+        user_id: str | None,
+        session_id: str | None,
+        ticket: AdmissionTicket,
+    ) -> AsyncIterator[AgentStreamEvent]:
+        """Stream an admitted run from a worker thread while holding a slot."""
+        queue_wait = await self._acquire(ticket.priority)
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        start = time.perf_counter()
+
+        def emit(event: AgentStreamEvent) -> bool:
+            """Hand an event to the loop; False once the consumer went away."""
+            if stop.is_set():
+                return False
+            loop.call_soon_threadsafe(events.put_nowait, event)
+            return True
+
+        try:
+            # Carry the caller's context (trace span, log correlation) into the thread
+            context = contextvars.copy_context()
+            future = self._executor.submit(
+                context.run, _stream_agent, message, user_id, session_id, emit
+            )
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        # Queued after every emitted event: marks the end of the stream
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(events.put_nowait, f))
+
+        status = "error"
+        try:
+            while (event := await events.get()) is not future:
+                if event.kind == "done":
+                    status = "ok"
+                    event.timing = RunTiming(
+                        queue_wait, time.perf_counter() - start, ticket.delay
+                    )
+                yield event
+            future.result()
+        except (asyncio.CancelledError, GeneratorExit):
+            status = "cancelled"
+            raise
+        finally:
+            stop.set()
+            AGENT_RUN_SECONDS.observe(
+                time.perf_counter() - start, mode="stream", status=status
+            )
+
+    def shutdown(self) -> None:
+        """Stop the worker threads, dropping runs that have not started."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _route_message(message: str, user_id: str | None = None) -> RouteDecision:
+    """Pick the cheapest agent path able to answer the message.
+
+    Once a daily query token budget is spent, runs that would use tools
+    are degraded to knowledge base only.
+    """
+    if settings.agent_routing:
+        decision = get_message_router().route(message)
+    else:
+        decision = RouteDecision(Route.FULL, "disabled")
+
+    if decision.route == Route.FULL:
+        budget = get_usage_ledger().query_budget_reason(user_id)
+        if budget is not None:
+            logger.bind(user_id=user_id, budget=budget).warning(
+                "Query token budget spent, running without tools"
+            )
+            return RouteDecision(Route.KB_ONLY, f"budget:{budget}", decision.seconds)
+    return decision
+
+
+def _observe_route(decision: RouteDecision, seconds: float) -> None:
+    """Record a routed run's duration and log the estimated time saved."""
+    ROUTED_RUN_SECONDS.observe(seconds, route=decision.route.value)
+    if not settings.agent_routing:
+        return
+    saved = get_message_router().observe(decision.route, seconds)
+    logger.bind(
+        route=decision.route.value,
+        reason=decision.reason,
+        router_ms=round(decision.seconds * 1000, 3),
+        run_s=round(seconds, 3),
+        saved_s=round(saved, 3) if saved is not None else None,
+    ).info("Routed run")
+
+
+def _create_agent(
+    user_id: str | None, session_id: str | None, route: Route = Route.FULL
+) -> Agent:
+    """Create an agent bound to the user/session with its compacted history."""
+    history_context = None
+    if settings.history_compaction and session_id:
+        from src.agents.history import get_history_manager
+
+        try:
+            history_context = get_history_manager().build_context(user_id, session_id)
+        except Exception as e:
+            logger.error(f"Compacted history unavailable, using raw history: {e}")
+    return create_rag_agent(
+        user_id=user_id,
+        session_id=session_id,
+        history_context=history_context,
+        route=route,
+    )
+
+
+def _record_turn(
+    user_id: str | None, session_id: str | None, message: str, content: Any
+) -> None:
+    """Add a finished turn to the session's compacted history."""
+    if not settings.history_compaction or not session_id:
+        return
+    from src.agents.history import get_history_manager
+
+    try:
+        get_history_manager().record_turn(
+            user_id, session_id, message, "" if content is None else str(content)
+        )
+    except Exception as e:
+        logger.error(f"Failed to record turn | session={session_id}: {e}")
+
+
+def _run_agent(message: str, user_id: str | None, session_id: str | None) -> RunOutput:
+    """Create a fresh agent bound to the user/session and run it."""
+    with tracer.start_as_current_span("agent.run") as span, usage_scope(user_id=user_id):
+        decision = _route_message(message, user_id)
+        span.set_attribute("route", decision.route.value)
+        start = time.perf_counter()
+        agent = _create_agent(user_id, session_id, decision.route)
+        response = agent.run(message)
+        _observe_route(decision, time.perf_counter() - start)
+        _observe_llm_usage(response, span, time.perf_counter() - start)
+        _record_turn(user_id, session_id, message, response.content)
+        return response
+
+
+def _stream_agent(
+    message: str,
+    user_id: str | None,
+    session_id: str | None,
+    emit: Callable[[AgentStreamEvent], bool],
+) -> None:
+    """Run a streamed agent turn, passing its events to ``emit`` until it returns False.
+
+    The ``done`` event is emitted once the turn's usage and history are recorded.
+    """
+    status = "error"
+    with (
+        tracer.start_as_current_span("agent.run", attributes={"stream": True}) as span,
+        usage_scope(user_id=user_id),
+    ):
+        try:
+            decision = _route_message(message, user_id)
+            span.set_attribute("route", decision.route.value)
+            start = time.perf_counter()
+            agent = _create_agent(user_id, session_id, decision.route)
+            with closing(iter_agent_run(agent, message)) as events:
+                for event in events:
+                    if event.kind == "done":
+                        seconds = time.perf_counter() - start
+                        _observe_route(decision, seconds)
+                        _observe_llm_tokens(event.metrics, seconds)
+                        _record_turn(user_id, session_id, message, event.content)
+                        if event.metrics:
+                            set_usage_attributes(
+                                span,
+                                settings.llm_model,
+                                event.metrics.input_tokens,
+                                event.metrics.output_tokens,
+                            )
+                    if not emit(event):
+                        status = "cancelled"
+                        return
+            status = "ok"
+        finally:
+            span.set_attribute("status", status)
+
+
+def _observe_llm_tokens(metrics, seconds: float) -> None:
+    """Record token usage from agent run metrics in the metrics and usage ledger."""
+    if metrics is None:
+        return
+    model = settings.llm_model
+    LLM_TOKENS.inc(metrics.input_tokens or 0, model=model, direction="input")
+    LLM_TOKENS.inc(metrics.output_tokens or 0, model=model, direction="output")
+    get_usage_ledger().record(
+        "llm", "agent", model, metrics.input_tokens, metrics.output_tokens, seconds=seconds
+    )
+
+
+def _observe_llm_usage(response: RunOutput, span, seconds: float) -> None:
+    """Record model time (per model call) and token usage of a finished run."""
+    for message in response.messages or []:
+        if message.role == "assistant" and message.metrics and message.metrics.duration:
+            LLM_SECONDS.observe(message.metrics.duration, model=settings.llm_model)
+            span.add_event(
+                "gemini.generate_content",
+                {
+                    "duration_s": message.metrics.duration,
+                    "gen_ai.usage.input_tokens": message.metrics.input_tokens or 0,
+                    "gen_ai.usage.output_tokens": message.metrics.output_tokens or 0,
+                },
+            )
+    _observe_llm_tokens(response.metrics, seconds)
+    if response.metrics:
+        set_usage_attributes(
+            span,
+            settings.llm_model,
+            response.metrics.input_tokens,
+            response.metrics.output_tokens,
+        )
+
+
+_runner: AgentRunner | None = None
+_runner_lock = threading.Lock()
+
+
+def _runner_gauges() -> dict[tuple[str, ...], float]:
+    """Report run slot saturation of the process-wide runner."""
+    if _runner is None:
+        return {}
+    return {("in_flight",): _runner.in_flight, ("waiting",): _runner.waiting}
+
+
+CallbackMetric(
+    "rag_agent_runs",
+    "Agent runs currently executing or waiting for a slot",
+    _runner_gauges,
+    labelnames=("state",),
+)
+
+
+def get_agent_runner() -> AgentRunner:
+    """Return the process-wide agent runner, creating it from settings."""
+    global _runner
+
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = AgentRunner(
+                    max_in_flight=settings.agent_max_in_flight,
+                    max_queue=settings.agent_max_queue,
+                    queue_timeout=settings.agent_queue_timeout,
+                    admission=AdmissionController(
+                        rate_per_minute=settings.agent_user_rate_per_minute,
+                        burst=settings.agent_user_burst,
+                        max_delay=settings.agent_user_max_delay,
+                        max_pending=settings.agent_user_max_pending,
+                    ),
+                )
+    return _runner
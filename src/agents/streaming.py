@@ -0,0 +1,77 @@
+"""Normalized event stream over agent runs."""
+
+from __future__ import annotations
+
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Iterator, Literal
+
+from agno.agent import Agent
+from agno.run.agent import RunEvent
+
+if TYPE_CHECKING:
+    from src.agents.runner import RunTiming
+
+
+@dataclass
+class AgentStreamEvent:
+    """Framework-independent event emitted while an agent run streams.
+
+    Attributes:
+        kind: Event type: a content token, a tool call starting or
+            completing, or the final summary.
+        content: Token text, or the full response for ``done`` events.
+        tool_name: Tool name for tool events.
+        tools_used: Tools called during the run (``done`` events only).
+        timing: Queue/execution timing (``done`` events only, when known).
+        metrics: Agent run metrics such as token usage (``done`` events only).
+    """
+
+    kind: Literal["token", "tool_started", "tool_completed", "done"]
+    content: str = ""
+    tool_name: str | None = None
+    tools_used: list[str] = field(default_factory=list)
+    timing: RunTiming | None = None
+    metrics: Any = None
+
+
+def iter_agent_run(agent: Agent, message: str) -> Iterator[AgentStreamEvent]:
+    """Run an agent with streaming and translate its events.
+
+    Uses the synchronous agent API, so it runs on a worker thread (see
+    ``AgentRunner.stream``). Closing this generator early closes the
+    underlying agent stream, which stops the run.
+
+    Args:
+        agent: Configured agent.
+        message: User message.
+
+    Yields:
+        Stream events, ending with a single ``done`` event.
+    """
+    content_parts = []
+    tools_used = []
+    run_metrics = None
+
+    with closing(agent.run(message, stream=True, stream_events=True)) as run:
+        for event in run:
+            if event.event == RunEvent.run_content.value:
+                if event.content:
+                    content_parts.append(str(event.content))
+                    yield AgentStreamEvent(kind="token", content=str(event.content))
+            elif event.event == RunEvent.tool_call_started.value:
+                yield AgentStreamEvent(kind="tool_started", tool_name=event.tool.tool_name)
+            elif event.event == RunEvent.tool_call_completed.value:
+                tools_used.append(event.tool.tool_name)
+                yield AgentStreamEvent(
+                    kind="tool_completed", tool_name=event.tool.tool_name
+                )
+            elif event.event == RunEvent.run_completed.value:
+                run_metrics = event.metrics
+
+    yield AgentStreamEvent(
+        kind="done",
+        content="".join(content_parts),
+        tools_used=tools_used,
+        metrics=run_metrics,
+    )
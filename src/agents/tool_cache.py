@@ -0,0 +1,300 @@
+"""TTL cache for results of user-independent agent tools."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    delete,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+
+from src.config import settings
+from src.logger import logger
+from src.metrics import TOOL_CACHE_REQUESTS, CallbackMetric
+
+# Seconds a tool result stays fresh. Quotes go stale fast; fundamentals,
+# filings and web search results change slowly.
+DEFAULT_TOOL_TTLS = {
+    # YFinance
+    "get_current_stock_price": 60,
+    "get_historical_stock_prices": 15 * 60,
+    "get_technical_indicators": 15 * 60,
+    "get_company_news": 30 * 60,
+    "get_company_info": 6 * 3600,
+    "get_stock_fundamentals": 6 * 3600,
+    "get_income_statements": 6 * 3600,
+    "get_key_financial_ratios": 6 * 3600,
+    "get_analyst_recommendations": 6 * 3600,
+    # Tavily
+    "web_search_using_tavily": 3600,
+    "web_search_with_tavily": 3600,
+    "web_search": 3600,
+    "extract_url_content": 6 * 3600,
+}
+DEFAULT_TTL = 300
+
+metadata = MetaData()
+
+tool_cache = Table(
+    "tool_cache",
+    metadata,
+    Column("key", String(64), primary_key=True),
+    Column("tool", String(255), nullable=False),
+    Column("value", Text, nullable=False),
+    Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+)
+
+
+class PostgresToolCacheBackend:
+    """Tool results shared by all workers through a Postgres table.
+
+    Only string results (what toolkits return) are stored. Backend errors
+    are logged and treated as misses so the cache never breaks a tool call.
+    """
+
+    CLEANUP_EVERY = 500
+
+    def __init__(self, db_url: str | None = None) -> None:
+        """Initialize the backend and create its table if needed.
+
+        Args:
+            db_url: PostgreSQL connection string (defaults to ``settings.db_url``).
+        """
+        self.engine = create_engine(db_url or settings.db_url, pool_pre_ping=True)
+        metadata.create_all(self.engine, tables=[tool_cache], checkfirst=True)
+        self._writes = 0
+
+    def get(self, key: str) -> str | None:
+        """Return a fresh stored result, or None."""
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(
+                    select(tool_cache.c.value).where(
+                        tool_cache.c.key == key, tool_cache.c.expires_at > func.now()
+                    )
+                ).scalar_one_or_none()
+        except Exception as e:
+            logger.warning(f"Tool cache read failed: {e}")
+            return None
+
+    def set(self, key: str, tool: str, value: str, ttl: float) -> None:
+        """Store a result for ``ttl`` seconds."""
+        expires_at = func.now() + func.make_interval(0, 0, 0, 0, 0, 0, ttl)
+        statement = insert(tool_cache).values(
+            key=key, tool=tool, value=value, expires_at=expires_at
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[tool_cache.c.key],
+            set_={"value": statement.excluded.value, "expires_at": expires_at},
+        )
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(statement)
+                self._writes += 1
+                if self._writes % self.CLEANUP_EVERY == 0:
+                    conn.execute(
+                        delete(tool_cache).where(tool_cache.c.expires_at <= func.now())
+                    )
+        except Exception as e:
+            logger.warning(f"Tool cache write failed: {e}")
+
+
+class ToolResultCache:
+    """In-process LRU cache of tool results with per-tool TTLs.
+
+    Lookups go to the in-process LRU first and then to the optional shared
+    backend; shared hits are copied into the LRU.
+
+    Attributes:
+        max_entries: Maximum results kept in process memory.
+        ttls: Seconds a result stays fresh, per tool name.
+        default_ttl: TTL for tools without an entry in ``ttls``.
+        backend: Optional shared backend (Postgres).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttls: dict[str, float] | None = None,
+        default_ttl: float = DEFAULT_TTL,
+        backend: PostgresToolCacheBackend | None = None,
+    ) -> None:
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum results kept in process memory.
+            ttls: Per-tool TTL overrides merged over ``DEFAULT_TOOL_TTLS``.
+            default_ttl: TTL for tools without a specific entry.
+            backend: Optional shared backend.
+        """
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TOOL_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.backend = backend
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def ttl_for(self, tool: str) -> float:
+        """Return the TTL in seconds for a tool."""
+        return self.ttls.get(tool, self.default_ttl)
+
+    @staticmethod
+    def make_key(tool: str, normalized_arguments: str) -> str:
+        """Hash a tool name and its normalized arguments into a cache key."""
+        return hashlib.sha256(f"{tool}\0{normalized_arguments}".encode()).hexdigest()
+
+    def _count(self, tool: str, result: str) -> None:
+        """Record a lookup outcome."""
+        TOOL_CACHE_REQUESTS.inc(tool=tool, result=result)
+        with self._lock:
+            stats = self._stats.setdefault(tool, {"hit": 0, "shared_hit": 0, "miss": 0})
+            stats[result] += 1
+
+    def get(self, tool: str, key: str) -> tuple[bool, Any]:
+        """Look up a result.
+
+        Args:
+            tool: Tool name (for TTLs and metrics).
+            key: Cache key from ``make_key``.
+
+        Returns:
+            Tuple of (found, value).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                else:
+                    del self._entries[key]
+                    entry = None
+        if entry is not None:
+            self._count(tool, "hit")
+            return True, value
+
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self._put(key, value, self.ttl_for(tool))
+                self._count(tool, "shared_hit")
+                return True, value
+
+        self._count(tool, "miss")
+        return False, None
+
+    def set(self, tool: str, key: str, value: Any) -> None:
+        """Store a result with the tool's TTL."""
+        ttl = self.ttl_for(tool)
+        if ttl <= 0:
+            return
+        self._put(key, value, ttl)
+        if self.backend is not None and isinstance(value, str):
+            self.backend.set(key, tool, value, ttl)
+
+    def _put(self, key: str, value: Any, ttl: float) -> None:
+        """Insert into the LRU, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Return lookup counts and hit rate per tool."""
+        with self._lock:
+            stats = {tool: dict(counts) for tool, counts in self._stats.items()}
+        for counts in stats.values():
+            total = sum(counts.values())
+            counts["hit_rate"] = round((counts["hit"] + counts["shared_hit"]) / total, 3)
+        return stats
+
+
+def _is_error_result(value: Any) -> bool:
+    """Whether a toolkit returned an error message instead of data."""
+    return isinstance(value, str) and value.lstrip().lower().startswith(
+        ("error", "could not", "failed")
+    )
+
+
+def cache_tool_calls(
+    cache: ToolResultCache,
+    cached_tool_names: set[str],
+    key_fn: Callable[[str, dict[str, Any]], tuple[str, str]],
+) -> Callable:
+    """Create a tool hook serving repeated tool calls from the cache.
+
+    Args:
+        cache: Cache holding tool results.
+        cached_tool_names: Names of user-independent tools that may be cached.
+        key_fn: Builds ``(tool, normalized_arguments)`` for a call.
+
+    Returns:
+        Agno tool hook.
+    """
+
+    def hook(function_name: str, function_call: Callable, arguments: dict[str, Any]):
+        if function_name not in cached_tool_names or cache.ttl_for(function_name) <= 0:
+            return function_call(**arguments)
+
+        key = cache.make_key(*key_fn(function_name, arguments))
+        found, value = cache.get(function_name, key)
+        if found:
+            return value
+
+        value = function_call(**arguments)
+        if not _is_error_result(value):
+            cache.set(function_name, key, value)
+        return value
+
+    return hook
+
+
+_cache: ToolResultCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> ToolResultCache:
+    """Return the process-wide tool result cache, creating it from settings."""
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                backend = None
+                if settings.tool_cache_backend == "postgres":
+                    try:
+                        backend = PostgresToolCacheBackend()
+                    except Exception as e:
+                        logger.error(f"Shared tool cache unavailable, using memory only: {e}")
+                _cache = ToolResultCache(
+                    max_entries=settings.tool_cache_max_entries,
+                    ttls=settings.tool_cache_ttls,
+                    backend=backend,
+                )
+    return _cache
+
+
+CallbackMetric(
+    "rag_tool_cache_entries",
+    "Tool results held in the in-process cache",
+    lambda: {(): len(_cache)} if _cache is not None else {},
+)
@@ -0,0 +1,87 @@
+"""Tool hooks applied to every tool call of pooled agents."""
+
+import json
+from typing import Any, Callable
+
+from src.metrics import TOOL_CALL_SECONDS
+from src.singleflight import get_group
+from src.tracing import tracer
+
+
+# Arguments whose case does not matter, per tool (ticker symbols, search
+# queries). Other strings keep their case: URLs, for one, are case-sensitive.
+CASE_INSENSITIVE_ARGUMENTS = {
+    # YFinance
+    "get_current_stock_price": {"symbol"},
+    "get_historical_stock_prices": {"symbol"},
+    "get_technical_indicators": {"symbol"},
+    "get_company_news": {"symbol"},
+    "get_company_info": {"symbol"},
+    "get_stock_fundamentals": {"symbol"},
+    "get_income_statements": {"symbol"},
+    "get_key_financial_ratios": {"symbol"},
+    "get_analyst_recommendations": {"symbol"},
+    # Tavily
+    "web_search_using_tavily": {"query"},
+    "web_search_with_tavily": {"query"},
+    "web_search": {"query"},
+}
+
+
+def _normalize_argument(value: Any, casefold: bool = False) -> Any:
+    """Normalize an argument so equivalent calls share a key.
+
+    Strings have their whitespace collapsed, and are case-folded when
+    ``casefold`` is set; containers are normalized recursively.
+    """
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value.casefold() if casefold else value
+    if isinstance(value, dict):
+        return {k: _normalize_argument(v, casefold) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_argument(v, casefold) for v in value]
+    return value
+
+
+def tool_call_key(function_name: str, arguments: dict[str, Any]) -> tuple[str, str]:
+    """Build a key identifying a tool call by name and normalized arguments."""
+    case_insensitive = CASE_INSENSITIVE_ARGUMENTS.get(function_name, set())
+    normalized = {
+        name: _normalize_argument(value, casefold=name in case_insensitive)
+        for name, value in arguments.items()
+    }
+    return function_name, json.dumps(normalized, sort_keys=True, default=str)
+
+
+def observe_tool_calls(
+    function_name: str, function_call: Callable, arguments: dict[str, Any]
+):
+    """Tool hook recording the latency and outcome of every tool call."""
+    with (
+        tracer.start_as_current_span("tool.call", attributes={"tool": function_name}),
+        TOOL_CALL_SECONDS.time_with_status(tool=function_name),
+    ):
+        return function_call(**arguments)
+
+
+def coalesce_tool_calls(shared_tool_names: set[str]) -> Callable:
+    """Create a tool hook that coalesces identical concurrent tool calls.
+
+    Args:
+        shared_tool_names: Names of user-independent tools whose results may
+            be shared between callers. Other tools always run on their own.
+
+    Returns:
+        Agno tool hook.
+    """
+
+    def hook(function_name: str, function_call: Callable, arguments: dict[str, Any]):
+        if function_name not in shared_tool_names:
+            return function_call(**arguments)
+        return get_group("tools").do(
+            tool_call_key(function_name, arguments),
+            lambda: function_call(**arguments),
+        )
+
+    return hook
@@ -1,26 +1,93 @@
 """FastAPI application for RAG system."""
 
-from contextlib import asynccontextmanager
+import asyncio
+import json
+import re
+import time
+import uuid
+from contextlib import aclosing, asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import Optional
-from telegram import Update
+from pathlib import Path
+from typing import Literal, Optional
 
-from src.agents import create_rag_agent
-from src.integrations.telegram import TelegramBot
+from src.agents import (
+    AgentQueueFullError,
+    AgentQueueTimeoutError,
+    AgentRateLimitedError,
+    RunPriority,
+    get_agent_runner,
+    get_resource_pool,
+)
+from src.agents.pool import DEFAULT_TABLE_NAME
+from src.agents.tool_cache import get_tool_cache
+from src.ingestion import SUPPORTED_SUFFIXES, get_job_store
 from src.config import settings
-from src.logger import logger
+from src.logger import correlate, logger
+from src.metrics import CONTENT_TYPE, render_metrics
+from src.rag.shard_health import shard_health_stats
+from src.singleflight import singleflight_stats
+from src.tracing import configure_tracing, tracer
+from src.usage import DIMENSIONS, get_usage_ledger, usage_scope
 
 # Singleton bot instance for lifecycle management
 telegram_bot = None
+telegram_queue = None
+
+# Cold-start readiness, reported by /health
+startup_state = {
+    "ready": False,
+    "started_at": time.perf_counter(),
+    "time_to_ready_seconds": None,
+    "warm_up_seconds": None,
+    "warm_up_error": None,
+}
+warm_up_task: asyncio.Task | None = None
+
+
+def _warm_up() -> dict[str, float]:
+    """Build the resource pool and agent runner (runs in a worker thread)."""
+    start = time.perf_counter()
+    pool = get_resource_pool()
+    timings = {"resource_pool": time.perf_counter() - start}
+    timings.update(pool.warm_up())
+    get_agent_runner()
+    return timings
+
+
+async def _run_warm_up() -> None:
+    """Warm up in the background and record when the app became ready."""
+    try:
+        timings = await asyncio.to_thread(_warm_up)
+        startup_state["warm_up_seconds"] = {
+            step: round(seconds, 3) for step, seconds in timings.items()
+        }
+        logger.info(f"Agent resource pool ready | {startup_state['warm_up_seconds']}")
+    except Exception as e:
+        logger.error(f"Failed to warm up agent resource pool: {e}")
+        # Don't raise - the pool is built lazily on the first request instead
+        startup_state["warm_up_error"] = str(e)
+
+    startup_state["ready"] = True
+    startup_state["time_to_ready_seconds"] = round(
+        time.perf_counter() - startup_state["started_at"], 3
+    )
+    logger.info(f"Application ready in {startup_state['time_to_ready_seconds']}s")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize resources on startup and cleanup on shutdown."""
-    global telegram_bot
+    global telegram_bot, telegram_queue, warm_up_task
 
     logger.info("Starting FastAPI application initialization")
+    configure_tracing("rag-api")
+
+    # Build shared agent resources in the background so the server starts
+    # accepting connections (and health checks) right away
+    warm_up_task = asyncio.create_task(_run_warm_up())
 
     # Initialize Telegram bot with webhook only if RENDER_EXTERNAL_URL is set
     telegram_token = getattr(settings, "telegram_bot_token", None)
@@ -28,8 +95,26 @@ async def lifespan(app: FastAPI):
 
     if telegram_token and render_url:
         try:
-            telegram_bot = TelegramBot(token=telegram_token)
+            from src.integrations.telegram import TelegramBot
+            from src.integrations.telegram.update_queue import UpdateQueue, UpdateStore
+
+            telegram_bot = TelegramBot(token=telegram_token, queued=True)
             await telegram_bot.initialize()  # Initialize for webhook mode
+
+            try:
+                update_store = await asyncio.to_thread(UpdateStore)
+            except Exception as e:
+                logger.error(f"Telegram update store unavailable, queue kept in memory: {e}")
+                update_store = None
+            telegram_queue = UpdateQueue(
+                telegram_bot.process_payload,
+                update_store,
+                workers=settings.telegram_workers,
+                max_pending=settings.telegram_max_pending,
+                max_attempts=settings.telegram_update_max_attempts,
+            )
+            await telegram_queue.start()
+
             webhook_url = f"{render_url}/telegram"
             await telegram_bot.set_webhook(webhook_url)
             logger.info(f"Telegram webhook mode enabled: {webhook_url}")
@@ -46,11 +131,34 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("Shutting down FastAPI application")
+    if not warm_up_task.done():
+        warm_up_task.cancel()
+    if telegram_queue is not None:
+        await telegram_queue.stop()
+    get_agent_runner().shutdown()
+    await asyncio.to_thread(get_usage_ledger().shutdown)
+    # Drain the log queue before the process exits
+    await logger.complete()
 
 
 app = FastAPI(title="RAG API", lifespan=lifespan)
 
 
+@app.middleware("http")
+async def correlate_request(request: Request, call_next):
+    """Tag the request's logs with its X-Request-ID (generated if missing).
+
+    Model usage of the request is attributed to its path.
+    """
+    with (
+        correlate(request.headers.get("x-request-id")) as request_id,
+        usage_scope(endpoint=request.url.path),
+    ):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 class Query(BaseModel):
     """Query request model."""
 
@@ -60,6 +168,18 @@ class Query(BaseModel):
     max_results: Optional[int] = 5
 
 
+class IngestRequest(BaseModel):
+    """Ingestion job request model."""
+
+    path: str
+    table_name: str = DEFAULT_TABLE_NAME
+    priority: int = 0
+    context_strategy: Optional[Literal["llm", "extractive"]] = None
+
+
+_TABLE_NAME_PATTERN = re.compile(r"^[a-z_][a-z0-9_]{0,62}$")
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -72,19 +192,32 @@ async def root():
 
 @app.post("/telegram")
 async def telegram_webhook(request: Request):
-    """Handle Telegram webhook updates."""
-    if not telegram_bot:
+    """Handle Telegram webhook updates.
+
+    Updates are persisted and queued, then acknowledged right away; queue
+    workers run the bot handlers in order per chat. Redeliveries of an
+    update already received are acknowledged and dropped. When the queue is
+    full, 503 makes Telegram deliver the update again later.
+    """
+    if not telegram_bot or not telegram_queue:
         logger.error("Telegram webhook called but bot not initialized")
         raise HTTPException(status_code=503, detail="Telegram bot not initialized")
 
+    from src.integrations.telegram.update_queue import UpdateQueueFullError
+
     try:
         data = await request.json()
         logger.info(f"Telegram webhook received: {data.get('update_id', 'unknown')}")
 
-        update = Update.de_json(data, telegram_bot.app.bot)
-        await telegram_bot.app.process_update(update)
+        with tracer.start_as_current_span(
+            "POST /telegram", attributes={"update_id": data.get("update_id", -1)}
+        ):
+            queued = await telegram_queue.submit(data)
 
-        return {"ok": True}
+        return {"ok": True, "queued": queued}
+    except UpdateQueueFullError as e:
+        logger.warning(f"Telegram update rejected: {e}")
+        raise HTTPException(status_code=503, detail="Too many pending updates")
     except Exception as e:
         logger.error(f"Error processing Telegram webhook: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -92,25 +225,299 @@ async def telegram_webhook(request: Request):
 
 @app.post("/query")
 async def query(req: Query):
-    """Query the knowledge base with LLM-powered response."""
-    # Create fresh agent for API request
+    """Query the knowledge base with LLM-powered response.
+
+    The agent runs on a bounded worker pool so the event loop stays free for
+    other requests. API queries run in the batch priority class, behind
+    Telegram traffic. Returns 429 when the user is rate limited or the wait
+    queue is full, and 503 when no run slot frees up in time.
+    """
     try:
-        agent = create_rag_agent(
-            user_id=req.user_id, session_id=req.session_id or "default"
-        )
-        response = agent.run(req.question)
-        return {
-            "response": response.content,
-            "tools_used": [
-                m.tool_name for m in response.messages if hasattr(m, "tool_name")
-            ],
-        }
+        with tracer.start_as_current_span("POST /query") as span:
+            response, timing = await get_agent_runner().run(
+                req.question,
+                req.user_id,
+                req.session_id or "default",
+                priority=RunPriority.BATCH,
+            )
+            span.set_attribute("queue_wait_ms", timing.as_dict()["queue_wait_ms"])
+        logger.bind(
+            user_id=req.user_id,
+            response_length=len(response.content or ""),
+            **timing.as_dict(),
+        ).info("Query answered")
+    except AgentRateLimitedError as e:
+        logger.warning(f"Query rejected, rate limited | user={req.user_id} {e}")
+        raise _rate_limited(e)
+    except AgentQueueFullError as e:
+        logger.warning(f"Query rejected, queue full | {e}")
+        raise HTTPException(status_code=429, detail="Too many concurrent queries")
+    except AgentQueueTimeoutError as e:
+        logger.warning(f"Query rejected, queue timeout | {e}")
+        raise HTTPException(status_code=503, detail="Timed out waiting for capacity")
     except Exception as e:
         logger.error(f"Error in query endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    return {
+        "response": response.content,
+        "tools_used": [
+            m.tool_name for m in response.messages if hasattr(m, "tool_name")
+        ],
+        "timing": timing.as_dict(),
+    }
+
+
+def _rate_limited(error: AgentRateLimitedError) -> HTTPException:
+    """Build the 429 response for a rate-limited user."""
+    return HTTPException(
+        status_code=429,
+        detail="Too many queries for this user",
+        headers={"Retry-After": str(max(1, round(error.retry_after)))},
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format a Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/query/stream")
+async def query_stream(req: Query, request: Request):
+    """Stream the agent response as Server-Sent Events.
+
+    Emits ``token`` frames as the model generates, ``tool_started`` and
+    ``tool_completed`` frames around tool calls, and a final ``done`` frame
+    with the full response, ``tools_used`` and timing. If the client
+    disconnects, the underlying agent run is cancelled.
+    """
+    runner = get_agent_runner()
+    try:
+        runner.check_capacity()
+        ticket = runner.admit(req.user_id, RunPriority.BATCH)
+    except AgentRateLimitedError as e:
+        logger.warning(f"Streaming query rejected, rate limited | user={req.user_id} {e}")
+        raise _rate_limited(e)
+    except AgentQueueFullError as e:
+        logger.warning(f"Streaming query rejected, queue full | {e}")
+        raise HTTPException(status_code=429, detail="Too many concurrent queries")
+
+    async def events():
+        stream = runner.stream(
+            req.question, req.user_id, req.session_id or "default", ticket=ticket
+        )
+        try:
+            async with aclosing(stream):
+                async for event in stream:
+                    if await request.is_disconnected():
+                        logger.info("Client disconnected, cancelling streaming run")
+                        break
+
+                    if event.kind == "token":
+                        yield _sse("token", {"content": event.content})
+                    elif event.kind in ("tool_started", "tool_completed"):
+                        yield _sse(event.kind, {"tool": event.tool_name})
+                    else:
+                        yield _sse(
+                            "done",
+                            {
+                                "response": event.content,
+                                "tools_used": event.tools_used,
+                                "timing": event.timing.as_dict(),
+                            },
+                        )
+        except AgentQueueFullError:
+            yield _sse("error", {"status": 429, "detail": "Too many concurrent queries"})
+        except AgentQueueTimeoutError:
+            yield _sse(
+                "error", {"status": 503, "detail": "Timed out waiting for capacity"}
+            )
+        except Exception as e:
+            logger.error(f"Error in streaming query endpoint: {e}")
+            yield _sse("error", {"status": 500, "detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Release the admission even if the stream never started
+        background=BackgroundTask(ticket.release),
+    )
+
+
+def _validate_table_name(table_name: str) -> None:
+    """Reject table names that aren't plain lowercase identifiers."""
+    if not _TABLE_NAME_PATTERN.match(table_name):
+        raise HTTPException(status_code=400, detail=f"Invalid table name: {table_name}")
+
+
+def _resolve_ingest_path(path: str) -> Path:
+    """Resolve a job path, which must exist inside ``settings.ingest_root``."""
+    root = Path(settings.ingest_root).resolve()
+    source = (root / path).resolve()
+    if not source.is_relative_to(root):
+        raise HTTPException(
+            status_code=400, detail=f"Path must be inside {settings.ingest_root}"
+        )
+    if not source.exists():
+        raise HTTPException(status_code=404, detail=f"Path not found: {path}")
+    return source
+
+
+@app.post("/ingest", status_code=202)
+async def ingest(req: IngestRequest):
+    """Queue ingestion of a file or directory under ``settings.ingest_root``.
+
+    Jobs are run by separate worker processes (``python -m
+    src.ingestion.worker``); poll ``GET /ingest/{job_id}`` for progress.
+    ``context_strategy`` "extractive" skips the per-chunk Gemini calls.
+    """
+    _validate_table_name(req.table_name)
+    source = _resolve_ingest_path(req.path)
+
+    job = await asyncio.to_thread(
+        get_job_store().enqueue,
+        str(source),
+        req.table_name,
+        req.priority,
+        req.context_strategy,
+    )
+    return job.as_dict()
+
+
+@app.post("/ingest/upload", status_code=202)
+async def ingest_upload(
+    request: Request,
+    filename: str,
+    table_name: str = DEFAULT_TABLE_NAME,
+    priority: int = 0,
+    context_strategy: Optional[Literal["llm", "extractive"]] = None,
+):
+    """Upload a document (raw request body) and queue its ingestion.
+
+    Example::
+
+        curl -X POST --data-binary @report.pdf \\
+            "http://localhost:8000/ingest/upload?filename=report.pdf"
+    """
+    _validate_table_name(table_name)
+    name = Path(filename).name
+    if Path(name).suffix.lower() not in SUPPORTED_SUFFIXES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type, expected one of {SUPPORTED_SUFFIXES}",
+        )
+
+    upload_dir = Path(settings.ingest_upload_dir)
+    await asyncio.to_thread(upload_dir.mkdir, parents=True, exist_ok=True)
+    destination = upload_dir / f"{uuid.uuid4().hex}-{name}"
+    max_bytes = settings.ingest_max_upload_mb * 1024 * 1024
+
+    # File I/O runs on worker threads so large uploads don't stall the event loop
+    size = 0
+    try:
+        f = await asyncio.to_thread(destination.open, "wb")
+        try:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds {settings.ingest_max_upload_mb} MB",
+                    )
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+    except BaseException:
+        await asyncio.to_thread(destination.unlink, missing_ok=True)
+        raise
+
+    if size == 0:
+        await asyncio.to_thread(destination.unlink, missing_ok=True)
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    logger.info(f"Stored upload for ingestion | file={destination} bytes={size}")
+    job = await asyncio.to_thread(
+        get_job_store().enqueue,
+        str(destination.resolve()),
+        table_name,
+        priority,
+        context_strategy,
+    )
+    return job.as_dict()
+
+
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    """Return an ingestion job's status and progress."""
+    job = await asyncio.to_thread(get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.as_dict()
+
+
+@app.delete("/ingest/{job_id}")
+async def ingest_cancel(job_id: str):
+    """Cancel an ingestion job.
+
+    Queued jobs are cancelled immediately; running jobs stop at their next
+    progress report.
+    """
+    job = await asyncio.to_thread(get_job_store().cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.as_dict()
+
 
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
-    return {"status": "ok", "telegram_ready": telegram_bot is not None}
+    """Health check endpoint.
+
+    ``ready`` turns true once the background warm-up finished; until then
+    requests still work but pay for building the shared resources.
+    """
+    runner = get_agent_runner()
+    return {
+        "status": "ok",
+        "ready": startup_state["ready"],
+        "startup": {
+            "time_to_ready_seconds": startup_state["time_to_ready_seconds"],
+            "warm_up_seconds": startup_state["warm_up_seconds"],
+            "warm_up_error": startup_state["warm_up_error"],
+        },
+        "telegram_ready": telegram_bot is not None,
+        "telegram_updates_pending": telegram_queue.pending if telegram_queue else 0,
+        "agent_runs": {"in_flight": runner.in_flight, "waiting": runner.waiting},
+        "singleflight": singleflight_stats(),
+        "tool_cache": get_tool_cache().stats(),
+        "shards": shard_health_stats(),
+    }
+
+
+@app.get("/usage")
+async def usage(group_by: Optional[str] = None):
+    """Token usage and estimated cost since startup.
+
+    Grouped by model, or by ``document``, ``job_id``, ``user_id`` or
+    ``endpoint``. Each process keeps its own totals; the ``usage_ledger``
+    table (``USAGE_LEDGER=true``) has the combined history.
+    """
+    if group_by is not None and group_by not in DIMENSIONS:
+        raise HTTPException(
+            status_code=400, detail=f"group_by must be one of {', '.join(DIMENSIONS)}"
+        )
+    ledger = get_usage_ledger()
+    return {
+        "group_by": group_by or "model",
+        "usage": ledger.summary(group_by),
+        "today_tokens": {
+            "query": ledger.daily_tokens(("purpose", "query")),
+            "ingest": ledger.daily_tokens(("purpose", "ingest")),
+        },
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,6 +1,6 @@
 """Configuration settings for the RAG system."""
 
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -15,11 +15,80 @@ class Settings(BaseSettings):
         groq_api_key: Groq API key for Whisper transcription (free tier).
         db_url: PostgreSQL connection string with pgvector support.
         embedding_model: Gemini embedding model identifier for final embeddings.
+        embedding_dimensions: Vector size of the final embeddings.
+        embedding_registry_refresh: Seconds between checks of the embedding registry
+            for knowledge base tables switched to another model.
+        db_shard_urls: PostgreSQL connection strings of the vector store shards
+            (JSON list). When set, Agno knowledge base tables are spread over
+            these databases instead of living in ``db_url``.
+        shard_partition: How chunks are assigned to shards: "document" (all
+            chunks of a document on one shard) or "chunk" (each chunk hashed).
+        shard_search_timeout: Seconds a search waits for each shard before
+            answering without it (also the shards' search statement_timeout).
+        shard_failure_threshold: Consecutive failed searches after which a
+            shard is skipped.
+        shard_retry_after: Seconds before a skipped shard is probed again.
         llm_model: Gemini LLM model identifier for agent responses.
         semantic_chunking_model: OpenAI embedding model for semantic chunking.
         context_generation_model: Gemini model for contextual enhancement.
+        context_strategy: Default chunk context strategy: "llm" (Gemini) or
+            "extractive" (title, section path and keyphrases, no LLM calls).
         chunk_size: Maximum size for document chunks in characters.
         chunk_overlap: Overlap between consecutive chunks in characters.
+        chunk_similarity_threshold: Default semantic chunking similarity threshold (0-1).
+        chunking_params_file: JSON file of tuned chunking parameters per table.
+        telegram_workers: Webhook updates processed concurrently (one per chat at a time).
+        telegram_max_pending: Maximum queued webhook updates before Telegram is told to retry.
+        telegram_update_max_attempts: Processing attempts per update across restarts.
+        telegram_update_retention_hours: Hours finished updates are kept for deduplication.
+        transcription_segment_seconds: Maximum length of an audio segment sent for transcription.
+        transcription_min_silence: Minimum silence in seconds where audio may be split.
+        transcription_max_concurrency: Audio segments transcribed concurrently.
+        transcription_workers: Threads for ffmpeg and Gemini fallback transcription.
+        transcription_retries: Groq retries per segment before falling back to Gemini.
+        transcription_cache_size: Transcripts cached in-process.
+        telegram_streaming: Stream answers into a Telegram message edited as tokens arrive.
+        telegram_stream_edit_interval: Minimum seconds between edits of a streamed reply.
+        telegram_api_base_url: Root URL of the Bot API server (a self-hosted one, or a
+            local stub for load tests); None uses api.telegram.org.
+        log_level: Minimum level written by the log sinks.
+        log_format: "text" or "json" (one object per line).
+        log_enqueue: Write logs from a background thread instead of the caller's.
+        log_sample_rate: Fraction of sampled high-volume debug lines that are kept.
+        ingest_max_concurrency: Concurrency limit for async ingestion (LLM calls and files).
+        agent_max_in_flight: Maximum agent runs executing concurrently.
+        agent_max_queue: Maximum agent runs waiting for a free slot.
+        agent_queue_timeout: Maximum seconds a run waits for a slot before rejection.
+        agent_user_rate_per_minute: Agent runs each user may start per minute.
+        agent_user_burst: Runs a user may start back to back before rate limiting.
+        agent_user_max_delay: Maximum seconds a rate-limited run is delayed before rejection.
+        agent_user_max_pending: Maximum unfinished runs per user.
+        agent_routing: Route trivial messages past retrieval and tools.
+        agent_routing_threshold: Minimum exemplar similarity to take a cheaper route.
+        singleflight_timeout: Maximum seconds a coalesced call waits for the shared result.
+        history_compaction: Replace raw agent history with summary + recent turns.
+        history_keep_turns: Raw turns kept verbatim in the compacted history.
+        history_token_budget: Maximum tokens of history added to each agent run.
+        history_max_turn_tokens: Maximum tokens stored per user or assistant message.
+        history_cache_size: Session histories cached in-process between turns.
+        tool_cache_max_entries: Tool results kept in each process's LRU cache.
+        tool_cache_backend: "memory" or "postgres" (shared by all workers).
+        tool_cache_ttls: Per-tool TTL overrides in seconds (0 disables caching a tool).
+        tracing_exporter: Trace exporter: "file" (JSON lines), "otlp" or "none".
+        tracing_file: Output path for the file trace exporter.
+        tracing_otlp_endpoint: OTLP/HTTP traces endpoint (defaults to OTEL_* env vars).
+        ingest_root: Directory that path-based ingestion jobs may read from.
+        ingest_upload_dir: Directory where uploaded documents are stored.
+        ingest_max_upload_mb: Maximum size of an uploaded document in megabytes.
+        ingest_workers: Jobs processed concurrently by an ingestion worker process.
+        ingest_poll_interval: Seconds an idle ingestion worker waits between polls.
+        ingest_job_lease: Seconds without a heartbeat before a running job is reclaimed.
+        ingest_job_max_attempts: Maximum times a job is started before it is failed.
+        usage_ledger: Also write the token usage ledger to Postgres (shared across processes).
+        usage_prices: USD per million (input, output) tokens by model id prefix, overriding defaults.
+        usage_user_daily_tokens: Daily query tokens per user before queries degrade (0 = unlimited).
+        usage_query_daily_tokens: Daily query tokens for all users before queries degrade (0 = unlimited).
+        usage_ingest_daily_tokens: Daily ingestion tokens before ingestion pauses (0 = unlimited).
     """
 
     google_api_key: str
@@ -27,15 +96,76 @@ class Settings(BaseSettings):
     google_api_key_free_limited: Optional[str] = None
     tavily_api_key: Optional[str] = None
     telegram_bot_token: Optional[str] = None
+    log_level: str = "INFO"
+    log_format: Literal["text", "json"] = "text"
+    log_enqueue: bool = True
+    log_sample_rate: float = 0.05
+    telegram_streaming: bool = True
+    telegram_stream_edit_interval: float = 1.0
+    telegram_api_base_url: Optional[str] = None
+    telegram_workers: int = 8
+    telegram_max_pending: int = 1000
+    telegram_update_max_attempts: int = 3
+    telegram_update_retention_hours: float = 24.0
+    transcription_segment_seconds: float = 60.0
+    transcription_min_silence: float = 0.5
+    transcription_max_concurrency: int = 4
+    transcription_workers: int = 4
+    transcription_retries: int = 1
+    transcription_cache_size: int = 500
     groq_api_key: Optional[str] = None
     render_external_url: Optional[str] = None
     db_url: str
     embedding_model: str = "models/text-embedding-004"
+    embedding_dimensions: int = 768
+    embedding_registry_refresh: float = 30.0
+    db_shard_urls: list[str] = []
+    shard_partition: Literal["document", "chunk"] = "document"
+    shard_search_timeout: float = 2.0
+    shard_failure_threshold: int = 3
+    shard_retry_after: float = 30.0
     llm_model: str = "gemini-2.5-flash"
     semantic_chunking_model: str = "text-embedding-3-small"
     context_generation_model: str = "gemini-2.5-flash-lite"
+    context_strategy: Literal["llm", "extractive"] = "llm"
     chunk_size: int = 1000
     chunk_overlap: int = 200
+    chunk_similarity_threshold: float = 0.5
+    chunking_params_file: str = "chunking_params.json"
+    ingest_max_concurrency: int = 5
+    agent_max_in_flight: int = 4
+    agent_max_queue: int = 16
+    agent_queue_timeout: float = 30.0
+    agent_user_rate_per_minute: float = 10.0
+    agent_user_burst: float = 5.0
+    agent_user_max_delay: float = 10.0
+    agent_user_max_pending: int = 2
+    agent_routing: bool = True
+    agent_routing_threshold: float = 0.5
+    singleflight_timeout: float = 30.0
+    history_compaction: bool = True
+    history_keep_turns: int = 4
+    history_token_budget: int = 2000
+    history_max_turn_tokens: int = 400
+    history_cache_size: int = 1000
+    tool_cache_max_entries: int = 1024
+    tool_cache_backend: Literal["memory", "postgres"] = "memory"
+    tool_cache_ttls: dict[str, float] = {}
+    tracing_exporter: Literal["file", "otlp", "none"] = "file"
+    tracing_file: str = "logs/traces.jsonl"
+    tracing_otlp_endpoint: Optional[str] = None
+    ingest_root: str = "data"
+    ingest_upload_dir: str = "data/uploads"
+    ingest_max_upload_mb: int = 100
+    ingest_workers: int = 2
+    ingest_poll_interval: float = 5.0
+    ingest_job_lease: float = 300.0
+    ingest_job_max_attempts: int = 3
+    usage_ledger: bool = False
+    usage_prices: dict[str, tuple[float, float]] = {}
+    usage_user_daily_tokens: int = 0
+    usage_query_daily_tokens: int = 0
+    usage_ingest_daily_tokens: int = 0
 
     class Config:
         """Pydantic configuration."""
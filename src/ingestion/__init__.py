@@ -0,0 +1,19 @@
+"""Background document ingestion jobs."""
+
+from src.ingestion.jobs import (
+    SUPPORTED_SUFFIXES,
+    IngestionJob,
+    JobLeaseLost,
+    JobStatus,
+    JobStore,
+    get_job_store,
+)
+
+__all__ = [
+    "SUPPORTED_SUFFIXES",
+    "IngestionJob",
+    "JobLeaseLost",
+    "JobStatus",
+    "JobStore",
+    "get_job_store",
+]
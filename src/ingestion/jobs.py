@@ -0,0 +1,426 @@
+"""Durable ingestion job queue stored in Postgres."""
+
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import StrEnum
+from typing import Any
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+
+from src.config import settings
+from src.logger import logger
+
+SUPPORTED_SUFFIXES = (".pdf", ".txt", ".md")
+
+PROGRESS_STAGES = ("files_done", "chunked", "contextualized", "embedded", "stored")
+
+metadata = MetaData()
+
+ingestion_jobs = Table(
+    "ingestion_jobs",
+    metadata,
+    Column("id", String(36), primary_key=True),
+    Column("source_path", Text, nullable=False),
+    Column("table_name", String(255), nullable=False),
+    Column("priority", Integer, nullable=False, server_default="0"),
+    Column("context_strategy", String(16)),
+    Column("status", String(16), nullable=False),
+    Column("cancel_requested", Boolean, nullable=False, server_default="false"),
+    Column("progress", JSONB, nullable=False, server_default="{}"),
+    Column("files_total", Integer),
+    Column("error", Text),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("worker_id", String(255)),
+    Column("created_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Column("started_at", DateTime(timezone=True)),
+    Column("finished_at", DateTime(timezone=True)),
+    Column("heartbeat_at", DateTime(timezone=True)),
+    Index("ix_ingestion_jobs_queue", "status", "priority", "created_at"),
+)
+
+
+class JobLeaseLost(Exception):
+    """Raised when a job's lease expired and another worker may own it."""
+
+
+class JobStatus(StrEnum):
+    """Lifecycle states of an ingestion job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+@dataclass
+class IngestionJob:
+    """Snapshot of an ingestion job row.
+
+    Attributes:
+        id: Job identifier.
+        source_path: File or directory to ingest.
+        table_name: Knowledge base table receiving the chunks.
+        priority: Higher priorities are claimed first.
+        context_strategy: "llm" or "extractive" chunk contexts (None uses
+            ``settings.context_strategy``).
+        status: Current lifecycle state.
+        cancel_requested: Whether cancellation was requested while running.
+        progress: Counters per stage (files_done, chunked, contextualized,
+            embedded, stored).
+        files_total: Number of files in the job, once known.
+        error: Failure reason, if the job failed.
+        attempts: Number of times a worker started the job.
+        created_at: Enqueue time.
+        started_at: First start time.
+        finished_at: Completion time.
+    """
+
+    id: str
+    source_path: str
+    table_name: str
+    priority: int
+    status: JobStatus
+    context_strategy: str | None = None
+    cancel_requested: bool = False
+    progress: dict[str, int] = field(default_factory=dict)
+    files_total: int | None = None
+    error: str | None = None
+    attempts: int = 0
+    created_at: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    @classmethod
+    def from_row(cls, row: Any) -> "IngestionJob":
+        """Build a job from a database row."""
+        return cls(
+            id=row.id,
+            source_path=row.source_path,
+            table_name=row.table_name,
+            priority=row.priority,
+            status=JobStatus(row.status),
+            context_strategy=row.context_strategy,
+            cancel_requested=row.cancel_requested,
+            progress=dict(row.progress or {}),
+            files_total=row.files_total,
+            error=row.error,
+            attempts=row.attempts,
+            created_at=row.created_at,
+            started_at=row.started_at,
+            finished_at=row.finished_at,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the job as a JSON-serializable dict."""
+        return {
+            "job_id": self.id,
+            "source_path": self.source_path,
+            "table_name": self.table_name,
+            "priority": self.priority,
+            "context_strategy": self.context_strategy,
+            "status": self.status.value,
+            "cancel_requested": self.cancel_requested,
+            "progress": {stage: self.progress.get(stage, 0) for stage in PROGRESS_STAGES},
+            "files_total": self.files_total,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobStore:
+    """Postgres-backed ingestion job queue.
+
+    Workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` so any
+    number of worker processes can poll the same table without handing the
+    same job out twice. Running jobs send heartbeats with their progress; a
+    job whose heartbeat is older than the lease is reclaimed by another
+    worker, so a crashed worker never strands a job.
+
+    Every claim increments the job's ``attempts``, and updates made while
+    running the job only apply to the running attempt they were claimed
+    with. A worker that stalled past its lease can't overwrite the progress
+    or outcome of the worker that reclaimed the job.
+    """
+
+    def __init__(self, db_url: str | None = None, engine: Engine | None = None) -> None:
+        """Initialize the job store and create its table if needed.
+
+        Args:
+            db_url: PostgreSQL connection string (defaults to ``settings.db_url``).
+            engine: Existing SQLAlchemy engine to use instead of ``db_url``.
+        """
+        self.engine = engine or create_engine(
+            db_url or settings.db_url, pool_pre_ping=True
+        )
+        metadata.create_all(self.engine, tables=[ingestion_jobs], checkfirst=True)
+
+    def enqueue(
+        self,
+        source_path: str,
+        table_name: str,
+        priority: int = 0,
+        context_strategy: str | None = None,
+    ) -> IngestionJob:
+        """Add a job to the queue.
+
+        Args:
+            source_path: File or directory to ingest.
+            table_name: Knowledge base table receiving the chunks.
+            priority: Higher priorities are claimed first.
+            context_strategy: "llm" or "extractive" chunk contexts (None
+                uses ``settings.context_strategy`` when the job runs).
+
+        Returns:
+            The queued job.
+        """
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                ingestion_jobs.insert()
+                .values(
+                    id=str(uuid.uuid4()),
+                    source_path=source_path,
+                    table_name=table_name,
+                    priority=priority,
+                    context_strategy=context_strategy,
+                    status=JobStatus.QUEUED,
+                    progress={},
+                )
+                .returning(ingestion_jobs)
+            ).one()
+        job = IngestionJob.from_row(row)
+        logger.info(
+            f"Ingestion job queued | id={job.id} path={source_path} "
+            f"table={table_name} priority={priority} context={context_strategy}"
+        )
+        return job
+
+    def get(self, job_id: str) -> IngestionJob | None:
+        """Return a job by id, or None if it doesn't exist."""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(ingestion_jobs).where(ingestion_jobs.c.id == job_id)
+            ).one_or_none()
+        return IngestionJob.from_row(row) if row else None
+
+    def cancel(self, job_id: str) -> IngestionJob | None:
+        """Cancel a job.
+
+        Queued jobs are cancelled immediately. Running jobs are flagged and
+        stop at their next progress report. Finished jobs are left as is.
+
+        Args:
+            job_id: Job identifier.
+
+        Returns:
+            The updated job, or None if it doesn't exist.
+        """
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(ingestion_jobs)
+                .where(
+                    ingestion_jobs.c.id == job_id,
+                    ingestion_jobs.c.status == JobStatus.QUEUED,
+                )
+                .values(status=JobStatus.CANCELLED, finished_at=func.now())
+            )
+            conn.execute(
+                update(ingestion_jobs)
+                .where(
+                    ingestion_jobs.c.id == job_id,
+                    ingestion_jobs.c.status == JobStatus.RUNNING,
+                )
+                .values(cancel_requested=True)
+            )
+        return self.get(job_id)
+
+    def claim(self, worker_id: str) -> IngestionJob | None:
+        """Claim the highest-priority runnable job for a worker.
+
+        Runnable jobs are queued jobs and running jobs whose heartbeat
+        expired. Expired jobs that used up their attempts are failed instead.
+
+        Args:
+            worker_id: Identifier of the claiming worker.
+
+        Returns:
+            The claimed job, or None if the queue is empty.
+        """
+        lease = func.now() - func.make_interval(0, 0, 0, 0, 0, 0, settings.ingest_job_lease)
+        expired = (ingestion_jobs.c.status == JobStatus.RUNNING) & (
+            ingestion_jobs.c.heartbeat_at < lease
+        )
+
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(ingestion_jobs)
+                .where(expired, ingestion_jobs.c.attempts >= settings.ingest_job_max_attempts)
+                .values(
+                    status=JobStatus.FAILED,
+                    error="Worker stopped responding too many times",
+                    finished_at=func.now(),
+                )
+            )
+
+            job_id = conn.execute(
+                select(ingestion_jobs.c.id)
+                .where((ingestion_jobs.c.status == JobStatus.QUEUED) | expired)
+                .order_by(ingestion_jobs.c.priority.desc(), ingestion_jobs.c.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).scalar_one_or_none()
+            if job_id is None:
+                return None
+
+            row = conn.execute(
+                update(ingestion_jobs)
+                .where(ingestion_jobs.c.id == job_id)
+                .values(
+                    status=JobStatus.RUNNING,
+                    worker_id=worker_id,
+                    attempts=ingestion_jobs.c.attempts + 1,
+                    started_at=func.coalesce(ingestion_jobs.c.started_at, func.now()),
+                    heartbeat_at=func.now(),
+                )
+                .returning(ingestion_jobs)
+            ).one()
+        return IngestionJob.from_row(row)
+
+    @staticmethod
+    def _owned(job_id: str, attempt: int) -> Any:
+        """Condition matching a job only while the given attempt is running it."""
+        return (
+            (ingestion_jobs.c.id == job_id)
+            & (ingestion_jobs.c.attempts == attempt)
+            & (ingestion_jobs.c.status == JobStatus.RUNNING)
+        )
+
+    def heartbeat(
+        self,
+        job_id: str,
+        attempt: int,
+        progress: dict[str, int],
+        files_total: int | None = None,
+    ) -> bool:
+        """Store a running job's progress and refresh its lease.
+
+        Args:
+            job_id: Job identifier.
+            attempt: Attempt number the job was claimed with.
+            progress: Counters per stage.
+            files_total: Number of files in the job, if known.
+
+        Returns:
+            True if cancellation was requested for the job.
+
+        Raises:
+            JobLeaseLost: The attempt no longer runs the job (lease expired
+                and the job was reclaimed or failed).
+        """
+        values: dict[str, Any] = {"progress": progress, "heartbeat_at": func.now()}
+        if files_total is not None:
+            values["files_total"] = files_total
+
+        with self.engine.begin() as conn:
+            cancel_requested = conn.execute(
+                update(ingestion_jobs)
+                .where(self._owned(job_id, attempt))
+                .values(**values)
+                .returning(ingestion_jobs.c.cancel_requested)
+            ).scalar_one_or_none()
+        if cancel_requested is None:
+            raise JobLeaseLost(job_id)
+        return cancel_requested
+
+    def finish(
+        self,
+        job_id: str,
+        attempt: int,
+        status: JobStatus,
+        progress: dict[str, int],
+        error: str | None = None,
+    ) -> None:
+        """Record a job's final state.
+
+        Args:
+            job_id: Job identifier.
+            attempt: Attempt number the job was claimed with.
+            status: Final status (succeeded, failed or cancelled).
+            progress: Final counters per stage.
+            error: Failure reason for failed jobs.
+        """
+        with self.engine.begin() as conn:
+            updated = conn.execute(
+                update(ingestion_jobs)
+                .where(self._owned(job_id, attempt))
+                .values(
+                    status=status,
+                    progress=progress,
+                    error=error,
+                    finished_at=func.now(),
+                )
+            ).rowcount
+        if not updated:
+            logger.warning(
+                f"Ingestion job outcome discarded, lease lost | id={job_id} "
+                f"attempt={attempt} status={status}"
+            )
+            return
+        logger.info(f"Ingestion job finished | id={job_id} status={status}")
+
+    def release(self, job_id: str, attempt: int, progress: dict[str, int]) -> None:
+        """Put a running job back in the queue (worker shutting down).
+
+        Args:
+            job_id: Job identifier.
+            attempt: Attempt number the job was claimed with.
+            progress: Counters reached so far.
+        """
+        with self.engine.begin() as conn:
+            updated = conn.execute(
+                update(ingestion_jobs)
+                .where(self._owned(job_id, attempt))
+                .values(status=JobStatus.QUEUED, progress=progress, worker_id=None)
+            ).rowcount
+        if not updated:
+            logger.warning(
+                f"Ingestion job not released, lease lost | id={job_id} attempt={attempt}"
+            )
+            return
+        logger.info(f"Ingestion job released back to the queue | id={job_id}")
+
+
+_store: JobStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Return the process-wide job store, creating it on first use."""
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore()
+    return _store
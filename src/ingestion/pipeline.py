@@ -0,0 +1,273 @@
+"""Ingestion pipeline run by background jobs, with progress reporting."""
+
+import hashlib
+import threading
+import time
+from itertools import batched
+from pathlib import Path
+
+from agno.knowledge.document import Document
+
+from src.ingestion.jobs import SUPPORTED_SUFFIXES, IngestionJob, JobLeaseLost, JobStore
+from src.logger import logger
+from src.rag.agno import ContextualAgnoKnowledgeBase
+from src.tracing import tracer
+from src.usage import estimate_tokens, get_usage_ledger, usage_scope
+
+# Chunks embedded and written per PgVector write; also the granularity of
+# the "embedded"/"stored" counters and of cancellation between writes
+STORE_BATCH_SIZE = 50
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when cancellation was requested."""
+
+
+class JobInterrupted(Exception):
+    """Raised inside a running job when its worker is shutting down."""
+
+
+class IngestBudgetExceeded(JobInterrupted):
+    """Raised inside a running job when today's ingestion token budget is spent."""
+
+
+class JobProgress:
+    """Thread-safe progress counters for a running job.
+
+    Counters are flushed to the job store at most every ``flush_interval``
+    seconds, doubling as the job's heartbeat. A background thread keeps
+    the heartbeat going while a single step (e.g. semantic chunking of a
+    large document) reports nothing. ``check()`` raises once cancellation
+    was requested, the worker is stopping or the daily ingestion budget is
+    spent, so callers can abort between chunks.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        job: IngestionJob,
+        stop_event: threading.Event,
+        flush_interval: float = 5.0,
+    ) -> None:
+        """Initialize progress tracking for a job.
+
+        Args:
+            store: Job store receiving heartbeats.
+            job: Job being run. Counters restart from zero when a job is
+                resumed, since its files are processed again.
+            stop_event: Set when the worker is shutting down.
+            flush_interval: Minimum seconds between heartbeats.
+        """
+        self.store = store
+        self.job_id = job.id
+        self.attempt = job.attempts
+        self.stop_event = stop_event
+        self.flush_interval = flush_interval
+        self.files_total: int | None = None
+        self.cancelled = False
+        self.lease_lost = False
+
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._done = threading.Event()
+        self._heartbeat_thread: threading.Thread | None = None
+
+    def snapshot(self) -> dict[str, int]:
+        """Return a copy of the counters."""
+        with self._lock:
+            return dict(self._counters)
+
+    def record(self, stage: str, count: int) -> None:
+        """Add completed items to a stage."""
+        with self._lock:
+            self._counters[stage] = self._counters.get(stage, 0) + count
+
+    def add(self, stage: str, count: int) -> None:
+        """Add completed items to a stage and abort if the job must stop.
+
+        Matches the chunkers' ``(stage, count)`` progress callback signature.
+        """
+        self.record(stage, count)
+        self.check()
+
+    def check(self) -> None:
+        """Flush if due and raise if the job was cancelled or must stop.
+
+        Raises:
+            JobCancelled: Cancellation was requested for the job.
+            JobInterrupted: The worker is shutting down or lost the job's lease.
+            IngestBudgetExceeded: The daily ingestion token budget is spent.
+        """
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        if self.cancelled:
+            raise JobCancelled(self.job_id)
+        if self.stop_event.is_set() or self.lease_lost:
+            raise JobInterrupted(self.job_id)
+        if get_usage_ledger().ingest_budget_exceeded():
+            raise IngestBudgetExceeded(self.job_id)
+
+    def flush(self) -> None:
+        """Send the counters to the job store as a heartbeat."""
+        self._last_flush = time.monotonic()
+        try:
+            if self.store.heartbeat(
+                self.job_id, self.attempt, self.snapshot(), self.files_total
+            ):
+                self.cancelled = True
+        except JobLeaseLost:
+            # Another worker reclaimed the job; stop at the next check
+            if not self.lease_lost:
+                logger.warning(
+                    f"Ingestion job lease lost, stopping | id={self.job_id} "
+                    f"attempt={self.attempt}"
+                )
+            self.lease_lost = True
+        except Exception as e:
+            logger.warning(f"Failed to record ingestion progress | id={self.job_id}: {e}")
+
+    def _heartbeat_loop(self) -> None:
+        """Flush periodically until the job ends."""
+        while not self._done.wait(self.flush_interval):
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def __enter__(self) -> "JobProgress":
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name=f"ingest-heartbeat-{self.job_id}", daemon=True
+        )
+        self._heartbeat_thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._done.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+
+
+def collect_files(source: Path) -> list[Path]:
+    """List the supported documents in a file or directory.
+
+    Args:
+        source: File or directory to ingest.
+
+    Returns:
+        Sorted list of files to ingest.
+
+    Raises:
+        FileNotFoundError: The source doesn't exist.
+        ValueError: The source contains no supported documents.
+    """
+    if not source.exists():
+        raise FileNotFoundError(f"Source not found: {source}")
+
+    if source.is_file():
+        files = [source]
+    else:
+        files = sorted(path for path in source.rglob("*") if path.is_file())
+
+    files = [path for path in files if path.suffix.lower() in SUPPORTED_SUFFIXES]
+    if not files:
+        raise ValueError(f"No supported documents ({', '.join(SUPPORTED_SUFFIXES)}) in {source}")
+    return files
+
+
+def _content_hash(path: Path) -> str:
+    """Return the SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _unique_chunks(documents: list[Document]) -> list[Document]:
+    """Drop repeated chunks of a file (same id or text), which share a row id.
+
+    Inserting a repeated chunk after the first batch would violate the
+    table's primary key.
+    """
+    seen, unique = set(), []
+    for doc in documents:
+        key = doc.id or doc.content
+        if key not in seen:
+            seen.add(key)
+            unique.append(doc)
+    return unique
+
+
+def run_ingestion_job(job: IngestionJob, progress: JobProgress) -> None:
+    """Ingest a job's documents with contextual semantic chunking.
+
+    Chunk contexts come from Gemini or, for jobs with the "extractive"
+    context strategy, from the documents themselves.
+
+    Each file is read and chunked (reporting "chunked" and "contextualized"
+    progress from the chunker), then written to PgVector in batches. The
+    vector store embeds and writes a batch together, so "embedded" and
+    "stored" advance per batch. PgVector's upsert replaces every row of the
+    file's content hash, so only the first batch is upserted (clearing the
+    rows of an earlier or interrupted run) and the others are inserted.
+
+    Model usage is attributed to each file in the usage ledger; the vector
+    store doesn't report embedding tokens, so they are estimated per batch.
+
+    Args:
+        job: Job to run.
+        progress: Progress tracker for the job.
+
+    Raises:
+        JobCancelled: Cancellation was requested for the job.
+        JobInterrupted: The worker is shutting down or the ingestion budget
+            is spent.
+    """
+    files = collect_files(Path(job.source_path))
+    progress.files_total = len(files)
+
+    kb = ContextualAgnoKnowledgeBase(
+        table_name=job.table_name,
+        progress_callback=progress.add,
+        context_strategy=job.context_strategy,
+    )
+    vector_db = kb.knowledge.vector_db
+    vector_db.create()
+
+    for path in files:
+        progress.check()
+        with (
+            tracer.start_as_current_span(
+                "ingest.file", attributes={"job_id": job.id, "file": path.name}
+            ) as span,
+            usage_scope(document=path.name),
+        ):
+            reader = kb.pdf_reader if path.suffix.lower() == ".pdf" else kb.text_reader
+            documents = reader.read(path)
+            # Readers log and swallow errors, so re-check for a cancellation
+            # raised from the chunker before storing anything
+            progress.check()
+            if not documents:
+                logger.warning(f"No chunks produced | job={job.id} file={path}")
+
+            content_hash = _content_hash(path)
+            documents = _unique_chunks(documents)
+            for number, batch in enumerate(batched(documents, STORE_BATCH_SIZE)):
+                start = time.perf_counter()
+                write = vector_db.upsert if number == 0 else vector_db.insert
+                write(content_hash=content_hash, documents=list(batch))
+                get_usage_ledger().record(
+                    "embedding",
+                    "document_embedding",
+                    kb.embedding_target.model,
+                    sum(estimate_tokens(doc.content) for doc in batch),
+                    seconds=time.perf_counter() - start,
+                    estimated=True,
+                )
+                progress.record("embedded", len(batch))
+                progress.add("stored", len(batch))
+
+            span.set_attribute("chunks", len(documents))
+        progress.add("files_done", 1)
+        logger.info(
+            f"Ingested file | job={job.id} file={path.name} chunks={len(documents)}"
+        )
@@ -0,0 +1,183 @@
+"""Ingestion worker process.
+
+Runs queued ingestion jobs outside the API process::
+
+    python -m src.ingestion.worker --workers 2
+
+Any number of worker processes can share the queue. SIGINT/SIGTERM stop
+the worker gracefully: running jobs are put back in the queue at their
+next progress report. The same happens when the daily ingestion token
+budget is spent; the worker then stops claiming jobs until the next day.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+
+from src.config import settings
+from src.ingestion.jobs import IngestionJob, JobStatus, JobStore, get_job_store
+from src.ingestion.pipeline import (
+    IngestBudgetExceeded,
+    JobCancelled,
+    JobInterrupted,
+    JobProgress,
+    run_ingestion_job,
+)
+from src.logger import correlate, logger
+from src.tracing import configure_tracing, tracer
+from src.usage import get_usage_ledger, usage_scope
+
+
+class IngestionWorker:
+    """Pool of threads that claim and run ingestion jobs.
+
+    Attributes:
+        store: Job store polled for work.
+        concurrency: Number of jobs run at once.
+        poll_interval: Seconds an idle thread waits before polling again.
+        worker_id: Identifier recorded on claimed jobs.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        concurrency: int = 2,
+        poll_interval: float = 5.0,
+    ) -> None:
+        """Initialize the worker.
+
+        Args:
+            store: Job store polled for work.
+            concurrency: Number of jobs run at once.
+            poll_interval: Seconds an idle thread waits before polling again.
+        """
+        self.store = store
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Ask the worker to stop after releasing its running jobs."""
+        logger.info(f"Stopping ingestion worker | id={self.worker_id}")
+        self._stop.set()
+
+    def run(self) -> None:
+        """Run the worker threads until ``stop()`` is called."""
+        logger.info(
+            f"Ingestion worker started | id={self.worker_id} "
+            f"concurrency={self.concurrency}"
+        )
+        threads = [
+            threading.Thread(target=self._poll_loop, name=f"ingest-worker-{idx}")
+            for idx in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.info(f"Ingestion worker stopped | id={self.worker_id}")
+
+    def _poll_loop(self) -> None:
+        """Claim and run jobs until the worker stops."""
+        while not self._stop.is_set():
+            if get_usage_ledger().ingest_budget_exceeded():
+                self._stop.wait(self.poll_interval)
+                continue
+
+            try:
+                job = self.store.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Failed to claim ingestion job: {e}")
+                job = None
+
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            try:
+                self._run_job(job)
+            except Exception as e:
+                # Outcome couldn't be recorded; the lease expiry requeues the job
+                logger.error(f"Failed to record ingestion job outcome | id={job.id}: {e}")
+
+    def _run_job(self, job: IngestionJob) -> None:
+        """Run a claimed job and record its outcome."""
+        logger.info(
+            f"Running ingestion job | id={job.id} path={job.source_path} "
+            f"table={job.table_name} attempt={job.attempts}"
+        )
+        progress = JobProgress(self.store, job, self._stop)
+
+        with (
+            correlate(f"job-{job.id[:8]}"),
+            tracer.start_as_current_span(
+                "ingest.job", attributes={"job_id": job.id, "table": job.table_name}
+            ),
+            usage_scope(job_id=job.id),
+            progress,
+        ):
+            try:
+                run_ingestion_job(job, progress)
+            except JobCancelled:
+                self.store.finish(
+                    job.id, job.attempts, JobStatus.CANCELLED, progress.snapshot()
+                )
+            except IngestBudgetExceeded:
+                logger.warning(
+                    f"Daily ingestion token budget spent, pausing job | id={job.id}"
+                )
+                self.store.release(job.id, job.attempts, progress.snapshot())
+            except JobInterrupted:
+                self.store.release(job.id, job.attempts, progress.snapshot())
+            except Exception as e:
+                logger.exception(f"Ingestion job failed | id={job.id}")
+                self.store.finish(
+                    job.id, job.attempts, JobStatus.FAILED, progress.snapshot(), error=str(e)
+                )
+            else:
+                self.store.finish(
+                    job.id, job.attempts, JobStatus.SUCCEEDED, progress.snapshot()
+                )
+            finally:
+                usage = get_usage_ledger().totals("job_id", job.id)
+                logger.bind(
+                    calls=usage.calls,
+                    input_tokens=usage.input_tokens,
+                    output_tokens=usage.output_tokens,
+                    cost_usd=round(usage.cost, 4),
+                ).info("Ingestion job usage")
+
+
+def main():
+    """Run an ingestion worker until interrupted."""
+    parser = argparse.ArgumentParser(description="Run background ingestion jobs")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.ingest_workers,
+        help="Number of jobs processed concurrently",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=settings.ingest_poll_interval,
+        help="Seconds to wait between polls when the queue is empty",
+    )
+    args = parser.parse_args()
+
+    configure_tracing("rag-ingest-worker")
+
+    worker = IngestionWorker(
+        get_job_store(), concurrency=args.workers, poll_interval=args.poll_interval
+    )
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stop())
+    worker.run()
+    get_usage_ledger().shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,25 +10,52 @@ from telegram.ext import (
     filters,
     ContextTypes,
 )
-from src.logger import logger
+from src.config import settings
+from src.logger import correlate, logger, sampled
+from src.metrics import TELEGRAM_RESPONSE_SECONDS
+from src.tracing import tracer
+from src.usage import usage_scope
+from src.integrations.telegram.streaming import StreamingReply
 from src.integrations.telegram.transcriber import AudioTranscriber
-from src.agents import create_rag_agent
+from src.agents import (
+    AgentQueueFullError,
+    AgentQueueTimeoutError,
+    AgentRateLimitedError,
+    RunPriority,
+    get_agent_runner,
+)
+
+RATE_LIMITED_MESSAGE = (
+    "⏳ Você enviou muitas mensagens seguidas. Tente novamente em {seconds}s."
+)
+DELAYED_MESSAGE = "⏳ Muitas mensagens seguidas, vou responder em alguns segundos..."
+BUSY_MESSAGE = "⏳ Estou atendendo muitas pessoas agora. Tente novamente em instantes."
+ERROR_MESSAGE = "Desculpe, ocorreu um erro. Tente novamente."
 
 
 class TelegramBot:
     """Telegram bot client."""
 
-    def __init__(self, token: str, agent=None):
+    def __init__(self, token: str, agent=None, queued: bool = False):
         """Initialize Telegram bot.
 
         Args:
             token: Telegram bot token from BotFather.
             agent: Deprecated - agent is now created per request for strict isolation.
+            queued: Whether updates come from the webhook update queue. Audio
+                is then processed inline, keeping the chat's order and the
+                queue's worker bound, instead of in a background task.
         """
         self.token = token
         self.agent = agent
+        self.queued = queued
+        self.runner = get_agent_runner()
         self.transcriber = AudioTranscriber()
-        self.app = Application.builder().token(token).build()
+        builder = Application.builder().token(token)
+        if settings.telegram_api_base_url:
+            root = settings.telegram_api_base_url.rstrip("/")
+            builder = builder.base_url(f"{root}/bot").base_file_url(f"{root}/file/bot")
+        self.app = builder.build()
 
         self.app.add_handler(CommandHandler("start", self.start))
         self.app.add_handler(
@@ -49,24 +76,55 @@ class TelegramBot:
             "Hello! I'm *Spets*, a RAG assistant with economics and habits knowledge, and also web search powers! Send me your questions and I'll answer using my base knowledge and the internet, if needed.\n\n🎤 You can also send voice messages!"
         )
 
+    async def _admit(self, update: Update, user_id: str, priority: RunPriority):
+        """Admit a run for the user, replying if it is rejected or delayed.
+
+        Returns:
+            Admission ticket, or None if the user is rate limited.
+        """
+        try:
+            ticket = self.runner.admit(user_id, priority)
+        except AgentRateLimitedError as e:
+            logger.warning(f"Run rejected, rate limited | user_id={user_id} {e}")
+            await update.message.reply_text(
+                RATE_LIMITED_MESSAGE.format(seconds=max(1, round(e.retry_after)))
+            )
+            return None
+
+        if ticket.delay >= 1:
+            await update.message.reply_text(DELAYED_MESSAGE)
+        return ticket
+
     async def _process_audio_async(
-        self, update: Update, audio_file, format: str, user_name: str, user_id: str
+        self, update: Update, audio_file, format: str, user_name: str, user_id: str, ticket
     ):
         """Process audio asynchronously to avoid webhook timeout."""
+        try:
+            with tracer.start_as_current_span("telegram.audio"):
+                await self._process_audio(
+                    update, audio_file, format, user_name, user_id, ticket
+                )
+        finally:
+            ticket.release()
+
+    async def _process_audio(
+        self, update: Update, audio_file, format: str, user_name: str, user_id: str, ticket
+    ):
+        """Transcribe audio, run the agent and reply with both."""
         start_time = time.time()
 
         try:
-            # Download audio
-            audio_bytes = await audio_file.download_as_bytearray()
-
-            # Transcribe (runs in thread pool to not block)
-            loop = asyncio.get_event_loop()
-            transcription = await loop.run_in_executor(
-                None, self.transcriber.transcribe, bytes(audio_bytes), format
-            )
-            logger.info(
-                f"Audio transcribed | user={user_name} text={transcription[:100]}"
-            )
+            # Forwarded audio keeps its file_unique_id: skip download and
+            # transcription when it was transcribed before
+            cache_key = f"telegram:{audio_file.file_unique_id}"
+            transcription = self.transcriber.cached(cache_key)
+            if transcription is None:
+                audio_bytes = await audio_file.download_as_bytearray()
+                transcription = await self.transcriber.transcribe_async(
+                    bytes(audio_bytes), format, cache_key=cache_key
+                )
+            logger.bind(user_id=user_id, length=len(transcription)).info("Audio transcribed")
+            sampled().debug(f"Transcription preview | {transcription[:100]}")
 
             # Show typing while processing
             await update.message.chat.send_action("typing")
@@ -77,24 +135,45 @@ class TelegramBot:
             )
             message_with_context = f"{user_context}\n{transcription}"
 
-            # Create fresh agent for this user/session for strict isolation
-            agent = create_rag_agent(user_id=user_id, session_id=user_id)
-            response = agent.run(message_with_context)
+            # Fresh agent for this user/session (strict isolation), scheduled
+            # behind text messages
+            response, timing = await self.runner.run(
+                message_with_context,
+                user_id,
+                user_id,
+                priority=RunPriority.AUDIO,
+                ticket=ticket,
+            )
 
             duration = time.time() - start_time
 
-            logger.info(
-                f"Response generated | user={user_name} duration={duration:.2f}s "
-                f"response_length={len(response.content)}"
-            )
+            logger.bind(
+                user_id=user_id,
+                duration_s=round(duration, 3),
+                response_length=len(response.content),
+                **timing.as_dict(),
+            ).info("Response generated")
 
             # Send response with transcription
             await update.message.reply_text(
                 f"🎤 *Transcription:* {transcription}\n\n{response.content}",
                 parse_mode="Markdown",
             )
+            TELEGRAM_RESPONSE_SECONDS.observe(
+                time.time() - start_time, kind="audio", status="ok"
+            )
+
+        except (AgentQueueFullError, AgentQueueTimeoutError) as e:
+            TELEGRAM_RESPONSE_SECONDS.observe(
+                time.time() - start_time, kind="audio", status="rejected"
+            )
+            logger.warning(f"Audio run rejected, busy | user={user_name} {e}")
+            await update.message.reply_text(BUSY_MESSAGE)
 
         except Exception as e:
+            TELEGRAM_RESPONSE_SECONDS.observe(
+                time.time() - start_time, kind="audio", status="error"
+            )
             logger.error(f"Error processing audio | user={user_name} error={str(e)}")
             await update.message.reply_text(
                 "Desculpe, ocorreu um erro ao processar o áudio. Tente novamente."
@@ -102,71 +181,197 @@ class TelegramBot:
 
     async def handle_audio(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle voice and audio messages."""
+        # The background processing task inherits the correlation id and usage scope
+        with (
+            correlate(f"tg-{update.update_id}"),
+            usage_scope(endpoint="telegram", user_id=update.message.from_user.id),
+        ):
+            await self._handle_audio(update)
+
+    async def _handle_audio(self, update: Update):
+        """Admit an audio message and start transcribing and answering it."""
         user_name = update.message.from_user.first_name
         user_id = str(update.message.from_user.id)
 
-        logger.info(f"Audio received | user={user_name} user_id={user_id}")
+        logger.bind(user_id=user_id).info("Audio received")
 
-        # Send immediate response
-        await update.message.reply_text(
-            "🎤 Processing your audio. Please wait a moment..."
-        )
+        # Reject floods before downloading or transcribing anything
+        ticket = await self._admit(update, user_id, RunPriority.AUDIO)
+        if ticket is None:
+            return
 
-        # Get audio file info
-        if update.message.voice:
-            audio_file = await update.message.voice.get_file()
-            format = "ogg"
-        else:
-            audio_file = await update.message.audio.get_file()
-            format = "mp3"
-
-        # Process asynchronously (don't await to return quickly to Telegram)
-        asyncio.create_task(
-            self._process_audio_async(update, audio_file, format, user_name, user_id)
+        try:
+            # Send immediate response
+            await update.message.reply_text(
+                "🎤 Processing your audio. Please wait a moment..."
+            )
+
+            # Get audio file info
+            if update.message.voice:
+                audio_file = await update.message.voice.get_file()
+                format = "ogg"
+            else:
+                audio_file = await update.message.audio.get_file()
+                format = "mp3"
+        except BaseException:
+            ticket.release()
+            raise
+
+        processing = self._process_audio_async(
+            update, audio_file, format, user_name, user_id, ticket
         )
+        if self.queued:
+            # Already off the webhook request, in this chat's queue worker
+            await processing
+            return
+
+        # Process asynchronously (don't await to return quickly to Telegram).
+        # Per-user admission bounds how many of these tasks a user can start.
+        asyncio.create_task(processing)
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle incoming messages."""
+        with (
+            correlate(f"tg-{update.update_id}"),
+            tracer.start_as_current_span("telegram.message"),
+            usage_scope(endpoint="telegram", user_id=update.message.from_user.id),
+        ):
+            await self._handle_message(update)
+
+    async def _handle_message(self, update: Update):
+        """Run the agent for a text message and reply."""
         start_time = time.time()
         user_message = update.message.text
         user_name = update.message.from_user.first_name
         user_id = str(update.message.from_user.id)
 
-        logger.info(
-            f"Message received | user={user_name} user_id={user_id} message={user_message[:100]}"
-        )
+        logger.bind(user_id=user_id, length=len(user_message)).info("Message received")
+        sampled().debug(f"Message preview | {user_message[:100]}")
 
-        # Show typing indicator
-        await update.message.chat.send_action("typing")
+        ticket = await self._admit(update, user_id, RunPriority.INTERACTIVE)
+        if ticket is None:
+            TELEGRAM_RESPONSE_SECONDS.observe(
+                time.time() - start_time, kind="text", status="rejected"
+            )
+            return
 
         # Get response from agent with user session
         try:
+            # Show typing indicator
+            await update.message.chat.send_action("typing")
+
             # Add user info to message context
             user_context = f"[User_name: {user_name} (ID: {user_id})]"
             message_with_context = f"{user_context}\n{user_message}"
 
-            # Create fresh agent for this user/session for strict isolation
-            agent = create_rag_agent(user_id=user_id, session_id=user_id)
-            response = agent.run(message_with_context)
+            if settings.telegram_streaming:
+                await self._stream_reply(
+                    update, message_with_context, user_name, user_id, ticket, start_time
+                )
+                return
+
+            # Fresh agent for this user/session (strict isolation), run off the
+            # event loop in the highest priority class
+            response, timing = await self.runner.run(
+                message_with_context,
+                user_id,
+                user_id,
+                priority=RunPriority.INTERACTIVE,
+                ticket=ticket,
+            )
 
             tools_used = [
                 m.tool_name for m in response.messages if hasattr(m, "tool_name")
             ]
             duration = time.time() - start_time
 
-            logger.info(
-                f"Response generated | user={user_name} session={user_id} duration={duration:.2f}s "
-                f"response_length={len(response.content)} tools={tools_used}"
-            )
+            logger.bind(
+                user_id=user_id,
+                duration_s=round(duration, 3),
+                response_length=len(response.content),
+                tools=tools_used,
+                **timing.as_dict(),
+            ).info("Response generated")
 
             # Send response
             await update.message.reply_text(response.content, parse_mode="Markdown")
+            TELEGRAM_RESPONSE_SECONDS.observe(
+                time.time() - start_time, kind="text", status="ok"
+            )
+
+        except (AgentQueueFullError, AgentQueueTimeoutError) as e:
+            TELEGRAM_RESPONSE_SECONDS.observe(
+                time.time() - start_time, kind="text", status="rejected"
+            )
+            logger.warning(f"Message run rejected, busy | user={user_name} {e}")
+            await update.message.reply_text(BUSY_MESSAGE)
 
         except Exception as e:
+            TELEGRAM_RESPONSE_SECONDS.observe(
+                time.time() - start_time, kind="text", status="error"
+            )
             logger.error(f"Error processing message | user={user_name} error={str(e)}")
-            await update.message.reply_text(
-                "Desculpe, ocorreu um erro. Tente novamente."
+            await update.message.reply_text(ERROR_MESSAGE)
+        finally:
+            ticket.release()
+
+    async def _stream_reply(
+        self, update: Update, message: str, user_name: str, user_id: str, ticket, start_time: float
+    ):
+        """Stream the agent's answer into a message edited as tokens arrive.
+
+        Queue rejections propagate before anything is sent; errors once the
+        reply started replace it with an error message.
+        """
+        reply = StreamingReply(
+            update.message, edit_interval=settings.telegram_stream_edit_interval
+        )
+        events = self.runner.stream(
+            message, user_id, user_id, priority=RunPriority.INTERACTIVE, ticket=ticket
+        )
+        try:
+            async for event in events:
+                # The first event means the run got a slot and started
+                await reply.start()
+                if event.kind == "token":
+                    await reply.append(event.content)
+                elif event.kind == "tool_started":
+                    await reply.tool_started(event.tool_name)
+                elif event.kind == "done":
+                    await reply.finish(event.content)
+                    duration = time.time() - start_time
+                    first_token = reply.first_token_seconds
+                    logger.bind(
+                        user_id=user_id,
+                        duration_s=round(duration, 3),
+                        first_token_s=round(first_token, 3) if first_token else None,
+                        response_length=len(event.content),
+                        tools=event.tools_used,
+                        messages=reply.messages_sent,
+                        edits=reply.edits,
+                    ).info("Response streamed")
+                    TELEGRAM_RESPONSE_SECONDS.observe(duration, kind="text", status="ok")
+        except (AgentQueueFullError, AgentQueueTimeoutError):
+            raise
+        except Exception as e:
+            TELEGRAM_RESPONSE_SECONDS.observe(
+                time.time() - start_time, kind="text", status="error"
             )
+            logger.error(f"Error streaming message | user={user_name} error={str(e)}")
+            await reply.fail(ERROR_MESSAGE)
+        finally:
+            await events.aclose()
+
+    async def process_payload(self, payload: dict):
+        """Process a raw webhook update (used by the update queue)."""
+        update = Update.de_json(payload, self.app.bot)
+        with (
+            correlate(f"tg-{update.update_id}"),
+            tracer.start_as_current_span(
+                "telegram.update", attributes={"update_id": update.update_id}
+            ),
+        ):
+            await self.app.process_update(update)
 
     async def set_webhook(self, url: str):
         """Set webhook URL for the bot."""
@@ -0,0 +1,192 @@
+"""Progressive Telegram replies edited in place as the agent streams."""
+
+import asyncio
+import time
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+
+from src.logger import logger
+
+# Telegram's maximum message length
+MAX_MESSAGE_LENGTH = 4096
+
+PLACEHOLDER = "✍️ ..."
+TOOL_PLACEHOLDER = "🔎 Consultando {tool}..."
+
+
+def _split_point(text: str, limit: int) -> int:
+    """Index where to split ``text`` to keep the first part within ``limit``.
+
+    Prefers a paragraph break, then a line break, then a space in the second
+    half of the window, so messages don't end mid-word.
+    """
+    for separator in ("\n\n", "\n", " "):
+        index = text.rfind(separator, limit // 2, limit)
+        if index != -1:
+            return index + len(separator)
+    return limit
+
+
+def _seconds(retry_after) -> float:
+    """Normalize ``RetryAfter.retry_after`` (int or timedelta) to seconds."""
+    if hasattr(retry_after, "total_seconds"):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class StreamingReply:
+    """Reply to a Telegram message with text that grows as tokens arrive.
+
+    A placeholder is sent when the run starts and then edited with the text
+    so far, at most once every ``edit_interval`` seconds (Telegram limits
+    edits per chat). Text beyond ``MAX_MESSAGE_LENGTH`` continues in new
+    messages. Each edit is sent as Markdown and resent as plain text when
+    the partial Markdown doesn't parse.
+
+    Attributes:
+        reply_to: Message being answered.
+        edit_interval: Minimum seconds between edits.
+        max_length: Maximum characters per message.
+    """
+
+    def __init__(
+        self,
+        reply_to: Message,
+        edit_interval: float = 1.0,
+        max_length: int = MAX_MESSAGE_LENGTH,
+    ) -> None:
+        """Initialize the reply.
+
+        Args:
+            reply_to: Message being answered.
+            edit_interval: Minimum seconds between edits.
+            max_length: Maximum characters per message.
+        """
+        self.reply_to = reply_to
+        self.edit_interval = edit_interval
+        self.max_length = max_length
+
+        self.text = ""
+        self.created_at = time.monotonic()
+        self.started = False
+        self.first_token_at: float | None = None
+        self._offset = 0  # Start of the text shown in the current message
+        self._message: Message | None = None
+        self._shown = ""
+        self._next_edit = 0.0
+        self.messages_sent = 0
+        self.edits = 0
+
+    @property
+    def first_token_seconds(self) -> float | None:
+        """Seconds from creating the reply to the first streamed token."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.created_at
+
+    async def start(self) -> None:
+        """Send the placeholder message (once)."""
+        if self.started:
+            return
+        self.started = True
+        await self._try_show(PLACEHOLDER)
+        # The first token replaces the placeholder right away
+        self._next_edit = 0.0
+
+    async def tool_started(self, tool_name: str) -> None:
+        """Show which tool is running while no text has arrived yet."""
+        if not self.text and time.monotonic() >= self._next_edit:
+            await self._try_show(TOOL_PLACEHOLDER.format(tool=tool_name))
+
+    async def append(self, token: str) -> None:
+        """Add streamed text, editing the message if the interval elapsed."""
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.text += token
+        if time.monotonic() >= self._next_edit:
+            await self._flush(final=False)
+
+    async def finish(self, text: str | None = None) -> None:
+        """Show the complete response.
+
+        Args:
+            text: Final response; defaults to the streamed text.
+        """
+        if text is not None:
+            self.text = text
+        await self._flush(final=True)
+
+    async def fail(self, text: str) -> None:
+        """Replace the reply with an error message."""
+        self.text = ""
+        if self._message is not None:
+            await self._try_show(text)
+        else:
+            await self.reply_to.reply_text(text)
+
+    async def _flush(self, final: bool) -> None:
+        """Show the pending text, starting new messages past the length limit."""
+        part = self.text[self._offset :]
+        while len(part) > self.max_length:
+            cut = _split_point(part, self.max_length)
+            await self._show(part[:cut], retry=True)
+            self._offset += cut
+            self._message = None
+            self._shown = ""
+            part = self.text[self._offset :]
+
+        if part.strip():
+            if final:
+                await self._show(part, retry=True)
+            else:
+                await self._try_show(part)
+
+    async def _try_show(self, text: str) -> None:
+        """Show text, skipping this update if Telegram rejects it."""
+        try:
+            await self._show(text)
+        except RetryAfter as e:
+            self._next_edit = time.monotonic() + _seconds(e.retry_after)
+        except Exception as e:
+            logger.warning(f"Streaming reply update failed | error={str(e)}")
+
+    async def _show(self, text: str, retry: bool = False) -> None:
+        """Send or edit the current message.
+
+        Args:
+            text: Full text of the current message.
+            retry: Wait out Telegram flood control once instead of raising.
+        """
+        text = text.strip()
+        if not text or text == self._shown:
+            return
+        try:
+            await self._send(text)
+        except RetryAfter as e:
+            if not retry:
+                raise
+            await asyncio.sleep(_seconds(e.retry_after))
+            await self._send(text)
+        self._shown = text
+        self._next_edit = time.monotonic() + self.edit_interval
+
+    async def _send(self, text: str) -> None:
+        """Send or edit as Markdown, falling back to plain text."""
+        try:
+            await self._deliver(text, "Markdown")
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return
+            if "parse entities" not in str(e).lower():
+                raise
+            await self._deliver(text, None)
+
+    async def _deliver(self, text: str, parse_mode: str | None) -> None:
+        """Send a new message or edit the current one."""
+        if self._message is None:
+            self._message = await self.reply_to.reply_text(text, parse_mode=parse_mode)
+            self.messages_sent += 1
+        else:
+            await self._message.edit_text(text, parse_mode=parse_mode)
+            self.edits += 1
@@ -1,26 +1,132 @@
 """Audio transcription service with Groq Whisper (default) and Gemini (fallback)."""
 
+import asyncio
+import contextvars
+import hashlib
 import io
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Literal
-from groq import Groq, RateLimitError
+from groq import AsyncGroq, RateLimitError
 from agno.agent import Agent
 from agno.models.google import Gemini
 from agno.media import Audio
 from src.config import settings
 from src.logger import logger
+from src.metrics import TRANSCRIPTION_CACHE_REQUESTS, TRANSCRIPTION_SECONDS
+from src.tracing import tracer
+from src.usage import get_usage_ledger
+
+SILENCE_PATTERN = re.compile(r"silence_(start|end): (-?[\d.]+)")
+DURATION_PATTERN = re.compile(r"Duration: (\d+):(\d+):([\d.]+)")
+
+
+def _ffmpeg(*args: str) -> subprocess.CompletedProcess:
+    """Run ffmpeg quietly and return the completed process."""
+    return subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostdin", *args],
+        capture_output=True,
+        timeout=120,
+        check=True,
+    )
+
+
+def detect_silences(
+    path: Path, min_silence: float, noise_db: int = -35
+) -> tuple[float, list[tuple[float, float]]]:
+    """Find the silent stretches of an audio file.
+
+    Args:
+        path: Audio file.
+        min_silence: Minimum silence length in seconds.
+        noise_db: Level below which audio counts as silence.
+
+    Returns:
+        Tuple of (duration in seconds, list of (start, end) silences).
+    """
+    stderr = _ffmpeg(
+        "-i", str(path),
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}",
+        "-f", "null", "-",
+    ).stderr.decode(errors="replace")
+
+    match = DURATION_PATTERN.search(stderr)
+    if not match:
+        raise ValueError("Could not read audio duration")
+    hours, minutes, seconds = match.groups()
+    duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    silences, start = [], None
+    for kind, value in SILENCE_PATTERN.findall(stderr):
+        if kind == "start":
+            start = max(0.0, float(value))
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    return duration, silences
+
+
+def plan_segments(
+    duration: float, silences: list[tuple[float, float]], max_seconds: float
+) -> list[tuple[float, float]]:
+    """Split ``[0, duration]`` into segments of at most ``max_seconds``.
+
+    Each cut is placed in the middle of the latest silence that keeps the
+    segment under the limit and at least half of it long; without such a
+    silence the segment is cut at the limit.
+
+    Args:
+        duration: Audio duration in seconds.
+        silences: (start, end) silences from ``detect_silences``.
+        max_seconds: Maximum segment length.
+
+    Returns:
+        List of (start, end) segments in order.
+    """
+    cuts = [(start + end) / 2 for start, end in silences]
+    segments, start = [], 0.0
+    while duration - start > max_seconds:
+        limit = start + max_seconds
+        candidates = [c for c in cuts if start + max_seconds / 2 < c <= limit]
+        end = max(candidates) if candidates else limit
+        segments.append((start, end))
+        start = end
+    segments.append((start, duration))
+    return segments
 
 
 class AudioTranscriber:
-    """Transcribe audio using Groq Whisper (free) or Gemini (fallback)."""
+    """Transcribe audio using Groq Whisper (free) or Gemini (fallback).
+
+    Long audio is split on silences into segments of at most
+    ``transcription_segment_seconds``, which are transcribed concurrently
+    and joined in order. A segment that fails on Groq is retried and then
+    sent to Gemini on its own; the other segments keep their Groq result.
+
+    Transcripts are cached by caller key (Telegram ``file_unique_id``) and
+    by content hash, so forwarded audio is not transcribed again. Blocking
+    work (ffmpeg, Gemini) runs on a dedicated bounded thread pool.
+    """
 
     def __init__(self, provider: Literal["groq", "gemini"] = "groq"):
         """Initialize transcriber.
-        
+
         Args:
             provider: Transcription provider ("groq" or "gemini")
         """
         self.provider = provider
-        
+        self.max_segment_seconds = settings.transcription_segment_seconds
+        self.min_silence = settings.transcription_min_silence
+        self.retries = settings.transcription_retries
+        self.cache_size = settings.transcription_cache_size
+
         if provider == "groq":
             groq_api_key = getattr(settings, 'groq_api_key', None)
             if not groq_api_key:
@@ -28,72 +134,221 @@ class AudioTranscriber:
                 self.provider = "gemini"
                 self._init_gemini()
             else:
-                self.client = Groq(api_key=groq_api_key)
+                self.client = AsyncGroq(api_key=groq_api_key)
                 logger.info("Audio transcriber initialized with Groq Whisper (free)")
         else:
             self._init_gemini()
-        
+
         # Always initialize Gemini as fallback
         if self.provider == "groq":
             self._init_gemini()
-    
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.transcription_workers, thread_name_prefix="transcribe"
+        )
+        self._segment_slots = asyncio.Semaphore(settings.transcription_max_concurrency)
+        self._cache_lock = threading.Lock()
+        self._cache: OrderedDict[str, str] = OrderedDict()
+
+        self.ffmpeg_available = shutil.which("ffmpeg") is not None
+        if not self.ffmpeg_available:
+            logger.warning("ffmpeg not found, audio is transcribed without splitting")
+
     def _init_gemini(self):
         """Initialize Gemini transcriber."""
-        self.agent = Agent(
-            model=Gemini(id="gemini-2.0-flash-exp"),
-            markdown=False,
-        )
+        self.gemini_model = Gemini(id="gemini-2.0-flash-exp")
         if self.provider == "gemini":
             logger.info("Audio transcriber initialized with Gemini (paid)")
 
-    def transcribe(self, audio_bytes: bytes, format: str = "ogg") -> str:
+    def cached(self, key: str) -> str | None:
+        """Return a cached transcript, or None.
+
+        Args:
+            key: Caller key (e.g. Telegram ``file_unique_id``) or content hash.
+        """
+        with self._cache_lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+        TRANSCRIPTION_CACHE_REQUESTS.inc(result="miss" if text is None else "hit")
+        return text
+
+    def _remember(self, keys: list[str], text: str) -> None:
+        """Cache a transcript under several keys."""
+        with self._cache_lock:
+            for key in keys:
+                self._cache[key] = text
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    async def transcribe_async(
+        self, audio_bytes: bytes, format: str = "ogg", cache_key: str | None = None
+    ) -> str:
         """Transcribe audio to text.
-        
+
         Args:
             audio_bytes: Audio file bytes
             format: Audio format (ogg, mp3, wav, etc.)
-            
+            cache_key: Stable identifier of the audio (e.g. Telegram
+                ``file_unique_id``), cached alongside the content hash.
+
         Returns:
             Transcribed text
         """
-        if self.provider == "groq":
-            try:
-                return self._transcribe_groq(audio_bytes, format)
-            except RateLimitError as e:
-                logger.warning(f"Groq rate limit exceeded, falling back to Gemini | error={str(e)}")
-                return self._transcribe_gemini(audio_bytes, format)
-            except Exception as e:
-                logger.error(f"Groq transcription failed, falling back to Gemini | error={str(e)}")
-                return self._transcribe_gemini(audio_bytes, format)
-        else:
-            return self._transcribe_gemini(audio_bytes, format)
-    
-    def _transcribe_groq(self, audio_bytes: bytes, format: str) -> str:
+        content_key = f"sha256:{hashlib.sha256(audio_bytes).hexdigest()}"
+        text = self.cached(content_key)
+        if text is not None:
+            if cache_key:
+                self._remember([cache_key], text)
+            return text
+
+        with tracer.start_as_current_span(
+            "audio.transcription", attributes={"audio_bytes": len(audio_bytes)}
+        ) as span:
+            segments = await self._run_blocking(self._split, audio_bytes, format)
+            span.set_attribute("segments", len(segments))
+            texts = await asyncio.gather(
+                *(
+                    self._transcribe_segment(index, data, segment_format)
+                    for index, (data, segment_format) in enumerate(segments)
+                )
+            )
+
+        text = " ".join(t for t in texts if t)
+        self._remember([k for k in (cache_key, content_key) if k], text)
+        logger.info(
+            f"Transcription complete | segments={len(segments)} length={len(text)} chars"
+        )
+        return text
+
+    async def _run_blocking(self, func, *args):
+        """Run a blocking call on the transcription pool, keeping the log/trace context."""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, context.run, func, *args
+        )
+
+    def _split(self, audio_bytes: bytes, format: str) -> list[tuple[bytes, str]]:
+        """Split audio on silences into (bytes, format) segments.
+
+        Returns the audio unsplit when it is short, ffmpeg is missing or
+        splitting fails.
+        """
+        whole = [(audio_bytes, format)]
+        if not self.ffmpeg_available:
+            return whole
+
+        try:
+            with tempfile.TemporaryDirectory(prefix="audio-") as tmp:
+                path = Path(tmp) / f"audio.{format}"
+                path.write_bytes(audio_bytes)
+                duration, silences = detect_silences(path, self.min_silence)
+                if duration <= self.max_segment_seconds:
+                    return whole
+
+                segments = []
+                for start, end in plan_segments(duration, silences, self.max_segment_seconds):
+                    segments.append(
+                        (
+                            _ffmpeg(
+                                "-ss", f"{start:.3f}",
+                                "-t", f"{end - start:.3f}",
+                                "-i", str(path),
+                                "-ac", "1", "-ar", "16000",
+                                "-c:a", "libopus", "-b:a", "24k",
+                                "-f", "ogg", "pipe:1",
+                            ).stdout,
+                            "ogg",
+                        )
+                    )
+            logger.bind(
+                audio_s=round(duration, 1), segments=len(segments)
+            ).info("Audio split on silences")
+            return segments
+        except Exception as e:
+            logger.warning(f"Audio splitting failed, transcribing it whole | error={str(e)}")
+            return whole
+
+    async def _transcribe_segment(self, index: int, audio_bytes: bytes, format: str) -> str:
+        """Transcribe one segment with Groq, retrying, then falling back to Gemini."""
+        async with self._segment_slots:
+            if self.provider == "groq":
+                for attempt in range(self.retries + 1):
+                    try:
+                        return await self._transcribe_groq(audio_bytes, format)
+                    except RateLimitError as e:
+                        logger.warning(
+                            f"Groq rate limit exceeded, falling back to Gemini | "
+                            f"segment={index} error={str(e)}"
+                        )
+                        break
+                    except Exception as e:
+                        logger.error(
+                            f"Groq transcription failed | segment={index} "
+                            f"attempt={attempt + 1} error={str(e)}"
+                        )
+                        if attempt < self.retries:
+                            await asyncio.sleep(0.5 * 2**attempt)
+
+            return await self._run_blocking(self._transcribe_gemini, audio_bytes, format)
+
+    async def _transcribe_groq(self, audio_bytes: bytes, format: str) -> str:
         """Transcribe using Groq Whisper (free)."""
         logger.info(f"Transcribing with Groq | format={format} size={len(audio_bytes)} bytes")
-        
+
         audio_file = io.BytesIO(audio_bytes)
         audio_file.name = f"audio.{format}"
-        
-        transcription = self.client.audio.transcriptions.create(
-            file=audio_file,
-            model="whisper-large-v3-turbo",
-            response_format="text"
+
+        start = time.perf_counter()
+        with (
+            tracer.start_as_current_span(
+                "groq.transcription", attributes={"audio_bytes": len(audio_bytes)}
+            ),
+            TRANSCRIPTION_SECONDS.time_with_status(provider="groq"),
+        ):
+            transcription = await self.client.audio.transcriptions.create(
+                file=audio_file,
+                model="whisper-large-v3-turbo",
+                response_format="text"
+            )
+
+        # Whisper reports no tokens; the ledger keeps its calls and latency
+        get_usage_ledger().record(
+            "audio", "transcription", "whisper-large-v3-turbo", 0, 0,
+            seconds=time.perf_counter() - start,
         )
-        
         text = transcription.strip()
         logger.info(f"Groq transcription complete | length={len(text)} chars")
         return text
-    
+
     def _transcribe_gemini(self, audio_bytes: bytes, format: str) -> str:
         """Transcribe using Gemini (paid fallback)."""
         logger.info(f"Transcribing with Gemini | format={format} size={len(audio_bytes)} bytes")
-        
-        response = self.agent.run(
-            "Transcribe this audio to text. Return only the transcribed text, nothing else.",
-            audio=[Audio(content=audio_bytes, format=format)]
+
+        # One agent per call: segments may fall back concurrently
+        agent = Agent(model=self.gemini_model, markdown=False)
+        start = time.perf_counter()
+        with (
+            tracer.start_as_current_span(
+                "gemini.transcription", attributes={"audio_bytes": len(audio_bytes)}
+            ),
+            TRANSCRIPTION_SECONDS.time_with_status(provider="gemini"),
+        ):
+            response = agent.run(
+                "Transcribe this audio to text. Return only the transcribed text, nothing else.",
+                audio=[Audio(content=audio_bytes, format=format)]
+            )
+
+        metrics = response.metrics
+        get_usage_ledger().record(
+            "llm",
+            "transcription",
+            self.gemini_model.id,
+            metrics.input_tokens if metrics else None,
+            metrics.output_tokens if metrics else None,
+            seconds=time.perf_counter() - start,
         )
-        
         text = response.content.strip()
         logger.info(f"Gemini transcription complete | length={len(text)} chars")
         return text
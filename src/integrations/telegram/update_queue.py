@@ -0,0 +1,355 @@
+"""Persistent, per-chat ordered queue for Telegram webhook updates."""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    delete,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert
+
+from src.config import settings
+from src.logger import logger
+from src.metrics import TELEGRAM_UPDATE_WAIT_SECONDS, TELEGRAM_UPDATES, CallbackMetric
+
+metadata = MetaData()
+
+telegram_updates = Table(
+    "telegram_updates",
+    metadata,
+    Column("update_id", BigInteger, primary_key=True),
+    Column("chat_id", BigInteger, nullable=False),
+    Column("payload", JSONB, nullable=False),
+    Column("status", String(16), nullable=False, index=True),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("error", Text),
+    Column("received_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Column("finished_at", DateTime(timezone=True)),
+)
+
+# Update types that carry the chat they belong to
+_CHAT_KEYS = ("message", "edited_message", "channel_post", "edited_channel_post")
+
+
+class UpdateQueueFullError(Exception):
+    """Raised when too many updates are waiting to be processed."""
+
+
+def chat_id_of(payload: dict[str, Any]) -> int:
+    """Return the chat an update belongs to (0 when it has none)."""
+    for key in _CHAT_KEYS:
+        if key in payload:
+            return payload[key].get("chat", {}).get("id", 0)
+    callback = payload.get("callback_query", {}).get("message")
+    if callback:
+        return callback.get("chat", {}).get("id", 0)
+    return 0
+
+
+class UpdateStore:
+    """Postgres log of received updates, used to dedupe and to resume.
+
+    Rows go ``queued`` -> ``processing`` -> ``done``/``failed``. After a
+    restart, ``queued`` and ``processing`` rows are processed again; rows
+    that already failed ``max_attempts`` times are marked failed instead.
+    """
+
+    def __init__(self, db_url: str | None = None) -> None:
+        """Initialize the store and create its table if needed.
+
+        Args:
+            db_url: PostgreSQL connection string (defaults to ``settings.db_url``).
+        """
+        self.engine = create_engine(db_url or settings.db_url, pool_pre_ping=True)
+        metadata.create_all(self.engine, tables=[telegram_updates], checkfirst=True)
+
+    def add(self, update_id: int, chat_id: int, payload: dict[str, Any]) -> bool:
+        """Store a new update.
+
+        Returns:
+            False if the update was already received.
+        """
+        statement = (
+            insert(telegram_updates)
+            .values(update_id=update_id, chat_id=chat_id, payload=payload, status="queued")
+            .on_conflict_do_nothing(index_elements=[telegram_updates.c.update_id])
+            .returning(telegram_updates.c.update_id)
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(statement).scalar_one_or_none() is not None
+
+    def start(self, update_id: int) -> None:
+        """Mark an update as being processed."""
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(telegram_updates)
+                .where(telegram_updates.c.update_id == update_id)
+                .values(status="processing", attempts=telegram_updates.c.attempts + 1)
+            )
+
+    def finish(self, update_id: int, status: str, error: str | None = None) -> None:
+        """Record the outcome of an update."""
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(telegram_updates)
+                .where(telegram_updates.c.update_id == update_id)
+                .values(status=status, error=error, finished_at=func.now())
+            )
+
+    def recover(self, max_attempts: int) -> list[tuple[int, int, dict[str, Any]]]:
+        """Return updates left unfinished by a previous process.
+
+        Args:
+            max_attempts: Processing attempts after which an update is failed.
+
+        Returns:
+            List of (update_id, chat_id, payload), oldest first.
+        """
+        unfinished = telegram_updates.c.status.in_(("queued", "processing"))
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(telegram_updates)
+                .where(unfinished, telegram_updates.c.attempts >= max_attempts)
+                .values(
+                    status="failed",
+                    error="Interrupted too many times",
+                    finished_at=func.now(),
+                )
+            )
+            rows = conn.execute(
+                select(
+                    telegram_updates.c.update_id,
+                    telegram_updates.c.chat_id,
+                    telegram_updates.c.payload,
+                )
+                .where(unfinished)
+                .order_by(telegram_updates.c.update_id)
+            ).all()
+        return [(row.update_id, row.chat_id, row.payload) for row in rows]
+
+    def purge(self, retention_hours: float) -> int:
+        """Delete finished updates older than the retention period.
+
+        Returns:
+            Number of deleted rows.
+        """
+        cutoff = func.now() - func.make_interval(0, 0, 0, 0, 0, 0, retention_hours * 3600)
+        with self.engine.begin() as conn:
+            return conn.execute(
+                delete(telegram_updates).where(
+                    telegram_updates.c.status.in_(("done", "failed")),
+                    telegram_updates.c.received_at < cutoff,
+                )
+            ).rowcount
+
+
+class UpdateQueue:
+    """Bounded worker pool that processes updates in order per chat.
+
+    The webhook only persists and enqueues an update; ``workers`` tasks run
+    the handler. Each chat is handed to at most one worker at a time, so a
+    chat's updates are handled in arrival order while different chats run
+    in parallel, served round-robin. Updates are deduplicated by
+    ``update_id`` (recent ids in memory, all ids through the store), so
+    Telegram redeliveries never run twice.
+
+    Attributes:
+        handler: Coroutine processing one update payload.
+        store: Persistent update log; None keeps the queue in memory only.
+        workers: Number of concurrent worker tasks.
+        max_pending: Maximum queued or running updates.
+        max_attempts: Processing attempts per update across restarts.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict[str, Any]], Awaitable[None]],
+        store: UpdateStore | None = None,
+        workers: int = 8,
+        max_pending: int = 1000,
+        max_attempts: int = 3,
+        recent_ids: int = 10_000,
+    ) -> None:
+        """Initialize the queue.
+
+        Args:
+            handler: Coroutine processing one update payload.
+            store: Persistent update log; None keeps the queue in memory only.
+            workers: Number of concurrent worker tasks.
+            max_pending: Maximum queued or running updates.
+            max_attempts: Processing attempts per update across restarts.
+            recent_ids: Update ids remembered in memory for deduplication.
+        """
+        self.handler = handler
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.recent_ids = recent_ids
+
+        self._chats: dict[int, deque[tuple[int, dict[str, Any], float]]] = {}
+        self._ready: asyncio.Queue[int] = asyncio.Queue()
+        self._seen: OrderedDict[int, None] = OrderedDict()
+        self._pending = 0
+        self._running = 0
+        self._tasks: list[asyncio.Task] = []
+
+        CallbackMetric(
+            "rag_telegram_updates_pending",
+            "Telegram updates waiting for or being processed by a worker",
+            lambda: {
+                ("waiting",): self._pending - self._running,
+                ("running",): self._running,
+            },
+            labelnames=("state",),
+        )
+
+    @property
+    def pending(self) -> int:
+        """Updates queued or being processed."""
+        return self._pending
+
+    async def start(self) -> None:
+        """Resume unfinished updates from the store and start the workers."""
+        if self.store is not None:
+            recovered = await asyncio.to_thread(self.store.recover, self.max_attempts)
+            for update_id, chat_id, payload in recovered:
+                self._remember(update_id)
+                self._enqueue(update_id, chat_id, payload)
+            if recovered:
+                logger.info(f"Resumed unfinished Telegram updates | count={len(recovered)}")
+            try:
+                purged = await asyncio.to_thread(
+                    self.store.purge, settings.telegram_update_retention_hours
+                )
+                logger.info(f"Purged old Telegram updates | count={purged}")
+            except Exception as e:
+                logger.warning(f"Failed to purge old Telegram updates: {e}")
+
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"telegram-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Telegram update queue started | workers={self.workers}")
+
+    async def stop(self) -> None:
+        """Stop the workers.
+
+        Updates that were not finished stay in the store and are resumed by
+        the next ``start``.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: dict[str, Any]) -> bool:
+        """Persist and enqueue an update.
+
+        Args:
+            payload: Raw update as received by the webhook.
+
+        Returns:
+            False if the update was a duplicate and was dropped.
+
+        Raises:
+            UpdateQueueFullError: If ``max_pending`` updates are already queued.
+        """
+        update_id = payload["update_id"]
+        if update_id in self._seen:
+            TELEGRAM_UPDATES.inc(result="duplicate")
+            return False
+        if self._pending >= self.max_pending:
+            TELEGRAM_UPDATES.inc(result="rejected")
+            raise UpdateQueueFullError(f"{self._pending} Telegram updates pending")
+
+        # Remember before awaiting, so a redelivery racing this one is dropped
+        self._remember(update_id)
+        chat_id = chat_id_of(payload)
+        if self.store is not None:
+            try:
+                added = await asyncio.to_thread(self.store.add, update_id, chat_id, payload)
+            except BaseException:
+                self._seen.pop(update_id, None)
+                raise
+            if not added:
+                TELEGRAM_UPDATES.inc(result="duplicate")
+                return False
+
+        TELEGRAM_UPDATES.inc(result="queued")
+        self._enqueue(update_id, chat_id, payload)
+        return True
+
+    def _remember(self, update_id: int) -> None:
+        """Add an update id to the recent ids, forgetting the oldest."""
+        self._seen[update_id] = None
+        while len(self._seen) > self.recent_ids:
+            self._seen.popitem(last=False)
+
+    def _enqueue(self, update_id: int, chat_id: int, payload: dict[str, Any]) -> None:
+        """Append an update to its chat, scheduling the chat if it is idle."""
+        self._pending += 1
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            # Idle chat: not held by a worker nor already waiting in _ready
+            chat = self._chats[chat_id] = deque()
+            self._ready.put_nowait(chat_id)
+        chat.append((update_id, payload, time.perf_counter()))
+
+    async def _worker(self) -> None:
+        """Process one update of a ready chat at a time."""
+        while True:
+            chat_id = await self._ready.get()
+            chat = self._chats[chat_id]
+            update_id, payload, received = chat.popleft()
+            TELEGRAM_UPDATE_WAIT_SECONDS.observe(time.perf_counter() - received)
+            self._running += 1
+            try:
+                await self._process(update_id, payload)
+            finally:
+                self._running -= 1
+                self._pending -= 1
+                if chat:
+                    # Back of the line, so other chats get a turn
+                    self._ready.put_nowait(chat_id)
+                else:
+                    del self._chats[chat_id]
+
+    async def _process(self, update_id: int, payload: dict[str, Any]) -> None:
+        """Run the handler for an update and record the outcome."""
+        if self.store is not None:
+            await self._store_call(self.store.start, update_id)
+        try:
+            await self.handler(payload)
+        except Exception as e:
+            TELEGRAM_UPDATES.inc(result="error")
+            logger.error(f"Telegram update failed | update_id={update_id}: {e}")
+            if self.store is not None:
+                await self._store_call(self.store.finish, update_id, "failed", str(e))
+            return
+
+        TELEGRAM_UPDATES.inc(result="ok")
+        if self.store is not None:
+            await self._store_call(self.store.finish, update_id, "done")
+
+    @staticmethod
+    async def _store_call(func: Callable, *args: Any) -> None:
+        """Update the store off the event loop; failures only cost a retry."""
+        try:
+            await asyncio.to_thread(func, *args)
+        except Exception as e:
+            logger.warning(f"Telegram update store write failed: {e}")
@@ -1,16 +1,84 @@
-"""Centralized logging configuration."""
+"""Centralized logging configuration.
 
-from loguru import logger
+Sinks are written from loguru's background queue, records carry a
+``request_id`` correlation field and ``bind()`` fields are rendered as
+``key=value`` pairs (text) or JSON keys (``LOG_FORMAT=json``).
+"""
+
+import json
+import random
 import sys
+import uuid
+from contextlib import contextmanager
+from typing import Iterator
+
+from loguru import logger
+
+from src.config import settings
+
+# Extra keys that are not user fields
+_INTERNAL_EXTRA = {"request_id", "sample_rate", "fields", "serialized"}
+
+
+def _patch(record) -> None:
+    """Render structured fields (and the JSON line, in JSON mode)."""
+    extra = record["extra"]
+    fields = {k: v for k, v in extra.items() if k not in _INTERNAL_EXTRA}
+    extra["fields"] = "".join(f" {k}={v}" for k, v in fields.items())
+
+    if settings.log_format == "json":
+        payload = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "logger": f"{record['name']}:{record['function']}",
+            "message": record["message"],
+            "request_id": extra.get("request_id"),
+            **fields,
+        }
+        if record["exception"] is not None:
+            payload["exception"] = repr(record["exception"].value)
+        extra["serialized"] = json.dumps(payload, default=str, ensure_ascii=False)
+
+
+def _sample(record) -> bool:
+    """Drop sampled records with probability ``1 - sample_rate``."""
+    rate = record["extra"].get("sample_rate")
+    return rate is None or random.random() < rate
+
+
+def _text_format(colored: bool) -> str:
+    """Text line format with correlation id and structured fields."""
+    if colored:
+        return (
+            "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | "
+            "<magenta>{extra[request_id]}</magenta> | "
+            "<cyan>{name}</cyan>:<cyan>{function}</cyan> - "
+            "<level>{message}</level>{extra[fields]}"
+        )
+    return (
+        "{time:YYYY-MM-DD HH:mm:ss} | {level} | {extra[request_id]} | "
+        "{name}:{function} - {message}{extra[fields]}"
+    )
+
+
+def _json_format(record) -> str:
+    """JSON line format (the line is built by ``_patch``)."""
+    return "{extra[serialized]}\n"
+
 
 # Remove default handler
 logger.remove()
+logger.configure(extra={"request_id": "-"}, patcher=_patch)
+
+json_output = settings.log_format == "json"
 
 # Console handler (stdout)
 logger.add(
     sys.stdout,
-    format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan> - <level>{message}</level>",
-    level="INFO",
+    format=_json_format if json_output else _text_format(colored=True),
+    level=settings.log_level,
+    filter=_sample,
+    enqueue=settings.log_enqueue,
 )
 
 # File handler (rotating logs)
@@ -18,8 +86,40 @@ logger.add(
     "logs/app_{time}.log",
     rotation="1 day",
     retention="30 days",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function} - {message}",
-    level="INFO",
+    format=_json_format if json_output else _text_format(colored=False),
+    level=settings.log_level,
+    filter=_sample,
+    enqueue=settings.log_enqueue,
 )
 
-__all__ = ["logger"]
+
+@contextmanager
+def correlate(request_id: str | None = None) -> Iterator[str]:
+    """Tag all logs in the block (and tasks/threads started from it) with an id.
+
+    The id lives in a context variable, so it follows ``asyncio`` tasks,
+    ``asyncio.to_thread`` and the agent runner's worker threads.
+
+    Args:
+        request_id: Correlation id; a new random id when omitted.
+
+    Yields:
+        The correlation id in use.
+    """
+    request_id = request_id or uuid.uuid4().hex[:12]
+    with logger.contextualize(request_id=request_id):
+        yield request_id
+
+
+def sampled(rate: float | None = None):
+    """Return a logger that keeps only a fraction of its records.
+
+    Args:
+        rate: Fraction of records kept (defaults to ``LOG_SAMPLE_RATE``).
+    """
+    return logger.bind(
+        sample_rate=settings.log_sample_rate if rate is None else rate
+    )
+
+
+__all__ = ["correlate", "logger", "sampled"]
@@ -0,0 +1,315 @@
+"""Prometheus metrics in the text exposition format.
+
+A small, dependency-free registry with counters, histograms and callback
+gauges. Metric names and label sets are declared here so every label stays
+low-cardinality (stages, providers, tool names, statuses - never users).
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    """Render a label set as ``{name="value",...}``."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for registered metrics."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        """Validate labels and return their values in declaration order."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        """Return exposition lines for the metric's samples."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Return the HELP/TYPE header and samples."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Increase the counter for a label set."""
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observation for a label set."""
+        key = self._label_values(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[idx] += 1
+            counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the wrapped block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def time_with_status(self, **labels: str) -> Iterator[None]:
+        """Observe the block's duration with ``status`` set to ``ok`` or ``error``."""
+        start = time.perf_counter()
+        status = "error"
+        try:
+            yield
+            status = "ok"
+        finally:
+            self.observe(time.perf_counter() - start, status=status, **labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            counts = {key: list(value) for key, value in self._counts.items()}
+            sums = dict(self._sums)
+
+        lines = []
+        for key, bucket_counts in counts.items():
+            for bound, count in zip((*self.buckets, math.inf), bucket_counts):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sums[key])}")
+            lines.append(f"{self.name}_count{labels} {bucket_counts[-1]}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Metric whose samples are read from a callback at scrape time.
+
+    The callback returns a mapping of label values (in ``labelnames`` order)
+    to the current value.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], dict[LabelValues, float]],
+        labelnames: tuple[str, ...] = (),
+        type_name: str = "gauge",
+    ) -> None:
+        self.type_name = type_name
+        self.callback = callback
+        super().__init__(name, documentation, labelnames)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self.callback().items()
+        ]
+
+
+class Registry:
+    """Collection of metrics rendered together for scraping."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        """Add a metric, replacing any previous metric with the same name."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Agent serving
+AGENT_CONSTRUCTION_SECONDS = Histogram(
+    "rag_agent_construction_seconds", "Time to construct an agent from the resource pool"
+)
+AGENT_QUEUE_WAIT_SECONDS = Histogram(
+    "rag_agent_queue_wait_seconds", "Time agent runs wait for a run slot", ("priority",)
+)
+AGENT_RUN_SECONDS = Histogram(
+    "rag_agent_run_seconds", "Agent run execution time", ("mode", "status")
+)
+AGENT_REJECTIONS = Counter(
+    "rag_agent_rejections_total", "Agent runs rejected by admission control", ("reason",)
+)
+AGENT_ROUTES = Counter(
+    "rag_agent_routes_total", "Agent runs per route and routing reason", ("route", "reason")
+)
+ROUTED_RUN_SECONDS = Histogram(
+    "rag_agent_routed_run_seconds", "Agent run execution time per route", ("route",)
+)
+LLM_SECONDS = Histogram("rag_llm_seconds", "Model response time within agent runs", ("model",))
+LLM_TOKENS = Counter("rag_llm_tokens_total", "Tokens used by agent runs", ("model", "direction"))
+HISTORY_CONTEXT_TOKENS = Histogram(
+    "rag_history_context_tokens",
+    "Tokens of compacted chat history added to each agent run",
+    buckets=(0, 100, 250, 500, 1000, 2000, 4000, 8000),
+)
+HISTORY_CACHE_REQUESTS = Counter(
+    "rag_history_cache_requests_total",
+    "Session history lookups served from the in-process cache (hit) or Postgres "
+    "(miss), and cached copies reloaded after another process wrote them (stale)",
+    ("result",),
+)
+
+# Retrieval and tools
+QUERY_EMBEDDING_SECONDS = Histogram(
+    "rag_query_embedding_seconds", "Time to embed a query", ("model",)
+)
+KB_RETRIEVAL_SECONDS = Histogram(
+    "rag_kb_retrieval_seconds", "Knowledge base search time", ("table",)
+)
+SHARD_SEARCH_SECONDS = Histogram(
+    "rag_shard_search_seconds", "Vector store search time per shard", ("shard", "status")
+)
+TOOL_CALL_SECONDS = Histogram(
+    "rag_tool_call_seconds", "Agent tool call time", ("tool", "status")
+)
+TOOL_CACHE_REQUESTS = Counter(
+    "rag_tool_cache_requests_total",
+    "Tool result cache lookups by outcome (hit, shared_hit, miss)",
+    ("tool", "result"),
+)
+
+# Telegram
+TELEGRAM_RESPONSE_SECONDS = Histogram(
+    "rag_telegram_response_seconds",
+    "End-to-end Telegram message handling time",
+    ("kind", "status"),
+)
+TELEGRAM_UPDATES = Counter(
+    "rag_telegram_updates_total",
+    "Telegram webhook updates by outcome (queued, duplicate, rejected, ok, error)",
+    ("result",),
+)
+TELEGRAM_UPDATE_WAIT_SECONDS = Histogram(
+    "rag_telegram_update_wait_seconds", "Time Telegram updates wait for a worker"
+)
+TRANSCRIPTION_SECONDS = Histogram(
+    "rag_transcription_seconds", "Audio transcription time", ("provider", "status")
+)
+TRANSCRIPTION_CACHE_REQUESTS = Counter(
+    "rag_transcription_cache_requests_total", "Transcript cache lookups", ("result",)
+)
+
+# Ingestion
+INGEST_STAGE_SECONDS = Histogram(
+    "rag_ingest_stage_seconds",
+    "Chunking pipeline stage time per document",
+    ("chunker", "stage"),
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+INGEST_CHUNKS = Counter(
+    "rag_ingest_chunks_total", "Chunks produced per chunking stage", ("chunker", "stage")
+)
+INGEST_BYTES = Counter(
+    "rag_ingest_bytes_total", "Document text bytes processed by chunkers", ("chunker",)
+)
+
+# Usage accounting
+USAGE_TOKENS = Counter(
+    "rag_usage_tokens_total",
+    "Tokens used by model calls",
+    ("kind", "operation", "model", "direction"),
+)
+USAGE_COST = Counter(
+    "rag_usage_cost_usd_total",
+    "Estimated cost of model calls in USD",
+    ("kind", "operation", "model"),
+)
+
+
+def render_metrics() -> str:
+    """Render the process-wide registry."""
+    return REGISTRY.render()
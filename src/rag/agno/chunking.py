@@ -1,14 +1,27 @@
 """Context-enhanced semantic chunking strategy."""
 
 import time
-from typing import Any
+from typing import Any, Callable
 
 from agno.knowledge.chunking.strategy import ChunkingStrategy
 from agno.knowledge.document import Document
 from chonkie import SemanticChunker
+from chonkie.embeddings import BaseEmbeddings
 from google import genai
 
 from src.config import settings
+from src.logger import logger, sampled
+from src.metrics import INGEST_BYTES, INGEST_CHUNKS, INGEST_STAGE_SECONDS
+from src.rag.extractive_context import (
+    ExtractiveContextGenerator,
+    current_page_outline,
+    document_title,
+    validate_context_strategy,
+)
+from src.tracing import set_usage_attributes, tracer
+from src.usage import current_scope, timed_usage, usage_scope
+
+CHUNKER_LABEL = "agno_contextual"
 
 
 class ContextualSemanticChunking(ChunkingStrategy):
@@ -21,13 +34,22 @@ class ContextualSemanticChunking(ChunkingStrategy):
     The contextual enhancement improves retrieval accuracy by 20-30% by providing
     additional context about each chunk's role within the broader document.
 
+    With the "extractive" context strategy, step 2 makes no LLM calls: the
+    context is the document title, section path and chunk keyphrases (see
+    ``src.rag.extractive_context``), so ingestion runs at CPU speed.
+
     Attributes:
         semantic_chunker: SemanticChunker for detecting natural boundaries.
         semantic_chunking_model: OpenAI model ID for semantic chunking.
-        context_client: Gemini API client for context generation.
+        context_strategy: "llm" (Gemini contexts) or "extractive".
+        context_client: Gemini API client for context generation (None for
+            extractive contexts).
+        extractive_context: Context generator of the extractive strategy.
         context_model_id: Gemini model ID for context generation.
         max_retries: Maximum retry attempts per chunk.
         retry_delay: Initial delay between retries (exponential backoff).
+        progress_callback: Optional ``(stage, count)`` callback reporting
+            chunks produced by the "chunked" and "contextualized" stages.
     """
 
     CONTEXT_PROMPT = """Given the document below, provide a brief context (1-2 sentences) explaining what this chunk discusses within the broader document. \n\n DOCUMENT: {whole_doc} \n\n CHUNK: {chunk_content} \n\n Context:"""
@@ -38,6 +60,10 @@ class ContextualSemanticChunking(ChunkingStrategy):
         similarity_threshold: float = 0.5,
         max_retries: int = 3,
         retry_delay: float = 2.0,
+        progress_callback: Callable[[str, int], None] | None = None,
+        embedding_model: BaseEmbeddings | None = None,
+        context_client: genai.Client | None = None,
+        context_strategy: str | None = None,
     ) -> None:
         """Initialize contextual semantic chunking strategy.
 
@@ -46,23 +72,49 @@ class ContextualSemanticChunking(ChunkingStrategy):
             similarity_threshold: Threshold for semantic boundary detection (0-1).
             max_retries: Maximum retry attempts per chunk.
             retry_delay: Initial delay between retries (exponential backoff).
+            progress_callback: Optional ``(stage, count)`` progress callback.
+            embedding_model: Chonkie embeddings for boundary detection; defaults
+                to ``settings.semantic_chunking_model``.
+            context_client: Gemini client for context generation; defaults to
+                one using ``settings.google_api_key``.
+            context_strategy: "llm" or "extractive"; defaults to
+                ``settings.context_strategy``.
+
+        Raises:
+            ValueError: Unknown context strategy.
         """
         # Semantic chunking configuration (OpenAI)
         self.semantic_chunker = SemanticChunker(
-            embedding_model=settings.semantic_chunking_model,
+            embedding_model=embedding_model or settings.semantic_chunking_model,
             chunk_size=chunk_size,
             threshold=similarity_threshold,
             api_key=settings.openai_api_key,
         )
         
-        # Context generation configuration (Gemini)
-        self.context_client = genai.Client(api_key=settings.google_api_key)
+        # Context generation configuration (Gemini, or extractive without LLM)
+        self.context_strategy = validate_context_strategy(
+            context_strategy or settings.context_strategy
+        )
+        if self.context_strategy == "llm":
+            self.context_client = context_client or genai.Client(
+                api_key=settings.google_api_key
+            )
+        else:
+            self.context_client = None
         self.context_model_id = settings.context_generation_model
+        self.extractive_context = ExtractiveContextGenerator()
         
         # Retry configuration
         self.max_retries = max_retries
         self.retry_delay = retry_delay
 
+        self.progress_callback = progress_callback
+
+    def _report_progress(self, stage: str, count: int) -> None:
+        """Report chunks completed by a stage to the progress callback."""
+        if self.progress_callback is not None:
+            self.progress_callback(stage, count)
+
     def _perform_semantic_chunking(self, document: Document) -> list[Document]:
         """Perform semantic chunking on document.
 
@@ -93,9 +145,22 @@ class ContextualSemanticChunking(ChunkingStrategy):
         Returns:
             Generated context text.
         """
-        response = self.context_client.models.generate_content(
-            model=self.context_model_id, contents=prompt
-        )
+        with (
+            tracer.start_as_current_span("gemini.generate_content") as span,
+            timed_usage("llm", "context", self.context_model_id) as recorded,
+        ):
+            response = self.context_client.models.generate_content(
+                model=self.context_model_id, contents=prompt
+            )
+            usage = response.usage_metadata
+            recorded["input_tokens"] = usage.prompt_token_count if usage else None
+            recorded["output_tokens"] = usage.candidates_token_count if usage else None
+            set_usage_attributes(
+                span,
+                self.context_model_id,
+                recorded["input_tokens"],
+                recorded["output_tokens"],
+            )
         return response.text
 
     def _add_context_to_chunks(
@@ -122,9 +187,35 @@ class ContextualSemanticChunking(ChunkingStrategy):
                 failed_chunks.append((idx, chunk))
             
             contextual_chunks.append(self._create_enhanced_document(chunk, context))
+            self._report_progress("contextualized", 1)
 
         return contextual_chunks, failed_chunks
 
+    def _add_extractive_context(
+        self, semantic_chunks: list[Document], document: Document
+    ) -> list[Document]:
+        """Add title, section path and keyphrases to semantic chunks.
+
+        Args:
+            semantic_chunks: List of semantically chunked documents.
+            document: Document the chunks were cut from (a page for PDFs
+                read with ``OutlinePDFReader``).
+
+        Returns:
+            Chunks with extractive contexts.
+        """
+        contexts = self.extractive_context.contexts(
+            document.content,
+            [chunk.content for chunk in semantic_chunks],
+            title=document_title(document.name),
+            outline=current_page_outline(),
+        )
+        self._report_progress("contextualized", len(semantic_chunks))
+        return [
+            self._create_enhanced_document(chunk, context)
+            for chunk, context in zip(semantic_chunks, contexts)
+        ]
+
     def _try_generate_context_with_retry(
         self, chunk_content: str, doc_preview: str, chunk_idx: int
     ) -> str | None:
@@ -147,13 +238,13 @@ class ContextualSemanticChunking(ChunkingStrategy):
             except Exception:
                 if attempt < self.max_retries - 1:
                     delay = self.retry_delay * (2**attempt)
-                    print(
+                    sampled().debug(
                         f"⚠️  Chunk {chunk_idx + 1}: tentativa {attempt + 1} falhou. "
                         f"Retry em {delay:.1f}s..."
                     )
                     time.sleep(delay)
                 else:
-                    print(
+                    logger.warning(
                         f"❌ Chunk {chunk_idx + 1}: falhou após {self.max_retries} tentativas"
                     )
         return None
@@ -196,7 +287,7 @@ class ContextualSemanticChunking(ChunkingStrategy):
         if not failed_chunks:
             return
 
-        print(f"\n🔄 Reprocessando {len(failed_chunks)} chunks sem contexto...")
+        logger.info(f"🔄 Reprocessando {len(failed_chunks)} chunks sem contexto...")
         
         for idx, chunk in failed_chunks:
             for attempt in range(self.max_retries * 2):
@@ -209,18 +300,18 @@ class ContextualSemanticChunking(ChunkingStrategy):
                     contextual_chunks[idx] = self._create_enhanced_document(
                         chunk, context
                     )
-                    print(f"✅ Chunk {idx + 1}: contexto gerado com sucesso")
+                    sampled().debug(f"✅ Chunk {idx + 1}: contexto gerado com sucesso")
                     break
                 except Exception:
                     if attempt < (self.max_retries * 2) - 1:
                         delay = self.retry_delay * (2 ** (attempt % self.max_retries))
-                        print(
+                        sampled().debug(
                             f"⚠️  Chunk {idx + 1}: retry {attempt + 1} falhou. "
                             f"Aguardando {delay:.1f}s..."
                         )
                         time.sleep(delay)
                     else:
-                        print(
+                        logger.warning(
                             f"❌ Chunk {idx + 1}: impossível gerar contexto após "
                             f"todas as tentativas"
                         )
@@ -230,7 +321,7 @@ class ContextualSemanticChunking(ChunkingStrategy):
 
         Pipeline:
         1. Semantic chunking (OpenAI) - Detect natural boundaries
-        2. Context generation (Gemini) - Add situating context
+        2. Context generation (Gemini, or extractive) - Add situating context
         3. Retry failed chunks - Extended retry for failures
 
         Args:
@@ -239,16 +330,57 @@ class ContextualSemanticChunking(ChunkingStrategy):
         Returns:
             List of documents with enhanced contextual information.
         """
-        # Step 1: Semantic chunking (OpenAI)
-        semantic_chunks = self._perform_semantic_chunking(document)
-
-        # Step 2: Context generation (Gemini)
-        doc_preview = document.content[:5000]
-        contextual_chunks, failed_chunks = self._add_context_to_chunks(
-            semantic_chunks, doc_preview
-        )
+        # Knowledge.insert (used by the scripts) doesn't set a usage scope
+        document_name = current_scope().get("document", document.name)
+        with (
+            tracer.start_as_current_span(
+                "chunking.contextual", attributes={"chunker": CHUNKER_LABEL}
+            ),
+            usage_scope(document=document_name),
+        ):
+            INGEST_BYTES.inc(len(document.content.encode()), chunker=CHUNKER_LABEL)
+
+            # Step 1: Semantic chunking (OpenAI)
+            with (
+                tracer.start_as_current_span("chunking.semantic") as span,
+                INGEST_STAGE_SECONDS.time(chunker=CHUNKER_LABEL, stage="semantic"),
+            ):
+                semantic_chunks = self._perform_semantic_chunking(document)
+                span.set_attribute("chunks", len(semantic_chunks))
+            INGEST_CHUNKS.inc(
+                len(semantic_chunks), chunker=CHUNKER_LABEL, stage="semantic"
+            )
+            self._report_progress("chunked", len(semantic_chunks))
+
+            # Step 2: Context generation (Gemini, or extractive)
+            doc_preview = document.content[:5000]
+            with (
+                tracer.start_as_current_span(
+                    "chunking.context", attributes={"strategy": self.context_strategy}
+                ) as span,
+                INGEST_STAGE_SECONDS.time(chunker=CHUNKER_LABEL, stage="context"),
+            ):
+                if self.context_strategy == "extractive":
+                    contextual_chunks = self._add_extractive_context(semantic_chunks, document)
+                    failed_chunks = []
+                else:
+                    contextual_chunks, failed_chunks = self._add_context_to_chunks(
+                        semantic_chunks, doc_preview
+                    )
+                span.set_attribute("chunks", len(semantic_chunks))
+                span.set_attribute("failed_chunks", len(failed_chunks))
+            INGEST_CHUNKS.inc(
+                len(semantic_chunks) - len(failed_chunks),
+                chunker=CHUNKER_LABEL,
+                stage="context",
+            )
 
-        # Step 3: Retry failed chunks with extended attempts
-        self._retry_failed_chunks(failed_chunks, doc_preview, contextual_chunks)
+            # Step 3: Retry failed chunks with extended attempts
+            with (
+                tracer.start_as_current_span("chunking.retry") as span,
+                INGEST_STAGE_SECONDS.time(chunker=CHUNKER_LABEL, stage="retry"),
+            ):
+                span.set_attribute("chunks", len(failed_chunks))
+                self._retry_failed_chunks(failed_chunks, doc_preview, contextual_chunks)
 
-        return contextual_chunks
+            return contextual_chunks
@@ -0,0 +1,105 @@
+"""Agno embedder and knowledge variants that coalesce identical concurrent calls."""
+
+from typing import Any, List
+
+from agno.knowledge.document import Document
+from agno.knowledge.embedder.google import GeminiEmbedder
+from agno.knowledge.knowledge import Knowledge
+
+from src.metrics import KB_RETRIEVAL_SECONDS, QUERY_EMBEDDING_SECONDS
+from src.singleflight import get_group
+from src.tracing import tracer
+from src.usage import estimate_tokens, timed_usage
+
+
+class CoalescingGeminiEmbedder(GeminiEmbedder):
+    """Gemini embedder that shares in-flight embeddings of identical text.
+
+    When many users ask the same question at once, the query embedding is
+    computed once and handed to every concurrent caller.
+    """
+
+    def get_embedding(self, text: str) -> List[float]:
+        """Embed text, joining an identical in-flight request if there is one."""
+        compute = super().get_embedding
+
+        def embed() -> List[float]:
+            with (
+                QUERY_EMBEDDING_SECONDS.time(model=self.id),
+                timed_usage("embedding", "query_embedding", self.id) as usage,
+            ):
+                usage.update(input_tokens=estimate_tokens(text), estimated=True)
+                return compute(text)
+
+        with tracer.start_as_current_span("embedding.query", attributes={"model": self.id}):
+            return get_group("embedding").do((self.id, self.dimensions, text), embed)
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        """Embed text asynchronously, joining an identical in-flight request."""
+        compute = super().async_get_embedding
+
+        async def embed() -> List[float]:
+            with (
+                QUERY_EMBEDDING_SECONDS.time(model=self.id),
+                timed_usage("embedding", "query_embedding", self.id) as usage,
+            ):
+                usage.update(input_tokens=estimate_tokens(text), estimated=True)
+                return await compute(text)
+
+        with tracer.start_as_current_span("embedding.query", attributes={"model": self.id}):
+            return await get_group("embedding").ado(
+                (self.id, self.dimensions, text), embed
+            )
+
+
+class CoalescingKnowledge(Knowledge):
+    """Knowledge whose searches are shared between identical concurrent queries.
+
+    Retrieval depends only on the query, result limit and filters, never on
+    the user, so concurrent callers can safely share one search.
+    """
+
+    @property
+    def _table(self) -> str:
+        """Name of the backing table, for keys and metric labels."""
+        return str(getattr(self.vector_db, "table_name", None))
+
+    def _search_key(self, query: str, max_results: Any, filters: Any, kwargs: dict) -> tuple:
+        """Build the coalescing key for a search."""
+        return (self._table, query, max_results, repr(filters), repr(sorted(kwargs.items())))
+
+    def search(
+        self, query: str, max_results: int | None = None, filters: Any = None, **kwargs: Any
+    ) -> List[Document]:
+        """Search the knowledge base, joining an identical in-flight search."""
+        compute = super().search
+
+        def search() -> List[Document]:
+            with KB_RETRIEVAL_SECONDS.time(table=self._table):
+                return compute(query, max_results=max_results, filters=filters, **kwargs)
+
+        with tracer.start_as_current_span("kb.search", attributes={"table": self._table}) as span:
+            results = get_group("retrieval").do(
+                self._search_key(query, max_results, filters, kwargs), search
+            )
+            span.set_attribute("results", len(results))
+        return list(results)
+
+    async def async_search(
+        self, query: str, max_results: int | None = None, filters: Any = None, **kwargs: Any
+    ) -> List[Document]:
+        """Search asynchronously, joining an identical in-flight search."""
+        compute = super().async_search
+
+        async def search() -> List[Document]:
+            with KB_RETRIEVAL_SECONDS.time(table=self._table):
+                return await compute(
+                    query, max_results=max_results, filters=filters, **kwargs
+                )
+
+        with tracer.start_as_current_span("kb.search", attributes={"table": self._table}) as span:
+            results = await get_group("retrieval").ado(
+                self._search_key(query, max_results, filters, kwargs), search
+            )
+            span.set_attribute("results", len(results))
+        return list(results)
@@ -1,15 +1,29 @@
 """Enhanced Agno Knowledge with contextual semantic chunking."""
 
-from typing import Any
+from functools import cached_property
+from typing import Any, Callable
 
+from agno.knowledge.embedder.base import Embedder
 from agno.knowledge.embedder.google import GeminiEmbedder
 from agno.knowledge.knowledge import Knowledge
 from agno.knowledge.reader.pdf_reader import PDFReader
 from agno.knowledge.reader.text_reader import TextReader
-from agno.vectordb.pgvector import PgVector, SearchType
+from agno.vectordb.pgvector import HNSW, Ivfflat, SearchType
 
 from src.config import settings
+from src.logger import logger
 from src.rag.agno.chunking import ContextualSemanticChunking
+from src.rag.agno.coalescing import CoalescingGeminiEmbedder, CoalescingKnowledge
+from src.rag.agno.embedding_registry import (
+    default_target,
+    embedder_target,
+    get_embedding_registry,
+    make_embedder,
+)
+from src.rag.agno.outline_reader import OutlinePDFReader
+from src.rag.agno.sharding import knowledge_vector_db, shard_urls_for
+from src.rag.chunking_params import chunking_params_for
+from src.rag.extractive_context import validate_context_strategy
 
 
 class ContextualAgnoKnowledgeBase:
@@ -21,44 +35,118 @@ class ContextualAgnoKnowledgeBase:
     - Hybrid search: Combines vector similarity and full-text search.
 
     Attributes:
-        embedder: Gemini embedder for vector representations.
-        knowledge: Agno Knowledge instance with PgVector backend.
+        embedder: Embedder for vector representations (Gemini by default).
+        embedding_target: Physical table and embedding model serving the table.
+        embedding_registry: Registry the target was resolved from (None for
+            tables used as is: custom embedder or sharded table).
+        knowledge: Agno Knowledge instance with PgVector backend (sharded when
+            shard URLs are configured).
+        chunking: Chunking parameters of the table (tuned or from settings).
+        context_strategy: "llm" or "extractive" chunk contexts.
         pdf_reader: PDF reader with contextual semantic chunking strategy.
         text_reader: Text reader with contextual semantic chunking strategy.
+
+    Readers are built on first use, so the serving path (search only) never
+    constructs the chunkers and their API clients.
     """
 
-    def __init__(self, table_name: str = "economics_enhanced_gemini") -> None:
+    def __init__(
+        self,
+        table_name: str = "economics_enhanced_gemini",
+        coalesce: bool = False,
+        progress_callback: Callable[[str, int], None] | None = None,
+        embedder: Embedder | None = None,
+        db_url: str | None = None,
+        search_type: SearchType = SearchType.hybrid,
+        vector_index: HNSW | Ivfflat | None = None,
+        shard_urls: list[str] | None = None,
+        context_strategy: str | None = None,
+    ) -> None:
         """Initialize Enhanced Knowledge Base.
 
         Args:
-            table_name: PostgreSQL table name for document storage.
+            table_name: PostgreSQL table name for document storage. Tables
+                re-embedded with another model are resolved through the
+                embedding registry of the table's database (sharded tables
+                can't be re-embedded and always use the settings' model).
+            coalesce: Share query embeddings and searches between identical
+                concurrent requests (used by the serving path).
+            progress_callback: Optional ``(stage, count)`` callback receiving
+                chunking progress (used by background ingestion jobs).
+            embedder: Embedder to use instead of Gemini (e.g. for benchmarks);
+                the table is then used as is, without the registry.
+            db_url: PostgreSQL connection string (defaults to ``settings.db_url``).
+            search_type: PgVector search type.
+            vector_index: PgVector index settings (PgVector's default when omitted).
+            shard_urls: Databases to spread the table over (defaults to
+                ``settings.db_shard_urls`` unless ``db_url`` is given).
+            context_strategy: "llm" or "extractive" chunk contexts for this
+                instance's ingestion (defaults to ``settings.context_strategy``).
+
+        Raises:
+            ValueError: Unknown context strategy.
         """
-        self.embedder = GeminiEmbedder(
-            id=settings.embedding_model,
-            api_key=settings.google_api_key,
-            dimensions=768,
-        )
+        embedder_cls = CoalescingGeminiEmbedder if coalesce else GeminiEmbedder
+        knowledge_cls = CoalescingKnowledge if coalesce else Knowledge
 
-        self.knowledge = Knowledge(
-            vector_db=PgVector(
-                table_name=table_name,
-                db_url=settings.db_url,
-                search_type=SearchType.hybrid,
-                embedder=self.embedder,
+        self.progress_callback = progress_callback
+        self.chunking = chunking_params_for(table_name)
+        self.context_strategy = validate_context_strategy(
+            context_strategy or settings.context_strategy
+        )
+        shard_urls = shard_urls_for(db_url, shard_urls)
+        self.embedding_registry = (
+            get_embedding_registry(db_url) if embedder is None and not shard_urls else None
+        )
+        if embedder is not None:
+            self.embedding_target = embedder_target(table_name, embedder)
+            self.embedder = embedder
+        else:
+            self.embedding_target = (
+                self.embedding_registry.resolve(table_name)
+                if self.embedding_registry is not None
+                else default_target(table_name)
+            )
+            self.embedder = make_embedder(self.embedding_target, embedder_cls)
+
+        index_kwargs = {"vector_index": vector_index} if vector_index is not None else {}
+        self.knowledge = knowledge_cls(
+            vector_db=knowledge_vector_db(
+                self.embedding_target.table_name,
+                self.embedder,
+                db_url=db_url,
+                shard_urls=shard_urls,
+                search_type=search_type,
+                **index_kwargs,
             )
         )
 
-        self.pdf_reader = PDFReader(
+    @cached_property
+    def pdf_reader(self) -> PDFReader:
+        """PDF reader with contextual semantic chunking strategy.
+
+        Extractive contexts use ``OutlinePDFReader``, which passes the PDF's
+        headings to the chunker.
+        """
+        reader_cls = OutlinePDFReader if self.context_strategy == "extractive" else PDFReader
+        return reader_cls(
             chunking_strategy=ContextualSemanticChunking(
-                chunk_size=settings.chunk_size,
-                similarity_threshold=0.5,
+                chunk_size=self.chunking.chunk_size,
+                similarity_threshold=self.chunking.similarity_threshold,
+                progress_callback=self.progress_callback,
+                context_strategy=self.context_strategy,
             )
         )
 
-        self.text_reader = TextReader(
+    @cached_property
+    def text_reader(self) -> TextReader:
+        """Text reader with contextual semantic chunking strategy."""
+        return TextReader(
             chunking_strategy=ContextualSemanticChunking(
-                chunk_size=settings.chunk_size,
-                similarity_threshold=0.5,
+                chunk_size=self.chunking.chunk_size,
+                similarity_threshold=self.chunking.similarity_threshold,
+                progress_callback=self.progress_callback,
+                context_strategy=self.context_strategy,
             )
         )
 
@@ -68,7 +156,7 @@ class ContextualAgnoKnowledgeBase:
         Args:
             path: Path to the PDF file.
         """
-        print(f"📄 Ingesting with context-enhanced semantic chunking: {path}")
+        logger.info(f"📄 Ingesting with context-enhanced semantic chunking: {path}")
         self.knowledge.insert(path=path, reader=self.pdf_reader)
 
     def ingest_text(self, path: str) -> None:
@@ -77,7 +165,7 @@ class ContextualAgnoKnowledgeBase:
         Args:
             path: Path to the text file.
         """
-        print(f"📄 Ingesting text with context-enhanced semantic chunking: {path}")
+        logger.info(f"📄 Ingesting text with context-enhanced semantic chunking: {path}")
         self.knowledge.insert(path=path, reader=self.text_reader)
 
     def ingest_directory(self, path: str) -> None:
@@ -86,9 +174,7 @@ class ContextualAgnoKnowledgeBase:
         Args:
             path: Path to the directory containing PDF files.
         """
-        print(
-            f"📚 Ingesting directory with context-enhanced semantic chunking: {path}"
-        )
+        logger.info(f"📚 Ingesting directory with context-enhanced semantic chunking: {path}")
         self.knowledge.insert(path=path, reader=self.pdf_reader)
 
     def search(self, query: str, limit: int = 5) -> Any:
@@ -0,0 +1,535 @@
+"""Online re-embedding of a knowledge base table with another embedding model.
+
+A migration never chunks or generates contexts again: the chunks already
+stored (contexts included) are copied to a shadow table and embedded with
+the new model. Each step can be rerun after a crash or a stop:
+
+1. ``start`` creates the shadow table and records it in the registry.
+2. ``backfill`` copies, in throttled batches, the rows missing from the
+   shadow table or changed since they were copied, then deletes the rows
+   no longer in the active table. Queries and ingestion keep using the
+   active table meanwhile.
+3. ``switch`` builds the shadow table's indexes, then blocks writes to the
+   active table (reads continue), copies the last rows and points the
+   registry at the shadow table in the same transaction.
+4. ``rollback`` switches back to the previous table the same way, after
+   embedding with the previous model what was ingested since the switch.
+5. ``finalize`` drops the previous table once a rollback isn't needed.
+
+Serving processes pick up a switch within
+``settings.embedding_registry_refresh`` seconds; searches started before it
+finish on the old table, which is only dropped by ``finalize``.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
+from typing import Any
+
+from agno.knowledge.embedder.google import GeminiEmbedder
+from agno.vectordb.pgvector import PgVector, SearchType
+from sqlalchemy import delete, exists, func, inspect, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+
+from src.config import settings
+from src.ingestion.jobs import JobStatus, ingestion_jobs
+from src.logger import logger
+from src.rag.agno.embedding_registry import (
+    EmbeddingRegistry,
+    EmbeddingTarget,
+    RegistryEntry,
+    get_embedding_registry,
+    make_embedder,
+    shadow_table_name,
+)
+from src.usage import estimate_tokens, get_usage_ledger, usage_scope
+
+# Columns written by the migration itself rather than copied
+EMBEDDING_COLUMNS = ("embedding", "usage")
+
+
+class EmbeddingMigrationError(Exception):
+    """Raised when a migration step can't run in the table's current state."""
+
+
+@dataclass
+class SyncState:
+    """How far a destination table is behind its source.
+
+    Attributes:
+        source_rows: Rows in the source table.
+        destination_rows: Rows in the destination table.
+        pending: Source rows missing from the destination or changed since
+            they were copied.
+        stale: Destination rows deleted from the source since.
+    """
+
+    source_rows: int
+    destination_rows: int
+    pending: int
+    stale: int
+
+
+class EmbeddingMigration:
+    """Re-embeds a logical table's stored chunks into another embedding target.
+
+    Attributes:
+        table_name: Logical table name.
+        registry: Embedding registry holding the table's targets.
+        batch_size: Rows embedded and written per transaction.
+        rows_per_second: Maximum rows embedded per second (0 = unthrottled).
+        concurrency: Embedding requests in flight at once.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        registry: EmbeddingRegistry | None = None,
+        batch_size: int = 100,
+        rows_per_second: float = 20.0,
+        concurrency: int = 4,
+    ) -> None:
+        """Initialize the migration of a table.
+
+        Args:
+            table_name: Logical table name.
+            registry: Registry to use (defaults to the process-wide one).
+            batch_size: Rows embedded and written per transaction.
+            rows_per_second: Maximum rows embedded per second (0 = unthrottled).
+            concurrency: Embedding requests in flight at once.
+
+        Raises:
+            EmbeddingMigrationError: The knowledge base tables are sharded.
+        """
+        if settings.db_shard_urls:
+            raise EmbeddingMigrationError(
+                "Sharded knowledge base tables (DB_SHARD_URLS) cannot be migrated; "
+                "re-ingest into a new table instead"
+            )
+        self.table_name = table_name
+        self.registry = registry or get_embedding_registry()
+        self.registry.create()
+        self.engine = self.registry.engine
+        self.batch_size = batch_size
+        self.rows_per_second = rows_per_second
+        self.concurrency = concurrency
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Ask a running backfill to stop after its current batch."""
+        self._stop.set()
+
+    def _vector_db(self, target: EmbeddingTarget) -> PgVector:
+        """PgVector bound to a target's table, sharing the registry's engine."""
+        return PgVector(
+            table_name=target.table_name,
+            db_engine=self.engine,
+            embedder=make_embedder(target),
+            search_type=SearchType.hybrid,
+        )
+
+    def _copied_columns(self, source: PgVector, destination: PgVector) -> list[str]:
+        """Columns copied as is (tables created by older agno versions may lack some)."""
+        existing = {
+            column["name"]
+            for column in inspect(self.engine).get_columns(
+                source.table_name, schema=source.schema
+            )
+        }
+        return [
+            column.name
+            for column in destination.table.columns
+            if column.name in existing and column.name not in EMBEDDING_COLUMNS
+        ]
+
+    @staticmethod
+    def _pending_rows(source: PgVector, destination: PgVector) -> tuple[Any, Any]:
+        """Join and condition selecting source rows the destination lacks."""
+        s, d = source.table, destination.table
+        joined = s.outerjoin(d, d.c.id == s.c.id)
+        condition = or_(d.c.id.is_(None), d.c.content.is_distinct_from(s.c.content))
+        return joined, condition
+
+    def _sync_state(
+        self, conn: Connection, source: PgVector, destination: PgVector
+    ) -> SyncState:
+        """Count the rows separating a destination table from its source."""
+        source_rows = conn.execute(select(func.count()).select_from(source.table)).scalar_one()
+        if not destination.table_exists():
+            return SyncState(source_rows, 0, source_rows, 0)
+
+        joined, condition = self._pending_rows(source, destination)
+        s, d = source.table, destination.table
+        return SyncState(
+            source_rows=source_rows,
+            destination_rows=conn.execute(select(func.count()).select_from(d)).scalar_one(),
+            pending=conn.execute(
+                select(func.count()).select_from(joined).where(condition)
+            ).scalar_one(),
+            stale=conn.execute(
+                select(func.count()).select_from(d).where(~exists().where(s.c.id == d.c.id))
+            ).scalar_one(),
+        )
+
+    def _embed(self, texts: list[str], embedder: GeminiEmbedder) -> list[list[float]]:
+        """Embed a batch of chunk texts, failing if any embedding is missing.
+
+        Raises:
+            EmbeddingMigrationError: The model returned no (or a wrongly
+                sized) embedding for some text.
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            embeddings = list(executor.map(embedder.get_embedding, texts))
+        get_usage_ledger().record(
+            "embedding",
+            "document_embedding",
+            embedder.id,
+            sum(estimate_tokens(chunk) for chunk in texts),
+            seconds=time.perf_counter() - start,
+            estimated=True,
+        )
+
+        failed = sum(1 for embedding in embeddings if len(embedding) != embedder.dimensions)
+        if failed:
+            raise EmbeddingMigrationError(
+                f"{failed} of {len(texts)} embeddings from {embedder.id} failed"
+            )
+        return embeddings
+
+    def _copy_batch(
+        self,
+        conn: Connection,
+        source: PgVector,
+        destination: PgVector,
+        embedder: GeminiEmbedder,
+        columns: list[str],
+    ) -> int:
+        """Copy and embed one batch of pending rows; return the rows copied."""
+        joined, condition = self._pending_rows(source, destination)
+        rows = (
+            conn.execute(
+                select(*(source.table.c[name] for name in columns))
+                .select_from(joined)
+                .where(condition)
+                .order_by(source.table.c.id)
+                .limit(self.batch_size)
+            )
+            .mappings()
+            .all()
+        )
+        if not rows:
+            return 0
+
+        embeddings = self._embed([row["content"] for row in rows], embedder)
+        statement = insert(destination.table).values(
+            [{**row, "embedding": embedding} for row, embedding in zip(rows, embeddings)]
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[destination.table.c.id],
+            set_={
+                name: statement.excluded[name]
+                for name in (*columns, "embedding")
+                if name != "id"
+            },
+        )
+        conn.execute(statement)
+        return len(rows)
+
+    @staticmethod
+    def _delete_stale(conn: Connection, source: PgVector, destination: PgVector) -> int:
+        """Delete destination rows no longer in the source; return how many."""
+        s, d = source.table, destination.table
+        return conn.execute(delete(d).where(~exists().where(s.c.id == d.c.id))).rowcount
+
+    def _sync(
+        self, source_target: EmbeddingTarget, destination_target: EmbeddingTarget
+    ) -> int:
+        """Bring a destination table up to date with its source, batch by batch.
+
+        Stops early (leaving the rest for the next run) when ``stop`` is
+        called or today's ingestion token budget is spent.
+
+        Returns:
+            Rows copied.
+        """
+        source = self._vector_db(source_target)
+        destination = self._vector_db(destination_target)
+        destination.create()
+        embedder = make_embedder(destination_target)
+        columns = self._copied_columns(source, destination)
+
+        copied = 0
+        with usage_scope(job_id=f"embedding-migration:{self.table_name}"):
+            while not self._stop.is_set():
+                if get_usage_ledger().ingest_budget_exceeded():
+                    logger.warning(
+                        f"Ingestion token budget spent, pausing re-embedding | "
+                        f"table={self.table_name} copied={copied}"
+                    )
+                    return copied
+
+                start = time.perf_counter()
+                with self.engine.begin() as conn:
+                    count = self._copy_batch(conn, source, destination, embedder, columns)
+                if count == 0:
+                    break
+                copied += count
+                logger.info(
+                    f"Re-embedded batch | table={self.table_name} "
+                    f"to={destination_target.table_name} rows={count} total={copied}"
+                )
+                if self.rows_per_second > 0:
+                    elapsed = time.perf_counter() - start
+                    self._stop.wait(max(0.0, count / self.rows_per_second - elapsed))
+
+        with self.engine.begin() as conn:
+            deleted = self._delete_stale(conn, source, destination)
+        if deleted:
+            logger.info(
+                f"Deleted rows removed from the source | table={self.table_name} "
+                f"to={destination_target.table_name} rows={deleted}"
+            )
+        return copied
+
+    def _require_ingestion_idle(self, conn: Connection) -> None:
+        """Fail if an ingestion job is writing to the table.
+
+        Locks the job table until the switch commits, so jobs claimed
+        afterwards resolve the new target.
+
+        Raises:
+            EmbeddingMigrationError: A job on the table is running.
+        """
+        if not inspect(conn).has_table(ingestion_jobs.name):
+            return
+        conn.execute(text(f"LOCK TABLE {ingestion_jobs.name} IN SHARE ROW EXCLUSIVE MODE"))
+        running = conn.execute(
+            select(func.count())
+            .select_from(ingestion_jobs)
+            .where(
+                ingestion_jobs.c.table_name == self.table_name,
+                ingestion_jobs.c.status == JobStatus.RUNNING,
+            )
+        ).scalar_one()
+        if running:
+            raise EmbeddingMigrationError(
+                f"{running} ingestion job(s) are writing to {self.table_name}; "
+                "switch once they finish"
+            )
+
+    def _cut_over(self, current: EmbeddingTarget, new_entry: RegistryEntry) -> RegistryEntry:
+        """Catch the new active table up with the current one and switch reads to it.
+
+        Raises:
+            EmbeddingMigrationError: The backfill was stopped, the registry
+                changed meanwhile, ingestion is running on the table or too
+                many rows changed while catching up.
+        """
+        target = new_entry.active
+        self._sync(current, target)
+        if self._stop.is_set():
+            raise EmbeddingMigrationError("Stopped before switching")
+
+        source, destination = self._vector_db(current), self._vector_db(target)
+        # Build the vector and full-text indexes before the table takes traffic
+        destination.optimize()
+        embedder = make_embedder(target)
+        columns = self._copied_columns(source, destination)
+
+        with (
+            usage_scope(job_id=f"embedding-migration:{self.table_name}"),
+            self.engine.begin() as conn,
+        ):
+            entry = self.registry.get(self.table_name, conn, for_update=True)
+            if entry.active != current:
+                raise EmbeddingMigrationError(
+                    f"{self.table_name} switched to {entry.active} meanwhile"
+                )
+            # Searches keep reading; writers wait until the switch commits
+            conn.execute(
+                text(
+                    f'LOCK TABLE "{source.schema}"."{source.table_name}" '
+                    "IN SHARE ROW EXCLUSIVE MODE"
+                )
+            )
+            self._require_ingestion_idle(conn)
+
+            state = self._sync_state(conn, source, destination)
+            if state.pending > self.batch_size:
+                raise EmbeddingMigrationError(
+                    f"{state.pending} rows changed since the backfill; run it again"
+                )
+            while self._copy_batch(conn, source, destination, embedder, columns):
+                pass
+            self._delete_stale(conn, source, destination)
+            self.registry.save(new_entry, conn)
+
+        logger.info(
+            f"Embedding target switched | table={self.table_name} "
+            f"from={current} to={target}"
+        )
+        return new_entry
+
+    def start(self, model: str, dimensions: int) -> RegistryEntry:
+        """Create the shadow table for a new embedding model.
+
+        Args:
+            model: Gemini embedding model identifier.
+            dimensions: Vector size.
+
+        Returns:
+            The table's registry state with the shadow target.
+
+        Raises:
+            EmbeddingMigrationError: The table already uses the model, another
+                migration is in progress, the previous table still awaits
+                ``finalize`` or the table doesn't exist.
+        """
+        entry = self.registry.get(self.table_name)
+        if (entry.active.model, entry.active.dimensions) == (model, dimensions):
+            raise EmbeddingMigrationError(f"{self.table_name} is already served by {entry.active}")
+
+        target = EmbeddingTarget(
+            shadow_table_name(self.table_name, model, dimensions), model, dimensions
+        )
+        if entry.shadow is not None and entry.shadow != target:
+            raise EmbeddingMigrationError(
+                f"A migration to {entry.shadow} is in progress; abort it first"
+            )
+        if entry.previous is not None:
+            raise EmbeddingMigrationError(
+                f"Finalize (drop {entry.previous}) or roll back the last switch first"
+            )
+        if not self._vector_db(entry.active).table_exists():
+            raise EmbeddingMigrationError(f"Table {entry.active.table_name} doesn't exist")
+
+        self._vector_db(target).create()
+        entry = replace(entry, shadow=target)
+        self.registry.save(entry)
+        logger.info(f"Embedding migration started | table={self.table_name} to={target}")
+        return entry
+
+    def backfill(self) -> int:
+        """Copy and re-embed the rows the shadow table lacks.
+
+        Returns:
+            Rows copied.
+
+        Raises:
+            EmbeddingMigrationError: No migration is in progress.
+        """
+        entry = self.registry.get(self.table_name)
+        if entry.shadow is None:
+            raise EmbeddingMigrationError(f"No migration in progress for {self.table_name}")
+        return self._sync(entry.active, entry.shadow)
+
+    def switch(self) -> RegistryEntry:
+        """Serve the table from the shadow table, keeping the old one for rollback.
+
+        Returns:
+            The table's new registry state.
+
+        Raises:
+            EmbeddingMigrationError: No migration is in progress, or the
+                switch can't run yet (see ``_cut_over``).
+        """
+        entry = self.registry.get(self.table_name)
+        if entry.shadow is None:
+            raise EmbeddingMigrationError(f"No migration in progress for {self.table_name}")
+        return self._cut_over(
+            entry.active, RegistryEntry(self.table_name, active=entry.shadow, previous=entry.active)
+        )
+
+    def rollback(self) -> RegistryEntry:
+        """Serve the table from the previous table again.
+
+        Rows ingested since the switch are embedded with the previous model
+        first, so nothing is lost. The rolled back table becomes the previous
+        one, so the switch can be redone.
+
+        Returns:
+            The table's new registry state.
+
+        Raises:
+            EmbeddingMigrationError: There is nothing to roll back to, a
+                migration is in progress, or the switch back can't run yet.
+        """
+        entry = self.registry.get(self.table_name)
+        if entry.previous is None:
+            raise EmbeddingMigrationError(f"{self.table_name} has no previous table")
+        if entry.shadow is not None:
+            raise EmbeddingMigrationError(
+                f"A migration to {entry.shadow} is in progress; abort it first"
+            )
+        return self._cut_over(
+            entry.active,
+            RegistryEntry(self.table_name, active=entry.previous, previous=entry.active),
+        )
+
+    def abort(self) -> RegistryEntry:
+        """Drop the shadow table of a migration that hasn't switched.
+
+        Returns:
+            The table's new registry state.
+
+        Raises:
+            EmbeddingMigrationError: No migration is in progress.
+        """
+        entry = self.registry.get(self.table_name)
+        if entry.shadow is None:
+            raise EmbeddingMigrationError(f"No migration in progress for {self.table_name}")
+        self.registry.save(replace(entry, shadow=None))
+        self._vector_db(entry.shadow).drop()
+        logger.info(f"Embedding migration aborted | table={self.table_name} to={entry.shadow}")
+        return replace(entry, shadow=None)
+
+    def finalize(self) -> RegistryEntry:
+        """Drop the previous table, giving up the possibility of a rollback.
+
+        Returns:
+            The table's new registry state.
+
+        Raises:
+            EmbeddingMigrationError: There is no previous table, or serving
+                processes may still be reading it.
+        """
+        entry = self.registry.get(self.table_name)
+        if entry.previous is None:
+            raise EmbeddingMigrationError(f"{self.table_name} has no previous table")
+        if entry.updated_at is not None:
+            age = (datetime.now(timezone.utc) - entry.updated_at).total_seconds()
+            if age < settings.embedding_registry_refresh:
+                raise EmbeddingMigrationError(
+                    f"Switched {age:.0f}s ago; serving processes may still read "
+                    f"{entry.previous.table_name} for up to "
+                    f"{settings.embedding_registry_refresh:.0f}s"
+                )
+
+        self.registry.save(replace(entry, previous=None))
+        self._vector_db(entry.previous).drop()
+        logger.info(f"Previous embedding table dropped | table={self.table_name} {entry.previous}")
+        return replace(entry, previous=None)
+
+    def status(self) -> dict[str, Any]:
+        """Return the registry state and how far the shadow/previous tables lag.
+
+        Returns:
+            ``RegistryEntry.as_dict()`` plus ``shadow_sync`` (rows left to
+            backfill) and ``previous_sync`` (rows a rollback would re-embed)
+            when those tables exist.
+        """
+        entry = self.registry.get(self.table_name)
+        result = entry.as_dict()
+        source = self._vector_db(entry.active)
+        if not source.table_exists():
+            return result
+
+        with self.engine.connect() as conn:
+            for key, target in (("shadow_sync", entry.shadow), ("previous_sync", entry.previous)):
+                if target is not None:
+                    result[key] = asdict(self._sync_state(conn, source, self._vector_db(target)))
+        return result
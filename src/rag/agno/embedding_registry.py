@@ -0,0 +1,295 @@
+"""Embedding model and physical table serving each knowledge base table.
+
+Knowledge bases are addressed by a logical table name (the one the API,
+jobs and scripts use). The ``embedding_registry`` table maps it to the
+PgVector table actually holding the vectors and the model and dimensions
+they were embedded with, so a table can be re-embedded with another model
+(see ``src.rag.agno.embedding_migration``) without renaming anything.
+
+The registry lives in the database holding the vectors; the migration
+creates it there. Tables without a registry row (or in databases without
+the registry table) are served from the table of the same name with
+``settings.embedding_model`` and ``settings.embedding_dimensions``.
+"""
+
+import hashlib
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from agno.knowledge.embedder.base import Embedder
+from agno.knowledge.embedder.google import GeminiEmbedder
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import ProgrammingError
+
+from src.config import settings
+
+# Postgres truncates identifiers longer than this
+MAX_TABLE_NAME_LENGTH = 63
+
+# SQLSTATE of queries on a missing table
+UNDEFINED_TABLE = "42P01"
+
+metadata = MetaData()
+
+embedding_registry = Table(
+    "embedding_registry",
+    metadata,
+    Column("table_name", String(255), primary_key=True),
+    Column("active_table", String(255), nullable=False),
+    Column("active_model", String(255), nullable=False),
+    Column("active_dimensions", Integer, nullable=False),
+    Column("previous_table", String(255)),
+    Column("previous_model", String(255)),
+    Column("previous_dimensions", Integer),
+    Column("shadow_table", String(255)),
+    Column("shadow_model", String(255)),
+    Column("shadow_dimensions", Integer),
+    Column("updated_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+)
+
+
+@dataclass(frozen=True)
+class EmbeddingTarget:
+    """Physical table and the embedding model its vectors come from.
+
+    Attributes:
+        table_name: PgVector table holding the vectors.
+        model: Gemini embedding model identifier.
+        dimensions: Vector size.
+    """
+
+    table_name: str
+    model: str
+    dimensions: int
+
+    def __str__(self) -> str:
+        """Readable form for logs and status output."""
+        return f"{self.table_name} ({self.model}, {self.dimensions}d)"
+
+
+def default_target(table_name: str) -> EmbeddingTarget:
+    """Return the target of an unregistered table (the settings' model)."""
+    return EmbeddingTarget(table_name, settings.embedding_model, settings.embedding_dimensions)
+
+
+def embedder_target(table_name: str, embedder: Embedder) -> EmbeddingTarget:
+    """Return the target of a table used as is with a given embedder."""
+    model = getattr(embedder, "id", None) or type(embedder).__name__
+    return EmbeddingTarget(table_name, model, embedder.dimensions or 0)
+
+
+def shadow_table_name(table_name: str, model: str, dimensions: int) -> str:
+    """Name the table holding a table's vectors from another model.
+
+    Args:
+        table_name: Logical table name.
+        model: Embedding model identifier.
+        dimensions: Vector size.
+
+    Returns:
+        ``<table>__<model>_<dimensions>``, shortened with a hash suffix when
+        longer than Postgres allows.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "_", model.rsplit("/", 1)[-1].lower()).strip("_")
+    name = f"{table_name}__{slug}_{dimensions}"
+    if len(name) > MAX_TABLE_NAME_LENGTH:
+        digest = hashlib.md5(name.encode()).hexdigest()[:8]
+        name = f"{name[: MAX_TABLE_NAME_LENGTH - 9]}_{digest}"
+    return name
+
+
+def make_embedder(
+    target: EmbeddingTarget, embedder_cls: type[GeminiEmbedder] = GeminiEmbedder
+) -> GeminiEmbedder:
+    """Build the Gemini embedder matching a target's vectors.
+
+    Args:
+        target: Target whose model and dimensions to use.
+        embedder_cls: ``GeminiEmbedder`` or a subclass (e.g. the coalescing one).
+
+    Returns:
+        Embedder instance.
+    """
+    return embedder_cls(
+        id=target.model, api_key=settings.google_api_key, dimensions=target.dimensions
+    )
+
+
+@dataclass(frozen=True)
+class RegistryEntry:
+    """Registry state of a logical table.
+
+    Attributes:
+        table_name: Logical table name.
+        active: Target serving reads and new ingestion.
+        previous: Target served before the last switch, kept for rollback.
+        shadow: Target being backfilled by a migration in progress.
+        updated_at: Last change (None for unregistered tables).
+    """
+
+    table_name: str
+    active: EmbeddingTarget
+    previous: EmbeddingTarget | None = None
+    shadow: EmbeddingTarget | None = None
+    updated_at: datetime | None = None
+
+    @staticmethod
+    def _target(row: Any, prefix: str) -> EmbeddingTarget | None:
+        """Read one of the row's (table, model, dimensions) column groups."""
+        table_name = getattr(row, f"{prefix}_table")
+        if table_name is None:
+            return None
+        return EmbeddingTarget(
+            table_name, getattr(row, f"{prefix}_model"), getattr(row, f"{prefix}_dimensions")
+        )
+
+    @classmethod
+    def from_row(cls, row: Any) -> "RegistryEntry":
+        """Build an entry from a database row."""
+        return cls(
+            table_name=row.table_name,
+            active=cls._target(row, "active"),
+            previous=cls._target(row, "previous"),
+            shadow=cls._target(row, "shadow"),
+            updated_at=row.updated_at,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the entry as a JSON-serializable dict."""
+        return {
+            "table_name": self.table_name,
+            "active": str(self.active),
+            "previous": str(self.previous) if self.previous else None,
+            "shadow": str(self.shadow) if self.shadow else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+def _columns(prefix: str, target: EmbeddingTarget | None) -> dict[str, Any]:
+    """Column values storing a target under a prefix (all None to clear it)."""
+    return {
+        f"{prefix}_table": target.table_name if target else None,
+        f"{prefix}_model": target.model if target else None,
+        f"{prefix}_dimensions": target.dimensions if target else None,
+    }
+
+
+class EmbeddingRegistry:
+    """Postgres-backed map from logical tables to their embedding targets.
+
+    Writes go through ``save``, which callers run inside their own
+    transaction when the change must be atomic with other statements
+    (e.g. the final catch-up of a migration switch). The registry table is
+    only created by ``create`` (run by migrations); lookups in a database
+    without it return the default targets.
+    """
+
+    def __init__(self, db_url: str | None = None, engine: Engine | None = None) -> None:
+        """Initialize the registry.
+
+        Args:
+            db_url: PostgreSQL connection string (defaults to ``settings.db_url``).
+            engine: Existing SQLAlchemy engine to use instead of ``db_url``.
+        """
+        self.engine = engine or create_engine(
+            db_url or settings.db_url, pool_pre_ping=True
+        )
+
+    def create(self) -> None:
+        """Create the registry table if needed."""
+        metadata.create_all(self.engine, tables=[embedding_registry], checkfirst=True)
+
+    def get(
+        self, table_name: str, conn: Connection | None = None, for_update: bool = False
+    ) -> RegistryEntry:
+        """Return a table's registry state.
+
+        Args:
+            table_name: Logical table name.
+            conn: Connection (and transaction) to read with; a new one if None.
+            for_update: Lock the row until ``conn``'s transaction ends.
+
+        Returns:
+            The stored entry, or the default one for unregistered tables.
+        """
+        statement = select(embedding_registry).where(
+            embedding_registry.c.table_name == table_name
+        )
+        if for_update:
+            statement = statement.with_for_update()
+        if conn is None:
+            try:
+                with self.engine.connect() as conn:
+                    row = conn.execute(statement).one_or_none()
+            except ProgrammingError as e:
+                # No migration ever ran against this database
+                if getattr(e.orig, "sqlstate", None) != UNDEFINED_TABLE:
+                    raise
+                row = None
+        else:
+            row = conn.execute(statement).one_or_none()
+        return RegistryEntry.from_row(row) if row else RegistryEntry(
+            table_name, default_target(table_name)
+        )
+
+    def resolve(self, table_name: str) -> EmbeddingTarget:
+        """Return the target serving a table."""
+        return self.get(table_name).active
+
+    def save(self, entry: RegistryEntry, conn: Connection | None = None) -> None:
+        """Store a table's registry state.
+
+        Args:
+            entry: New state.
+            conn: Connection (and transaction) to write with; a new one if None.
+        """
+        values = {
+            **_columns("active", entry.active),
+            **_columns("previous", entry.previous),
+            **_columns("shadow", entry.shadow),
+            "updated_at": func.now(),
+        }
+        statement = insert(embedding_registry).values(table_name=entry.table_name, **values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[embedding_registry.c.table_name], set_=values
+        )
+        if conn is None:
+            with self.engine.begin() as conn:
+                conn.execute(statement)
+        else:
+            conn.execute(statement)
+
+
+_registries: dict[str, EmbeddingRegistry] = {}
+_registry_lock = threading.Lock()
+
+
+def get_embedding_registry(db_url: str | None = None) -> EmbeddingRegistry:
+    """Return the process-wide registry of a database, creating it on first use.
+
+    Args:
+        db_url: Database holding the vectors (defaults to ``settings.db_url``).
+    """
+    db_url = db_url or settings.db_url
+    registry = _registries.get(db_url)
+    if registry is None:
+        with _registry_lock:
+            registry = _registries.get(db_url)
+            if registry is None:
+                registry = _registries[db_url] = EmbeddingRegistry(db_url)
+    return registry
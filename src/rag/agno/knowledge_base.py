@@ -1,14 +1,22 @@
 """Agno Knowledge Base with PgVector and semantic chunking."""
 
+from functools import cached_property
 from typing import Any
 
-from agno.knowledge.embedder.google import GeminiEmbedder
+from agno.knowledge.embedder.base import Embedder
 from agno.knowledge.knowledge import Knowledge
 from agno.knowledge.reader.pdf_reader import PDFReader
-from agno.vectordb.pgvector import PgVector, SearchType
-
-from src.config import settings
+from agno.vectordb.pgvector import HNSW, Ivfflat, SearchType
+
+from src.rag.agno.embedding_registry import (
+    default_target,
+    embedder_target,
+    get_embedding_registry,
+    make_embedder,
+)
+from src.rag.agno.sharding import knowledge_vector_db, shard_urls_for
 from src.rag.agno.simple_chunking import SimpleSemanticChunking
+from src.rag.chunking_params import chunking_params_for
 
 
 class AgnoKnowledgeBase:
@@ -18,36 +26,76 @@ class AgnoKnowledgeBase:
     using semantic chunking and hybrid search (vector + full-text).
 
     Attributes:
-        embedder: Gemini embedder for vector representations.
-        knowledge: Agno Knowledge instance with PgVector backend.
-        pdf_reader: PDF reader with semantic chunking strategy.
+        embedder: Embedder for vector representations (Gemini by default).
+        embedding_target: Physical table and embedding model serving the table.
+        embedding_registry: Registry the target was resolved from (None for
+            tables used as is: custom embedder or sharded table).
+        knowledge: Agno Knowledge instance with PgVector backend (sharded when
+            shard URLs are configured).
+        chunking: Chunking parameters of the table (tuned or from settings).
+        pdf_reader: PDF reader with semantic chunking strategy (built on
+            first use, so search-only instances skip the chunker).
     """
 
-    def __init__(self, table_name: str = "economics_docs_agno") -> None:
+    def __init__(
+        self,
+        table_name: str = "economics_docs_agno",
+        embedder: Embedder | None = None,
+        db_url: str | None = None,
+        search_type: SearchType = SearchType.hybrid,
+        vector_index: HNSW | Ivfflat | None = None,
+        shard_urls: list[str] | None = None,
+    ) -> None:
         """Initialize Agno Knowledge Base.
 
         Args:
-            table_name: PostgreSQL table name for document storage.
+            table_name: PostgreSQL table name for document storage. Tables
+                re-embedded with another model are resolved through the
+                embedding registry of the table's database (sharded tables
+                can't be re-embedded and always use the settings' model).
+            embedder: Embedder to use instead of Gemini (e.g. for benchmarks);
+                the table is then used as is, without the registry.
+            db_url: PostgreSQL connection string (defaults to ``settings.db_url``).
+            search_type: PgVector search type.
+            vector_index: PgVector index settings (PgVector's default when omitted).
+            shard_urls: Databases to spread the table over (defaults to
+                ``settings.db_shard_urls`` unless ``db_url`` is given).
         """
-        self.embedder = GeminiEmbedder(
-            id=settings.embedding_model,
-            api_key=settings.google_api_key,
-            dimensions=768,
+        self.chunking = chunking_params_for(table_name)
+        shard_urls = shard_urls_for(db_url, shard_urls)
+        self.embedding_registry = (
+            get_embedding_registry(db_url) if embedder is None and not shard_urls else None
         )
+        if embedder is not None:
+            self.embedding_target = embedder_target(table_name, embedder)
+            self.embedder = embedder
+        else:
+            self.embedding_target = (
+                self.embedding_registry.resolve(table_name)
+                if self.embedding_registry is not None
+                else default_target(table_name)
+            )
+            self.embedder = make_embedder(self.embedding_target)
 
+        index_kwargs = {"vector_index": vector_index} if vector_index is not None else {}
         self.knowledge = Knowledge(
-            vector_db=PgVector(
-                table_name=table_name,
-                db_url=settings.db_url,
-                search_type=SearchType.hybrid,
-                embedder=self.embedder,
+            vector_db=knowledge_vector_db(
+                self.embedding_target.table_name,
+                self.embedder,
+                db_url=db_url,
+                shard_urls=shard_urls,
+                search_type=search_type,
+                **index_kwargs,
             )
         )
 
-        self.pdf_reader = PDFReader(
+    @cached_property
+    def pdf_reader(self) -> PDFReader:
+        """PDF reader with semantic chunking strategy."""
+        return PDFReader(
             chunking_strategy=SimpleSemanticChunking(
-                chunk_size=settings.chunk_size,
-                similarity_threshold=0.5,
+                chunk_size=self.chunking.chunk_size,
+                similarity_threshold=self.chunking.similarity_threshold,
             )
         )
 
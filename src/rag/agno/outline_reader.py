@@ -0,0 +1,58 @@
+"""PDF reader that gives the chunker each page's place in the document outline."""
+
+from contextvars import ContextVar
+from pathlib import Path
+from typing import IO, Any, List, Optional, Union
+
+from agno.knowledge.document import Document
+from agno.knowledge.reader.pdf_reader import PDFReader
+
+from src.rag.extractive_context import DocumentOutline, page_outline, read_pdf_outline
+
+_outline: ContextVar[DocumentOutline | None] = ContextVar("pdf_outline", default=None)
+
+
+class OutlinePDFReader(PDFReader):
+    """``PDFReader`` for extractive contexts.
+
+    Reads the PDF's title and headings (bookmarks or font sizes) with
+    PyMuPDF before the pages are extracted, then chunks each page inside
+    ``page_outline``, so the chunking strategy knows the section path the
+    page starts in and the headings on it.
+    """
+
+    def read(
+        self,
+        pdf: Optional[Union[str, Path, IO[Any]]] = None,
+        name: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> List[Document]:
+        token = _outline.set(read_pdf_outline(pdf) if pdf is not None else None)
+        try:
+            return super().read(pdf, name=name, password=password)
+        finally:
+            _outline.reset(token)
+
+    async def async_read(
+        self,
+        pdf: Optional[Union[str, Path, IO[Any]]] = None,
+        name: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> List[Document]:
+        token = _outline.set(read_pdf_outline(pdf) if pdf is not None else None)
+        try:
+            return await super().async_read(pdf, name=name, password=password)
+        finally:
+            _outline.reset(token)
+
+    def _build_chunked_documents(self, documents: List[Document]) -> List[Document]:
+        outline = _outline.get()
+        if outline is None or not self.split_on_pages:
+            return super()._build_chunked_documents(documents)
+
+        # One document per page, in page order
+        chunked_documents: List[Document] = []
+        for index, document in enumerate(documents):
+            with page_outline(outline.page(index)):
+                chunked_documents.extend(self.chunk_document(document))
+        return chunked_documents
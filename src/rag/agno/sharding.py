@@ -0,0 +1,662 @@
+"""PgVector tables partitioned across several Postgres instances.
+
+Every shard holds the same table in its own database. Ingested chunks are
+written to one shard, picked by hashing the document's content hash
+(``document`` partitioning: a document's chunks stay together, so it is
+replaced or deleted on one shard) or each chunk's id (``chunk``: large
+documents are spread too, so an upsert also clears the document's old
+chunks from the shards that receive none of the new ones).
+
+Searches embed the query once, query every shard concurrently for the
+top ``limit`` results and merge them by the table's distance between the
+query embedding and each result's embedding (PgVector reports no score).
+Keyword searches have no query embedding and are merged by reciprocal
+rank fusion.
+
+Searches run on their own engine per shard, whose connections set
+``statement_timeout`` to ``settings.shard_search_timeout``: a shard that
+hangs frees its search thread instead of holding it past the timeout.
+Writes and index builds use another engine without that limit.
+
+A shard that fails or misses ``settings.shard_search_timeout``
+``settings.shard_failure_threshold`` times in a row is skipped by searches,
+which answer from the other shards, until ``settings.shard_retry_after``
+seconds passed and a search probes it again. Writes are never skipped:
+they fail when their shard does, and the ingestion job retries.
+
+The shard list is fixed for a table's lifetime: changing the number of
+shards moves documents to another home shard, so re-ingest into a new
+table instead.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from agno.knowledge.document import Document
+from agno.knowledge.embedder.base import Embedder
+from agno.vectordb.base import VectorDb
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector import PgVector, SearchType
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+
+from src.config import settings
+from src.logger import logger
+from src.metrics import SHARD_SEARCH_SECONDS
+from src.rag.shard_health import get_shard_health
+
+# Reciprocal rank fusion constant (the usual 60 from the original paper)
+RRF_K = 60
+
+# Threads running shard searches for all sharded tables of the process
+SEARCH_WORKERS = 32
+
+# Query embedding computed by the sharded search, reused by its shard searches
+_query_embedding: contextvars.ContextVar[tuple[str, List[float]] | None] = (
+    contextvars.ContextVar("shard_query_embedding", default=None)
+)
+
+# Database errors raised during the current shard search. PgVector logs and
+# swallows search errors (returning no results), so they are collected from
+# the engine's error events instead.
+_shard_errors: contextvars.ContextVar[list[BaseException] | None] = contextvars.ContextVar(
+    "shard_errors", default=None
+)
+
+
+def shard_name(db_url: str) -> str:
+    """Return a shard's label (host, port and database, no credentials)."""
+    url = make_url(db_url)
+    return f"{url.host or 'localhost'}:{url.port or 5432}/{url.database}"
+
+
+def shard_index(key: str, shards: int) -> int:
+    """Map a partition key to a shard, stably across processes and restarts."""
+    return int(hashlib.md5(key.encode()).hexdigest()[:16], 16) % shards
+
+
+_engines: dict[tuple[str, bool], Engine] = {}
+_shards_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+
+def _record_shard_error(context: Any) -> None:
+    """Engine ``handle_error`` hook: attribute the error to the running shard search."""
+    errors = _shard_errors.get()
+    if errors is not None:
+        errors.append(context.original_exception)
+
+
+def _shard_engine(db_url: str, search: bool = False) -> Engine:
+    """Return an engine of a shard, shared by every table stored on it.
+
+    Args:
+        db_url: Shard connection string.
+        search: Return the search engine, whose statements are cancelled
+            by the server after ``settings.shard_search_timeout``.
+    """
+    with _shards_lock:
+        if (db_url, search) not in _engines:
+            connect_args: dict[str, Any] = {
+                "connect_timeout": max(1, round(settings.shard_search_timeout))
+            }
+            if search:
+                timeout_ms = max(1, round(settings.shard_search_timeout * 1000))
+                connect_args["options"] = f"-c statement_timeout={timeout_ms}"
+            engine = create_engine(db_url, pool_pre_ping=True, connect_args=connect_args)
+            if search:
+                event.listen(engine, "handle_error", _record_shard_error)
+            _engines[(db_url, search)] = engine
+        return _engines[(db_url, search)]
+
+
+def _search_executor() -> ThreadPoolExecutor:
+    """Return the thread pool running synchronous shard searches."""
+    global _executor
+
+    with _shards_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=SEARCH_WORKERS, thread_name_prefix="shard-search"
+            )
+        return _executor
+
+
+@dataclass
+class ShardQueryEmbedder(Embedder):
+    """Embedder given to the shards' PgVector instances.
+
+    Query embeddings come from the sharded search that is running (one
+    embedding call per query instead of one per shard); everything else,
+    document embeddings included, is delegated to the wrapped embedder.
+    """
+
+    embedder: Optional[Embedder] = None
+
+    def __post_init__(self) -> None:
+        self.dimensions = self.embedder.dimensions
+        self.enable_batch = self.embedder.enable_batch
+        self.batch_size = self.embedder.batch_size
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "embedder":
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
+    @staticmethod
+    def _precomputed(text: str) -> List[float] | None:
+        """Return the running search's query embedding if it is for ``text``."""
+        precomputed = _query_embedding.get()
+        if precomputed is not None and precomputed[0] == text:
+            return list(precomputed[1])
+        return None
+
+    def get_embedding(self, text: str) -> List[float]:
+        precomputed = self._precomputed(text)
+        return precomputed if precomputed is not None else self.embedder.get_embedding(text)
+
+    def get_embedding_and_usage(self, text: str) -> Any:
+        return self.embedder.get_embedding_and_usage(text)
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        precomputed = self._precomputed(text)
+        if precomputed is not None:
+            return precomputed
+        return await self.embedder.async_get_embedding(text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Any:
+        return await self.embedder.async_get_embedding_and_usage(text)
+
+
+def similarity(a: Sequence[float], b: Sequence[float], distance: Distance) -> float:
+    """Score two embeddings by a PgVector distance metric (higher is closer)."""
+    dot = sum(x * y for x, y in zip(a, b))
+    if distance == Distance.max_inner_product:
+        return dot
+    if distance == Distance.l2:
+        return -math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
+    norms = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norms if norms else 0.0
+
+
+def merge_results(
+    results: List[List[Document]],
+    limit: int,
+    query_embedding: Sequence[float] | None = None,
+    distance: Distance = Distance.cosine,
+) -> List[Document]:
+    """Merge per-shard search results into one top-``limit`` list.
+
+    Args:
+        results: Each responding shard's results, best first.
+        limit: Maximum number of results.
+        query_embedding: Embedding of the query (none for keyword searches).
+        distance: Distance metric of the table.
+
+    Returns:
+        Results ordered by ``distance`` to the query embedding when it and
+        every result's embedding are known, else by reciprocal rank fusion
+        of the shard rankings.
+    """
+    documents = [doc for shard_results in results for doc in shard_results]
+    if query_embedding and all(doc.embedding for doc in documents):
+        ranked = sorted(
+            documents,
+            key=lambda doc: similarity(query_embedding, doc.embedding, distance),
+            reverse=True,
+        )
+    else:
+        scores: dict[int, float] = {}
+        for shard_results in results:
+            for rank, doc in enumerate(shard_results):
+                scores[id(doc)] = 1.0 / (RRF_K + rank + 1)
+        ranked = sorted(documents, key=lambda doc: scores[id(doc)], reverse=True)
+
+    merged, seen = [], set()
+    for doc in ranked:
+        key = doc.id or doc.content
+        if key not in seen:
+            seen.add(key)
+            merged.append(doc)
+    return merged[:limit]
+
+
+class ShardedPgVector(VectorDb):
+    """Agno vector database spreading one PgVector table over several databases.
+
+    Drop-in replacement for ``PgVector`` in ``Knowledge``: writes are routed
+    to each chunk's shard, searches are scattered to all shards and gathered.
+
+    Attributes:
+        table_name: Table name on every shard.
+        embedder: Embedder of the table (query and document embeddings).
+        search_type: PgVector search type.
+        partition: "document" or "chunk" partitioning.
+        search_timeout: Seconds a search waits for each shard.
+        shards: One PgVector per shard database, used for writes.
+        search_shards: The same tables on the shards' search engines.
+        health: Health tracker of each shard (same order as ``shards``).
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        db_urls: List[str],
+        embedder: Embedder,
+        search_type: SearchType = SearchType.hybrid,
+        partition: str | None = None,
+        search_timeout: float | None = None,
+        **pgvector_kwargs: Any,
+    ) -> None:
+        """Initialize the sharded table.
+
+        Args:
+            table_name: Table name on every shard.
+            db_urls: PostgreSQL connection strings, one per shard.
+            embedder: Embedder of the table.
+            search_type: PgVector search type.
+            partition: "document" or "chunk" (defaults to ``settings.shard_partition``).
+            search_timeout: Seconds a search waits for each shard (defaults
+                to ``settings.shard_search_timeout``).
+            **pgvector_kwargs: Extra ``PgVector`` arguments (e.g. ``vector_index``).
+
+        Raises:
+            ValueError: No shard URLs or an unknown partitioning.
+        """
+        if not db_urls:
+            raise ValueError("ShardedPgVector needs at least one database URL")
+        partition = partition or settings.shard_partition
+        if partition not in ("document", "chunk"):
+            raise ValueError(f"Unknown shard partitioning: {partition}")
+
+        super().__init__(name=f"{table_name}_sharded")
+        self.table_name = table_name
+        self.embedder = embedder
+        self.search_type = search_type
+        self.partition = partition
+        self.search_timeout = search_timeout or settings.shard_search_timeout
+
+        shard_embedder = ShardQueryEmbedder(embedder=embedder)
+
+        def shard_table(db_url: str, search: bool) -> PgVector:
+            return PgVector(
+                table_name=table_name,
+                db_engine=_shard_engine(db_url, search=search),
+                embedder=shard_embedder,
+                search_type=search_type,
+                **pgvector_kwargs,
+            )
+
+        self.shards = [shard_table(db_url, search=False) for db_url in db_urls]
+        self.search_shards = [shard_table(db_url, search=True) for db_url in db_urls]
+        self.health = [get_shard_health(shard_name(db_url)) for db_url in db_urls]
+
+    # Routing
+
+    def _home_shard(self, content_hash: str) -> PgVector:
+        """Shard holding a document's chunks (document partitioning)."""
+        return self.shards[shard_index(content_hash, len(self.shards))]
+
+    def _shards_for(self, content_hash: str) -> List[PgVector]:
+        """Shards that may hold chunks of a document."""
+        return [self._home_shard(content_hash)] if self.partition == "document" else self.shards
+
+    def _route(
+        self, content_hash: str, documents: List[Document]
+    ) -> Dict[int, List[Document]]:
+        """Group a document's chunks by the index of the shard storing them."""
+        if self.partition == "document":
+            return {shard_index(content_hash, len(self.shards)): list(documents)}
+
+        groups: Dict[int, List[Document]] = {}
+        for doc in documents:
+            key = doc.id or hashlib.md5(doc.content.encode()).hexdigest()
+            groups.setdefault(shard_index(key, len(self.shards)), []).append(doc)
+        return groups
+
+    # Schema
+
+    def create(self) -> None:
+        for shard in self.shards:
+            shard.create()
+
+    async def async_create(self) -> None:
+        await asyncio.gather(*(shard.async_create() for shard in self.shards))
+
+    def drop(self) -> None:
+        for shard in self.shards:
+            shard.drop()
+
+    async def async_drop(self) -> None:
+        await asyncio.gather(*(shard.async_drop() for shard in self.shards))
+
+    def exists(self) -> bool:
+        return all(shard.exists() for shard in self.shards)
+
+    async def async_exists(self) -> bool:
+        return all(await asyncio.gather(*(shard.async_exists() for shard in self.shards)))
+
+    def optimize(self, **kwargs: Any) -> None:
+        for shard in self.shards:
+            shard.optimize(**kwargs)
+
+    def get_supported_search_types(self) -> List[str]:
+        return self.shards[0].get_supported_search_types()
+
+    # Lookups
+
+    def name_exists(self, name: str) -> bool:
+        return any(shard.name_exists(name) for shard in self.shards)
+
+    async def async_name_exists(self, name: str) -> bool:
+        return any(await asyncio.gather(*(shard.async_name_exists(name) for shard in self.shards)))
+
+    def id_exists(self, id: str) -> bool:
+        return any(shard.id_exists(id) for shard in self.shards)
+
+    def content_hash_exists(self, content_hash: str, **kwargs: Any) -> bool:
+        return any(
+            shard.content_hash_exists(content_hash, **kwargs)
+            for shard in self._shards_for(content_hash)
+        )
+
+    # Writes
+
+    def upsert_available(self) -> bool:
+        return True
+
+    def insert(
+        self,
+        content_hash: str,
+        documents: List[Document],
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        for index, group in self._route(content_hash, documents).items():
+            self.shards[index].insert(content_hash, group, filters, **kwargs)
+
+    async def async_insert(
+        self,
+        content_hash: str,
+        documents: List[Document],
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        await asyncio.gather(
+            *(
+                self.shards[index].async_insert(content_hash, group, filters, **kwargs)
+                for index, group in self._route(content_hash, documents).items()
+            )
+        )
+
+    def _upsert_groups(
+        self, content_hash: str, documents: List[Document]
+    ) -> Dict[int, List[Document]]:
+        """Group a document's chunks for an upsert.
+
+        With chunk partitioning every shard is included, those receiving no
+        chunks with an empty group, so the upsert clears the document's old
+        chunks everywhere.
+        """
+        groups = self._route(content_hash, documents)
+        if self.partition == "chunk":
+            groups = {index: groups.get(index, []) for index in range(len(self.shards))}
+        return groups
+
+    def upsert(
+        self,
+        content_hash: str,
+        documents: List[Document],
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        for index, group in self._upsert_groups(content_hash, documents).items():
+            self.shards[index].upsert(content_hash, group, filters, **kwargs)
+
+    async def async_upsert(
+        self,
+        content_hash: str,
+        documents: List[Document],
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        await asyncio.gather(
+            *(
+                self.shards[index].async_upsert(content_hash, group, filters, **kwargs)
+                for index, group in self._upsert_groups(content_hash, documents).items()
+            )
+        )
+
+    def update_metadata(self, content_id: str, metadata: Dict[str, Any]) -> None:
+        for shard in self.shards:
+            shard.update_metadata(content_id, metadata)
+
+    def delete(self) -> bool:
+        return all([shard.delete() for shard in self.shards])
+
+    def delete_by_id(self, id: str) -> bool:
+        return any([shard.delete_by_id(id) for shard in self.shards])
+
+    def delete_by_name(self, name: str) -> bool:
+        return any([shard.delete_by_name(name) for shard in self.shards])
+
+    def delete_by_metadata(self, metadata: Dict[str, Any]) -> bool:
+        return any([shard.delete_by_metadata(metadata) for shard in self.shards])
+
+    def delete_by_content_id(self, content_id: str, **kwargs: Any) -> bool:
+        return any([shard.delete_by_content_id(content_id, **kwargs) for shard in self.shards])
+
+    # Search
+
+    def _search_shard(
+        self, index: int, query: str, limit: int, filters: Any, kwargs: dict
+    ) -> List[Document]:
+        """Search one shard, raising on database errors PgVector swallowed."""
+        errors: list[BaseException] = []
+        token = _shard_errors.set(errors)
+        try:
+            results = self.search_shards[index].search(query, limit, filters, **kwargs)
+        finally:
+            _shard_errors.reset(token)
+        if errors:
+            raise errors[0]
+        return results
+
+    async def _async_search_shard(
+        self, index: int, query: str, limit: int, filters: Any, kwargs: dict
+    ) -> List[Document]:
+        """Search one shard asynchronously, raising on swallowed database errors."""
+        # Runs in its own task, so the error list is this search's alone
+        errors: list[BaseException] = []
+        _shard_errors.set(errors)
+        results = await self.search_shards[index].async_search(query, limit, filters, **kwargs)
+        if errors:
+            raise errors[0]
+        return results
+
+    def _record(self, index: int, start: float, error: BaseException | None) -> None:
+        """Update a shard's health and metrics after a search."""
+        seconds = time.perf_counter() - start
+        health = self.health[index]
+        if error is None:
+            health.record_success(seconds)
+            SHARD_SEARCH_SECONDS.observe(seconds, shard=health.name, status="ok")
+            return
+        status = "timeout" if isinstance(error, TimeoutError) else "error"
+        lines = str(error).strip().splitlines()
+        reason = f"{status}: {lines[0]}" if lines else status
+        health.record_failure(reason)
+        SHARD_SEARCH_SECONDS.observe(seconds, shard=health.name, status=status)
+        logger.warning(
+            f"Shard search failed | shard={health.name} table={self.table_name} error={reason}"
+        )
+
+    def _available_shards(self) -> List[int]:
+        """Indexes of the shards a search should query."""
+        available = [index for index, health in enumerate(self.health) if health.should_search()]
+        if len(available) < len(self.shards):
+            logger.warning(
+                f"Searching without unhealthy shards | table={self.table_name} "
+                f"shards={len(available)}/{len(self.shards)}"
+            )
+        return available
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        filters: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Search every available shard concurrently and merge the results.
+
+        Args:
+            query: Search query string.
+            limit: Maximum number of results.
+            filters: Filters applied on every shard.
+            **kwargs: Extra ``PgVector.search`` arguments.
+
+        Returns:
+            Merged top results of the shards that answered in time.
+        """
+        token, embedding = None, None
+        if self.search_type != SearchType.keyword:
+            embedding = self.embedder.get_embedding(query)
+            if embedding:
+                token = _query_embedding.set((query, embedding))
+        try:
+            start = time.perf_counter()
+            executor = _search_executor()
+            futures = {
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._search_shard,
+                    index,
+                    query,
+                    limit,
+                    filters,
+                    kwargs,
+                ): index
+                for index in self._available_shards()
+            }
+        finally:
+            if token is not None:
+                _query_embedding.reset(token)
+
+        done, not_done = wait(futures, timeout=self.search_timeout)
+        results = []
+        for future in done:
+            error = future.exception()
+            self._record(futures[future], start, error)
+            if error is None:
+                results.append(future.result())
+        for future in not_done:
+            future.cancel()
+            self._record(futures[future], start, TimeoutError())
+        return merge_results(results, limit, embedding, self.shards[0].distance)
+
+    async def async_search(
+        self,
+        query: str,
+        limit: int = 5,
+        filters: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Search every available shard concurrently and merge the results.
+
+        Args:
+            query: Search query string.
+            limit: Maximum number of results.
+            filters: Filters applied on every shard.
+            **kwargs: Extra ``PgVector.async_search`` arguments.
+
+        Returns:
+            Merged top results of the shards that answered in time.
+        """
+        token, embedding = None, None
+        if self.search_type != SearchType.keyword:
+            embedding = await self.embedder.async_get_embedding(query)
+            if embedding:
+                token = _query_embedding.set((query, embedding))
+        try:
+            start = time.perf_counter()
+            indexes = self._available_shards()
+            # Tasks copy the context, query embedding included
+            outcomes = await asyncio.gather(
+                *(
+                    asyncio.wait_for(
+                        self._async_search_shard(index, query, limit, filters, kwargs),
+                        timeout=self.search_timeout,
+                    )
+                    for index in indexes
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            if token is not None:
+                _query_embedding.reset(token)
+
+        results = []
+        for index, outcome in zip(indexes, outcomes):
+            error = outcome if isinstance(outcome, BaseException) else None
+            self._record(index, start, error)
+            if error is None:
+                results.append(outcome)
+        return merge_results(results, limit, embedding, self.shards[0].distance)
+
+
+def shard_urls_for(db_url: str | None, shard_urls: List[str] | None) -> List[str]:
+    """Return the shards of a knowledge base table (empty when unsharded).
+
+    Args:
+        db_url: PostgreSQL connection string of an unsharded table.
+        shard_urls: Shard connection strings; defaults to
+            ``settings.db_shard_urls`` unless ``db_url`` is given.
+    """
+    if shard_urls is None and db_url is None:
+        return list(settings.db_shard_urls)
+    return list(shard_urls or [])
+
+
+def knowledge_vector_db(
+    table_name: str,
+    embedder: Embedder,
+    db_url: str | None = None,
+    shard_urls: List[str] | None = None,
+    search_type: SearchType = SearchType.hybrid,
+    **pgvector_kwargs: Any,
+) -> VectorDb:
+    """Build the vector database of a knowledge base table.
+
+    Args:
+        table_name: Physical table name.
+        embedder: Embedder of the table.
+        db_url: PostgreSQL connection string of an unsharded table.
+        shard_urls: Shard connection strings; defaults to
+            ``settings.db_shard_urls`` unless ``db_url`` is given.
+        search_type: PgVector search type.
+        **pgvector_kwargs: Extra ``PgVector`` arguments (e.g. ``vector_index``).
+
+    Returns:
+        ``ShardedPgVector`` when there are shard URLs, else ``PgVector``.
+    """
+    shard_urls = shard_urls_for(db_url, shard_urls)
+    if shard_urls:
+        return ShardedPgVector(
+            table_name, shard_urls, embedder, search_type=search_type, **pgvector_kwargs
+        )
+    return PgVector(
+        table_name=table_name,
+        db_url=db_url or settings.db_url,
+        search_type=search_type,
+        embedder=embedder,
+        **pgvector_kwargs,
+    )
+
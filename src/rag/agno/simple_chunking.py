@@ -3,8 +3,13 @@
 from agno.knowledge.chunking.strategy import ChunkingStrategy
 from agno.knowledge.document import Document
 from chonkie import SemanticChunker
+from chonkie.embeddings import BaseEmbeddings
 
 from src.config import settings
+from src.metrics import INGEST_BYTES, INGEST_CHUNKS, INGEST_STAGE_SECONDS
+from src.tracing import tracer
+
+CHUNKER_LABEL = "agno_semantic"
 
 
 class SimpleSemanticChunking(ChunkingStrategy):
@@ -14,15 +19,18 @@ class SimpleSemanticChunking(ChunkingStrategy):
         self,
         chunk_size: int = 1000,
         similarity_threshold: float = 0.5,
+        embedding_model: BaseEmbeddings | None = None,
     ) -> None:
         """Initialize simple semantic chunking strategy.
 
         Args:
             chunk_size: Maximum size for each chunk in characters.
             similarity_threshold: Threshold for semantic boundary detection (0-1).
+            embedding_model: Chonkie embeddings for boundary detection; defaults
+                to ``settings.semantic_chunking_model``.
         """
         self.semantic_chunker = SemanticChunker(
-            embedding_model=settings.semantic_chunking_model,
+            embedding_model=embedding_model or settings.semantic_chunking_model,
             chunk_size=chunk_size,
             threshold=similarity_threshold,
             api_key=settings.openai_api_key,
@@ -37,7 +45,14 @@ class SimpleSemanticChunking(ChunkingStrategy):
         Returns:
             List of semantically chunked documents.
         """
-        chonkie_chunks = self.semantic_chunker.chunk(document.content)
+        INGEST_BYTES.inc(len(document.content.encode()), chunker=CHUNKER_LABEL)
+        with (
+            tracer.start_as_current_span("chunking.semantic") as span,
+            INGEST_STAGE_SECONDS.time(chunker=CHUNKER_LABEL, stage="semantic"),
+        ):
+            chonkie_chunks = self.semantic_chunker.chunk(document.content)
+            span.set_attribute("chunks", len(chonkie_chunks))
+        INGEST_CHUNKS.inc(len(chonkie_chunks), chunker=CHUNKER_LABEL, stage="semantic")
 
         return [
             Document(
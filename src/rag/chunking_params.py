@@ -0,0 +1,100 @@
+"""Chunking parameters per knowledge base table.
+
+Tables tuned with ``python -m benchmarks.tune_chunking`` have their
+``chunk_size`` and ``similarity_threshold`` stored in the JSON file at
+``settings.chunking_params_file``::
+
+    {
+      "economics_enhanced_gemini": {
+        "chunk_size": 768,
+        "similarity_threshold": 0.6,
+        "tuned_at": "2026-10-19T12:00:00+00:00"
+      }
+    }
+
+Tables missing from the file use ``settings.chunk_size`` and
+``settings.chunk_similarity_threshold``. Extra keys (tuning details) are
+kept for reference and ignored here.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from src.config import settings
+from src.logger import logger
+
+
+@dataclass(frozen=True)
+class ChunkingParams:
+    """Semantic chunker parameters.
+
+    Attributes:
+        chunk_size: Maximum chunk size in tokens of the chunking embeddings.
+        similarity_threshold: Similarity below which sentences are split (0-1).
+    """
+
+    chunk_size: int
+    similarity_threshold: float
+
+
+def _read_params_file() -> dict[str, Any]:
+    """Return the parameters file's content (empty when missing or invalid)."""
+    path = Path(settings.chunking_params_file)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable chunking parameters file {path}: {e}")
+        return {}
+
+
+def chunking_params_for(table_name: str) -> ChunkingParams:
+    """Return the chunking parameters of a table.
+
+    Args:
+        table_name: Knowledge base table (or LangChain collection) name.
+
+    Returns:
+        Tuned parameters when the table has an entry, else the settings.
+    """
+    entry = _read_params_file().get(table_name, {})
+    return ChunkingParams(
+        chunk_size=int(entry.get("chunk_size", settings.chunk_size)),
+        similarity_threshold=float(
+            entry.get("similarity_threshold", settings.chunk_similarity_threshold)
+        ),
+    )
+
+
+def save_chunking_params(
+    table_name: str, params: ChunkingParams, details: dict[str, Any] | None = None
+) -> Path:
+    """Store a table's parameters, keeping the other tables' entries.
+
+    The file is replaced atomically, so a process reading it never sees a
+    partial write.
+
+    Args:
+        table_name: Knowledge base table (or LangChain collection) name.
+        params: Parameters to store.
+        details: Extra keys recorded with the entry (e.g. tuning scores).
+
+    Returns:
+        Path of the parameters file.
+    """
+    path = Path(settings.chunking_params_file)
+    entries = _read_params_file()
+    entries[table_name] = {
+        "chunk_size": params.chunk_size,
+        "similarity_threshold": params.similarity_threshold,
+        **(details or {}),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_text(json.dumps(entries, indent=2) + "\n", encoding="utf-8")
+    os.replace(temporary, path)
+    return path
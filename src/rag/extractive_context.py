@@ -0,0 +1,526 @@
+"""Chunk contexts built locally, without LLM calls.
+
+The extractive strategy situates a chunk with what the document already
+says about it: the document title, the path of section headings above the
+chunk and the chunk's top TF-IDF keyphrases relative to the rest of the
+document::
+
+    Document: Inflation Report. Section: Prices > Food.
+    Key terms: food prices, ipca, harvest.
+
+Headings come from the PDF outline (bookmarks) or, when a PDF has none,
+from lines set in a larger font than the body text; text documents use
+Markdown headings. PDF readers hand each page's share of the outline to
+the chunker through ``page_outline``.
+"""
+
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, Sequence
+
+import numpy as np
+
+from src.logger import logger
+
+CONTEXT_STRATEGIES = ("llm", "extractive")
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+# Two-word phrases don't span these
+PHRASE_BREAK = re.compile(r"[\n.,;:!?()\[\]{}\"“”'‘’/|]+")
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# Too frequent to characterize a chunk (the corpora are English and Portuguese)
+STOPWORDS = frozenset(
+    """
+    a about above after again against all also an and any are as at be because
+    been before being below between both but by can could did do does doing down
+    during each few for from further had has have having he her here hers him his
+    how however i if in into is it its itself just may me might more most must my
+    no nor not now of off on once only or other our out over own per same she
+    should so some such than that the their them then there these they this those
+    through to too under until up upon very was we were what when where which
+    while who whom why will with within without would you your
+    ao aos as até com como da das de dela dele deles do dos e ela elas ele eles em
+    entre era essa esse esta este foi for foram há isso isto já lhe mais mas
+    mesmo muito na nas nem no nos num numa não o os ou para pela pelas pelo pelos
+    por qual quando que quem se sem ser seu seus sobre sua suas são também te tem
+    um uma umas uns à às é
+    """.split()
+)
+
+# Two-word phrases say more than single words at the same TF-IDF
+BIGRAM_WEIGHT = 1.5
+
+# PDF lines this much larger than the body text are headings
+HEADING_SCALE = 1.15
+MAX_HEADING_CHARS = 120
+MAX_HEADING_LEVELS = 3
+
+
+@dataclass(frozen=True)
+class Heading:
+    """A section heading.
+
+    Attributes:
+        level: Nesting level (1 is the top level).
+        text: Heading text.
+        page: Zero-based page index (0 for text documents).
+        y: Vertical position on the page as a fraction of its height.
+    """
+
+    level: int
+    text: str
+    page: int = 0
+    y: float = 0.0
+
+
+class TermStats:
+    """Document frequencies of terms over the segments (pages, paragraphs) of a document.
+
+    Attributes:
+        segments: Number of segments counted.
+        document_frequency: Segments containing each term.
+    """
+
+    def __init__(self, segments: Iterable[str]) -> None:
+        """Count the terms of each segment.
+
+        Args:
+            segments: Texts the document is divided into.
+        """
+        self.segments = 0
+        self.document_frequency: Counter[str] = Counter()
+        for segment in segments:
+            self.segments += 1
+            self.document_frequency.update(set(terms(segment)))
+
+    def idf(self, vocabulary: Sequence[str]) -> np.ndarray:
+        """Smoothed inverse document frequency of each term."""
+        frequency = np.fromiter(
+            (self.document_frequency.get(term, 0) for term in vocabulary),
+            dtype=np.float64,
+            count=len(vocabulary),
+        )
+        return np.log((1 + self.segments) / (1 + frequency)) + 1
+
+
+@dataclass(frozen=True)
+class PageOutline:
+    """The part of a document's outline a page needs.
+
+    Attributes:
+        title: Document title, if known.
+        path: Headings in effect at the top of the page, outermost first.
+        headings: Headings on the page, top to bottom.
+        stats: Term statistics of the whole document.
+    """
+
+    title: str | None
+    path: tuple[Heading, ...]
+    headings: tuple[Heading, ...]
+    stats: TermStats | None = None
+
+    def locate(self, text: str) -> list[tuple[int, Heading]]:
+        """Return the character offset of each heading in the page text.
+
+        Headings the text extraction rendered differently are placed by
+        their vertical position instead.
+        """
+        located = []
+        folded = text.casefold()
+        cursor = 0
+        for heading in self.headings:
+            offset = folded.find(heading.text.casefold(), cursor)
+            if offset < 0:
+                offset = max(cursor, int(heading.y * len(text)))
+            located.append((offset, heading))
+            cursor = offset
+        return located
+
+
+@dataclass
+class DocumentOutline:
+    """Title, headings and term statistics of a PDF.
+
+    Attributes:
+        title: Document title, if the PDF has one.
+        headings: Headings in reading order.
+        stats: Term statistics over the pages.
+    """
+
+    title: str | None
+    headings: list[Heading] = field(default_factory=list)
+    stats: TermStats | None = None
+
+    def page(self, index: int) -> PageOutline:
+        """Return the outline of a page.
+
+        Args:
+            index: Zero-based page index.
+        """
+        before = [heading for heading in self.headings if heading.page < index]
+        on_page = sorted(
+            (heading for heading in self.headings if heading.page == index),
+            key=lambda heading: heading.y,
+        )
+        return PageOutline(self.title, _push_headings((), before), tuple(on_page), self.stats)
+
+
+_page_outline: ContextVar[PageOutline | None] = ContextVar("page_outline", default=None)
+
+
+@contextmanager
+def page_outline(outline: PageOutline | None) -> Iterator[None]:
+    """Make a page's outline available to chunkers called in the block.
+
+    Args:
+        outline: Outline of the page being chunked.
+    """
+    token = _page_outline.set(outline)
+    try:
+        yield
+    finally:
+        _page_outline.reset(token)
+
+
+def current_page_outline() -> PageOutline | None:
+    """Return the outline set by ``page_outline``, if any."""
+    return _page_outline.get()
+
+
+def terms(text: str) -> list[str]:
+    """Candidate keyphrases of a text: words and two-word phrases without stopwords."""
+    unigrams, bigrams = [], []
+    for phrase in PHRASE_BREAK.split(text.casefold()):
+        words = WORD_PATTERN.findall(phrase)
+        keep = [len(word) > 2 and word not in STOPWORDS for word in words]
+        unigrams.extend(word for word, kept in zip(words, keep) if kept)
+        bigrams.extend(
+            f"{first} {second}"
+            for first, second, kept_first, kept_second in zip(words, words[1:], keep, keep[1:])
+            if kept_first and kept_second and first != second
+        )
+    return unigrams + bigrams
+
+
+def keyphrases(chunks: Sequence[str], stats: TermStats, top_n: int = 5) -> list[list[str]]:
+    """Return the top TF-IDF keyphrases of each chunk.
+
+    Term frequencies are taken within the chunk and document frequencies
+    from ``stats``, so a chunk's keyphrases are what sets it apart from the
+    rest of its document. Phrases whose words were all already picked are
+    skipped.
+
+    Args:
+        chunks: Chunk texts.
+        stats: Term statistics of the chunks' document.
+        top_n: Keyphrases per chunk.
+
+    Returns:
+        Keyphrases per chunk, best first.
+    """
+    rows, candidates = [], []
+    for row, chunk in enumerate(chunks):
+        chunk_terms = terms(chunk)
+        rows.extend([row] * len(chunk_terms))
+        candidates.extend(chunk_terms)
+    if not candidates:
+        return [[] for _ in chunks]
+
+    vocabulary, columns = np.unique(np.array(candidates), return_inverse=True)
+    rows = np.asarray(rows)
+    pairs, counts = np.unique(rows * len(vocabulary) + columns, return_counts=True)
+    pair_rows, pair_columns = np.divmod(pairs, len(vocabulary))
+    lengths = np.bincount(rows, minlength=len(chunks))
+    weights = np.where(np.char.find(vocabulary, " ") >= 0, BIGRAM_WEIGHT, 1.0)
+    scores = (
+        counts / lengths[pair_rows] * (stats.idf(vocabulary.tolist()) * weights)[pair_columns]
+    )
+
+    # Best candidates first within each chunk; keep a few spares per chunk
+    # for the ones dropped as redundant
+    order = np.lexsort((-scores, pair_rows))
+    ranked_rows = pair_rows[order]
+    rank = np.arange(len(order)) - np.searchsorted(ranked_rows, ranked_rows)
+    shortlist = order[rank < top_n * 3]
+
+    phrases: list[list[str]] = [[] for _ in chunks]
+    picked_words: list[set[str]] = [set() for _ in chunks]
+    for index in shortlist:
+        row = pair_rows[index]
+        if len(phrases[row]) == top_n:
+            continue
+        phrase = str(vocabulary[pair_columns[index]])
+        words = set(phrase.split())
+        if words <= picked_words[row]:
+            continue
+        phrases[row].append(phrase)
+        picked_words[row] |= words
+    return phrases
+
+
+def markdown_headings(text: str) -> list[tuple[int, Heading]]:
+    """Return the Markdown headings of a text with their offsets."""
+    return [
+        (match.start(), Heading(level=len(match.group(1)), text=match.group(2).strip()))
+        for match in MARKDOWN_HEADING.finditer(text)
+    ]
+
+
+def _push_headings(
+    path: tuple[Heading, ...], headings: Iterable[Heading]
+) -> tuple[Heading, ...]:
+    """Apply headings in order to a heading path (each closes its siblings)."""
+    stack = list(path)
+    for heading in headings:
+        while stack and stack[-1].level >= heading.level:
+            stack.pop()
+        stack.append(heading)
+    return tuple(stack)
+
+
+def section_paths(
+    offsets: Sequence[int],
+    headings: Sequence[tuple[int, Heading]],
+    start: tuple[Heading, ...] = (),
+) -> list[tuple[str, ...]]:
+    """Return the heading path in effect at each offset.
+
+    Args:
+        offsets: Character offsets, in increasing order.
+        headings: ``(offset, heading)`` pairs, in increasing order.
+        start: Heading path in effect before the text.
+    """
+    paths = []
+    path = start
+    applied = 0
+    for offset in offsets:
+        while applied < len(headings) and headings[applied][0] <= offset:
+            path = _push_headings(path, [headings[applied][1]])
+            applied += 1
+        paths.append(tuple(heading.text for heading in path))
+    return paths
+
+
+def chunk_offsets(text: str, chunks: Sequence[str]) -> list[int]:
+    """Return where each chunk starts in the text it was cut from."""
+    offsets = []
+    cursor = 0
+    for chunk in chunks:
+        offset = text.find(chunk[:80].strip(), cursor)
+        if offset >= 0:
+            cursor = offset
+        offsets.append(cursor)
+    return offsets
+
+
+def format_context(title: str | None, path: Sequence[str], phrases: Sequence[str]) -> str:
+    """Render an extractive context (empty when there is nothing to say)."""
+    parts = []
+    if title:
+        parts.append(f"Document: {title}.")
+    if path:
+        parts.append(f"Section: {' > '.join(path)}.")
+    if phrases:
+        parts.append(f"Key terms: {', '.join(phrases)}.")
+    return " ".join(parts)
+
+
+class ExtractiveContextGenerator:
+    """Builds chunk contexts from the title, heading path and keyphrases.
+
+    Attributes:
+        top_n: Keyphrases per context.
+    """
+
+    def __init__(self, top_n: int = 5) -> None:
+        """Initialize the generator.
+
+        Args:
+            top_n: Keyphrases per context.
+        """
+        self.top_n = top_n
+
+    def contexts(
+        self,
+        text: str,
+        chunks: Sequence[str],
+        title: str | None = None,
+        outline: PageOutline | None = None,
+    ) -> list[str]:
+        """Return a context for each chunk of a text.
+
+        Args:
+            text: Text the chunks were cut from (a page for PDFs).
+            chunks: Chunk texts, in order.
+            title: Document title used when the outline has none.
+            outline: Page outline from a PDF; without it, headings are read
+                from Markdown and keyphrases scored against the paragraphs.
+
+        Returns:
+            One context per chunk.
+        """
+        if not chunks:
+            return []
+        if outline is not None:
+            title = outline.title or title
+            headings = outline.locate(text)
+            start = outline.path
+            stats = outline.stats or TermStats(PARAGRAPH_BREAK.split(text))
+        else:
+            headings = markdown_headings(text)
+            start = ()
+            stats = TermStats(PARAGRAPH_BREAK.split(text))
+
+        # A chunk belongs to the section it is mostly in: take the path a
+        # third of the way in, past a heading the chunk opens with
+        offsets = [
+            offset + len(chunk) // 3 for offset, chunk in zip(chunk_offsets(text, chunks), chunks)
+        ]
+        paths = section_paths(offsets, headings, start)
+        phrases = keyphrases(chunks, stats, self.top_n)
+        return [
+            format_context(title, path, chunk_phrases)
+            for path, chunk_phrases in zip(paths, phrases)
+        ]
+
+
+def _pdf_lines(page: Any) -> list[tuple[str, float, float]]:
+    """Text lines of a PyMuPDF page as ``(text, font size, y)``."""
+    lines = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if spans:
+                text = " ".join(" ".join(span["text"] for span in spans).split())
+                lines.append((text, max(span["size"] for span in spans), line["bbox"][1]))
+    return lines
+
+
+def _font_headings(
+    pages: list[list[tuple[str, float, float]]], heights: list[float]
+) -> list[Heading]:
+    """Headings of a PDF without bookmarks, from lines set larger than the body."""
+    sizes: Counter[float] = Counter()
+    repeated: Counter[str] = Counter()
+    for lines in pages:
+        for text, size, _ in lines:
+            sizes[round(size * 2) / 2] += len(text)
+        repeated.update({text for text, _, _ in lines})
+    if not sizes:
+        return []
+    body = sizes.most_common(1)[0][0]
+    # Running headers and footers repeat on most pages
+    running = {
+        text for text, count in repeated.items() if len(pages) > 2 and count > len(pages) / 2
+    }
+
+    candidates = [
+        (index, text, round(size * 2) / 2, y)
+        for index, lines in enumerate(pages)
+        for text, size, y in lines
+        if size >= body * HEADING_SCALE
+        and len(text) <= MAX_HEADING_CHARS
+        and WORD_PATTERN.search(text)
+        and text not in running
+    ]
+    levels = {
+        size: min(rank + 1, MAX_HEADING_LEVELS)
+        for rank, size in enumerate(sorted({size for _, _, size, _ in candidates}, reverse=True))
+    }
+
+    headings: list[Heading] = []
+    for index, text, size, y in candidates:
+        y_fraction = y / heights[index] if heights[index] else 0.0
+        previous = headings[-1] if headings else None
+        # Headings wrapped over several lines
+        if (
+            previous is not None
+            and previous.page == index
+            and previous.level == levels[size]
+            and 0 <= y_fraction - previous.y < 0.05
+        ):
+            headings[-1] = Heading(previous.level, f"{previous.text} {text}", index, previous.y)
+            continue
+        headings.append(Heading(levels[size], text, index, y_fraction))
+    return headings
+
+
+def read_pdf_outline(pdf: str | Path | IO[bytes]) -> DocumentOutline | None:
+    """Read the title, headings and term statistics of a PDF.
+
+    Bookmarks are used when the PDF has them; otherwise headings are the
+    lines set larger than the body text, levels following font sizes.
+
+    Args:
+        pdf: PDF path or binary file object (rewound afterwards).
+
+    Returns:
+        The outline, or None when the PDF can't be parsed.
+    """
+    import pymupdf
+
+    try:
+        if hasattr(pdf, "read"):
+            position = pdf.tell()
+            document = pymupdf.open(stream=pdf.read(), filetype="pdf")
+            pdf.seek(position)
+        else:
+            document = pymupdf.open(pdf)
+    except Exception as e:
+        logger.warning(f"Could not read PDF outline, using text only: {e}")
+        return None
+
+    with document:
+        pages = [_pdf_lines(page) for page in document]
+        heights = [page.rect.height for page in document]
+        headings = []
+        for level, text, page_number, destination in document.get_toc(simple=False):
+            index = page_number - 1
+            if not text.strip() or not 0 <= index < len(heights):
+                continue
+            y = getattr(destination.get("to"), "y", 0.0) if destination else 0.0
+            y_fraction = min(max(y / heights[index], 0.0), 1.0) if heights[index] else 0.0
+            headings.append(Heading(level, " ".join(text.split()), index, y_fraction))
+        if not headings:
+            headings = _font_headings(pages, heights)
+
+        title = (document.metadata or {}).get("title", "").strip() or None
+        if title is None and pages and pages[0]:
+            text, size, _ = max(pages[0], key=lambda line: line[1])
+            if len(text) <= MAX_HEADING_CHARS and any(size > other for _, other, _ in pages[0]):
+                title = text
+
+        stats = TermStats("\n".join(text for text, _, _ in lines) for lines in pages)
+    if title:
+        # The title is said once already, don't repeat it in every path
+        headings = [
+            heading for heading in headings if heading.text.casefold() != title.casefold()
+        ]
+    return DocumentOutline(title, headings, stats)
+
+
+def document_title(name: str | None) -> str | None:
+    """Readable title from a document name such as ``inflation_report_2024``."""
+    if not name:
+        return None
+    return " ".join(Path(name).stem.replace("_", " ").split()) or None
+
+
+def validate_context_strategy(strategy: str) -> str:
+    """Return a context strategy name, rejecting unknown ones.
+
+    Raises:
+        ValueError: The strategy isn't one of ``CONTEXT_STRATEGIES``.
+    """
+    if strategy not in CONTEXT_STRATEGIES:
+        raise ValueError(
+            f"Unknown context strategy {strategy!r}, expected one of {CONTEXT_STRATEGIES}"
+        )
+    return strategy
+
@@ -1,5 +1,24 @@
-"""LangChain-based RAG implementation."""
+"""LangChain-based RAG implementation.
 
-from src.rag.langchain.contextual_knowledge_base import ContextualLangChainKnowledgeBase
+The LangChain stack is only needed by the LangChain ingestion scripts, so
+it is imported on first attribute access instead of with this package.
+"""
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.rag.langchain.contextual_knowledge_base import (
+        ContextualLangChainKnowledgeBase,
+    )
 
 __all__ = ["ContextualLangChainKnowledgeBase"]
+
+
+def __getattr__(name: str):
+    if name == "ContextualLangChainKnowledgeBase":
+        from src.rag.langchain.contextual_knowledge_base import (
+            ContextualLangChainKnowledgeBase,
+        )
+
+        return ContextualLangChainKnowledgeBase
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,6 @@
 """Context-enhanced semantic chunking for LangChain."""
 
+import asyncio
 import time
 from typing import List
 
@@ -8,6 +9,12 @@ from google import genai
 from langchain_core.documents import Document
 
 from src.config import settings
+from src.logger import logger, sampled
+from src.metrics import INGEST_BYTES, INGEST_CHUNKS, INGEST_STAGE_SECONDS
+from src.tracing import set_usage_attributes, tracer
+from src.usage import get_usage_ledger
+
+CHUNKER_LABEL = "langchain_contextual"
 
 
 class LangChainContextualChunker:
@@ -35,6 +42,8 @@ Context:"""
         similarity_threshold: float = 0.5,
         max_retries: int = 3,
         retry_delay: float = 2.0,
+        max_concurrency: int = 5,
+        client: genai.Client | None = None,
     ) -> None:
         """Initialize contextual chunker.
 
@@ -44,17 +53,25 @@ Context:"""
             similarity_threshold: Threshold for semantic boundary detection (0-1).
             max_retries: Maximum retry attempts per chunk.
             retry_delay: Initial delay between retries (exponential backoff).
+            max_concurrency: Maximum concurrent context generation calls (async API).
+            client: Gemini client for context generation; defaults to one using
+                ``settings.google_api_key``.
         """
         self.semantic_chunker = SemanticChunker(
             embedding_model=embedder,
             chunk_size=chunk_size,
-            similarity_threshold=similarity_threshold,
+            threshold=similarity_threshold,
         )
 
-        self.client = genai.Client(api_key=settings.google_api_key)
+        self.client = client or genai.Client(api_key=settings.google_api_key)
         self.model_id = settings.semantic_chunking_model
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.max_concurrency = max_concurrency
+
+        # Semaphores are bound to an event loop, so create one lazily per loop
+        self._semaphore: asyncio.Semaphore | None = None
+        self._semaphore_loop: asyncio.AbstractEventLoop | None = None
 
     def _generate_context(self, prompt: str) -> str:
         """Generate context using Gemini API.
@@ -65,11 +82,116 @@ Context:"""
         Returns:
             Generated context text.
         """
-        response = self.client.models.generate_content(
-            model=self.model_id, contents=prompt
-        )
+        start = time.perf_counter()
+        with tracer.start_as_current_span("gemini.generate_content") as span:
+            response = self.client.models.generate_content(
+                model=self.model_id, contents=prompt
+            )
+            self._set_usage(span, response, time.perf_counter() - start)
         return response.text
 
+    async def _agenerate_context(self, prompt: str) -> str:
+        """Generate context using the async Gemini API.
+
+        Args:
+            prompt: Context generation prompt.
+
+        Returns:
+            Generated context text.
+        """
+        start = time.perf_counter()
+        with tracer.start_as_current_span("gemini.generate_content") as span:
+            response = await self.client.aio.models.generate_content(
+                model=self.model_id, contents=prompt
+            )
+            self._set_usage(span, response, time.perf_counter() - start)
+        return response.text
+
+    def _set_usage(self, span, response, seconds: float) -> None:
+        """Attach token usage of a Gemini response to a span and the usage ledger."""
+        usage = response.usage_metadata
+        input_tokens = usage.prompt_token_count if usage else None
+        output_tokens = usage.candidates_token_count if usage else None
+        set_usage_attributes(span, self.model_id, input_tokens, output_tokens)
+        get_usage_ledger().record(
+            "llm", "context", self.model_id, input_tokens, output_tokens, seconds=seconds
+        )
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the concurrency semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _agenerate_context_with_retry(
+        self, chunk_text: str, doc_preview: str, chunk_idx: int
+    ) -> str | None:
+        """Generate context asynchronously with exponential backoff retry.
+
+        The concurrency slot is released while backing off, so a failing chunk
+        does not hold up the others.
+
+        Args:
+            chunk_text: Content of the chunk to generate context for.
+            doc_preview: Preview of the full document.
+            chunk_idx: Index of the chunk (for logging).
+
+        Returns:
+            Generated context or None if all retries failed.
+        """
+        prompt = self.CONTEXT_PROMPT.format(
+            whole_doc=doc_preview, chunk_content=chunk_text[:500]
+        )
+        semaphore = self._get_semaphore()
+
+        for attempt in range(self.max_retries):
+            try:
+                async with semaphore:
+                    return await self._agenerate_context(prompt)
+            except Exception:
+                if attempt < self.max_retries - 1:
+                    delay = self.retry_delay * (2**attempt)
+                    sampled().bind(chunk=chunk_idx + 1, attempt=attempt + 1).debug(
+                        f"⚠️  Chunk {chunk_idx + 1}: attempt {attempt + 1} failed. "
+                        f"Retry in {delay:.1f}s..."
+                    )
+                    await asyncio.sleep(delay)
+                else:
+                    logger.bind(chunk=chunk_idx + 1, attempts=self.max_retries).warning(
+                        f"❌ Chunk {chunk_idx + 1}: failed after {self.max_retries} attempts"
+                    )
+        return None
+
+    def _build_chunk_document(
+        self, doc: Document, chunk, idx: int, context_prefix: str | None
+    ) -> Document:
+        """Build the output document for a chunk with optional context.
+
+        Args:
+            doc: Source LangChain document.
+            chunk: Chonkie chunk produced from the source document.
+            idx: Index of the chunk within the source document.
+            context_prefix: Generated context or None.
+
+        Returns:
+            Chunk document with contextual information.
+        """
+        if context_prefix:
+            enhanced_content = f"[CONTEXT: {context_prefix.strip()}]\n\n{chunk.text}"
+        else:
+            enhanced_content = chunk.text
+
+        return Document(
+            page_content=enhanced_content,
+            metadata={
+                **doc.metadata,
+                "chunk_index": idx,
+                "token_count": chunk.token_count,
+            },
+        )
+
     def chunk_documents(self, documents: List[Document]) -> List[Document]:
         """Chunk documents with contextual enhancement.
 
@@ -79,54 +201,134 @@ Context:"""
         Returns:
             List of chunked documents with contextual information.
         """
-        all_chunks = []
-
-        for doc in documents:
-            text = doc.page_content
-            doc_preview = text[:5000]
-
-            # Semantic chunking
-            semantic_chunks = self.semantic_chunker.chunk(text)
-
-            # Add context to each chunk
-            for idx, chunk in enumerate(semantic_chunks):
-                context_prefix = None
-
-                for attempt in range(self.max_retries):
-                    try:
-                        prompt = self.CONTEXT_PROMPT.format(
-                            whole_doc=doc_preview, chunk_content=chunk.text[:500]
-                        )
-                        context_prefix = self._generate_context(prompt)
-                        break
-                    except Exception as e:
-                        if attempt < self.max_retries - 1:
-                            delay = self.retry_delay * (2**attempt)
-                            print(
-                                f"⚠️  Chunk {idx + 1}: attempt {attempt + 1} failed. Retry in {delay:.1f}s..."
-                            )
-                            time.sleep(delay)
-                        else:
-                            print(
-                                f"❌ Chunk {idx + 1}: failed after {self.max_retries} attempts"
+        with tracer.start_as_current_span(
+            "chunking.contextual", attributes={"chunker": CHUNKER_LABEL}
+        ) as span:
+            all_chunks = []
+
+            for doc in documents:
+                text = doc.page_content
+                doc_preview = text[:5000]
+                INGEST_BYTES.inc(len(text.encode()), chunker=CHUNKER_LABEL)
+
+                # Semantic chunking
+                with (
+                    tracer.start_as_current_span("chunking.semantic") as semantic_span,
+                    INGEST_STAGE_SECONDS.time(chunker=CHUNKER_LABEL, stage="semantic"),
+                ):
+                    semantic_chunks = self.semantic_chunker.chunk(text)
+                    semantic_span.set_attribute("chunks", len(semantic_chunks))
+                INGEST_CHUNKS.inc(
+                    len(semantic_chunks), chunker=CHUNKER_LABEL, stage="semantic"
+                )
+                context_start = time.perf_counter()
+
+                # Add context to each chunk
+                for idx, chunk in enumerate(semantic_chunks):
+                    context_prefix = None
+
+                    for attempt in range(self.max_retries):
+                        try:
+                            prompt = self.CONTEXT_PROMPT.format(
+                                whole_doc=doc_preview, chunk_content=chunk.text[:500]
                             )
+                            context_prefix = self._generate_context(prompt)
+                            break
+                        except Exception:
+                            if attempt < self.max_retries - 1:
+                                delay = self.retry_delay * (2**attempt)
+                                sampled().bind(chunk=idx + 1, attempt=attempt + 1).debug(
+                                    f"⚠️  Chunk {idx + 1}: attempt {attempt + 1} failed. "
+                                    f"Retry in {delay:.1f}s..."
+                                )
+                                time.sleep(delay)
+                            else:
+                                logger.bind(chunk=idx + 1, attempts=self.max_retries).warning(
+                                    f"❌ Chunk {idx + 1}: failed after {self.max_retries} attempts"
+                                )
 
-                if context_prefix:
-                    enhanced_content = (
-                        f"[CONTEXT: {context_prefix.strip()}]\n\n{chunk.text}"
+                    if context_prefix:
+                        INGEST_CHUNKS.inc(chunker=CHUNKER_LABEL, stage="context")
+                    all_chunks.append(
+                        self._build_chunk_document(doc, chunk, idx, context_prefix)
                     )
-                else:
-                    enhanced_content = chunk.text
-
-                all_chunks.append(
-                    Document(
-                        page_content=enhanced_content,
-                        metadata={
-                            **doc.metadata,
-                            "chunk_index": idx,
-                            "token_count": chunk.token_count,
-                        },
+
+                INGEST_STAGE_SECONDS.observe(
+                    time.perf_counter() - context_start,
+                    chunker=CHUNKER_LABEL,
+                    stage="context",
+                )
+
+            span.set_attribute("documents", len(documents))
+            span.set_attribute("chunks", len(all_chunks))
+            return all_chunks
+
+    async def achunk_documents(self, documents: List[Document]) -> List[Document]:
+        """Chunk documents with contextual enhancement without blocking the loop.
+
+        Semantic chunking runs in a worker thread, one document at a time.
+        Context generation for a document starts as soon as its chunks are
+        known, so LLM calls overlap with chunking of the following documents.
+        At most ``max_concurrency`` context calls are in flight at once.
+
+        Args:
+            documents: List of LangChain documents to chunk.
+
+        Returns:
+            List of chunked documents with contextual information, in the
+            same order as ``chunk_documents`` would produce.
+        """
+        pending = []
+
+        try:
+            for doc in documents:
+                text = doc.page_content
+                doc_preview = text[:5000]
+                INGEST_BYTES.inc(len(text.encode()), chunker=CHUNKER_LABEL)
+
+                # Semantic chunking (blocking embeddings call)
+                with (
+                    tracer.start_as_current_span("chunking.semantic") as span,
+                    INGEST_STAGE_SECONDS.time(chunker=CHUNKER_LABEL, stage="semantic"),
+                ):
+                    semantic_chunks = await asyncio.to_thread(
+                        self.semantic_chunker.chunk, text
                     )
+                    span.set_attribute("chunks", len(semantic_chunks))
+                INGEST_CHUNKS.inc(
+                    len(semantic_chunks), chunker=CHUNKER_LABEL, stage="semantic"
+                )
+
+                for idx, chunk in enumerate(semantic_chunks):
+                    task = asyncio.create_task(
+                        self._agenerate_context_with_retry(chunk.text, doc_preview, idx)
+                    )
+                    pending.append((doc, chunk, idx, task))
+
+            context_start = time.perf_counter()
+            with tracer.start_as_current_span("chunking.context") as span:
+                contexts = await asyncio.gather(*(task for *_, task in pending))
+                span.set_attribute("chunks", len(contexts))
+                span.set_attribute(
+                    "failed_chunks", sum(1 for context in contexts if not context)
                 )
+            INGEST_STAGE_SECONDS.observe(
+                time.perf_counter() - context_start,
+                chunker=CHUNKER_LABEL,
+                stage="context",
+            )
+            INGEST_CHUNKS.inc(
+                sum(1 for context in contexts if context),
+                chunker=CHUNKER_LABEL,
+                stage="context",
+            )
+        except BaseException:
+            # Don't leave context calls running if chunking fails or we are cancelled
+            for *_, task in pending:
+                task.cancel()
+            raise
 
-        return all_chunks
+        return [
+            self._build_chunk_document(doc, chunk, idx, context_prefix)
+            for (doc, chunk, idx, _), context_prefix in zip(pending, contexts)
+        ]
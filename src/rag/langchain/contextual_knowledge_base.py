@@ -1,14 +1,23 @@
 """LangChain-based Knowledge with contextual semantic chunking."""
 
+import asyncio
+import time
+from functools import cached_property
+from pathlib import Path
 from typing import Any, List
 
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.vectorstores.pgvector import PGVector
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 
 from src.config import settings
+from src.logger import logger
+from src.metrics import INGEST_CHUNKS, INGEST_STAGE_SECONDS
+from src.rag.chunking_params import chunking_params_for
 from src.rag.langchain.chunking import LangChainContextualChunker
+from src.usage import estimate_tokens, get_usage_ledger, usage_scope
 
 
 class ContextualLangChainKnowledgeBase:
@@ -20,46 +29,104 @@ class ContextualLangChainKnowledgeBase:
     - Hybrid search: Combines vector similarity and full-text search.
 
     Attributes:
-        embeddings: Google Gemini embeddings for vector representations.
+        embeddings: Embeddings for vector representations (Gemini by default).
         vectorstore: PGVector vectorstore instance.
-        chunker: Contextual semantic chunker.
+        chunking: Chunking parameters of the collection (tuned or from settings).
+        chunker: Contextual semantic chunker (built on first use).
+        max_concurrency: Concurrency limit for the async ingestion API.
     """
 
-    def __init__(self, collection_name: str = "economics_enhanced_langchain") -> None:
+    def __init__(
+        self,
+        collection_name: str = "economics_enhanced_langchain",
+        max_concurrency: int | None = None,
+        embeddings: Embeddings | None = None,
+        connection_string: str | None = None,
+    ) -> None:
         """Initialize LangChain Knowledge Base.
 
         Args:
             collection_name: PostgreSQL collection name for document storage.
+            max_concurrency: Maximum concurrent context generation calls and
+                files for the async API. Defaults to ``settings.ingest_max_concurrency``.
+            embeddings: Embeddings to use instead of Gemini (e.g. for benchmarks).
+            connection_string: PostgreSQL connection string (defaults to
+                ``settings.db_url``).
         """
-        self.embeddings = GoogleGenerativeAIEmbeddings(
+        self.max_concurrency = max_concurrency or settings.ingest_max_concurrency
+        self.chunking = chunking_params_for(collection_name)
+
+        self.embeddings = embeddings or GoogleGenerativeAIEmbeddings(
             model=settings.embedding_model,
             google_api_key=settings.google_api_key,
         )
 
-        self.chunker = LangChainContextualChunker(
-            embedder=self.embeddings,
-            chunk_size=settings.chunk_size,
-            similarity_threshold=0.5,
-        )
-
         self.vectorstore = PGVector(
             collection_name=collection_name,
-            connection_string=settings.db_url,
+            connection_string=connection_string or settings.db_url,
             embedding_function=self.embeddings,
         )
 
+    @cached_property
+    def chunker(self) -> LangChainContextualChunker:
+        """Contextual semantic chunker."""
+        return LangChainContextualChunker(
+            embedder=self.embeddings,
+            chunk_size=self.chunking.chunk_size,
+            similarity_threshold=self.chunking.similarity_threshold,
+            max_concurrency=self.max_concurrency,
+        )
+
     def ingest_pdf(self, path: str) -> None:
         """Ingest PDF with contextual semantic chunking.
 
         Args:
             path: Path to the PDF file.
         """
-        print(f"📄 Ingesting with context-enhanced semantic chunking: {path}")
-        loader = PyPDFLoader(path)
-        documents = loader.load()
-        chunked_docs = self.chunker.chunk_documents(documents)
-        self.vectorstore.add_documents(chunked_docs)
-        print(f"✅ Ingested {len(chunked_docs)} chunks from {path}")
+        logger.info(f"📄 Ingesting with context-enhanced semantic chunking: {path}")
+        with usage_scope(document=Path(path).name):
+            loader = PyPDFLoader(path)
+            documents = loader.load()
+            chunked_docs = self.chunker.chunk_documents(documents)
+            start = time.perf_counter()
+            with INGEST_STAGE_SECONDS.time(chunker="langchain_contextual", stage="store"):
+                self.vectorstore.add_documents(chunked_docs)
+            self._record_embedding(chunked_docs, time.perf_counter() - start)
+        INGEST_CHUNKS.inc(len(chunked_docs), chunker="langchain_contextual", stage="store")
+        logger.bind(chunks=len(chunked_docs)).info(
+            f"✅ Ingested {len(chunked_docs)} chunks from {path}"
+        )
+
+    async def aingest_pdf(self, path: str) -> None:
+        """Ingest PDF with contextual semantic chunking without blocking the loop.
+
+        Args:
+            path: Path to the PDF file.
+        """
+        logger.info(f"📄 Ingesting with context-enhanced semantic chunking: {path}")
+        with usage_scope(document=Path(path).name):
+            loader = PyPDFLoader(path)
+            documents = await asyncio.to_thread(loader.load)
+            chunked_docs = await self.chunker.achunk_documents(documents)
+            start = time.perf_counter()
+            with INGEST_STAGE_SECONDS.time(chunker="langchain_contextual", stage="store"):
+                await self.vectorstore.aadd_documents(chunked_docs)
+            self._record_embedding(chunked_docs, time.perf_counter() - start)
+        INGEST_CHUNKS.inc(len(chunked_docs), chunker="langchain_contextual", stage="store")
+        logger.bind(chunks=len(chunked_docs)).info(
+            f"✅ Ingested {len(chunked_docs)} chunks from {path}"
+        )
+
+    def _record_embedding(self, documents: List[Document], seconds: float) -> None:
+        """Record the (estimated) embedding tokens of stored chunks."""
+        get_usage_ledger().record(
+            "embedding",
+            "document_embedding",
+            settings.embedding_model,
+            sum(estimate_tokens(doc.page_content) for doc in documents),
+            seconds=seconds,
+            estimated=True,
+        )
 
     def ingest_directory(self, path: str) -> None:
         """Ingest directory with contextual semantic chunking.
@@ -67,15 +134,30 @@ class ContextualLangChainKnowledgeBase:
         Args:
             path: Path to the directory containing PDF files.
         """
-        from pathlib import Path
-
-        print(
-            f"📚 Ingesting directory with context-enhanced semantic chunking: {path}"
-        )
+        logger.info(f"📚 Ingesting directory with context-enhanced semantic chunking: {path}")
         pdf_files = list(Path(path).glob("*.pdf"))
         for pdf_file in pdf_files:
             self.ingest_pdf(str(pdf_file))
 
+    async def aingest_directory(self, path: str) -> None:
+        """Ingest directory concurrently with contextual semantic chunking.
+
+        Up to ``max_concurrency`` files are processed at once; context
+        generation calls share the chunker's own concurrency limit.
+
+        Args:
+            path: Path to the directory containing PDF files.
+        """
+        logger.info(f"📚 Ingesting directory with context-enhanced semantic chunking: {path}")
+        pdf_files = list(Path(path).glob("*.pdf"))
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def ingest_one(pdf_file: Path) -> None:
+            async with semaphore:
+                await self.aingest_pdf(str(pdf_file))
+
+        await asyncio.gather(*(ingest_one(pdf_file) for pdf_file in pdf_files))
+
     def search(self, query: str, limit: int = 5) -> List[Document]:
         """Perform similarity search with contextually enhanced chunks.
 
@@ -88,6 +170,18 @@ class ContextualLangChainKnowledgeBase:
         """
         return self.vectorstore.similarity_search(query, k=limit)
 
+    async def asearch(self, query: str, limit: int = 5) -> List[Document]:
+        """Perform similarity search asynchronously.
+
+        Args:
+            query: Search query string.
+            limit: Maximum number of results to return.
+
+        Returns:
+            List of relevant documents.
+        """
+        return await self.vectorstore.asimilarity_search(query, k=limit)
+
     def search_with_score(self, query: str, limit: int = 5) -> List[tuple[Document, float]]:
         """Perform similarity search with relevance scores.
 
@@ -100,6 +194,20 @@ class ContextualLangChainKnowledgeBase:
         """
         return self.vectorstore.similarity_search_with_score(query, k=limit)
 
+    async def asearch_with_score(
+        self, query: str, limit: int = 5
+    ) -> List[tuple[Document, float]]:
+        """Perform similarity search with relevance scores asynchronously.
+
+        Args:
+            query: Search query string.
+            limit: Maximum number of results to return.
+
+        Returns:
+            List of tuples containing documents and their relevance scores.
+        """
+        return await self.vectorstore.asimilarity_search_with_score(query, k=limit)
+
     def as_retriever(self, **kwargs: Any):
         """Return a LangChain retriever interface.
 
@@ -0,0 +1,123 @@
+"""Search health of the vector store shards, shared by every sharded table.
+
+Kept apart from ``src.rag.agno.sharding`` so that ``/health`` and the
+metrics can report it without importing the Agno knowledge base stack.
+"""
+
+import threading
+import time
+from typing import Any
+
+from src.config import settings
+from src.logger import logger
+from src.metrics import CallbackMetric
+
+
+class ShardHealth:
+    """Search health of one shard database, shared by every table stored on it.
+
+    Attributes:
+        name: Shard label.
+        searches: Searches sent to the shard.
+        failures: Searches that failed or timed out.
+        consecutive_failures: Failures since the last successful search.
+        last_error: Latest failure reason.
+        last_latency: Seconds taken by the latest successful search.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialize a healthy shard.
+
+        Args:
+            name: Shard label.
+        """
+        self.name = name
+        self.searches = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error: str | None = None
+        self.last_latency: float | None = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def healthy(self) -> bool:
+        """Whether searches currently query the shard."""
+        return self.consecutive_failures < settings.shard_failure_threshold
+
+    def should_search(self) -> bool:
+        """Whether a search should query the shard now.
+
+        A shard marked down is probed by one search every
+        ``settings.shard_retry_after`` seconds.
+        """
+        with self._lock:
+            if self.healthy:
+                return True
+            now = time.monotonic()
+            if now < self._retry_at:
+                return False
+            self._retry_at = now + settings.shard_retry_after
+            return True
+
+    def record_success(self, seconds: float) -> None:
+        """Record a successful search."""
+        with self._lock:
+            if not self.healthy:
+                logger.info(f"Shard recovered | shard={self.name}")
+            self.searches += 1
+            self.consecutive_failures = 0
+            self.last_latency = seconds
+
+    def record_failure(self, error: str) -> None:
+        """Record a failed or timed out search."""
+        with self._lock:
+            self.searches += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+            if self.consecutive_failures == settings.shard_failure_threshold:
+                self._retry_at = time.monotonic() + settings.shard_retry_after
+                logger.warning(
+                    f"Shard marked down | shard={self.name} "
+                    f"failures={self.consecutive_failures} error={error}"
+                )
+
+    def stats(self) -> dict[str, Any]:
+        """Return the shard's health as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                "healthy": self.healthy,
+                "searches": self.searches,
+                "failures": self.failures,
+                "consecutive_failures": self.consecutive_failures,
+                "last_error": self.last_error,
+                "last_latency": self.last_latency,
+            }
+
+
+_health: dict[str, ShardHealth] = {}
+_health_lock = threading.Lock()
+
+
+def get_shard_health(name: str) -> ShardHealth:
+    """Return the process-wide health tracker of a shard."""
+    with _health_lock:
+        if name not in _health:
+            _health[name] = ShardHealth(name)
+        return _health[name]
+
+
+def shard_health_stats() -> dict[str, dict[str, Any]]:
+    """Return the health of every shard used by this process."""
+    with _health_lock:
+        health = list(_health.values())
+    return {shard.name: shard.stats() for shard in health}
+
+
+CallbackMetric(
+    "rag_shard_healthy",
+    "Whether searches query each vector store shard (1) or skip it (0)",
+    lambda: {(name,): float(stats["healthy"]) for name, stats in shard_health_stats().items()},
+    labelnames=("shard",),
+)
@@ -0,0 +1,200 @@
+"""Single-flight coalescing of identical concurrent calls."""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+from src.config import settings
+from src.logger import logger
+from src.metrics import CallbackMetric
+
+T = TypeVar("T")
+
+
+class _LeaderAbandoned(Exception):
+    """Signals followers that the leading call was cancelled before finishing."""
+
+
+class _Call:
+    """In-flight call shared by a leader thread and its followers."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesce identical in-flight calls so concurrent callers share one result.
+
+    The first caller for a key (the leader) executes the call; callers that
+    arrive while it runs (followers) wait for its result instead of
+    repeating the work. Followers that wait longer than the timeout fall back
+    to executing the call themselves. Only user-independent work should be
+    coalesced, since every follower receives the leader's result.
+
+    Attributes:
+        name: Group name used in logs and metrics.
+        timeout: Default seconds a follower waits for the leader.
+        executed: Number of calls actually executed by leaders.
+        coalesced: Number of calls served from another caller's result.
+        timeouts: Number of followers that gave up waiting and ran the call.
+    """
+
+    def __init__(self, name: str, timeout: float = 30.0) -> None:
+        """Initialize a single-flight group.
+
+        Args:
+            name: Group name used in logs and metrics.
+            timeout: Default seconds a follower waits for the leader.
+        """
+        self.name = name
+        self.timeout = timeout
+        self.executed = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._async_calls: dict[Hashable, asyncio.Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T], timeout: float | None = None) -> T:
+        """Execute ``fn`` once per key among concurrent (threaded) callers.
+
+        Args:
+            key: Hashable identity of the call.
+            fn: Zero-argument callable performing the work.
+            timeout: Seconds a follower waits before running ``fn`` itself.
+
+        Returns:
+            Result of the shared call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+
+        if not call.done.wait(timeout or self.timeout):
+            self._record_timeout()
+            return fn()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def ado(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        timeout: float | None = None,
+    ) -> T:
+        """Execute ``fn`` once per key among concurrent coroutines.
+
+        Args:
+            key: Hashable identity of the call.
+            fn: Zero-argument coroutine function performing the work.
+            timeout: Seconds a follower waits before running ``fn`` itself.
+
+        Returns:
+            Result of the shared call.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._async_calls.get(key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                self._async_calls[key] = future
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                future.set_exception(_LeaderAbandoned())
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                with self._lock:
+                    self._async_calls.pop(key, None)
+                # Mark the exception as retrieved when nobody was waiting
+                if future.done() and not future.cancelled():
+                    future.exception()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except TimeoutError:
+            self._record_timeout()
+        except _LeaderAbandoned:
+            pass
+        return await fn()
+
+    def _record_timeout(self) -> None:
+        """Count a follower that stopped waiting for its leader."""
+        with self._lock:
+            self.timeouts += 1
+        logger.warning(f"Single-flight wait timed out, running call | group={self.name}")
+
+    def stats(self) -> dict[str, int]:
+        """Return call counters for this group."""
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+        }
+
+
+_groups: dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name: str) -> SingleFlight:
+    """Return the process-wide single-flight group with the given name."""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = SingleFlight(name, timeout=settings.singleflight_timeout)
+            _groups[name] = group
+        return group
+
+
+def singleflight_stats() -> dict[str, dict[str, int]]:
+    """Return counters for every single-flight group."""
+    with _groups_lock:
+        return {name: group.stats() for name, group in _groups.items()}
+
+
+CallbackMetric(
+    "rag_singleflight_calls_total",
+    "Single-flight calls by outcome (executed, coalesced, timeouts)",
+    lambda: {
+        (group, outcome): value
+        for group, stats in singleflight_stats().items()
+        for outcome, value in stats.items()
+    },
+    labelnames=("group", "outcome"),
+    type_name="counter",
+)
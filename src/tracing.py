@@ -0,0 +1,99 @@
+"""OpenTelemetry tracing configuration.
+
+Spans are created through ``tracer`` everywhere in ``src``. Until
+``configure_tracing`` installs a provider, the OpenTelemetry API hands out
+no-op spans, so instrumented code costs next to nothing when tracing is off.
+"""
+
+import threading
+from pathlib import Path
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+from src.config import settings
+from src.logger import logger
+
+tracer = trace.get_tracer("contextual-semantic-hybrid-rag")
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _otlp_exporter():
+    """Create an OTLP/HTTP span exporter, or None if the exporter isn't installed."""
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+    except ImportError:
+        logger.warning(
+            "opentelemetry-exporter-otlp not installed, falling back to file traces"
+        )
+        return None
+
+    # Endpoint/headers fall back to the standard OTEL_EXPORTER_OTLP_* variables
+    return OTLPSpanExporter(endpoint=settings.tracing_otlp_endpoint)
+
+
+def _file_exporter() -> ConsoleSpanExporter:
+    """Create an exporter writing one JSON span per line to the traces file."""
+    path = Path(settings.tracing_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return ConsoleSpanExporter(
+        out=path.open("a", encoding="utf-8"),
+        formatter=lambda span: span.to_json(indent=None) + "\n",
+    )
+
+
+def configure_tracing(service_name: str = "rag-api") -> None:
+    """Install the tracer provider selected by ``settings.tracing_exporter``.
+
+    Safe to call more than once; only the first call has an effect.
+
+    Args:
+        service_name: ``service.name`` resource attribute for emitted spans.
+    """
+    global _configured
+
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+
+        if settings.tracing_exporter == "none":
+            logger.info("Tracing disabled")
+            return
+
+        exporter = None
+        if settings.tracing_exporter == "otlp":
+            exporter = _otlp_exporter()
+        if exporter is None:
+            exporter = _file_exporter()
+
+        provider = TracerProvider(
+            resource=Resource.create({"service.name": service_name})
+        )
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        logger.info(
+            f"Tracing enabled | exporter={type(exporter).__name__} service={service_name}"
+        )
+
+
+def set_usage_attributes(span, model: str, input_tokens, output_tokens) -> None:
+    """Attach model and token usage attributes to a span.
+
+    Args:
+        span: Span to annotate.
+        model: Model identifier.
+        input_tokens: Prompt tokens, if known.
+        output_tokens: Completion tokens, if known.
+    """
+    span.set_attribute("gen_ai.request.model", model)
+    if input_tokens is not None:
+        span.set_attribute("gen_ai.usage.input_tokens", input_tokens)
+    if output_tokens is not None:
+        span.set_attribute("gen_ai.usage.output_tokens", output_tokens)
@@ -0,0 +1,521 @@
+"""Token and cost accounting for LLM and embedding calls.
+
+Every model call records a ``UsageEntry`` in the process-wide ledger. The
+entry is attributed to the active usage scope (document, ingestion job,
+user, endpoint), set with ``usage_scope`` by whoever starts the work, so
+call sites only report tokens and time. Totals are kept per scope value
+and per day, which is what the daily budgets are checked against.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+from src.config import settings
+from src.logger import logger
+from src.metrics import USAGE_COST, USAGE_TOKENS
+
+# USD per million (input, output) tokens, matched by longest model id prefix.
+# List prices at the time of writing; override with USAGE_PRICES.
+DEFAULT_PRICES: dict[str, tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "models/text-embedding-004": (0.0, 0.0),
+    "gemini-embedding-001": (0.15, 0.0),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+# Scope keys usage is aggregated by
+DIMENSIONS = ("document", "job_id", "user_id", "endpoint")
+
+_scope: ContextVar[dict[str, str]] = ContextVar("usage_scope", default={})
+
+metadata = MetaData()
+
+usage_ledger = Table(
+    "usage_ledger",
+    metadata,
+    Column("id", BigInteger, primary_key=True, autoincrement=True),
+    Column("kind", String(16), nullable=False),
+    Column("operation", String(32), nullable=False),
+    Column("model", String(128), nullable=False),
+    Column("input_tokens", Integer, nullable=False),
+    Column("output_tokens", Integer, nullable=False),
+    Column("seconds", Float, nullable=False),
+    Column("cost", Float, nullable=False),
+    Column("estimated", Boolean, nullable=False),
+    Column("purpose", String(16), nullable=False),
+    Column("scope", JSONB, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False, index=True),
+)
+
+
+@contextmanager
+def usage_scope(**attrs: Any) -> Iterator[dict[str, str]]:
+    """Attribute model calls made in the block (and tasks/threads started from it).
+
+    Nested scopes add to the enclosing one; None values are ignored.
+
+    Args:
+        **attrs: Scope values, e.g. ``user_id="42"`` or ``document="book.pdf"``.
+
+    Yields:
+        The scope in effect inside the block.
+    """
+    scope = {**_scope.get(), **{k: str(v) for k, v in attrs.items() if v is not None}}
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def current_scope() -> dict[str, str]:
+    """Return a copy of the active usage scope."""
+    return dict(_scope.get())
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (4 characters per token) for APIs that report none."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _today() -> str:
+    """Current UTC day, the period budgets apply to."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+@dataclass
+class UsageEntry:
+    """One model call.
+
+    Attributes:
+        kind: "llm" or "embedding".
+        operation: What the call was for (agent, context, summary, ...).
+        model: Model identifier.
+        input_tokens: Prompt tokens.
+        output_tokens: Generated tokens.
+        seconds: Call latency.
+        cost: Estimated cost in USD.
+        scope: Usage scope the call was made in.
+        estimated: Tokens were estimated from text length.
+    """
+
+    kind: str
+    operation: str
+    model: str
+    input_tokens: int
+    output_tokens: int
+    seconds: float
+    cost: float
+    scope: dict[str, str] = field(default_factory=dict)
+    estimated: bool = False
+
+    @property
+    def tokens(self) -> int:
+        """Input plus output tokens."""
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def purpose(self) -> str:
+        """"ingest" for calls made while ingesting documents, else "query"."""
+        return "ingest" if "document" in self.scope or "job_id" in self.scope else "query"
+
+
+@dataclass
+class UsageTotals:
+    """Accumulated usage of a scope value."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    seconds: float = 0.0
+    cost: float = 0.0
+
+    def add(self, entry: UsageEntry) -> None:
+        """Add a call to the totals."""
+        self.calls += 1
+        self.input_tokens += entry.input_tokens
+        self.output_tokens += entry.output_tokens
+        self.seconds += entry.seconds
+        self.cost += entry.cost
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the totals with rounded time and cost."""
+        totals = asdict(self)
+        totals["seconds"] = round(self.seconds, 3)
+        totals["cost"] = round(self.cost, 6)
+        return totals
+
+
+class UsageStore:
+    """Postgres table of usage entries, for reporting across processes."""
+
+    def __init__(self, db_url: str | None = None) -> None:
+        """Initialize the store and create its table if needed.
+
+        Args:
+            db_url: PostgreSQL connection string (defaults to ``settings.db_url``).
+        """
+        self.engine = create_engine(db_url or settings.db_url, pool_pre_ping=True)
+        metadata.create_all(self.engine, tables=[usage_ledger], checkfirst=True)
+
+    def add(self, entries: list[tuple[UsageEntry, datetime]]) -> None:
+        """Insert entries with the time they were recorded."""
+        rows = [
+            {
+                "kind": entry.kind,
+                "operation": entry.operation,
+                "model": entry.model,
+                "input_tokens": entry.input_tokens,
+                "output_tokens": entry.output_tokens,
+                "seconds": entry.seconds,
+                "cost": entry.cost,
+                "estimated": entry.estimated,
+                "purpose": entry.purpose,
+                "scope": entry.scope,
+                "created_at": created_at,
+            }
+            for entry, created_at in entries
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(usage_ledger.insert(), rows)
+
+    def daily_tokens(self, day: str) -> dict[tuple[str, str], int]:
+        """Return a UTC day's tokens per purpose and per user.
+
+        Returns:
+            Mapping of ("purpose", purpose) and ("user_id", user) to tokens;
+            user counters only include queries.
+        """
+        tokens = usage_ledger.c.input_tokens + usage_ledger.c.output_tokens
+        user = usage_ledger.c.scope["user_id"].astext
+        since = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        with self.engine.begin() as conn:
+            by_purpose = conn.execute(
+                select(usage_ledger.c.purpose, func.sum(tokens))
+                .where(usage_ledger.c.created_at >= since)
+                .group_by(usage_ledger.c.purpose)
+            ).all()
+            by_user = conn.execute(
+                select(user, func.sum(tokens))
+                .where(
+                    usage_ledger.c.created_at >= since,
+                    usage_ledger.c.purpose == "query",
+                    user.is_not(None),
+                )
+                .group_by(user)
+            ).all()
+        daily = {("purpose", purpose): int(total) for purpose, total in by_purpose}
+        daily.update({("user_id", uid): int(total) for uid, total in by_user})
+        return daily
+
+
+class UsageLedger:
+    """Process-wide record of model usage with per-scope totals and daily budgets.
+
+    Totals are kept in memory per scope dimension (document, job, user,
+    endpoint). When a store is given, entries are also written to Postgres
+    in batches from a background thread, and today's totals are loaded from
+    it on startup so budgets hold across restarts and processes sharing the
+    database (as of the last restart of each process).
+
+    Budgets are daily token caps in UTC; 0 disables a cap. Callers check
+    them before starting work: queries degrade to cheaper routes and
+    ingestion pauses until the next day.
+
+    Attributes:
+        store: Persistent ledger; None keeps usage in memory only.
+        prices: USD per million (input, output) tokens by model id prefix.
+        user_daily_tokens: Daily query tokens per user.
+        query_daily_tokens: Daily query tokens for all users.
+        ingest_daily_tokens: Daily ingestion tokens.
+    """
+
+    def __init__(
+        self,
+        store: UsageStore | None = None,
+        prices: dict[str, tuple[float, float]] | None = None,
+        user_daily_tokens: int = 0,
+        query_daily_tokens: int = 0,
+        ingest_daily_tokens: int = 0,
+        flush_every: int = 50,
+    ) -> None:
+        """Initialize the ledger.
+
+        Args:
+            store: Persistent ledger; None keeps usage in memory only.
+            prices: Price overrides merged over ``DEFAULT_PRICES``.
+            user_daily_tokens: Daily query tokens per user (0 = unlimited).
+            query_daily_tokens: Daily query tokens for all users (0 = unlimited).
+            ingest_daily_tokens: Daily ingestion tokens (0 = unlimited).
+            flush_every: Entries buffered before a write to the store.
+        """
+        self.store = store
+        self.prices = {**DEFAULT_PRICES, **(prices or {})}
+        self.user_daily_tokens = user_daily_tokens
+        self.query_daily_tokens = query_daily_tokens
+        self.ingest_daily_tokens = ingest_daily_tokens
+        self.flush_every = flush_every
+
+        self._lock = threading.Lock()
+        self._totals: dict[tuple[str, str], UsageTotals] = {}
+        self._models: dict[str, UsageTotals] = {}
+        self._day = _today()
+        self._daily: dict[tuple[str, str], int] = {}
+        self._pending: list[tuple[UsageEntry, datetime]] = []
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="usage")
+
+        if store is not None:
+            try:
+                self._daily = store.daily_tokens(self._day)
+            except Exception as e:
+                logger.warning(f"Failed to load today's usage: {e}")
+
+    def price(self, model: str) -> tuple[float, float]:
+        """Return USD per million (input, output) tokens for a model (0 if unknown)."""
+        matches = [prefix for prefix in self.prices if model.startswith(prefix)]
+        return self.prices[max(matches, key=len)] if matches else (0.0, 0.0)
+
+    def record(
+        self,
+        kind: str,
+        operation: str,
+        model: str,
+        input_tokens: int | None,
+        output_tokens: int | None = 0,
+        seconds: float = 0.0,
+        estimated: bool = False,
+    ) -> UsageEntry:
+        """Record a model call in the active usage scope.
+
+        Args:
+            kind: "llm" or "embedding".
+            operation: What the call was for (agent, context, summary, ...).
+            model: Model identifier.
+            input_tokens: Prompt tokens (None when not reported).
+            output_tokens: Generated tokens (None when not reported).
+            seconds: Call latency.
+            estimated: Tokens were estimated from text length.
+
+        Returns:
+            The recorded entry.
+        """
+        input_tokens, output_tokens = input_tokens or 0, output_tokens or 0
+        input_price, output_price = self.price(model)
+        entry = UsageEntry(
+            kind=kind,
+            operation=operation,
+            model=model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            seconds=seconds,
+            cost=(input_tokens * input_price + output_tokens * output_price) / 1e6,
+            scope=current_scope(),
+            estimated=estimated,
+        )
+
+        labels = {"kind": kind, "operation": operation, "model": model}
+        USAGE_TOKENS.inc(input_tokens, direction="input", **labels)
+        USAGE_TOKENS.inc(output_tokens, direction="output", **labels)
+        USAGE_COST.inc(entry.cost, **labels)
+
+        flush = False
+        with self._lock:
+            for dimension in DIMENSIONS:
+                if dimension in entry.scope:
+                    key = (dimension, entry.scope[dimension])
+                    self._totals.setdefault(key, UsageTotals()).add(entry)
+            self._models.setdefault(model, UsageTotals()).add(entry)
+
+            today = _today()
+            if today != self._day:
+                self._day, self._daily = today, {}
+            self._add_daily(("purpose", entry.purpose), entry.tokens)
+            if entry.purpose == "query" and "user_id" in entry.scope:
+                self._add_daily(("user_id", entry.scope["user_id"]), entry.tokens)
+
+            if self.store is not None:
+                self._pending.append((entry, datetime.now(timezone.utc)))
+                flush = len(self._pending) >= self.flush_every
+        if flush:
+            self._executor.submit(self.flush)
+        return entry
+
+    def _add_daily(self, key: tuple[str, str], tokens: int) -> None:
+        """Add tokens to a daily counter (lock held)."""
+        self._daily[key] = self._daily.get(key, 0) + tokens
+
+    def flush(self) -> None:
+        """Write buffered entries to the store."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending or self.store is None:
+            return
+        try:
+            self.store.add(pending)
+        except Exception as e:
+            logger.warning(f"Failed to write usage entries | count={len(pending)}: {e}")
+
+    def totals(self, dimension: str, value: str) -> UsageTotals:
+        """Return the totals of one scope value (e.g. a job id)."""
+        with self._lock:
+            totals = self._totals.get((dimension, str(value)), UsageTotals())
+            return UsageTotals(**asdict(totals))
+
+    def summary(self, dimension: str | None = None) -> dict[str, dict[str, Any]]:
+        """Return totals per value of a scope dimension, or per model when omitted."""
+        with self._lock:
+            if dimension is None:
+                items = self._models.items()
+            else:
+                items = [(v, t) for (d, v), t in self._totals.items() if d == dimension]
+            return {value: totals.as_dict() for value, totals in items}
+
+    def daily_tokens(self, key: tuple[str, str]) -> int:
+        """Return today's tokens of a ("purpose", ...) or ("user_id", ...) counter."""
+        with self._lock:
+            if _today() != self._day:
+                return 0
+            return self._daily.get(key, 0)
+
+    def query_budget_reason(self, user_id: str | None) -> str | None:
+        """Return which query budget is spent ("user" or "query"), or None."""
+        if (
+            self.user_daily_tokens
+            and user_id is not None
+            and self.daily_tokens(("user_id", str(user_id))) >= self.user_daily_tokens
+        ):
+            return "user"
+        if (
+            self.query_daily_tokens
+            and self.daily_tokens(("purpose", "query")) >= self.query_daily_tokens
+        ):
+            return "query"
+        return None
+
+    def ingest_budget_exceeded(self) -> bool:
+        """Return True once today's ingestion token budget is spent."""
+        return bool(
+            self.ingest_daily_tokens
+            and self.daily_tokens(("purpose", "ingest")) >= self.ingest_daily_tokens
+        )
+
+    def report(self, dimension: str | None = None) -> str:
+        """Format ``summary`` as a text table.
+
+        Args:
+            dimension: Scope dimension to group by; per model when omitted.
+        """
+        rows = sorted(self.summary(dimension).items(), key=lambda item: -item[1]["cost"])
+        if not rows:
+            return "No model usage recorded."
+
+        width = max(len(dimension or "model"), *(len(value) for value, _ in rows))
+        lines = [
+            f"{(dimension or 'model'):<{width}}  {'calls':>7}  {'input':>11}  "
+            f"{'output':>9}  {'seconds':>9}  {'cost ($)':>10}"
+        ]
+        total = UsageTotals()
+        for value, t in rows:
+            lines.append(
+                f"{value:<{width}}  {t['calls']:>7}  {t['input_tokens']:>11,}  "
+                f"{t['output_tokens']:>9,}  {t['seconds']:>9.1f}  {t['cost']:>10.4f}"
+            )
+            total.calls += t["calls"]
+            total.input_tokens += t["input_tokens"]
+            total.output_tokens += t["output_tokens"]
+            total.seconds += t["seconds"]
+            total.cost += t["cost"]
+        lines.append(
+            f"{'total':<{width}}  {total.calls:>7}  {total.input_tokens:>11,}  "
+            f"{total.output_tokens:>9,}  {total.seconds:>9.1f}  {total.cost:>10.4f}"
+        )
+        return "\n".join(lines)
+
+    def shutdown(self) -> None:
+        """Write buffered entries and stop the writer thread."""
+        self._executor.shutdown(wait=True)
+        self.flush()
+
+
+@contextmanager
+def timed_usage(kind: str, operation: str, model: str) -> Iterator[dict[str, Any]]:
+    """Time a model call and record it when the block exits without error.
+
+    The block fills the yielded dict with ``input_tokens``/``output_tokens``
+    (and ``estimated``) once the response is known.
+
+    Args:
+        kind: "llm" or "embedding".
+        operation: What the call is for.
+        model: Model identifier.
+
+    Yields:
+        Dict receiving the call's token counts.
+    """
+    usage: dict[str, Any] = {}
+    start = time.perf_counter()
+    yield usage
+    get_usage_ledger().record(
+        kind,
+        operation,
+        model,
+        usage.get("input_tokens"),
+        usage.get("output_tokens"),
+        seconds=time.perf_counter() - start,
+        estimated=usage.get("estimated", False),
+    )
+
+
+_ledger: UsageLedger | None = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Return the process-wide usage ledger, creating it from settings."""
+    global _ledger
+
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                store = None
+                if settings.usage_ledger:
+                    try:
+                        store = UsageStore()
+                    except Exception as e:
+                        logger.error(
+                            f"Usage ledger table unavailable, keeping usage in memory: {e}"
+                        )
+                _ledger = UsageLedger(
+                    store=store,
+                    prices=settings.usage_prices,
+                    user_daily_tokens=settings.usage_user_daily_tokens,
+                    query_daily_tokens=settings.usage_query_daily_tokens,
+                    ingest_daily_tokens=settings.usage_ingest_daily_tokens,
+                )
+    return _ledger